@@ -0,0 +1,269 @@
+# api.py
+"""
+API JSON somente leitura com os números do painel (`/api/v1/`).
+
+Para outros sistemas do INPA reaproveitarem KPIs e contagens sem raspar o
+Dash. Mesmos filtros do dashboard, na query string:
+
+    anos=2015-2020 | anos=2020          (sem: todos, inclusive sem ano)
+    tipo=, modalidade=, continente=     (repetidos ou separados por vírgula)
+    status=todos|vigentes|na_data  data=AAAA-MM-DD (com na_data; padrão hoje)
+    local=pais:ARG | local=uf:AM
+    distintos=1                         (um por acordo: duplicatas e aditivos ligados contam uma vez)
+    versao=<versão guardada>            (histórico, ver historico.py)
+
+Rotas: `/api/v1/` (versão, parâmetros e opções), `/api/v1/kpis`,
+`/api/v1/contagens/<pais|uf|modalidade|ano>` e `/api/v1/acordos`
+(`pagina`, `por_pagina` até `POR_PAGINA_MAX`).
+
+KPIs e contagens saem do agregado do estado de filtros (o mesmo dos
+filtros cruzados, `motor.agregado` em LRU); o corpo JSON de cada
+(versão, rota, filtros) fica num LRU de respostas. O ETag é a versão dos
+dados + hash da rota/filtros normalizados, então um `If-None-Match` igual
+responde 304 sem consultar nada; `Cache-Control` com `INPA_API_MAX_AGE`
+segundos (versões antigas não mudam: cache de 1 ano).
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from flask import Response, request
+
+import cruzados
+from consultas import ANO_ATUAL, Filtros
+
+PREFIXO = "/api/v1"
+API_MAX_AGE = int(os.environ.get("INPA_API_MAX_AGE", "60"))       # segundos de cache nos clientes/proxies
+API_CACHE = int(os.environ.get("INPA_API_CACHE", "256"))          # respostas guardadas (LRU)
+POR_PAGINA_MAX = 500
+GZIP_MIN = 1024          # corpos menores vão sem compressão
+
+STATUS = ("todos", "vigentes", "na_data")
+DIMENSOES = {
+    # dimensão: (coluna do agregado, coluna do rótulo, campo da chave, campo do rótulo)
+    "pais": ("codigo_iso3", "pais", "iso3", "pais"),
+    "uf": ("uf_sigla", "uf_nome", "uf", "nome"),
+    "modalidade": ("modalidade", None, "modalidade", None),
+    "ano": ("ano", None, "ano", None),
+}
+
+
+class ErroParametro(ValueError):
+    """Parâmetro inválido na query string (resposta 400)."""
+
+
+# =========================================================
+# PARÂMETROS -> FILTROS
+# =========================================================
+def _lista(args, nome: str) -> list:
+    valores = []
+    for v in args.getlist(nome):
+        valores += [p.strip() for p in v.split(",") if p.strip()]
+    return sorted(set(valores), key=str)
+
+
+def _anos(texto):
+    if not texto or texto == "Todos":
+        return "Todos"
+    try:
+        partes = [int(p) for p in texto.split("-")]
+    except ValueError:
+        raise ErroParametro(f"anos inválido: {texto!r} (use 2020 ou 2015-2020)")
+    if len(partes) == 1:
+        return partes[0]
+    if len(partes) == 2:
+        return tuple(partes)
+    raise ErroParametro(f"anos inválido: {texto!r} (use 2020 ou 2015-2020)")
+
+
+def _local(texto):
+    if not texto:
+        return None
+    nivel, _, codigo = texto.partition(":")
+    if nivel not in ("pais", "uf") or not codigo:
+        raise ErroParametro(f"local inválido: {texto!r} (use pais:ISO3 ou uf:UF)")
+    return nivel, codigo.upper()
+
+
+def filtros_da_requisicao(args) -> Filtros:
+    """Query string -> Filtros normalizados (mesma chave para a mesma consulta em qualquer ordem)."""
+    status = args.get("status") or "todos"
+    if status not in STATUS:
+        raise ErroParametro(f"status inválido: {status!r} (use {', '.join(STATUS)})")
+    data = args.get("data")
+    if data:
+        try:
+            data = pd.Timestamp(data).date().isoformat()
+        except ValueError:
+            raise ErroParametro(f"data inválida: {data!r} (use AAAA-MM-DD)")
+    distintos = args.get("distintos") or "0"
+    if distintos not in ("0", "1"):
+        raise ErroParametro(f"distintos inválido: {distintos!r} (use 0 ou 1)")
+    return Filtros(_anos(args.get("anos")), _lista(args, "tipo"), _lista(args, "continente"),
+                   _lista(args, "modalidade"), status, _local(args.get("local")), ativos_em=data,
+                   distintos=distintos == "1")
+
+
+def _inteiro(args, nome: str, padrao: int, minimo: int, maximo: int = None) -> int:
+    try:
+        v = int(args.get(nome, padrao))
+    except ValueError:
+        raise ErroParametro(f"{nome} deve ser um número inteiro")
+    if v < minimo or (maximo is not None and v > maximo):
+        raise ErroParametro(f"{nome} fora do intervalo ({minimo}–{maximo or '∞'})")
+    return v
+
+
+# =========================================================
+# CONSULTAS (sobre o agregado do estado de filtros)
+# =========================================================
+def kpis(ag: pd.DataFrame, f: Filtros) -> dict:
+    k = cruzados.kpis(ag, f.anos[1] if f.anos else ANO_ATUAL)
+    return {
+        "acordos": k["total"],
+        "vigentes": k["vigentes"],
+        "paises": k["paises"],
+        "ano_novos": k["ano_novos"],
+        "novos": k["novos"],
+        "modalidade_lider": k["modalidade_lider"],
+        "modalidade_lider_acordos": k["modalidade_lider_qtd"],
+    }
+
+
+def contagens(ag: pd.DataFrame, dimensao: str) -> list:
+    """Acordos e vigentes por valor da dimensão (mais acordos primeiro; anos em ordem)."""
+    coluna, col_rotulo, campo, campo_rotulo = DIMENSOES[dimensao]
+    if dimensao == "pais":
+        ag = ag[(ag["nivel_localizacao"] == "pais") & ag["codigo_iso3"].notna()]
+    elif dimensao == "uf":
+        ag = ag[(ag["codigo_iso3"] == "BRA").fillna(False) & ag["uf_sigla"].notna()]
+    else:
+        ag = ag[ag[coluna].notna()]
+    ag = ag.assign(_vig=ag["qtd"].where(ag["eh_vigente"].astype(bool), 0))
+    g = ag.groupby(coluna, sort=True).agg(acordos=("qtd", "sum"), vigentes=("_vig", "sum"))
+    if col_rotulo:
+        g = g.join(ag.dropna(subset=[col_rotulo]).groupby(coluna)[col_rotulo].first())   # 1º rótulo não nulo
+    g = g.reset_index()
+    if dimensao != "ano":
+        g = g.sort_values("acordos", ascending=False, kind="stable")
+    nomes = {coluna: campo, **({col_rotulo: campo_rotulo} if col_rotulo else {})}
+    cols = [campo] + ([campo_rotulo] if col_rotulo else []) + ["acordos", "vigentes"]
+    g = g.rename(columns=nomes)[cols]
+    return g.astype(object).where(g.notna(), None).to_dict("records")
+
+
+# =========================================================
+# RESPOSTAS COM ETAG
+# =========================================================
+def _json(obj) -> bytes:
+    padrao = lambda o: o.item() if isinstance(o, np.generic) else str(o)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=padrao).encode("utf-8")
+
+
+class CacheRespostas:
+    """Últimas `maximo` respostas (corpo JSON e versão gzip) por ETag."""
+
+    def __init__(self, maximo: int = API_CACHE):
+        self.maximo = maximo
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtem(self, etag: str, calcula) -> tuple:
+        with self._lock:
+            if etag in self._itens:
+                self._itens.move_to_end(etag)
+                return self._itens[etag]
+        corpo = _json(calcula())
+        item = (corpo, gzip.compress(corpo, 6) if len(corpo) >= GZIP_MIN else None)
+        with self._lock:
+            self._itens[etag] = item
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+        return item
+
+
+def etag(versao: str, rota: str, partes) -> str:
+    """Valor do ETag (sem aspas): versão dos dados + hash da rota e dos filtros normalizados."""
+    return f"{versao}-{hashlib.sha1(repr((rota, partes)).encode()).hexdigest()[:16]}"
+
+
+def _erro(status: int, mensagem: str) -> Response:
+    resp = Response(_json({"erro": mensagem}), status=status, mimetype="application/json")
+    resp.headers["Access-Control-Allow-Origin"] = "*"
+    return resp
+
+
+def instala(server, base, opcoes, respostas: CacheRespostas = None) -> CacheRespostas:
+    """
+    Rotas `/api/v1/` em `server`. `base(versao)` -> (versão efetiva, visão
+    com `.motor`, `.agregados` e `.antiga`) — a atual para versao None ou
+    desconhecida; `opcoes()` -> valores disponíveis de cada filtro.
+    """
+    respostas = respostas or CacheRespostas()
+
+    def responde(rota: str, partes, calcula, versao_pedida=None):
+        versao, visao = base(versao_pedida)
+        if versao_pedida and versao_pedida not in ("atual", versao):
+            return _erro(404, f"versão {versao_pedida!r} não está no histórico")
+        tag = etag(versao, rota, partes)
+        if request.if_none_match.contains_weak(tag):    # proxies com gzip podem devolver W/"..."
+            resp = Response(status=304)
+        else:
+            corpo, comprimido = respostas.obtem(tag, lambda: calcula(visao))
+            resp = Response(corpo, mimetype="application/json")
+            if comprimido is not None and "gzip" in request.headers.get("Accept-Encoding", ""):
+                resp.set_data(comprimido)
+                resp.headers["Content-Encoding"] = "gzip"
+        resp.headers["Vary"] = "Accept-Encoding"
+        resp.set_etag(tag)
+        resp.headers["Cache-Control"] = ("public, max-age=31536000, immutable" if visao.antiga
+                                         else f"public, max-age={API_MAX_AGE}")
+        resp.headers["Access-Control-Allow-Origin"] = "*"
+        return resp
+
+    def com_filtros(rota: str, calcula, *extras):
+        try:
+            f = filtros_da_requisicao(request.args)
+            partes = (f.chave(), tuple(e(request.args) for e in extras))
+        except ErroParametro as e:
+            return _erro(400, str(e))
+        return responde(rota, partes, lambda v: calcula(v, f, *partes[1]), request.args.get("versao"))
+
+    @server.route(f"{PREFIXO}/")
+    def api_indice():
+        """Versão dos dados, rotas, parâmetros e valores aceitos em cada filtro."""
+        def calcula(_visao):
+            return {
+                "versao": base(None)[0],
+                "rotas": [f"{PREFIXO}/kpis", *(f"{PREFIXO}/contagens/{d}" for d in DIMENSOES), f"{PREFIXO}/acordos"],
+                "parametros": ["anos", "tipo", "modalidade", "continente", "status", "data", "local", "distintos",
+                               "versao", "pagina", "por_pagina"],
+                "opcoes": {**opcoes(), "status": list(STATUS)},
+            }
+        return responde("indice", (), calcula)
+
+    @server.route(f"{PREFIXO}/kpis")
+    def api_kpis():
+        return com_filtros("kpis", lambda v, f: kpis(v.agregados.obtem(f), f))
+
+    @server.route(f"{PREFIXO}/contagens/<dimensao>")
+    def api_contagens(dimensao):
+        if dimensao not in DIMENSOES:
+            return _erro(404, f"dimensão desconhecida: {dimensao!r} (use {', '.join(DIMENSOES)})")
+        return com_filtros(f"contagens/{dimensao}", lambda v, f: contagens(v.agregados.obtem(f), dimensao))
+
+    @server.route(f"{PREFIXO}/acordos")
+    def api_acordos():
+        def calcula(v, f, pagina, por_pagina):
+            registros, total = v.motor.pagina(f, pagina, por_pagina)
+            return {"total": total, "pagina": pagina, "por_pagina": por_pagina, "acordos": registros}
+        return com_filtros("acordos", calcula,
+                           lambda a: _inteiro(a, "pagina", 0, 0),
+                           lambda a: _inteiro(a, "por_pagina", 100, 1, POR_PAGINA_MAX))
+
+    return respostas
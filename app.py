@@ -1,15 +1,45 @@
 # app.py
-import json, re, os, unicodedata, time, hashlib, io, requests
+import json, re, os, unicodedata, time, hashlib, gzip, threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from dash import Dash, dcc, html, Input, Output, State
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+from dash import Dash, dcc, html, Input, Output, State, Patch, ALL
+from dash.exceptions import PreventUpdate
 import dash
 import dash_bootstrap_components as dbc
 from dash import dash_table
-
-# TEMPLATE PLOTLY CUSTOMIZADO
+from flask import Response, abort, request
+from geodata import load_label_points, build_uf_geometry, LABEL_POINTS_PATH, GEO_CACHE_DIR
+from camadas import carrega_motor, CELULA_PX
+from fetch import fetch_to_file
+from ingest import coluna_pais
+from fontes import Fonte, baixa_planilha, carrega_config, ingere_fontes, imprime_relatorio
+from incremental import EstadoETL, Contagens
+from consultas import ANO_ATUAL, Filtros, MotorPandas, cria_motor, filtra_df, periodo
+from aquecimento import CacheQuente
+from facetas import IndiceFacetas, opcoes_com_contagem
+from perfis import IndicePerfis
+from processos import IndiceProcessos
+from rede import RedeColaboracao
+from vigencia import IndiceVigencia, datas_vigencia
+from coalescencia import SCRIPT_PAGINA, UltimaVence, instala_cookie
+import tarefas
+import historico
+import respostas
+import api
+import estado_url
+import nomes_paises
+import estaticos
+import cruzados
+
+# TEMPLATE PLOTLY CUSTOMIZADO (registrado como "inpa"; as figuras referenciam pelo nome)
 
 PLOTLY_TEMPLATE = go.layout.Template(
     layout=go.Layout(
@@ -45,97 +75,49 @@ PLOTLY_TEMPLATE = go.layout.Template(
         )
     )
 )
+pio.templates["inpa"] = PLOTLY_TEMPLATE
 
 # ============================================================================
 # HELPERS DE COMPONENTES UI
 # ============================================================================
-def kpi_card(label: str, value: str, icon: str = "📊") -> dbc.Card:
+def kpi_card(label: str, value: str = "", icon: str = "📊", id: str = None) -> dbc.Card:
+    """
+    Cartão fixo no layout; com `id`, valor (`id`) e rótulo (`id`-rotulo) são
+    saídas de callback: cada `desenha` manda só os textos (estilos no CSS).
+    """
+    ids = lambda sufixo: {"id": f"{id}{sufixo}"} if id else {}
     return dbc.Card(
         dbc.CardBody([
-            html.Div(icon, style={"fontSize": "20px", "marginBottom": "8px", "opacity": "0.7"}),
-            html.Div(value, style={
-                "fontSize": "28px",
-                "fontWeight": "700",
-                "color": "#1F2937",
-                "LineHeight": "1.2",
-                "marginBottom": "4px"
-            }),
-            html.Div(label, style={
-                "fontSize": "13px",
-                "color": "#6B7280",
-                "textTransform": "uppercase",
-                "letterSpacing": "0.5px",
-                "fontWeight": "500"
-            })
-        ], style={"textAlign": "center", "padding": "20px"})
-        , style={
-            "borderRadius": "18px",
-            "border": "1px solid #E5E7EB",
-            "boxShadow": "0 6px 20px rgba(0,0,0,0.04)",
-            "backgroundColor": "#FFFFFF",
-            "height": "100%"
-        }
+            html.Div(icon, className="kpi-icone"),
+            html.Div(value, className="kpi-valor", **ids("")),
+            html.Div(label, className="kpi-rotulo", **ids("-rotulo")),
+        ]),
+        className="cartao kpi"
     )
 
 def chart_card(title: str, chart_component) -> dbc.Card:
     return dbc.Card([
-        dbc.CardHeader(
-            html.H6(title, style={
-                "margin": "0",
-                "fontSize": "13px",
-                "fontWeight": "600",
-                "color": "#6B7280",
-                "textTransform": "uppercase",
-                "letterSpacing": "0.8px"
-            }),
-            style={"backgroundColor": "#F7FAFC", "border": "none", "padding": "16px 20px"}
-        ),
-        dbc.CardBody(chart_component, style={"padding": "20px"})
-    ], style={
-        "borderRadius": "18px",
-        "border": "1px solid #E5E7EB",
-        "boxShadow": "0 6px 20px rgba(0,0,0,0.04)",
-        "backgroundColor": "#FFFFFF",
-        "marginBottom": "20px"
-    })
-
-def create_ranking_list(data: pd.DataFrame, label_col: str, value_col: str, max_items: int = 10) -> html.Div:
-    colors = ["#0B5ED7", "#3B82F6", "#60A5FA", "#10B981", "#F59E0B", "#EF4444", "#8B5CF6", "#EC4899", "#06B6D4", "#84CC16"]
+        dbc.CardHeader(html.H6(title, className="cartao-titulo")),
+        dbc.CardBody(chart_component)
+    ], className="cartao cartao-grafico")
+
+def create_ranking_list(data: pd.DataFrame, label_col: str, value_col: str, max_items: int = 10,
+                        id_tipo: str = None) -> html.Div:
+    """
+    `id_tipo`: itens clicáveis com id {"type": id_tipo, "index": rótulo} (filtro cruzado).
+    A cor do marcador vem da posição (`.ranking .lista-item:nth-child(n)` no CSS).
+    """
     items = []
-    for idx, row in data.head(max_items).iterrows():
-        color = colors[idx % len(colors)]
+    for _, row in data.head(max_items).iterrows():
         items.append(
             html.Div([
-                html.Div(style={
-                    "width": "10px",
-                    "height": "10px",
-                    "borderRadius": "50%",
-                    "backgroundColor": color,
-                    "marginRight": "12px",
-                    "flexShrink": "0"
-                }),
-                html.Div(row[label_col], style={
-                    "flex": "1",
-                    "fontSize": "14px",
-                    "color": "#1F2937",
-                    "overflow": "hidden",
-                    "textOverflow": "ellipsis",
-                    "whiteSpace": "nowrap"
-                }),
-                html.Div(str(row[value_col]), style={
-                    "fontSize": "14px",
-                    "fontWeight": "600",
-                    "color": "#0B5ED7",
-                    "marginLeft": "12px"
-                })
-            ], style={
-                "display": "flex",
-                "alignItems": "center",
-                "padding": "10px 0",
-                "borderBottom": "1px solid #F3F4F6"
-            })
+                html.Div(className="ranking-ponto"),
+                html.Div(row[label_col], className="lista-texto"),
+                html.Div(str(row[value_col]), className="lista-valor")
+            ], className="lista-item clicavel" if id_tipo else "lista-item",
+               **({"id": {"type": id_tipo, "index": str(row[label_col])}, "n_clicks": 0} if id_tipo else {}))
         )
-    return html.Div(items, style={"padding": "0 4px"})
+    return html.Div(items, className="ranking")
 
 # =========================================================
 # CONFIGURAÇÃO DE ARQUIVOS E GOOGLE SHEETS
@@ -145,9 +127,19 @@ DATA_DIR = BASE_DIR / "data"
 
 # Google Sheets Configuration
 GOOGLE_SHEET_ID = "1hPoZOGtQV0fAMCFoviE9PVuhmYArA6BQ"
-GOOGLE_SHEET_URL = f"https://docs.google.com/spreadsheets/d/{GOOGLE_SHEET_ID}/export?format=xlsx"
+# "csv" (rápido, só a primeira aba) ou "xlsx" (necessário se a planilha depender de várias abas)
+FORMATO_PLANILHA = os.environ.get("INPA_FORMATO_PLANILHA", "csv").lower()
 
 EXCEL_PATH = DATA_DIR / "PROCESSOS_ASSINADOS.xlsx"  # Fallback local
+# Último download em data/sheet_cache.<formato> (+ validadores HTTP em .http.json)
+REFRESH_MIN = float(os.environ.get("INPA_REFRESH_MIN", "15"))  # 0 desativa a revalidação periódica
+MOTOR_CONSULTAS = os.environ.get("INPA_MOTOR", "pandas").lower()  # "pandas" | "duckdb" (ver consultas.py)
+TABELA_PAGINA = 15   # linhas por página da tabela de detalhe (paginação no servidor)
+CACHE_TOPK = int(os.environ.get("INPA_CACHE_TOPK", "20"))      # estados de filtro pré-calculados após cada carga
+CACHE_MB = float(os.environ.get("INPA_CACHE_MB", "32"))        # orçamento de memória do cache quente
+AGREGADOS_MAX = int(os.environ.get("INPA_AGREGADOS_MAX", "32"))  # agregados em memória para filtros cruzados
+DEBOUNCE_MS = int(os.environ.get("INPA_DEBOUNCE_MS", "300"))     # espera nos multi-selects antes de recalcular
+REDE_MAX = int(os.environ.get("INPA_REDE_MAX", "60"))            # pesquisadores no grafo da rede (os com mais acordos)
 BR_STATES_PATH = DATA_DIR / "br_states.geojson"
 
 # =========================================================
@@ -182,62 +174,6 @@ ISO3_TO_CONTINENT = {
     "AUS":"Oceania","NZL":"Oceania","PNG":"Oceania","FJI":"Oceania","NCL":"Oceania","PYF":"Oceania",
 }
 
-def load_iso3_centroids(path: Path) -> dict:
-    if path.exists():
-        try:
-            centroids_df = pd.read_csv(path)
-            return {row["iso3"]: (row["lat"], row["lon"]) for _, row in centroids_df.iterrows()}
-        except Exception as e:
-            print(f"⚠️  Erro ao carregar {path}: {e}")
-    print(f"📥 Centroides não encontrados em {path}, tentando baixar GeoJSON...")
-    try:
-        import requests
-        url = "https://raw.githubusercontent.com/johan/world.geo.json/master/countries.geo.json"
-        r = requests.get(url, timeout=30)
-        r.raise_for_status()
-        geojson = r.json()
-        centroids = {}
-        try:
-            from shapely.geometry import shape
-            for feature in geojson.get("features", []):
-                iso3 = feature.get("id")
-                if iso3:
-                    geom = shape(feature["geometry"])
-                    centroid = geom.centroid
-                    centroids[iso3] = (centroid.y, centroid.x)
-        except ImportError:
-            print("⚠️  shapely não disponível, usando centroide aproximado")
-            for feature in geojson.get("features", []):
-                iso3 = feature.get("id")
-                if iso3:
-                    coords = feature["geometry"].get("coordinates", [])
-                    if coords:
-                        all_points = []
-                        def extract_points(c):
-                            if isinstance(c, (int, float)):
-                                return
-                            if len(c) == 2 and isinstance(c[0], (int, float)):
-                                all_points.append(c)
-                            else:
-                                for item in c:
-                                    extract_points(item)
-                        extract_points(coords)
-                        if all_points:
-                            avg_lon = sum(p[0] for p in all_points) / len(all_points)
-                            avg_lat = sum(p[1] for p in all_points) / len(all_points)
-                            centroids[iso3] = (avg_lat, avg_lon)
-        if centroids:
-            centroids_df = pd.DataFrame([
-                {"iso3": iso3, "lat": lat, "lon": lon}
-                for iso3, (lat, lon) in centroids.items()
-            ])
-            centroids_df.to_csv(path, index=False)
-            print(f"✅ Centroides salvos em {path}")
-        return centroids
-    except Exception as e:
-        print(f"❌ Erro ao baixar/calcular centroides: {e}")
-        return {}
-
 # ============================================================================
 # PARSERS / NORMALIZADORES
 # ============================================================================
@@ -324,6 +260,24 @@ def parse_pais_ou_uf(val: str) -> dict:
         pais_nome = re.sub(r'\([^)]+\)\s*$', "", s).strip()
         return {"nivel":"pais","pais":pais_nome,"iso3":pd.NA,"uf_sigla":pd.NA,"uf_nome":pd.NA}
 
+def resolve_paises_sem_codigo(parsed: pd.DataFrame) -> pd.DataFrame:
+    """
+    País escrito sem "(ISO3)" -> ISO3 pelo nome (nomes_paises.py), uma vez por
+    nome distinto. O nome passa a ser o já usado na planilha para aquele ISO3
+    (ou o nome em português), para o ranking não separar o mesmo país.
+    """
+    sem = (parsed["nivel"] == "pais") & parsed["iso3"].isna() & parsed["pais"].notna()
+    if not sem.any():
+        return parsed
+    r = nomes_paises.resolvedor()
+    achados = {n: r.resolve(n) for n in parsed.loc[sem, "pais"].unique()}
+    com_codigo = parsed.dropna(subset=["iso3"]).drop_duplicates("iso3")
+    nomes = dict(zip(com_codigo["iso3"], com_codigo["pais"]))
+    res = parsed.loc[sem, "pais"].map(achados).dropna()
+    parsed.loc[res.index, "iso3"] = [x.iso3 for x in res]
+    parsed.loc[res.index, "pais"] = [nomes.get(x.iso3, x.nome) for x in res]
+    return parsed
+
 def infer_year_from_num(num):
     if pd.isna(num): 
         return pd.NA
@@ -350,20 +304,17 @@ def infer_year_multi_column(row, num_col="NÚMERO", date_cols=None):
 # ============================================================================
 # MAPAS (MUNDIAL E BRASIL) — corrigindo customdata
 # ============================================================================
-def _agg_pins_world(dff: pd.DataFrame, centroids: dict):
-    paises = dff[dff["nivel_localizacao"] == "pais"].copy()
-    grp = paises.groupby(["codigo_iso3", "eh_vigente"], dropna=True).size().reset_index(name="qtd")
-    meta = paises.groupby("codigo_iso3", dropna=True)["pais"].first().rename("pais").reset_index()
-    agg = grp.merge(meta, on="codigo_iso3", how="left")
-    agg["lat"] = agg["codigo_iso3"].map(lambda iso: centroids.get(iso, (None, None))[0])
-    agg["lon"] = agg["codigo_iso3"].map(lambda iso: centroids.get(iso, (None, None))[1])
+def _agg_pins_world(contagem: pd.DataFrame, centroids):
+    """`contagem`: linhas por (codigo_iso3, eh_vigente) com o nome do país (motor.pins_paises)."""
+    agg = contagem.copy()
+    agg["lat"], agg["lon"] = centroids.lookup(agg["codigo_iso3"])
     agg = agg.dropna(subset=["lat", "lon"])
     max_qtd = agg["qtd"].max() if len(agg) else 1
     agg["marker_size"] = agg["qtd"].apply(lambda q: max(8, min(24, 8 + (q / max_qtd) * 16)))
     return agg
 
-def build_world_marker_map(dff: pd.DataFrame, centroids: dict, clicked_iso3: str = None) -> go.Figure:
-    agg = _agg_pins_world(dff, centroids)
+def build_world_marker_map(contagem: pd.DataFrame, centroids, clicked_iso3: str = None) -> go.Figure:
+    agg = _agg_pins_world(contagem, centroids)
     fig = go.Figure()
 
     # Demais (cinza) – borda escura
@@ -421,14 +372,10 @@ def build_world_marker_map(dff: pd.DataFrame, centroids: dict, clicked_iso3: str
     )
     return fig
 
-def build_brazil_marker_map(dff: pd.DataFrame, uf_centroids: dict) -> go.Figure:
-    br = dff[dff["codigo_iso3"] == "BRA"].copy()
-    grp = br.groupby(["uf_sigla", "eh_vigente"], dropna=False).size().reset_index(name="qtd")
-    meta = br.groupby("uf_sigla", dropna=False)[["uf_nome"]].first().reset_index()
-    agg = grp.merge(meta, on="uf_sigla", how="left")
-    agg = agg[agg["uf_sigla"].notna()].copy()
-    agg["lat"] = agg["uf_sigla"].map(lambda uf: uf_centroids.get(uf, (None, None))[0])
-    agg["lon"] = agg["uf_sigla"].map(lambda uf: uf_centroids.get(uf, (None, None))[1])
+def build_brazil_marker_map(contagem: pd.DataFrame, uf_centroids) -> go.Figure:
+    """`contagem`: linhas por (uf_sigla, eh_vigente) com o nome da UF (motor.pins_ufs)."""
+    agg = contagem.copy()
+    agg["lat"], agg["lon"] = uf_centroids.lookup(agg["uf_sigla"])
     agg = agg.dropna(subset=["lat", "lon"])
     max_qtd = agg["qtd"].max() if len(agg) else 1
     agg["marker_size"] = agg["qtd"].apply(lambda q: max(8, min(28, 8 + (q / max_qtd) * 18)))
@@ -469,6 +416,10 @@ def build_brazil_marker_map(dff: pd.DataFrame, uf_centroids: dict) -> go.Figure:
             showlegend=True
         ))
 
+    _estilo_geo_brasil(fig)
+    return fig
+
+def _estilo_geo_brasil(fig: go.Figure) -> None:
     # ⬇️ Geografia com mais contorno e fundo levemente azulado
     fig.update_geos(
         projection_type="mercator",
@@ -487,188 +438,231 @@ def build_brazil_marker_map(dff: pd.DataFrame, uf_centroids: dict) -> go.Figure:
         paper_bgcolor="#FFFFFF",
         geo=dict(bgcolor="#FFFFFF")
     )
+
+def build_brazil_choropleth_map(agg: pd.DataFrame, geojson_url: str) -> go.Figure:
+    """
+    Coroplético por UF. A geometria é referenciada por URL (asset estático,
+    baixado uma vez pelo navegador); a figura carrega só os valores por UF
+    (`agg`: uf_sigla, qtd, vigentes, uf_nome — motor.resumo_ufs).
+    """
+
+    fig = go.Figure(go.Choropleth(
+        geojson=geojson_url, featureidkey="id",
+        locations=agg["uf_sigla"], z=agg["qtd"],
+        colorscale=[[0, "#DBEAFE"], [0.5, "#3B82F6"], [1, "#0B3B8C"]],
+        marker=dict(line=dict(color="#FFFFFF", width=0.8)),
+        colorbar=dict(title="Acordos", thickness=12, len=0.6),
+        customdata=agg[["uf_sigla", "qtd", "uf_nome", "vigentes"]].values,
+        hovertemplate="<b>%{customdata[2]}</b><br>%{z} acordos (%{customdata[3]} vigentes)<extra></extra>",
+    ))
+    _estilo_geo_brasil(fig)
+    fig.update_layout(uirevision="br-coropletico")   # mantém o zoom ao trocar dados/resolução
     return fig
 
-# =========================================================
-# CARREGAR DADOS DO GOOGLE SHEETS
-# =========================================================
-def load_data_from_google_sheets(sheet_url: str, timeout: int = 30, max_retries: int = 3) -> pd.DataFrame:
+REDE_CORES = {"pesquisador": "#0B5ED7", "pais": "#10B981", "modalidade": "#F97316"}
+
+def build_rede_figure(rede: RedeColaboracao, linhas, tipos=("pais", "modalidade"),
+                      max_pesquisadores: int = REDE_MAX) -> go.Figure:
     """
-    Carrega dados diretamente do Google Sheets de forma robusta.
-    
-    Args:
-        sheet_url: URL de exportação do Google Sheets (.xlsx)
-        timeout: Timeout em segundos para cada tentativa
-        max_retries: Número máximo de tentativas
-    
-    Returns:
-        DataFrame com os dados da planilha
-    
-    Raises:
-        Exception: Se não conseguir carregar após todas as tentativas
+    Grafo pesquisador–país/modalidade das `linhas` filtradas, nas posições
+    já calculadas da rede inteira (rede.py). Tamanho = acordos no recorte;
+    o hover traz grau e coocorrência da versão dos dados (sem filtros).
+    Devolve None enquanto as posições ainda estão sendo calculadas.
     """
-    print(f"🔄 Tentando carregar planilha do Google Sheets...")
-    
-    for tentativa in range(1, max_retries + 1):
-        try:
-            print(f"   Tentativa {tentativa}/{max_retries}...")
-            
-            # Download do arquivo Excel
-            response = requests.get(sheet_url, timeout=timeout)
-            response.raise_for_status()
-            
-            # Ler o conteúdo diretamente na memória
-            excel_data = io.BytesIO(response.content)
-            df = pd.read_excel(excel_data, engine='openpyxl')
-            
-            print(f"✅ Planilha carregada com sucesso! {len(df)} linhas encontradas.")
-            return df
-            
-        except requests.exceptions.Timeout:
-            print(f"⚠️  Timeout na tentativa {tentativa}. A conexão está demorando muito...")
-            if tentativa == max_retries:
-                raise Exception(
-                    "Não foi possível carregar a planilha: timeout após múltiplas tentativas. "
-                    "Verifique sua conexão com a internet."
-                )
-            time.sleep(2 * tentativa)  # Espera progressiva
-            
-        except requests.exceptions.ConnectionError:
-            print(f"⚠️  Erro de conexão na tentativa {tentativa}...")
-            if tentativa == max_retries:
-                raise Exception(
-                    "Não foi possível conectar ao Google Sheets. "
-                    "Verifique sua conexão com a internet."
-                )
-            time.sleep(2 * tentativa)
-            
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 403:
-                raise Exception(
-                    "Acesso negado ao Google Sheets. "
-                    "Verifique se a planilha está compartilhada publicamente ou com 'qualquer pessoa com o link'."
-                )
-            elif e.response.status_code == 404:
-                raise Exception(
-                    "Planilha não encontrada. Verifique se o ID da planilha está correto."
-                )
-            else:
-                print(f"⚠️  Erro HTTP {e.response.status_code} na tentativa {tentativa}...")
-                if tentativa == max_retries:
-                    raise Exception(f"Erro ao acessar Google Sheets: {str(e)}")
-            time.sleep(2 * tentativa)
-            
-        except Exception as e:
-            print(f"⚠️  Erro inesperado na tentativa {tentativa}: {str(e)}")
-            if tentativa == max_retries:
-                raise Exception(f"Erro ao processar planilha: {str(e)}")
-            time.sleep(2 * tentativa)
-    
-    raise Exception("Falha ao carregar dados após todas as tentativas.")
+    pos = rede.posicoes(espera=False)
+    if pos is None:
+        return None
+    acordos = rede.acordos(linhas)
+    topo = np.argsort(-acordos, kind="stable")[:max_pesquisadores]
+    topo = topo[acordos[topo] > 0]
+    no_topo = np.zeros(len(acordos), dtype=bool)
+    no_topo[topo] = True
 
-# Tentar carregar do Google Sheets primeiro, com fallback para arquivo local
-try:
-    df_raw = load_data_from_google_sheets(GOOGLE_SHEET_URL)
-    DATA_SOURCE = "Google Sheets"
-except Exception as e:
-    print(f"❌ Erro ao carregar do Google Sheets: {str(e)}")
-    print(f"🔄 Tentando carregar arquivo local como fallback...")
-    
-    if not EXCEL_PATH.exists():
-        # Se não há fallback local, mostrar erro amigável
-        app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
-        server = app.server
-        app.layout = dbc.Container([
-            dbc.Alert([
-                html.H4("⚠️ Erro ao Carregar Dados", className="alert-heading"),
-                html.P([
-                    "Não foi possível carregar os dados do Google Sheets e não há arquivo local disponível.",
-                    html.Br(), html.Br(),
-                    html.Strong("Erro: "), str(e)
-                ]),
-                html.Hr(),
-                html.P("Soluções possíveis:", className="mb-2", style={"fontWeight": "600"}),
-                html.Ol([
-                    html.Li([
-                        html.Strong("Verifique sua conexão com a internet"), 
-                        " - O aplicativo precisa acessar o Google Sheets online."
-                    ]),
-                    html.Li([
-                        html.Strong("Verifique as permissões da planilha"), 
-                        " - A planilha precisa estar compartilhada com 'qualquer pessoa com o link'."
-                    ]),
-                    html.Li([
-                        html.Strong("Arquivo local alternativo"), 
-                        " - Coloque o arquivo 'PROCESSOS_ASSINADOS.xlsx' na pasta 'data/' como backup."
-                    ]),
-                ]),
-                html.Hr(),
-                html.P("Formato esperado da planilha:", className="mb-1", style={"fontWeight": "600"}),
-                html.Ul([
-                    html.Li("Coluna 'PAÍS/ESTADO (ISO3)' → ex.: 'Reino Unido (GBR)' ou 'Amazonas (AM)'"),
-                    html.Li("Coluna 'NÚMERO' → ex.: '01280.000381/2023-95' (contém o ano)"),
-                    html.Li("Coluna 'STATUS'"),
-                    html.Li("Coluna 'TIPO DE PROCESSO'"),
-                    html.Li("Coluna 'Contatos' ou 'PESQUISADOR' → pesquisador responsável"),
-                ]),
-            ], color="danger")
-        ], fluid=True, style={"maxWidth": "900px", "marginTop": "40px"})
-        
-        if __name__ == "__main__":
-            app.run_server(debug=True, host="0.0.0.0", port=8050)
-        raise SystemExit
-    else:
-        # Usar arquivo local como fallback
-        try:
-            df_raw = pd.read_excel(EXCEL_PATH)
-            DATA_SOURCE = "Arquivo Local (Fallback)"
-            print(f"✅ Dados carregados do arquivo local: {len(df_raw)} linhas")
-        except Exception as local_error:
-            raise Exception(
-                f"Falha ao carregar tanto do Google Sheets quanto do arquivo local. "
-                f"Google Sheets: {str(e)}. Arquivo local: {str(local_error)}"
+    fig = go.Figure()
+    nos = {"pesquisador": (topo, acordos[topo])}
+    for tipo in tipos:
+        b = rede.ligacoes(tipo, linhas)
+        m = no_topo[b.linhas]
+        origem, destino = pos[b.linhas[m]], pos[b.colunas[m] + rede.deslocamento(tipo)]
+        seg = np.full((3 * m.sum(), 2), np.nan)      # origem, destino, quebra: uma linha por ligação
+        seg[0::3], seg[1::3] = origem, destino
+        fig.add_trace(go.Scatter(x=seg[:, 0], y=seg[:, 1], mode="lines", hoverinfo="skip", showlegend=False,
+                                 line=dict(color=REDE_CORES[tipo], width=1), opacity=0.35))
+        cols = np.unique(b.colunas[m])
+        nos[tipo] = (cols, np.bincount(b.colunas[m], weights=b.valores[m], minlength=b.forma[1])[cols].astype(int))
+
+    rotulos = {"pesquisador": rede.pesquisadores, "pais": rede.nomes_paises, "modalidade": rede.modalidades}
+    nomes_tipo = {"pesquisador": "Pesquisadores", "pais": "Países", "modalidade": "Modalidades"}
+    for tipo, (idx, qtd) in nos.items():
+        if not len(idx):
+            continue
+        met = rede.metricas[tipo]
+        xy = pos[idx + rede.deslocamento(tipo)]
+        if tipo == "pesquisador":
+            extra = [f"{met['paises'][i]} países · {met['modalidades'][i]} modalidades · "
+                     f"{met['colaboradores'][i]} colaboradores no mesmo país" for i in idx]
+        elif tipo == "pais":
+            extra = [f"{met['pesquisadores'][i]} pesquisadores · {met['paises_ligados'][i]} países com pesquisador em "
+                     "comum" for i in idx]
+        else:
+            extra = [f"{met['pesquisadores'][i]} pesquisadores" for i in idx]
+        fig.add_trace(go.Scatter(
+            x=xy[:, 0], y=xy[:, 1], name=nomes_tipo[tipo],
+            mode="markers" if tipo == "pesquisador" else "markers+text",
+            text=[str(rotulos[tipo][i]) for i in idx], textposition="top center", textfont=dict(size=10),
+            marker=dict(size=7 + 3 * np.sqrt(qtd), color=REDE_CORES[tipo], line=dict(color="#FFFFFF", width=1),
+                        symbol={"pesquisador": "circle", "pais": "square", "modalidade": "diamond"}[tipo]),
+            customdata=np.column_stack([qtd, extra]),
+            hovertemplate="<b>%{text}</b><br>%{customdata[0]} acordos no recorte<br>%{customdata[1]}<extra></extra>",
+        ))
+    if not len(topo):
+        fig.add_annotation(text="Sem pesquisadores informados no recorte", showarrow=False,
+                           font=dict(color="#6B7280"))
+    fig.update_layout(template="inpa", margin=dict(l=10, r=10, t=10, b=10), hovermode="closest",
+                      xaxis=dict(visible=False, range=[-1.15, 1.15]), yaxis=dict(visible=False, range=[-1.15, 1.15]),
+                      legend=dict(orientation="h", yanchor="bottom", y=1.0, xanchor="right", x=1),
+                      uirevision="rede")     # posições fixas: zoom do usuário fica entre filtros
+    return fig
+
+# ============================================================================
+# CAMADAS VETORIAIS (Camada Cidadã – AAE BR-319), ver camadas.py
+# ============================================================================
+BR_EXTENT = (-74.0, -35.0, -32.0, 6.0)   # lon_min, lat_min, lon_max, lat_max (= lataxis/lonaxis do mapa BR)
+ZOOM_BASE_BR = 5                         # zoom web equivalente ao mapa BR sem zoom
+
+def viewport_br(estado: dict = None) -> tuple:
+    """(bbox, zoom) a partir do centro/escala da projeção guardados do relayoutData."""
+    estado = estado or {}
+    escala = max(float(estado.get("geo.projection.scale") or 1), 1e-6)
+    lon_min, lat_min, lon_max, lat_max = BR_EXTENT
+    lon_c = float(estado.get("geo.center.lon", (lon_min + lon_max) / 2))
+    lat_c = float(estado.get("geo.center.lat", (lat_min + lat_max) / 2))
+    meia_lon = (lon_max - lon_min) / 2 / escala * 1.1
+    meia_lat = (lat_max - lat_min) / 2 / escala * 1.1
+    bbox = (lon_c - meia_lon, lat_c - meia_lat, lon_c + meia_lon, lat_c + meia_lat)
+    return bbox, ZOOM_BASE_BR + np.log2(escala)
+
+def build_layer_trace(motor, layer_id: str, bbox: tuple, zoom: float, periodo=None):
+    """Um trace por camada (mesmo vazio), para manter os índices estáveis na figura."""
+    camada = motor[layer_id]
+    campos = camada.tooltip
+    if not camada.disponivel:
+        return go.Scattergeo(lon=[], lat=[], name=camada.label, showlegend=False)
+    hover = "<b>" + camada.label + "</b>" + "".join(
+        f"<br>{c}: %{{customdata[{i}]}}" for i, c in enumerate(campos)
+    ) + "<extra></extra>"
+
+    if camada.tipo == "point":
+        agregado, pts = motor.pontos_na_janela(layer_id, bbox, zoom, periodo)
+        if agregado:
+            # células (hexbin): cor e hover pela contagem, tooltip resumido por célula
+            hover_cel = "<b>" + camada.label + "</b><br>%{customdata[0]} focos" + "".join(
+                f"<br>{c}: %{{customdata[{i + 1}]}}" for i, c in enumerate(campos)
+            ) + "<extra></extra>"
+            return go.Scattergeo(
+                lon=pts["lon"], lat=pts["lat"], mode="markers", name=camada.label,
+                marker=dict(symbol="hexagon", size=CELULA_PX, opacity=0.8, color=pts["qtd"],
+                            colorscale=[[0, camada.cor_rgba(0.25)], [1, camada.cor_rgba(1.0)]],
+                            line=dict(width=0)),
+                customdata=pts[["qtd", *campos]].values, hovertemplate=hover_cel, showlegend=True
             )
+        for c in campos:
+            if pd.api.types.is_datetime64_any_dtype(pts[c]):
+                pts[c] = pts[c].dt.strftime("%d/%m/%Y")
+        return go.Scattergeo(
+            lon=pts["lon"], lat=pts["lat"], mode="markers",
+            name=camada.label, marker=dict(size=4, color=camada.cor_rgba(0.85)),
+            customdata=pts[campos].values, hovertemplate=hover, showlegend=True
+        )
 
-# tenta achar a coluna de país/estado
-col_pais = None
-for col in df_raw.columns:
-    if "PAÍS" in col.upper() or "PAIS" in col.upper():
-        col_pais = col; break
-if col_pais is None:
-    raise ValueError("Coluna de PAÍS/ESTADO não encontrada no Excel. Colunas: " + str(list(df_raw.columns)))
-
-parsed = df_raw[col_pais].apply(parse_pais_ou_uf).apply(pd.Series)
-df = df_raw.copy()
-df["nivel_localizacao"] = parsed["nivel"]
-df["pais"]             = parsed["pais"]
-df["codigo_iso3"]      = parsed["iso3"]
-df["uf_sigla"]         = parsed["uf_sigla"]
-df["uf_nome"]          = parsed["uf_nome"]
-
-date_cols_candidates = [c for c in df_raw.columns if any(kw in c.upper() for kw in ["DATA", "ANO", "YEAR", "DATE"])]
-if date_cols_candidates:
-        df["ano_assinatura"] = df.apply(
-        lambda row: infer_year_multi_column(row, num_col="NÚMERO", date_cols=date_cols_candidates),
-        axis=1
+    fc = motor.geojson_na_janela(layer_id, bbox, zoom)
+    feats = fc["features"]
+    customdata = [[f["properties"].get(c) for c in campos] for f in feats]
+    return go.Choropleth(
+        geojson=fc, featureidkey="id", locations=[f["id"] for f in feats], z=[1] * len(feats),
+        colorscale=[[0, camada.cor_rgba(0.35)], [1, camada.cor_rgba(0.35)]], showscale=False,
+        marker=dict(line=dict(color=camada.cor_rgba(0.9), width=0.6)),
+        name=camada.label, customdata=customdata, hovertemplate=hover
     )
-else:
-    df["ano_assinatura"] = df["NÚMERO"].apply(infer_year_from_num)
 
-# Padronizações de campos-base
-df["tipo"] = df["TIPO DE PROCESSO"].fillna("Não informado")
+def periodo_camadas(ini, fim):
+    return (ini, fim) if ini or fim else None
 
-# Usar coluna "Contatos" se existir, senão usar "PESQUISADOR"
-if "Contatos" in df.columns:
-    df["pesquisador_responsavel"] = df["Contatos"].fillna("Não informado")
-elif "PESQUISADOR" in df.columns:
-    df["pesquisador_responsavel"] = df["PESQUISADOR"].fillna("Não informado")
-else:
-    df["pesquisador_responsavel"] = "Não informado"
+def add_layer_traces(fig: go.Figure, motor, visiveis, bbox: tuple, zoom: float, posicao: int,
+                     periodo=None) -> go.Figure:
+    """Insere os traces das camadas a partir de `posicao` (abaixo dos marcadores)."""
+    if not motor or not visiveis:
+        return fig
+    traces = [build_layer_trace(motor, lid, bbox, zoom, periodo) for lid in visiveis]
+    return go.Figure(data=fig.data[:posicao] + tuple(traces) + fig.data[posicao:], layout=fig.layout)
 
-df["status"] = df["STATUS"].astype(str)
-
-# Modalidade normalizada
-df["modalidade"] = df["TIPO DE PROCESSO"].fillna("Outros").apply(normaliza_modalidade)
+# =========================================================
+# CARREGAR DADOS DO GOOGLE SHEETS
+# =========================================================
+# Fonte padrão (sem data/fontes.json): a planilha principal, com o Excel local como fallback
+FONTE_PRINCIPAL = Fonte("principal", sheet_id=GOOGLE_SHEET_ID, formato=FORMATO_PLANILHA,
+                        fallback=EXCEL_PATH, cache=DATA_DIR / "sheet_cache")
+FONTES = carrega_config(padrao=[FONTE_PRINCIPAL])
+
+def _origem_dados(relatorios) -> str:
+    origens = {"Google Sheets" if r.origem == "Google Sheets" else
+               "Arquivo Local (Fallback)" if r.estado == "fallback" else r.origem
+               for r in relatorios if r.ok}
+    return ", ".join(sorted(origens))
+
+# Carrega todas as fontes em paralelo (cada uma com seu fallback local)
+try:
+    df_raw, relatorio_fontes, partes_fontes = ingere_fontes(FONTES)
+    imprime_relatorio(relatorio_fontes)
+    DATA_SOURCE = _origem_dados(relatorio_fontes)
+    print(f"✅ {len(df_raw)} linhas de {len(partes_fontes)}/{len(FONTES)} fonte(s)")
+except Exception as e:
+    print(f"❌ Erro ao carregar as fontes de dados: {str(e)}")
+    # Nenhuma fonte (nem o fallback local) carregou: mostrar erro amigável
+    _manifesto = estaticos.carrega_manifesto()
+    app = Dash(__name__, external_stylesheets=[estaticos.url(_manifesto, "bootstrap.css")],
+               assets_ignore=estaticos.IGNORAR_NO_DASH)
+    server = app.server
+    estaticos.instala_rota(server, _manifesto)
+    app.layout = dbc.Container([
+        dbc.Alert([
+            html.H4("⚠️ Erro ao Carregar Dados", className="alert-heading"),
+            html.P([
+                "Não foi possível carregar os dados do Google Sheets e não há arquivo local disponível.",
+                html.Br(), html.Br(),
+                html.Strong("Erro: "), str(e)
+            ]),
+            html.Hr(),
+            html.P("Soluções possíveis:", className="mb-2", style={"fontWeight": "600"}),
+            html.Ol([
+                html.Li([
+                    html.Strong("Verifique sua conexão com a internet"), 
+                    " - O aplicativo precisa acessar o Google Sheets online."
+                ]),
+                html.Li([
+                    html.Strong("Verifique as permissões da planilha"), 
+                    " - A planilha precisa estar compartilhada com 'qualquer pessoa com o link'."
+                ]),
+                html.Li([
+                    html.Strong("Arquivo local alternativo"), 
+                    " - Coloque o arquivo 'PROCESSOS_ASSINADOS.xlsx' na pasta 'data/' como backup."
+                ]),
+            ]),
+            html.Hr(),
+            html.P("Formato esperado da planilha:", className="mb-1", style={"fontWeight": "600"}),
+            html.Ul([
+                html.Li("Coluna 'PAÍS/ESTADO (ISO3)' → ex.: 'Reino Unido (GBR)' ou 'Amazonas (AM)'"),
+                html.Li("Coluna 'NÚMERO' → ex.: '01280.000381/2023-95' (contém o ano)"),
+                html.Li("Coluna 'STATUS'"),
+                html.Li("Coluna 'TIPO DE PROCESSO'"),
+                html.Li("Coluna 'Contatos' ou 'PESQUISADOR' → pesquisador responsável"),
+            ]),
+        ], color="danger")
+    ], fluid=True, style={"maxWidth": "900px", "marginTop": "40px"})
+    
+    if __name__ == "__main__":
+        app.run_server(debug=True, host="0.0.0.0", port=8050)
+    raise SystemExit
 
 # -------------------------
 # Vigência robusta
@@ -702,75 +696,314 @@ def eh_vigente_status(txt: str) -> bool:
 
     return False
 
-df["eh_vigente"] = df["status"].apply(eh_vigente_status)
-
 # Continente
 def infer_continent(row):
-    if row["nivel_localizacao"] == "uf_br" or row["codigo_iso3"] == "BRA":
-        return "América do Sul"
     iso = str(row["codigo_iso3"]) if pd.notna(row["codigo_iso3"]) else ""
+    if row["nivel_localizacao"] == "uf_br" or iso == "BRA":
+        return "América do Sul"
     return ISO3_TO_CONTINENT.get(iso, "Não informado")
 
-df["continente"] = df.apply(infer_continent, axis=1)
+# -------------------------
+# Pipeline ETL (planilha crua -> DataFrame do dashboard)
+# -------------------------
+def processa_planilha(df_raw: pd.DataFrame) -> pd.DataFrame:
+    # tenta achar a coluna de país/estado
+    col_pais = coluna_pais(df_raw.columns)
+    if col_pais is None:
+        raise ValueError("Coluna de PAÍS/ESTADO não encontrada no Excel. Colunas: " + str(list(df_raw.columns)))
+
+    parsed = resolve_paises_sem_codigo(df_raw[col_pais].apply(parse_pais_ou_uf).apply(pd.Series))
+    df = df_raw.copy()
+    df["nivel_localizacao"] = parsed["nivel"]
+    df["pais"]             = parsed["pais"]
+    df["codigo_iso3"]      = parsed["iso3"]
+    df["uf_sigla"]         = parsed["uf_sigla"]
+    df["uf_nome"]          = parsed["uf_nome"]
+
+    date_cols_candidates = [c for c in df_raw.columns if any(kw in c.upper() for kw in ["DATA", "ANO", "YEAR", "DATE"])]
+    if date_cols_candidates:
+        df["ano_assinatura"] = df.apply(
+            lambda row: infer_year_multi_column(row, num_col="NÚMERO", date_cols=date_cols_candidates),
+            axis=1
+        )
+    else:
+        df["ano_assinatura"] = df["NÚMERO"].apply(infer_year_from_num)
+
+    # Padronizações de campos-base
+    df["tipo"] = df["TIPO DE PROCESSO"].fillna("Não informado")
+
+    # Usar coluna "Contatos" se existir, senão usar "PESQUISADOR"
+    if "Contatos" in df.columns:
+        df["pesquisador_responsavel"] = df["Contatos"].fillna("Não informado")
+    elif "PESQUISADOR" in df.columns:
+        df["pesquisador_responsavel"] = df["PESQUISADOR"].fillna("Não informado")
+    else:
+        df["pesquisador_responsavel"] = "Não informado"
+
+    df["status"] = df["STATUS"].astype(str)
+
+    # Modalidade normalizada
+    df["modalidade"] = df["TIPO DE PROCESSO"].fillna("Outros").apply(normaliza_modalidade)
+
+    # Vigência robusta
+    df["eh_vigente"] = df["status"].apply(eh_vigente_status)
+    # Vigência por datas (intervalo [início, fim]; ver vigencia.py)
+    df["vigencia_inicio"], df["vigencia_fim"] = datas_vigencia(df_raw)
+
+    # Continente
+    df["continente"] = df.apply(infer_continent, axis=1)
+    return df
+
+estado_etl = EstadoETL(processa_planilha)   # guarda o derivado + impressões digitais por linha
+estado_etl.carrega(df_raw)
+
+def _resumo_processos(p: IndiceProcessos) -> str:
+    r = p.relatorio()
+    return (f"{r['acordos_distintos']} acordos distintos, {r['repetidos']} números repetidos, "
+            f"{r['aditivos_ligados']} aditivos ligados à origem ({r['aditivos_sem_origem']} sem origem na planilha)")
+
+def _iso_por_pais(d: pd.DataFrame) -> dict:
+    """Nome do país -> ISO3 (clique no ranking vira filtro cruzado por país)."""
+    d = d.dropna(subset=["pais", "codigo_iso3"])
+    return d.groupby("pais")["codigo_iso3"].first().to_dict()
+
+def _versao(d: pd.DataFrame) -> str:
+    """Impressão digital do conteúdo carregado (muda só quando os dados mudam)."""
+    return hashlib.sha1(pd.util.hash_pandas_object(d, index=False).to_numpy().tobytes()).hexdigest()[:12]
 
 # -------------------------
-# Opções de filtros
+# Visão dos dados: DataFrame, motor e índices de uma carga, trocados juntos
 # -------------------------
-anos_validos = pd.to_numeric(df["ano_assinatura"], errors="coerce").dropna().astype(int)
-anos_opts = ["Todos"] + sorted(anos_validos.unique().tolist())
-tipos_opts = sorted(df["tipo"].dropna().unique().tolist())
-conts_opts = sorted(df["continente"].dropna().unique().tolist())
-modalidades_opts = sorted(df["modalidade"].dropna().unique().tolist())
+Visao = namedtuple("Visao", "df motor vigencia facetas perfis rede agregados antiga processos iso_por_pais versao")
 
-# =========================================================
-# CENTROIDES
-# =========================================================
-CENTROIDS_PATH = DATA_DIR / "iso3_centroids.csv"
-centroids_dict = load_iso3_centroids(CENTROIDS_PATH)
-# Pequenos fallbacks úteis
-FALLBACK_CENTROIDS = {
-    "CHN": (35.0, 103.0),"USA": (37.0, -95.0),"GBR": (54.0, -2.0),"FRA": (46.0, 2.0),
-    "DEU": (51.0, 10.0),"JPN": (36.0, 138.0),"IND": (20.0, 77.0),"CAN": (56.0, -106.0),
-    "AUS": (-25.0, 133.0),"RUS": (60.0, 100.0),
-}
-for iso3, coords in FALLBACK_CENTROIDS.items():
-    centroids_dict.setdefault(iso3, coords)
+def monta_visao(d_etl: pd.DataFrame, versao: str = None, motor_nome: str = "pandas", anterior: Visao = None,
+                delta=None, antiga: bool = False) -> Visao:
+    """
+    DataFrame do ETL -> visão com todos os índices, montada ao lado da atual
+    (quem está consultando segue na anterior até a troca, que é uma atribuição).
+    Com a visão `anterior` e o `delta` de uma recarga incremental, o que aceita
+    diferença é atualizado por ela: o cubo do motor (`CuboAnual.aplica`) e os
+    números/nomes já extraídos de cada célula (processos, rede). O resto é
+    remontado sobre as linhas, em passadas vetorizadas.
+    """
+    proc = IndiceProcessos(d_etl, anterior.processos if anterior else None)   # duplicatas e aditivos -> origem
+    d = proc.marca(d_etl)                    # + coluna `principal` (KPIs por acordo distinto)
+    vig = IndiceVigencia(d)                  # ativos numa data / vencendo em breve (um só, também no motor)
+    if anterior is not None and not isinstance(anterior.motor, MotorPandas):
+        m = anterior.motor.ao_lado(d, vig)   # DuckDB: tabela nova no mesmo banco, a anterior segue respondendo
+    elif anterior is not None and delta is not None and not delta.completo:
+        m = MotorPandas(d, vig, anterior.motor.cubo.aplica(delta.saidas, delta.entradas))
+    else:
+        m = cria_motor(motor_nome, d, vig)   # filtros, KPIs, agregações e paginação da tabela
+    return Visao(d, m, vig,
+                 IndiceFacetas(d, vigencia=vig),                        # contagens por opção nos dropdowns
+                 IndicePerfis(d, proc),                                 # perfil de cada país/UF
+                 RedeColaboracao(d, anterior.rede if anterior else None),   # posições do grafo na 1ª vez
+                 cruzados.AgregadosLRU(m.agregado, AGREGADOS_MAX),      # base dos filtros cruzados
+                 antiga, proc, _iso_por_pais(d), versao)
+
+atual = monta_visao(estado_etl.df, _versao(estado_etl.df), MOTOR_CONSULTAS)
+print(f"🔗 Processos: {_resumo_processos(atual.processos)}")
+threading.Thread(target=atual.rede.posicoes, daemon=True, name="rede-layout").start()
+
+def versao_dados() -> str:
+    return atual.versao
+
+# -------------------------
+# Histórico de versões: "dados de" uma carga anterior (historico.py)
+# -------------------------
+def _abre_versao(d: pd.DataFrame) -> Visao:
+    """Motor e índices de uma versão antiga (pandas: barato de montar e atravessa o fork das tarefas)."""
+    return monta_visao(d, antiga=True)
 
-# UF centroids opcionais
-UF_CENTROIDS_PATH = DATA_DIR / "uf_centroids.csv"
-uf_centroids_dict = {}
-if UF_CENTROIDS_PATH.exists():
+historico_versoes = historico.Historico(abre=_abre_versao)
+
+def registra_versao():
+    """Guarda a versão carregada no histórico (uma vez por conteúdo, entre todos os workers)."""
+    versao = atual.versao
     try:
-        uf_centroids_df = pd.read_csv(UF_CENTROIDS_PATH)
-        uf_centroids_dict = {row["uf"]: (row["lat"], row["lon"]) for _, row in uf_centroids_df.iterrows()}
-    except Exception as e:
-        print(f"⚠️  Erro ao carregar centroides de UFs: {e}")
+        e = historico_versoes.registra(versao, estado_etl.por_chave)
+    except Exception as erro:
+        print(f"⚠️  Histórico: falha ao guardar a versão {versao}: {erro}")
+        return
+    if e:
+        print(f"🗂️  Versão {e['versao']} guardada no histórico ({e['tipo']}, {e['linhas']} linhas)")
+
+def visao_de(versao) -> Visao:
+    """Dados atuais ou, com `versao` de uma carga anterior, a visão dela (LRU de versões abertas)."""
+    v = atual                   # uma leitura só: a troca de carga não muda a visão no meio da chamada
+    if versao and versao not in ("atual", v.versao):
+        antiga = historico_versoes.visao(versao)
+        if antiga is not None:
+            return antiga
+    return v
+
+def opcoes_versoes() -> list:
+    """Dropdown "dados de": a carga atual e as versões guardadas, da mais nova para a mais antiga."""
+    v = atual
+    opcoes = [{"label": f"Atuais ({len(v.df):,} acordos)".replace(",", "."), "value": "atual"}]
+    for e in historico_versoes.versoes():
+        if e["versao"] != v.versao:
+            quando = pd.Timestamp(e["registrada_em"]).strftime("%d/%m/%Y %H:%M")
+            opcoes.append({"label": f"{quando} ({e['linhas']:,} acordos)".replace(",", "."), "value": e["versao"]})
+    return opcoes
+
+registra_versao()
+
+# -------------------------
+# Opções de filtros (contagens por valor, atualizadas por diferença)
+# -------------------------
+contagens = Contagens(["ano_assinatura", "tipo", "continente", "modalidade"], atual.df)
+anos_opts, tipos_opts, conts_opts, modalidades_opts = [], [], [], []
+
+def _atualiza_opcoes():
+    # atualiza as listas no lugar (quem guardou a referência vê os valores novos)
+    anos_opts[:] = ["Todos"] + sorted({int(a) for a in contagens.valores("ano_assinatura")})
+    tipos_opts[:] = contagens.valores("tipo")
+    conts_opts[:] = contagens.valores("continente")
+    modalidades_opts[:] = contagens.valores("modalidade")
+
+_atualiza_opcoes()
+
+# -------------------------
+# Cache quente: estados de filtro mais pedidos, recalculados após cada carga
+# -------------------------
+def limites_anos() -> tuple:
+    anos = anos_opts[1:] or [ANO_ATUAL]
+    return anos[0], anos[-1]
+
+def periodo_do_slider(valor):
+    """[ini, fim] do slider de anos; o intervalo inteiro equivale a "Todos" (inclui acordos sem ano)."""
+    if not isinstance(valor, (list, tuple)):
+        return valor            # "Todos" ou um ano (chamadas diretas)
+    ini, fim = limites_anos()
+    if not valor or (valor[0] <= ini and valor[-1] >= fim):
+        return "Todos"
+    return tuple(valor)
+
+def marcas_anos() -> dict:
+    ini, fim = limites_anos()
+    return {a: str(a) for a in range(ini, fim + 1) if a in (ini, fim) or a % 5 == 0}
+
+def filtros_normalizados(ano_sel, tipos, conts, modalidades, status_mode, local=None, data_vig=None,
+                         distintos=False) -> Filtros:
+    """Mesmo estado, mesma chave: a ordem das seleções nos dropdowns não muda o resultado."""
+    return Filtros(periodo_do_slider(ano_sel), sorted(tipos or [], key=str), sorted(conts or [], key=str),
+                   sorted(modalidades or [], key=str), status_mode, local, ativos_em=data_vig,
+                   distintos=bool(distintos))
+
+def _estados_padrao():
+    f = filtros_normalizados("Todos", tipos_opts, conts_opts, modalidades_opts, "todos")
+    return [("desenha", "world", None, None, f.chave(), ()), ("tabela", f.chave(), 0)]
+
+cache_quente = CacheQuente(
+    CACHE_TOPK, int(CACHE_MB * 1024 * 1024),
+    tamanho=lambda r: len(json.dumps(r, cls=PlotlyJSONEncoder)),   # ~ bytes enviados ao navegador
+    sementes=_estados_padrao,
+)
+
+def _resumo_cache() -> str:
+    r = cache_quente.relatorio()
+    return f"{r['servidas_pelo_cache']}/{r['requisicoes']} requisições servidas ({r['estados_prontos']} estados prontos)"
+
+# -------------------------
+# Revalidação periódica da planilha
+# -------------------------
+_carga_lock = threading.Lock()    # revalidação periódica e recarga forçada não se cruzam
+
+def atualiza_dados() -> bool:
+    """
+    Revalida as fontes. Se todas responderem 304 o custo é uma ida e volta
+    pequena por fonte e nada é reprocessado; se algo mudou, só as linhas
+    novas/alteradas passam pelo ETL, os índices que aceitam diferença são
+    atualizados pelo delta e a visão nova é montada ao lado e trocada de uma
+    vez (`monta_visao`). Retorna True se mudou.
+    """
+    global atual, df_raw, DATA_SOURCE, relatorio_fontes, partes_fontes
+    with _carga_lock:
+        novo_raw, relatorio_fontes, partes = ingere_fontes(FONTES, max_retries=1)
+        if partes.keys() == partes_fontes.keys() and all(partes[n] is partes_fontes[n] for n in partes):
+            return False   # todas as fontes responderam 304 (ou reaproveitaram a leitura anterior)
+        for r in relatorio_fontes:
+            if not r.ok:
+                print(f"⚠️  Fonte {r.nome}: {r.estado} ({r.erro})")
+        delta = estado_etl.carrega(novo_raw)
+        df_raw, partes_fontes = novo_raw, partes
+        DATA_SOURCE = _origem_dados(relatorio_fontes)
+        if delta.vazio:
+            print("✅ Planilha baixada de novo, mas sem linhas alteradas.")
+            return False
+        nova = monta_visao(estado_etl.df, _versao(estado_etl.df), MOTOR_CONSULTAS, anterior=atual, delta=delta)
+        print(f"🔥 Cache quente antes da troca: {_resumo_cache()}")
+        atual = nova               # troca num passo só: cada callback vê a carga antiga inteira ou a nova inteira
+        contagens.aplica(delta, estado_etl.df)
+        _atualiza_opcoes()         # antes de aquecer: o estado padrão usa as listas de opções
+        cache_quente.aquece_em_segundo_plano()
+        threading.Thread(target=nova.rede.posicoes, daemon=True, name="rede-layout").start()
+        registra_versao()
+        print(f"🔁 Dados atualizados: {len(nova.df)} linhas ({delta})")
+        print(f"🔗 Processos: {_resumo_processos(nova.processos)}")
+        return True
+
+def _loop_atualizacao(intervalo_s: float):
+    while True:
+        time.sleep(intervalo_s)
+        try:
+            atualiza_dados()
+        except Exception as e:
+            print(f"⚠️  Falha ao revalidar a planilha: {e}")
+
+if REFRESH_MIN > 0:
+    threading.Thread(target=_loop_atualizacao, args=(REFRESH_MIN * 60,),
+                     daemon=True, name="atualiza-planilha").start()
+
+# =========================================================
+# CENTROIDES (tabela binária pré-calculada por `python geodata.py`)
+# =========================================================
+centroids_pais, centroids_uf = load_label_points(LABEL_POINTS_PATH)
 
 # =========================================================
-# GEOJSON UFs (compat futuro – não é necessário pro marker map)
+# GEOJSON UFs (coroplético: geometria simplificada em cache, ver geodata.py)
 # =========================================================
 BR_STATES_PATH.parent.mkdir(parents=True, exist_ok=True)
 if not BR_STATES_PATH.exists():
     try:
-        import requests
         url = "https://raw.githubusercontent.com/tbrugz/geodata-br/master/geojson/ufs.json"
-        r = requests.get(url, timeout=20)
-        if r.ok:
-            with open(BR_STATES_PATH, "w", encoding="utf-8") as f:
-                f.write(r.text)
+        fetch_to_file(url, BR_STATES_PATH, timeout=20)
     except Exception:
         pass
 
+UF_GEO_ASSETS = build_uf_geometry(BR_STATES_PATH)   # {nivel: asset_id}
+
+# Camadas vetoriais locais (config kepler + GeoJSONs em data/camadas/)
+motor_camadas = carrega_motor()
+camadas_opts = [
+    {"label": c.label, "value": c.id, "disabled": not c.disponivel} for c in (motor_camadas or [])
+]
+camadas_padrao = [c.id for c in (motor_camadas or []) if c.visivel and c.disponivel]
+
+def uf_geojson_url(nivel: str = "baixa") -> str:
+    return f"/geo/{UF_GEO_ASSETS[nivel]}.geojson"
+
+def nivel_por_zoom(escala) -> str:
+    """Resolução da geometria das UFs conforme a escala da projeção (zoom)."""
+    escala = float(escala or 1)
+    if escala >= 4:
+        return "alta"
+    if escala >= 1.8:
+        return "media"
+    return "baixa"
+
 # =========================================================
 # APP & LAYOUT (com filtro GLOBAL por ANO)
 # =========================================================
+# Bootstrap, Inter, ícones, emojis e bandeira servidos localmente depois de `python estaticos.py`
+# (sem o build, das CDNs como antes)
+MANIFESTO_ESTATICOS = estaticos.carrega_manifesto()
 app = Dash(__name__, 
-    external_stylesheets=[
-        dbc.themes.BOOTSTRAP,
-        "https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap",
-        "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.0/font/bootstrap-icons.css"
-    ],
-    external_scripts=["https://twemoji.maxcdn.com/v/latest/twemoji.min.js"],
+    external_stylesheets=estaticos.folhas_de_estilo(MANIFESTO_ESTATICOS),
+    external_scripts=estaticos.scripts(MANIFESTO_ESTATICOS),
+    assets_ignore=estaticos.IGNORAR_NO_DASH,
     meta_tags=[{"name": "language", "content": "pt-BR"}]
 )
 app.index_string = """
@@ -783,7 +1016,7 @@ app.index_string = """
         {%css%}
         <style>
             :root, body, button, .btn {
-                font-family: Inter, system-ui, -apple-system, "Apple Color Emoji",
+                font-family: Inter, "Twemoji INPA", system-ui, -apple-system, "Apple Color Emoji",
                              "Segoe UI Emoji", "Noto Color Emoji", "Segoe UI Symbol", sans-serif;
             }
         </style>
@@ -795,13 +1028,83 @@ app.index_string = """
                 if (window.twemoji) twemoji.parse(document.body, {folder: 'svg', ext: '.svg'});
             });
         </script>
+        """ + SCRIPT_PAGINA + """
         <footer>{%config%}{%scripts%}{%renderer%}</footer>
     </body>
 </html>
 """
 server = app.server
-
-store_modo = dcc.Store(id="modo-mapa", data="world")
+estaticos.instala_rota(server, MANIFESTO_ESTATICOS)   # /estaticos/<nome com hash>, cache de 1 ano
+instala_cookie(server)          # id do navegador; com o da página (SCRIPT_PAGINA), "última requisição vence" por aba
+ultima_vence = UltimaVence()
+medidor = respostas.Medidor()   # bytes por callback (GET /status/payload)
+medidor.instala(server)
+
+def _base_api(versao) -> tuple:
+    """(versão efetiva, visão): a pedida, se estiver no histórico, ou a atual."""
+    v = visao_de(versao)
+    return (versao if v.antiga else v.versao), v
+
+def _opcoes_api() -> dict:
+    return {"anos": anos_opts[1:], "tipo": tipos_opts, "modalidade": modalidades_opts, "continente": conts_opts}
+
+api.instala(server, _base_api, _opcoes_api)   # /api/v1/: KPIs e contagens em JSON, ETag pela versão dos dados
+cache_layout = estado_url.CacheLayout(versao_dados)   # página inicial por estado da URL (GET /status/layout)
+cache_layout.instala(server)
+# background callbacks (tarefas.py): resultados guardados por versão dos dados / recarga sem cache
+gerenciador_resultados, gerenciador_recarga = tarefas.cria_gerenciadores(versao_dados)
+
+@server.route("/geo/<asset_id>.geojson")
+def geo_asset(asset_id):
+    """GeoJSON pré-gerado (gzip em disco); o id já embute o hash do conteúdo."""
+    if asset_id not in UF_GEO_ASSETS.values():
+        abort(404)
+    corpo = (GEO_CACHE_DIR / f"{asset_id}.geojson.gz").read_bytes()
+    resp = Response(mimetype="application/json")
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        resp.set_data(corpo)
+        resp.headers["Content-Encoding"] = "gzip"
+    else:
+        resp.set_data(gzip.decompress(corpo))
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return resp
+
+@server.route("/status/cache")
+def status_cache():
+    """Quantas requisições o cache quente serviu desde a última carga de dados."""
+    return Response(json.dumps(cache_quente.relatorio()), mimetype="application/json")
+
+@server.route("/status/payload")
+def status_payload():
+    """Bytes das respostas por callback e, nas saídas do `desenha`, sem enxugar x enviados."""
+    return Response(json.dumps(medidor.relatorio()), mimetype="application/json")
+
+@server.route("/status/layout")
+def status_layout():
+    """Páginas iniciais guardadas por estado da URL, montadas e servidas do cache (estado_url.py)."""
+    return Response(json.dumps(cache_layout.relatorio()), mimetype="application/json")
+
+@server.route("/status/requisicoes")
+def status_requisicoes():
+    """Chamadas entregues, interrompidas e superadas por callback ("última requisição vence")."""
+    return Response(json.dumps(ultima_vence.relatorio()), mimetype="application/json")
+
+store_viewport = dcc.Store(id="viewport-br", data={})
+store_estaveis = dcc.Store(id="filtros-estaveis")   # multi-selects depois do debounce (dispara os callbacks caros)
+
+OCULTO, VISIVEL = {"display": "none"}, {"display": "inline-block", "marginLeft": "8px"}
+
+def linha_tarefa(nome: str, rotulo: str, opcoes=None) -> html.Div:
+    """Botão de uma tarefa pesada + barra de progresso + cancelar (tarefas.py)."""
+    return html.Div([
+        dbc.Button(rotulo, id=f"btn-{nome}", color="primary", outline=True, size="sm", n_clicks=0),
+        html.Div(opcoes, className="tarefa-opcoes") if opcoes is not None else None,
+        dbc.Progress(id=f"progresso-{nome}", value=0, label="", striped=True, animated=True,
+                     className="tarefa-progresso"),
+        dbc.Button("Cancelar", id=f"btn-cancelar-{nome}", color="danger", outline=True, size="sm",
+                   n_clicks=0, style=OCULTO),
+    ], className="tarefa")
 
 header = html.Div([
     html.Div([
@@ -857,132 +1160,262 @@ filters_toggle = html.Div([
     )
 ], style={"marginBottom": "12px"})
 
-# Barra de filtros colapsável
-filters_bar = dbc.Collapse(
-    dbc.Card(
-        dbc.CardBody([
-            dbc.Row([
-                dbc.Col([
-                    html.Label("ANO", className="mb-1", style={"fontSize":"12px","textTransform":"uppercase","color":"#6B7280","fontWeight":"600"}),
-                    dcc.Dropdown(id="filtro-ano", options=[{"label": str(a), "value": a} for a in anos_opts],
-                                 value="Todos", clearable=False, style={"fontSize":"14px"})
-                ], md=2),
-                dbc.Col([
-                    html.Label("TIPOS DE PROCESSO", className="mb-1", style={"fontSize":"12px","textTransform":"uppercase","color":"#6B7280","fontWeight":"600"}),
-                    dcc.Dropdown(id="filtro-tipos", options=[{"label": t, "value": t} for t in tipos_opts],
-                                 value=tipos_opts, multi=True, placeholder="Selecione tipos...", style={"fontSize":"14px"})
-                ], md=3),
-                dbc.Col([
-                    html.Label("MODALIDADES", className="mb-1", style={"fontSize":"12px","textTransform":"uppercase","color":"#6B7280","fontWeight":"600"}),
-                    dcc.Dropdown(id="filtro-modalidades", options=[{"label": m, "value": m} for m in modalidades_opts],
-                                 value=modalidades_opts, multi=True, placeholder="Selecione modalidades...", style={"fontSize":"14px"})
-                ], md=3),
-                dbc.Col([
-                    html.Label("CONTINENTES", className="mb-1", style={"fontSize":"12px","textTransform":"uppercase","color":"#6B7280","fontWeight":"600"}),
-                    dcc.Dropdown(id="filtro-continentes", options=[{"label": c, "value": c} for c in conts_opts],
-                                 value=conts_opts, multi=True, placeholder="Selecione continentes...", style={"fontSize":"14px"})
-                ], md=3),
-                dbc.Col([
-                    html.Label("STATUS", className="mb-1", style={"fontSize":"12px","textTransform":"uppercase","color":"#6B7280","fontWeight":"600"}),
-                    dbc.RadioItems(
-                        id="filtro-status",
-                        options=[{"label":"Todos","value":"todos"},{"label":"Apenas vigentes","value":"vigentes"}],
-                        value="todos", inline=True, input_style={"marginRight":"6px"}, style={"fontSize":"14px"}
-                    )
-                ], md=1),
-            ], className="g-3")
-        ]),
-        style={"borderRadius":"14px","border":"1px solid #E5E7EB","marginBottom":"16px"}
-    ),
-    id="collapse-filters",
-    is_open=False
-)
+def barra_filtros(v: dict) -> dbc.Collapse:
+    """Barra de filtros colapsável com os valores iniciais `v` (ver `valores_iniciais`)."""
+    return dbc.Collapse(
+        dbc.Card(
+            dbc.CardBody([
+                dbc.Row([
+                    dbc.Col([
+                        html.Label("ANO", className="mb-1 rotulo-filtro"),
+                        dcc.RangeSlider(id="filtro-ano", min=limites_anos()[0], max=limites_anos()[1], step=1,
+                                        value=v["ano"], marks=marcas_anos(), allowCross=False,
+                                        tooltip={"placement": "bottom"}),
+                        html.Small(id="resumo-periodo", style={"fontSize":"11px","color":"#6B7280"})
+                    ], md=2),
+                    dbc.Col([
+                        html.Label("TIPOS DE PROCESSO", className="mb-1 rotulo-filtro"),
+                        dcc.Dropdown(id="filtro-tipos", options=[{"label": t, "value": t} for t in tipos_opts],
+                                     value=v["tipos"], multi=True, placeholder="Selecione tipos...", style={"fontSize":"14px"})
+                    ], md=3),
+                    dbc.Col([
+                        html.Label("MODALIDADES", className="mb-1 rotulo-filtro"),
+                        dcc.Dropdown(id="filtro-modalidades", options=[{"label": m, "value": m} for m in modalidades_opts],
+                                     value=v["modalidades"], multi=True, placeholder="Selecione modalidades...", style={"fontSize":"14px"})
+                    ], md=3),
+                    dbc.Col([
+                        html.Label("CONTINENTES", className="mb-1 rotulo-filtro"),
+                        dcc.Dropdown(id="filtro-continentes", options=[{"label": c, "value": c} for c in conts_opts],
+                                     value=v["conts"], multi=True, placeholder="Selecione continentes...", style={"fontSize":"14px"})
+                    ], md=2),
+                    dbc.Col([
+                        html.Label("STATUS", className="mb-1 rotulo-filtro"),
+                        dbc.RadioItems(
+                            id="filtro-status",
+                            options=[{"label":"Todos","value":"todos"},{"label":"Apenas vigentes","value":"vigentes"},
+                                     {"label":"Ativos na data","value":"na_data"}],
+                            value=v["status"], inline=True, input_style={"marginRight":"6px"}, style={"fontSize":"14px"}
+                        ),
+                        dcc.DatePickerSingle(id="data-vigencia", date=v["data"], display_format="DD/MM/YYYY",
+                                             first_day_of_week=0, style={"fontSize":"13px","marginTop":"4px"})
+                    ], md=2),
+                ], className="g-3"),
+                dbc.Row([
+                    dbc.Col([
+                        html.Label("DADOS DE", className="mb-1 rotulo-filtro"),
+                        dcc.Dropdown(id="versao-dados", options=v["opcoes_versoes"], value=v["versao"], clearable=False,
+                                     style={"fontSize":"14px"})
+                    ], md=3),
+                ], className="g-3 mt-1")
+            ]),
+            style={"borderRadius":"14px","border":"1px solid #E5E7EB","marginBottom":"16px"}
+        ),
+        id="collapse-filters",
+        is_open=False
+    )
 
 # Botões de modo de mapa (acima do mapa)
 map_mode_buttons = html.Div([
     dbc.Button("🌍 Mundial", id="btn-world", color="light", size="sm", 
               style={"borderRadius": "10px", "marginRight": "8px", "fontSize": "13px", "fontWeight": "600", "color": "#000000"}),
     dbc.Button(
-        [html.Img(src="https://flagcdn.com/w20/br.png",
+        [html.Img(src=estaticos.url(MANIFESTO_ESTATICOS, "bandeira-br.png"),
                   style={"height":"14px","marginRight":"6px"}), "Brasil"],
         id="btn-br", color="light", size="sm",
         style={"borderRadius": "10px", "fontSize": "13px", "fontWeight": "600", "color": "#000000"}
     ),
-], style={"display": "flex", "alignItems": "center", "marginBottom": "12px"})
+    dbc.RadioItems(
+        id="estilo-mapa-br",
+        options=[{"label":"Marcadores","value":"marcadores"},{"label":"Coroplético (UF)","value":"coropletico"}],
+        value="marcadores", inline=True, input_style={"marginRight":"6px"},
+        style={"fontSize":"13px","marginLeft":"16px","display":"none"}
+    ),
+    dbc.Checklist(
+        id="camadas-visiveis", options=camadas_opts, value=camadas_padrao,
+        inline=True, input_style={"marginRight":"6px"},
+        style={"fontSize":"13px","marginLeft":"16px","display":"none"}
+    ),
+    html.Div(
+        dcc.DatePickerRange(id="periodo-camadas", display_format="DD/MM/YYYY", clearable=True,
+                            start_date_placeholder_text="Início", end_date_placeholder_text="Fim"),
+        id="periodo-camadas-wrap", style={"fontSize":"13px","marginLeft":"16px","display":"none"}
+    ),
+], style={"display": "flex", "alignItems": "center", "flexWrap": "wrap", "marginBottom": "12px"})
 
 # Stores para scroll automático
 scroll_store = dcc.Store(id="scroll-trigger")
 scroll_sink = html.Div(id="scroll-sink", style={"display": "none"})
 
-app.layout = dbc.Container([
-    header, store_modo, scroll_store, scroll_sink, filters_toggle, filters_bar,
-    dbc.Row([
-        dbc.Col(html.Div(id="kpi-total"), md=3),
-        dbc.Col(html.Div(id="kpi-paises"), md=3),
-        dbc.Col(html.Div(id="kpi-tipos"), md=3),
-        dbc.Col(html.Div(id="kpi-vigentes"), md=3),
-    ], className="mb-3"),
-    map_mode_buttons,
-    dbc.Row([
-        dbc.Col(
-            chart_card("Mapa de Distribuição Geográfica", dcc.Graph(id="mapa", config={"displayModeBar": False}, style={"height":"520px"})), md=12)
-    ], className="mb-3"),
-    dbc.Row([
-        dbc.Col(chart_card("Distribuição por Modalidade", dcc.Graph(id="graf-por-modalidade", config={"displayModeBar": False}, style={"height":"320px"})), md=4),
-        dbc.Col(chart_card("Evolução Temporal de Acordos", dcc.Graph(id="graf-evolucao", config={"displayModeBar": False}, style={"height":"320px"})), md=4),
-        dbc.Col(chart_card("Top 10 Países Parceiros", html.Div(id="ranking-parceiros")), md=4),
-    ], className="mb-3"),
-    html.Div(id="anchor-detalhe"),
-    chart_card("Detalhamento dos Acordos", dash_table.DataTable(
-        id="tabela-detalhe",
-        columns=[
-            {"name":"Número do Processo","id":"numero_processo"},
-            {"name":"País","id":"pais"},
-            {"name":"UF","id":"uf_sigla"},
-            {"name":"Tipo","id":"tipo"},
-            {"name":"Modalidade","id":"modalidade"},
-            {"name":"Ano","id":"ano_assinatura"},
-            {"name":"Status","id":"status"},
-            {"name":"Pesquisador Responsável","id":"pesquisador_responsavel"},
-            {"name":"Vigente","id":"Vigente"},
-        ],
-        page_size=15,
-        style_table={"overflowX":"auto"},
-        style_cell={"fontFamily":"Inter, sans-serif","fontSize":"13px","padding":"12px 16px","textAlign":"left"},
-        style_header={
-            "fontWeight":"600","fontSize":"12px","textTransform":"uppercase","letterSpacing":"0.5px",
-            "color":"#6B7280","backgroundColor":"#F7FAFC","borderBottom":"2px solid #E5E7EB"
-        },
-        style_data={"color":"#1F2937","backgroundColor":"#FFFFFF","borderBottom":"1px solid #F3F4F6"},
-        style_data_conditional=[
-            {"if": {"state": "selected"}, "backgroundColor": "#EEF2FF", "border": "1px solid #0B5ED7"},
-            {"if": {"filter_query": "{Vigente} = 'Sim'"},
-             "backgroundColor": "#ECFDF5", "borderLeft": "3px solid #10B981"},
-        ]
-    )),
-], fluid=True, style={"maxWidth":"1400px","padding":"20px"})
+def valores_iniciais(busca: str) -> dict:
+    """Valores dos filtros e stores para a query string da página (estado_url.py); opções fora dos dados são ignoradas."""
+    e = estado_url.decodifica(busca)
+    escolhidas = lambda sel, opts: [o for o in sel if o in opts] or list(opts)
+    ini, fim = limites_anos()
+    ano = [max(ini, e["anos"][0]), min(fim, e["anos"][1])] if e["anos"] else [ini, fim]
+    opcoes = opcoes_versoes()
+    return {
+        "ano": ano if ano[0] <= ano[1] else [ini, fim],
+        "tipos": escolhidas(e["tipos"], tipos_opts),
+        "modalidades": escolhidas(e["modalidades"], modalidades_opts),
+        "conts": escolhidas(e["conts"], conts_opts),
+        "status": e["status"],
+        "data": e["data"] or date.today().isoformat(),
+        "distintos": e["distintos"],
+        "modo": e["modo"],
+        "cruz": {"local": list(e["local"])} if e["local"] else {},
+        "versao": e["versao"] if any(o["value"] == e["versao"] for o in opcoes) else "atual",
+        "perfil": list(e["perfil"]) if e["perfil"] else None,
+        "opcoes_versoes": opcoes,
+    }
 
-# =========================================================
-# FILTRO ÚNICO (com ANO como valor único ou 'Todos')
-# =========================================================
-def filtra(df_in: pd.DataFrame, ano_sel, tipos, conts, modalidades=None, status_mode: str = "todos") -> pd.DataFrame:
-    d = df_in.copy()
+def estado_do_painel(ano_sel, tipos, conts, modalidades, status_mode, data_vig, modo, cruz, versao,
+                     perfil=None, distintos=False) -> dict:
+    """Valores dos componentes -> estado de `estado_url` (seleção completa = sem parâmetro)."""
+    tudo_ou = lambda sel, opts: [] if not sel or set(sel) >= set(opts) else list(sel)
+    return {
+        "anos": periodo(periodo_do_slider(ano_sel)),
+        "tipos": tudo_ou(tipos, tipos_opts),
+        "modalidades": tudo_ou(modalidades, modalidades_opts),
+        "conts": tudo_ou(conts, conts_opts),
+        "status": status_mode or "todos",
+        "data": data_vig,
+        "distintos": bool(distintos),
+        "modo": modo or "world",
+        "local": cruzados.normaliza(cruz).get("local"),
+        "versao": versao if versao and versao != "atual" else None,
+        "perfil": tuple(perfil) if perfil else None,
+    }
 
-    # Ano global
-    if ano_sel != "Todos":
-        ano_num = pd.to_numeric(d["ano_assinatura"], errors="coerce")
-        d = d[ano_num == int(ano_sel)]
+def layout():
+    """
+    Página no estado da URL, com mapa, gráficos, ranking e KPIs já desenhados
+    (as mesmas saídas do `desenha`, do cache quente) e as assinaturas delas:
+    o primeiro `desenha` do navegador não tem nada a mandar. A resposta
+    inteira fica em `cache_layout` por estado da URL + versão dos dados.
+    """
+    v = valores_iniciais(estado_url.busca_da_pagina())
+    f = filtros_normalizados(v["ano"], v["tipos"], v["conts"], v["modalidades"], v["status"], data_vig=v["data"],
+                             distintos=v["distintos"])
+    estilo = "marcadores" if v["modo"] == "br" else None
+    saidas = _saidas_desenha(f, v["modo"], estilo, None, cruzados.normaliza(v["cruz"]), visao_de(v["versao"]))
+    _, assinaturas = respostas.enxuga(SAIDAS_DESENHA, saidas)
+    fig_map, fig_modal, fig_ev, ranking, kpi1, kpi2, kpi3, kpi4, kpi3_rotulo = saidas
+    perfil = visao_de(v["versao"]).perfis.obtem(*v["perfil"]) if v["perfil"] else None
+    titulo_perfil, corpo_perfil = conteudo_perfil(perfil) if v["perfil"] else ("", None)
+    return dbc.Container([
+        header, dcc.Location(id="url", refresh=False),
+        dcc.Store(id="modo-mapa", data=v["modo"]), store_viewport,
+        dcc.Store(id="filtros-cruzados", data=v["cruz"]),   # {"modalidade", "ano", "local": [nivel, código]}
+        store_estaveis,
+        dcc.Store(id="assinaturas-desenha", data=assinaturas),   # o que o navegador já tem de cada saída (respostas.py)
+        scroll_store, scroll_sink, filters_toggle, barra_filtros(v),
+        html.Div(id="chips-cruzados", className="chips"),
+        dcc.Store(id="perfil-aberto", data=v["perfil"]),   # [nivel, código] do perfil aberto (perfis.py)
+        dbc.Modal([
+            dbc.ModalHeader(dbc.ModalTitle(titulo_perfil, id="perfil-titulo")),
+            dbc.ModalBody(corpo_perfil, id="perfil-conteudo"),
+        ], id="perfil-modal", size="xl", scrollable=True, is_open=bool(v["perfil"])),
+        dbc.Switch(id="kpi-distintos", value=v["distintos"], className="mb-2", style={"fontSize": "13px"},
+                   label="KPIs por acordo distinto (mesmo número de processo e termos aditivos contam uma vez)"),
+        dbc.Row([
+            dbc.Col(kpi_card("Vigência Geral", kpi1, icon="✅", id="kpi-total"), md=3),
+            dbc.Col(kpi_card("Países com Parcerias", kpi2, icon="🌍", id="kpi-paises"), md=3),
+            dbc.Col(kpi_card(kpi3_rotulo, kpi3, icon="📅", id="kpi-tipos"), md=3),
+            dbc.Col(kpi_card("Modalidade Mais Frequente", kpi4, icon="📋", id="kpi-vigentes"), md=3),
+        ], className="mb-3"),
+        map_mode_buttons,
+        dbc.Row([
+            dbc.Col(
+                chart_card("Mapa de Distribuição Geográfica", dcc.Graph(id="mapa", figure=fig_map, config={"displayModeBar": False}, style={"height":"520px"})), md=12)
+        ], className="mb-3"),
+        dbc.Row([
+            dbc.Col(chart_card("Distribuição por Modalidade", dcc.Graph(id="graf-por-modalidade", figure=fig_modal, config={"displayModeBar": False}, style={"height":"320px"})), md=4),
+            dbc.Col(chart_card("Evolução Temporal de Acordos", dcc.Graph(id="graf-evolucao", figure=fig_ev, config={"displayModeBar": False}, style={"height":"320px"})), md=4),
+            dbc.Col(chart_card("Top 10 Países Parceiros", html.Div(ranking, id="ranking-parceiros")), md=4),
+        ], className="mb-3"),
+        chart_card("Rede de Colaboração", html.Div([
+            dbc.Checklist(id="rede-ligacoes", value=["pais", "modalidade"], inline=True,
+                          options=[{"label": "Países", "value": "pais"}, {"label": "Modalidades", "value": "modalidade"}],
+                          input_style={"marginRight":"6px"}, style={"fontSize":"13px","marginBottom":"8px"}),
+            dcc.Graph(id="grafo-rede", config={"displayModeBar": False}, style={"height":"520px"}),
+            dcc.Interval(id="intervalo-rede", interval=1500, disabled=True),   # espera as posições da rede
+            html.Small(f"Os {REDE_MAX} pesquisadores com mais acordos no recorte; posições fixas por versão dos dados.",
+                       className="perfil-nota"),
+        ])),
+        chart_card("Vencendo em Breve", html.Div([
+            dbc.RadioItems(id="janela-vencimento", value=90, inline=True,
+                           options=[{"label": f"{d} dias", "value": d} for d in (30, 90, 180, 365)],
+                           input_style={"marginRight":"6px"}, style={"fontSize":"13px","marginBottom":"12px"}),
+            html.Div(id="lista-vencendo"),
+        ])),
+        chart_card("Exportações e Dados", html.Div([
+            linha_tarefa("exportacao", "⬇️ Exportar", dbc.RadioItems(
+                id="formato-exportacao", value="csv", inline=True,
+                options=[{"label": "CSV", "value": "csv"}, {"label": "XLSX", "value": "xlsx"}],
+                input_style={"marginRight": "6px"}, style={"fontSize": "13px"})),
+            linha_tarefa("relatorio", "📄 Relatório (XLSX)"),
+            linha_tarefa("recarga", "🔄 Recarregar dados"),
+            html.Small(id="status-recarga", style={"fontSize": "12px", "color": "#6B7280"}),
+            dcc.Store(id="recarga-baixada"),
+            dcc.Interval(id="intervalo-recarga", interval=1000, disabled=True),   # acompanha a troca dos dados
+            dcc.Download(id="download-exportacao"),
+            dcc.Download(id="download-relatorio"),
+        ])),
+        html.Div(id="anchor-detalhe"),
+        chart_card("Detalhamento dos Acordos", dash_table.DataTable(
+            id="tabela-detalhe",
+            columns=[
+                {"name":"Número do Processo","id":"numero_processo"},
+                {"name":"País","id":"pais"},
+                {"name":"UF","id":"uf_sigla"},
+                {"name":"Tipo","id":"tipo"},
+                {"name":"Modalidade","id":"modalidade"},
+                {"name":"Ano","id":"ano_assinatura"},
+                {"name":"Status","id":"status"},
+                {"name":"Pesquisador Responsável","id":"pesquisador_responsavel"},
+                {"name":"Vigente","id":"Vigente"},
+            ],
+            page_action="custom", page_current=0, page_size=TABELA_PAGINA, page_count=1,
+            style_table={"overflowX":"auto"},
+            style_cell={"fontFamily":"Inter, sans-serif","fontSize":"13px","padding":"12px 16px","textAlign":"left"},
+            style_header={
+                "fontWeight":"600","fontSize":"12px","textTransform":"uppercase","letterSpacing":"0.5px",
+                "color":"#6B7280","backgroundColor":"#F7FAFC","borderBottom":"2px solid #E5E7EB"
+            },
+            style_data={"color":"#1F2937","backgroundColor":"#FFFFFF","borderBottom":"1px solid #F3F4F6"},
+            style_data_conditional=[
+                {"if": {"state": "selected"}, "backgroundColor": "#EEF2FF", "border": "1px solid #0B5ED7"},
+                {"if": {"filter_query": "{Vigente} = 'Sim'"},
+                 "backgroundColor": "#ECFDF5", "borderLeft": "3px solid #10B981"},
+            ]
+        )),
+    ], fluid=True, style={"maxWidth":"1400px","padding":"20px"})
 
-    if tipos:
-        d = d[d["tipo"].isin(tipos)]
-    if modalidades:
-        d = d[d["modalidade"].isin(modalidades)]
-    if conts:
-        d = d[d["continente"].isin(conts)]
-    if status_mode == "vigentes":
-        d = d[d["eh_vigente"]]
 
-    return d
+# =========================================================
+# CLIENTSIDE CALLBACK: debounce dos multi-selects
+# =========================================================
+# Cada chip adicionado/removido reinicia a espera; só a última edição de uma
+# rajada chega ao servidor (os callbacks caros leem os dropdowns como State).
+app.clientside_callback(
+    """
+    function(tipos, conts, modalidades) {
+        const dc = window.dash_clientside;
+        const estado = dc._inpa_debounce = dc._inpa_debounce || {seq: 0};
+        const seq = ++estado.seq;
+        return new Promise(function(resolve) {
+            setTimeout(function() {
+                resolve(seq === estado.seq ? {tipos: tipos, conts: conts, modalidades: modalidades} : dc.no_update);
+            }, DEBOUNCE_MS);
+        });
+    }
+    """.replace("DEBOUNCE_MS", str(DEBOUNCE_MS)),
+    Output("filtros-estaveis", "data"),
+    Input("filtro-tipos", "value"),
+    Input("filtro-continentes", "value"),
+    Input("filtro-modalidades", "value"),
+    prevent_initial_call=True
+)
 
 # =========================================================
 # CLIENTSIDE CALLBACK para scroll automático
@@ -1019,6 +1452,41 @@ def toggle_filters(n_clicks, is_open):
         return not is_open
     return is_open
 
+@app.callback(
+    Output("filtro-ano", "min"),
+    Output("filtro-ano", "max"),
+    Output("filtro-ano", "marks"),
+    Output("resumo-periodo", "children"),
+    Output("filtro-tipos", "options"),
+    Output("filtro-modalidades", "options"),
+    Output("filtro-continentes", "options"),
+    Input("filtro-ano", "value"),
+    State("filtro-tipos", "value"),
+    State("filtro-continentes", "value"),
+    State("filtro-modalidades", "value"),
+    Input("filtro-status", "value"),
+    Input("data-vigencia", "date"),
+    Input("filtros-estaveis", "data"),
+    Input("versao-dados", "value"),
+)
+@ultima_vence("facetas")
+def atualiza_facetas(ano_sel, tipos, conts, modalidades, status_mode, data_vig=None, _estaveis=None, versao=None):
+    """Cada opção mostra quantos acordos retornaria com os demais filtros ativos (multi-selects após o debounce)."""
+    f = filtros_normalizados(ano_sel, tipos, conts, modalidades, status_mode, data_vig=data_vig)
+    qtd = visao_de(versao).facetas.contagens(f)
+    if f.anos is None:
+        resumo = f"Todos os anos: {qtd['_total']} acordos"
+    else:
+        ini, fim = f.anos
+        no_periodo = sum(n for a, n in qtd["ano"].items() if ini <= a <= fim)
+        resumo = f"{ini}–{fim}: {no_periodo} de {qtd['_total']} acordos"
+    return (
+        *limites_anos(), marcas_anos(), resumo,
+        opcoes_com_contagem(tipos_opts, qtd["tipos"]),
+        opcoes_com_contagem(modalidades_opts, qtd["modalidades"]),
+        opcoes_com_contagem(conts_opts, qtd["conts"]),
+    )
+
 @app.callback(
     Output("scroll-trigger", "data"),
     Input("mapa", "clickData"),
@@ -1039,16 +1507,27 @@ def trigger_scroll(clickData):
     Output("btn-br", "color"),
     Output("btn-world", "outline"),
     Output("btn-br", "outline"),
+    Output("estilo-mapa-br", "style"),
+    Output("camadas-visiveis", "style"),
+    Output("periodo-camadas-wrap", "style"),
     Input("modo-mapa", "data"),
+    State("estilo-mapa-br", "style"),
+    State("camadas-visiveis", "style"),
+    State("periodo-camadas-wrap", "style"),
     prevent_initial_call=False
 )
-def sync_botao_modo(modo):
+def sync_botao_modo(modo, estilo_style, camadas_style, periodo_style):
+    display = "none" if modo == "world" else "block"
+    tem_pontos = any(c.tipo == "point" and c.disponivel for c in (motor_camadas or []))
+    estilo_style = {**(estilo_style or {}), "display": display}
+    camadas_style = {**(camadas_style or {}), "display": display if camadas_opts else "none"}
+    periodo_style = {**(periodo_style or {}), "display": display if tem_pontos else "none"}
     if modo == "world":
         # Mundial ativo (azul), Brasil inativo (claro)
-        return "primary", "light", False, True
+        return "primary", "light", False, True, estilo_style, camadas_style, periodo_style
     else:
         # Brasil ativo (azul), Mundial inativo (claro)
-        return "light", "primary", True, False
+        return "light", "primary", True, False, estilo_style, camadas_style, periodo_style
 
 @app.callback(
     Output("modo-mapa","data"),
@@ -1077,6 +1556,38 @@ def troca_modo(n_br, n_world, clickData, modo):
             pass
     return modo
 
+@app.callback(
+    Output("versao-dados", "options"),
+    Input("collapse-filters", "is_open"),
+)
+def lista_versoes(_aberto):
+    """Versões guardadas (relidas ao abrir os filtros: outro worker pode ter guardado uma nova)."""
+    return opcoes_versoes()
+
+@app.callback(
+    Output("url", "search"),
+    Input("filtro-ano", "value"),
+    Input("filtro-status", "value"),
+    Input("data-vigencia", "date"),
+    Input("modo-mapa", "data"),
+    Input("filtros-cruzados", "data"),
+    Input("versao-dados", "value"),
+    Input("filtros-estaveis", "data"),
+    Input("perfil-aberto", "data"),
+    Input("kpi-distintos", "value"),
+    State("filtro-tipos", "value"),
+    State("filtro-continentes", "value"),
+    State("filtro-modalidades", "value"),
+    State("url", "search"),
+    prevent_initial_call=True,
+)
+def atualiza_url(ano_sel, status_mode, data_vig, modo, cruz, versao, _estaveis, perfil, distintos, tipos, conts,
+                 modalidades, busca):
+    """Estado do painel na URL (link compartilhável), sem recarregar a página."""
+    nova = estado_url.codifica(estado_do_painel(ano_sel, tipos, conts, modalidades, status_mode, data_vig,
+                                                modo, cruz, versao, perfil, distintos))
+    return nova if nova != (busca or "") else dash.no_update
+
 @app.callback(
     Output("mapa","figure"),
     Output("graf-por-modalidade","figure"),
@@ -1086,57 +1597,117 @@ def troca_modo(n_br, n_world, clickData, modo):
     Output("kpi-paises","children"),
     Output("kpi-tipos","children"),
     Output("kpi-vigentes","children"),
+    Output("kpi-tipos-rotulo","children"),
+    Output("assinaturas-desenha","data"),
     Input("modo-mapa","data"),
     Input("filtro-ano","value"),
-    Input("filtro-tipos","value"),
-    Input("filtro-continentes","value"),
-    Input("filtro-modalidades","value"),
+    State("filtro-tipos","value"),
+    State("filtro-continentes","value"),
+    State("filtro-modalidades","value"),
     Input("filtro-status","value"),
+    Input("estilo-mapa-br","value"),
+    Input("camadas-visiveis","value"),
+    Input("periodo-camadas","start_date"),
+    Input("periodo-camadas","end_date"),
+    Input("data-vigencia","date"),
+    Input("filtros-cruzados","data"),
+    State("viewport-br","data"),
+    Input("filtros-estaveis","data"),
+    State("assinaturas-desenha","data"),
+    Input("versao-dados","value"),
+    Input("kpi-distintos","value"),
 )
-def desenha(modo, ano_sel, tipos, conts, modalidades, status_mode):
-    dff = filtra(df, ano_sel, tipos, conts, modalidades, status_mode=status_mode)
+@ultima_vence("desenha")
+def desenha(modo, ano_sel, tipos, conts, modalidades, status_mode, estilo_br="marcadores",
+            camadas_vis=None, periodo_ini=None, periodo_fim=None, data_vig=None, cruz=None, viewport=None,
+            _estaveis=None, assinaturas=None, versao=None, distintos=False):
+    """
+    Saídas de `_desenha` (cache quente) enxugadas contra o que o navegador já
+    tem (`assinaturas`): só os arrays das figuras quando a estrutura não mudou,
+    nada quando a saída é a mesma (respostas.py).
+    """
+    f = filtros_normalizados(ano_sel, tipos, conts, modalidades, status_mode, data_vig=data_vig, distintos=distintos)
+    cruz = cruzados.normaliza(cruz)
+    estilo = estilo_br if modo == "br" else None
+    coropletico = estilo == "coropletico" and bool(UF_GEO_ASSETS)
+    nivel = nivel_por_zoom((viewport or {}).get("geo.projection.scale")) if coropletico else None
+    base = visao_de(versao)
+
+    if modo == "br" and camadas_vis:
+        # camadas dependem da janela do mapa: sempre calculadas na hora
+        fig_map, *resto = _desenha(f, modo, estilo, nivel, cruz, base)
+        bbox, zoom = viewport_br(viewport)
+        fig_map = add_layer_traces(fig_map, motor_camadas, camadas_vis, bbox, zoom, posicao=1 if coropletico else 0,
+                                   periodo=periodo_camadas(periodo_ini, periodo_fim))
+        fig_map.update_layout(uirevision="br")
+        # o mapa com camadas muda no navegador pelo viewport (Patch): sempre inteiro
+        saidas, inteiras = (fig_map, *resto), ("mapa",)
+    else:
+        saidas, inteiras = _saidas_desenha(f, modo, estilo, nivel, cruz, base), ()
+    enxutas, novas = respostas.enxuga(SAIDAS_DESENHA, saidas, assinaturas, inteiras, medidor)
+    return (*enxutas, novas if novas != assinaturas else dash.no_update)
+
+def _saidas_desenha(f: Filtros, modo, estilo, nivel, cruz: dict, base: Visao) -> tuple:
+    """Saídas de `_desenha` pelo cache quente (versões antigas não entram: recalculadas a cada carga)."""
+    if base.antiga:
+        return _desenha(f, modo, estilo, nivel, cruz, base)
+    return cache_quente.obtem(("desenha", modo, estilo, nivel, f.chave(), cruzados.chave(cruz)),
+                              lambda: _desenha(f, modo, estilo, nivel, cruz))
+
+SAIDAS_DESENHA = ("mapa", "modalidade", "evolucao", "ranking", "kpi_total", "kpi_paises", "kpi_tipos", "kpi_vigentes",
+                  "kpi_tipos_rotulo")
+
+def _desenha(f: Filtros, modo, estilo_br, nivel_uf, cruz: dict = None, base: Visao = None):
+    """
+    Mapa, gráficos, ranking e KPIs de um estado de filtros (sem as camadas vetoriais).
+    Com filtros cruzados, tudo sai de fatias do agregado do estado (cruzados.py),
+    sem refiltrar as linhas. `base`: outra versão dos dados (histórico).
+    `f.distintos` vale só para os KPIs; mapa, gráficos e ranking contam linhas.
+    """
+    base = base or visao_de(None)
+    f_kpis, f = f, f._com(distintos=False)
+    fatias = lambda filtros: cruzados.Fatias(base.agregados.obtem(filtros), cruz,
+                                             filtros.anos[1] if filtros.anos else ANO_ATUAL)
+    q = fatias(f) if cruz else base.motor
+    q_kpis = q
+    if f_kpis.distintos:
+        q_kpis = fatias(f_kpis) if cruz else base.motor
 
     # KPIs NOVOS
+    ultima_vence.checa()        # pontos de verificação: edição mais nova na mesma página interrompe o cálculo
+    k = q_kpis.kpis(f_kpis)
     # 1. Vigência Geral (% e total de vigentes)
-    total_acordos = len(dff)
-    vigentes_total = dff["eh_vigente"].sum()
-    vigentes_perc = (dff["eh_vigente"].mean() * 100.0) if total_acordos > 0 else 0.0
-    kpi1 = kpi_card("Vigência Geral", f"{vigentes_perc:.1f}% ({vigentes_total})", "✅")
+    total_acordos = k["total"]
+    vigentes_total = k["vigentes"]
+    vigentes_perc = (vigentes_total / total_acordos * 100.0) if total_acordos > 0 else 0.0
+    kpi1 = f"{vigentes_perc:.1f}% ({vigentes_total})"
     
     # 2. Países com Parcerias (número de países únicos no período filtrado)
-    paises_com_acordos = dff[dff["nivel_localizacao"] == "pais"]["codigo_iso3"].nunique()
-    kpi2 = kpi_card("Países com Parcerias", str(paises_com_acordos), "🌍")
+    kpi2 = str(k["paises"])
     
-    # 3. Novos Acordos (Ano Atual)
-    if ano_sel != "Todos":
-        novos_ano = total_acordos
-        ano_label = ano_sel
-    else:
-        # Se "Todos" está selecionado, pegar o ano atual (2025)
-        ano_atual = 2025
-        ano_num = pd.to_numeric(dff["ano_assinatura"], errors="coerce")
-        novos_ano = (ano_num == ano_atual).sum()
-        ano_label = ano_atual
-    kpi3 = kpi_card(f"Novos Acordos ({ano_label})", str(novos_ano), "📅")
+    # 3. Novos Acordos (Ano Atual; com ano selecionado = total do ano)
+    ano_label = k["ano_novos"]   # com período: o último ano dele
+    kpi3, kpi3_rotulo = str(k["novos"]), f"Novos Acordos ({ano_label})"
     
     # 4. Modalidade Mais Frequente
     if total_acordos > 0:
-        modalidade_counts = dff["modalidade"].value_counts()
-        modalidade_lider = modalidade_counts.idxmax()
-        perc_lider = (modalidade_counts.max() / total_acordos * 100.0)
-        kpi4 = kpi_card("Modalidade Mais Frequente", f"{modalidade_lider} ({perc_lider:.0f}%)", "📋")
+        perc_lider = (k["modalidade_lider_qtd"] / total_acordos * 100.0)
+        kpi4 = f"{k['modalidade_lider']} ({perc_lider:.0f}%)"
     else:
-        kpi4 = kpi_card("Modalidade Mais Frequente", "—", "📋")
+        kpi4 = "—"
 
     # MAPA
-    fig_map = build_brazil_marker_map(dff, uf_centroids_dict) if modo == "br" else build_world_marker_map(dff, centroids_dict)
+    ultima_vence.checa()
+    if estilo_br == "coropletico" and nivel_uf:
+        fig_map = build_brazil_choropleth_map(q.resumo_ufs(f), uf_geojson_url(nivel_uf))
+    elif modo == "br":
+        fig_map = build_brazil_marker_map(q.pins_ufs(f), centroids_uf)
+    else:
+        fig_map = build_world_marker_map(q.pins_paises(f), centroids_pais)
 
     # POR MODALIDADE (exclui "Termo Aditivo" do gráfico)
-    modal = (
-        dff[dff["modalidade"] != "Termo Aditivo"]
-        .groupby("modalidade", dropna=False).size().reset_index(name="qtd")
-        .sort_values("qtd", ascending=False).copy()
-    )
+    ultima_vence.checa()
+    modal = q.contagem(f, "modalidade", excluir="Termo Aditivo")
     # compacta itens com qtd==1 em "Outras", mantendo "Carta Convite"
     carta = modal[modal["modalidade"] == "Carta Convite"]
     resto = modal[modal["modalidade"] != "Carta Convite"]
@@ -1147,7 +1718,7 @@ def desenha(modo, ano_sel, tipos, conts, modalidades, status_mode):
     if len(carta): blocos.append(carta)
     if len(únicas):
         blocos.append(pd.DataFrame([{"modalidade":"Outras","qtd": int(únicas["qtd"].sum())}]))
-    modal_plot = (pd.concat(blocos, ignore_index=True) if blocos else modal).sort_values("qtd", ascending=False)
+    modal_plot = (pd.concat(blocos, ignore_index=True) if blocos else modal).sort_values("qtd", ascending=False, kind="stable")
 
     fig_modal = go.Figure()
     fig_modal.add_trace(go.Pie(
@@ -1160,7 +1731,7 @@ def desenha(modo, ano_sel, tipos, conts, modalidades, status_mode):
         automargin=True
     ))
     fig_modal.update_layout(
-        template=PLOTLY_TEMPLATE, 
+        template="inpa",
         showlegend=False, 
         height=350, 
         margin=dict(l=40, r=40, t=40, b=40),
@@ -1169,13 +1740,9 @@ def desenha(modo, ano_sel, tipos, conts, modalidades, status_mode):
     )
 
     # EVOLUÇÃO temporal - Barras empilhadas por status
-    ev_data = dff.dropna(subset=["ano_assinatura"]).copy()
-    ev_data["ano_assinatura"] = pd.to_numeric(ev_data["ano_assinatura"], errors="coerce")
-    ev_data = ev_data.dropna(subset=["ano_assinatura"])
-    
-    # Agrupar por ano e status de vigência
-    ev = ev_data.groupby(["ano_assinatura", "eh_vigente"], as_index=False).size().rename(columns={"size": "qtd"})
-    ev = ev.sort_values("ano_assinatura")
+    # (agrupado por ano e status de vigência)
+    ultima_vence.checa()
+    ev = q.evolucao(f)
     
     # Separar vigentes e demais
     vigentes = ev[ev["eh_vigente"] == True]
@@ -1202,7 +1769,7 @@ def desenha(modo, ano_sel, tipos, conts, modalidades, status_mode):
     ))
     
     fig_ev.update_layout(
-        template=PLOTLY_TEMPLATE, 
+        template="inpa",
         height=320, 
         margin=dict(l=10, r=10, t=10, b=30),
         xaxis=dict(title="", tickformat="d"),
@@ -1221,64 +1788,528 @@ def desenha(modo, ano_sel, tipos, conts, modalidades, status_mode):
     )
 
     # RANKING parceiros
-    parceiros = (dff.groupby("pais", dropna=False).size().reset_index(name="qtd")
-                   .sort_values("qtd", ascending=False))
+    ultima_vence.checa()
+    parceiros = q.contagem(f, "pais")
     parceiros = parceiros[parceiros["pais"].notna()]
-    ranking = create_ranking_list(parceiros, "pais", "qtd", max_items=10)
+    ranking = create_ranking_list(parceiros, "pais", "qtd", max_items=10, id_tipo="ranking-item")
 
-    return fig_map, fig_modal, fig_ev, ranking, kpi1, kpi2, kpi3, kpi4
+    return fig_map, fig_modal, fig_ev, ranking, kpi1, kpi2, kpi3, kpi4, kpi3_rotulo
+
+@app.callback(
+    Output("mapa","figure", allow_duplicate=True),
+    Output("viewport-br","data"),
+    Input("mapa","relayoutData"),
+    State("modo-mapa","data"),
+    State("estilo-mapa-br","value"),
+    State("camadas-visiveis","value"),
+    State("periodo-camadas","start_date"),
+    State("periodo-camadas","end_date"),
+    State("viewport-br","data"),
+    prevent_initial_call=True
+)
+def ajusta_viewport_br(relayout, modo, estilo_br, camadas_vis, periodo_ini, periodo_fim, viewport):
+    """
+    Zoom/pan no mapa BR: troca só o que depende da janela (Patch) — a URL da
+    geometria das UFs e os traces das camadas recortados ao novo viewport.
+    """
+    chaves = ("geo.projection.scale", "geo.center.lon", "geo.center.lat")
+    if modo != "br" or not relayout or not any(k in relayout for k in chaves):
+        raise PreventUpdate
+    viewport = {**(viewport or {}), **{k: relayout[k] for k in chaves if k in relayout}}
+    coropletico = estilo_br == "coropletico" and bool(UF_GEO_ASSETS)
+
+    patch = Patch()
+    if coropletico:
+        patch["data"][0]["geojson"] = uf_geojson_url(nivel_por_zoom(viewport.get("geo.projection.scale")))
+    if motor_camadas and camadas_vis:
+        bbox, zoom = viewport_br(viewport)
+        inicio = 1 if coropletico else 0
+        for i, lid in enumerate(camadas_vis):
+            trace = build_layer_trace(motor_camadas, lid, bbox, zoom, periodo_camadas(periodo_ini, periodo_fim))
+            patch["data"][inicio + i] = trace.to_plotly_json()
+    return patch, viewport
+
+def local_do_clique(clickData, modo):
+    """País (ISO3) ou UF clicado no mapa, a partir do customdata = (identificador, qtd) ou da location."""
+    if not clickData or "points" not in clickData:
+        return None
+    try:
+        p = clickData["points"][0]
+        ident = None
+        if "customdata" in p and isinstance(p["customdata"], (list, tuple)) and len(p["customdata"]) >= 1:
+            ident = p["customdata"][0]
+        ident = ident or p.get("location")
+        if ident:
+            return ("uf", ident) if modo == "br" else ("pais", ident)
+    except Exception as e:
+        print(f"⚠️ clique mapa: {e}")
+    return None
+
+@app.callback(
+    Output("filtros-cruzados", "data"),
+    Input("mapa", "clickData"),
+    Input("graf-por-modalidade", "clickData"),
+    Input("graf-evolucao", "clickData"),
+    Input({"type": "ranking-item", "index": ALL}, "n_clicks"),
+    Input({"type": "chip-cruzado", "index": ALL}, "n_clicks"),
+    Input("modo-mapa", "data"),
+    State("filtros-cruzados", "data"),
+    prevent_initial_call=True
+)
+def atualiza_cruzados(clique_mapa, clique_modal, clique_ev, _ranking, _chips, modo, cruz):
+    """
+    Clique num gráfico = filtro cruzado para os demais (clicar de novo no mesmo
+    valor desfaz). Troca de modo do mapa limpa o local; chips removem filtros.
+    """
+    ctx = dash.callback_context
+    if not ctx.triggered or not ctx.triggered[0]["value"]:
+        raise PreventUpdate          # itens recém-desenhados (n_clicks=0) também disparam
+    trig = ctx.triggered_id
+    cruz = cruzados.normaliza(cruz)
+
+    if trig == "modo-mapa":
+        if "local" not in cruz:
+            raise PreventUpdate
+        cruz.pop("local")
+        return _store_cruzados(cruz)
+    if isinstance(trig, dict) and trig.get("type") == "chip-cruzado":
+        if trig["index"] == "todos":
+            return {}
+        cruz.pop(trig["index"], None)
+        return _store_cruzados(cruz)
+
+    dim = valor = None
+    try:
+        if trig == "mapa":
+            dim, valor = "local", local_do_clique(clique_mapa, modo)
+        elif trig == "graf-por-modalidade":
+            dim, valor = "modalidade", clique_modal["points"][0].get("label")
+            if valor == "Outras":       # fatia que junta várias modalidades
+                raise PreventUpdate
+        elif trig == "graf-evolucao":
+            dim, valor = "ano", int(float(clique_ev["points"][0]["x"]))
+        elif isinstance(trig, dict) and trig.get("type") == "ranking-item":
+            iso = atual.iso_por_pais.get(trig["index"])
+            dim, valor = "local", ("pais", iso) if iso else None
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        print(f"⚠️ filtro cruzado: {e}")
+    if dim is None or valor is None:
+        raise PreventUpdate
+
+    if cruz.get(dim) == valor:
+        cruz.pop(dim)
+    else:
+        cruz[dim] = valor
+    return _store_cruzados(cruz)
+
+def _store_cruzados(cruz: dict) -> dict:
+    return {d: list(v) if isinstance(v, tuple) else v for d, v in cruz.items()}
+
+@app.callback(
+    Output("chips-cruzados", "children"),
+    Input("filtros-cruzados", "data"),
+)
+def mostra_chips(cruz):
+    cruz = cruzados.normaliza(cruz)
+    nomes = {iso: pais for pais, iso in atual.iso_por_pais.items()}
+    chips = [html.Button(f"{cruzados.rotulo(d, v, nomes)} ✕", id={"type": "chip-cruzado", "index": d},
+                         n_clicks=0, title="Remover filtro", className="chip")
+             for d, v in cruz.items()]
+    if len(chips) > 1:
+        chips.append(html.Button("Limpar filtros cruzados", id={"type": "chip-cruzado", "index": "todos"}, n_clicks=0,
+                                 className="chip neutro"))
+    if "local" in cruz:
+        nivel, codigo = cruz["local"]
+        chips.append(html.Button(f"Perfil de {nomes.get(codigo, codigo) if nivel == 'pais' else codigo} →",
+                                 id={"type": "abre-perfil", "index": f"{nivel}:{codigo}"}, n_clicks=0,
+                                 title="Modalidades, linha do tempo e pesquisadores do local", className="chip perfil"))
+    return chips
+
+# =========================================================
+# PERFIL DE PAÍS / UF (perfis.py)
+# =========================================================
+def lista_cadeias(cadeias: list) -> html.Ul:
+    """Cada acordo do local com os termos aditivos ligados a ele (processos.py), em ordem."""
+    def linha(item, classe):
+        ano = f" · {item['ano']}" if item["ano"] else ""
+        vig = " · vigente" if item["vigente"] else ""
+        return html.Li([html.Strong(item["numero"]), f" · {(item['tipo'] or item['modalidade'] or '—').strip()}"
+                        f"{ano}{vig}"], className=classe)
+    return html.Ul([
+        html.Li([linha(c, "cadeia-origem"), html.Ul([linha(a, "cadeia-aditivo") for a in c["aditivos"]])],
+                className="cadeia")
+        for c in cadeias
+    ], className="cadeias")
+
+def conteudo_perfil(p: dict) -> tuple:
+    """(título, corpo) do modal de perfil, montados do perfil já pronto (sem consultar o motor)."""
+    if p is None:
+        return "Perfil", html.P("Sem acordos para este local nos dados escolhidos.", className="perfil-nota")
+    perc = p["vigentes"] / p["acordos"] * 100.0 if p["acordos"] else 0.0
+
+    modal = pd.DataFrame(p["modalidades"], columns=["modalidade", "acordos", "vigentes"]).iloc[::-1]
+    fig_modal = go.Figure([
+        go.Bar(y=modal["modalidade"], x=modal["acordos"] - modal["vigentes"], name="Demais", orientation="h",
+               marker=dict(color="#9CA3AF"), hovertemplate="<b>%{y}</b><br>Demais: %{x}<extra></extra>"),
+        go.Bar(y=modal["modalidade"], x=modal["vigentes"], name="Vigentes", orientation="h",
+               marker=dict(color="#10B981"), hovertemplate="<b>%{y}</b><br>Vigentes: %{x}<extra></extra>"),
+    ])
+    fig_modal.update_layout(template="inpa", barmode="stack", height=max(220, 40 + 28 * len(modal)),
+                            margin=dict(l=10, r=10, t=10, b=30), showlegend=False, xaxis=dict(tickformat="d"))
+
+    anos = pd.DataFrame(p["anos"], columns=["ano", "acordos", "vigentes"])
+    fig_ev = go.Figure([
+        go.Bar(x=anos["ano"], y=anos["acordos"] - anos["vigentes"], name="Demais",
+               marker=dict(color="#9CA3AF", line=dict(color="#FFFFFF", width=1)),
+               hovertemplate="<b>%{x}</b><br>Demais: %{y}<extra></extra>"),
+        go.Bar(x=anos["ano"], y=anos["vigentes"], name="Vigentes",
+               marker=dict(color="#10B981", line=dict(color="#FFFFFF", width=1)),
+               hovertemplate="<b>%{x}</b><br>Vigentes: %{y}<extra></extra>"),
+    ])
+    fig_ev.update_layout(template="inpa", barmode="stack", height=260, margin=dict(l=10, r=10, t=10, b=30),
+                         xaxis=dict(title="", tickformat="d"), yaxis=dict(title="", tickformat="d"),
+                         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                         hovermode="x unified")
+
+    pesq = pd.DataFrame(p["pesquisadores"], columns=["pesquisador", "acordos", "vigentes"])
+    grafico = lambda fig: dcc.Graph(figure=fig, config={"displayModeBar": False})
+    nota = "Todos os acordos do local nos dados escolhidos, sem os filtros do painel."
+    if p["sem_ano"]:
+        nota += f" {p['sem_ano']} sem ano de assinatura (fora da linha do tempo)."
+    if p["distintos"] != p["acordos"]:
+        nota += (f" {p['distintos']} acordos distintos (linhas com o mesmo número de processo e termos aditivos"
+                 " ligados ao acordo de origem contam uma vez).")
+    corpo = html.Div([
+        dbc.Row([
+            dbc.Col(kpi_card("Acordos", str(p["acordos"]), icon="📄"), md=3),
+            dbc.Col(kpi_card("Vigentes", f"{perc:.1f}% ({p['vigentes']})", icon="✅"), md=3),
+            dbc.Col(kpi_card("Demais", str(p["demais"]), icon="📁"), md=3),
+            dbc.Col(kpi_card("Pesquisadores", str(len(pesq)), icon="🔬"), md=3),
+        ], className="mb-3"),
+        dbc.Row([
+            dbc.Col(chart_card("Modalidades", grafico(fig_modal)), md=6),
+            dbc.Col(chart_card("Linha do Tempo", grafico(fig_ev)), md=6),
+        ], className="mb-3"),
+        chart_card("Pesquisadores Envolvidos", create_ranking_list(pesq, "pesquisador", "acordos", max_items=15)
+                   if len(pesq) else html.P("Nenhum pesquisador informado.", className="perfil-nota")),
+        *([chart_card("Termos Aditivos", lista_cadeias(p["cadeias"]))] if p["cadeias"] else []),
+        html.P(nota, className="perfil-nota"),
+    ])
+    rotulo = "País" if p["nivel"] == "pais" else "UF"
+    return f"{rotulo}: {p['nome']} ({p['codigo']})", corpo
+
+@app.callback(
+    Output("perfil-modal", "is_open"),
+    Output("perfil-titulo", "children"),
+    Output("perfil-conteudo", "children"),
+    Output("perfil-aberto", "data"),
+    Input({"type": "abre-perfil", "index": ALL}, "n_clicks"),
+    Input("perfil-modal", "is_open"),
+    Input("versao-dados", "value"),
+    State("perfil-aberto", "data"),
+    prevent_initial_call=True
+)
+def mostra_perfil(_cliques, aberto, versao, atual):
+    """Abre o perfil pedido (chip do local), acompanha a versão dos dados e esquece o perfil ao fechar."""
+    ctx = dash.callback_context
+    trig = ctx.triggered_id
+    if trig == "perfil-modal":
+        if aberto:
+            raise PreventUpdate
+        return dash.no_update, dash.no_update, dash.no_update, None
+    if trig == "versao-dados":
+        if not atual:
+            raise PreventUpdate
+        local = atual
+    else:
+        if not ctx.triggered or not ctx.triggered[0]["value"]:
+            raise PreventUpdate      # chip recém-desenhado (n_clicks=0)
+        local = trig["index"].split(":", 1)
+    titulo, corpo = conteudo_perfil(visao_de(versao).perfis.obtem(*local))
+    return True, titulo, corpo, list(local)
 
 @app.callback(
     Output("tabela-detalhe","data"),
-    Input("mapa","clickData"),
-    Input("modo-mapa","data"),
+    Output("tabela-detalhe","page_count"),
+    Output("tabela-detalhe","page_current"),
+    Input("filtros-cruzados","data"),
     Input("filtro-ano","value"),
-    Input("filtro-tipos","value"),
-    Input("filtro-continentes","value"),
-    Input("filtro-modalidades","value"),
+    State("filtro-tipos","value"),
+    State("filtro-continentes","value"),
+    State("filtro-modalidades","value"),
     Input("filtro-status","value"),
+    Input("tabela-detalhe","page_current"),
+    Input("data-vigencia","date"),
+    Input("filtros-estaveis","data"),
+    Input("versao-dados","value"),
+)
+@ultima_vence("tabela")
+def atualiza_tabela(cruz, ano_sel, tipos, conts, modalidades, status_mode, page_current=0, data_vig=None,
+                    _estaveis=None, versao=None):
+    # paginação no servidor: só a página visível é consultada/enviada
+    try:
+        trig = [t["prop_id"] for t in dash.callback_context.triggered]
+    except Exception:   # chamada direta, fora de um callback
+        trig = []
+    pagina = (page_current or 0) if trig == ["tabela-detalhe.page_current"] else 0
+
+    f = filtros_normalizados(ano_sel, tipos, conts, modalidades, status_mode, data_vig=data_vig)
+    f = cruzados.aplica(f, cruzados.normaliza(cruz))   # a tabela mostra as linhas com todos os filtros
+    base = visao_de(versao)
+    if base.antiga:
+        registros, total = base.motor.pagina(f, pagina, TABELA_PAGINA)
+    else:
+        registros, total = cache_quente.obtem(("tabela", f.chave(), pagina),
+                                              lambda: base.motor.pagina(f, pagina, TABELA_PAGINA))
+    return registros, max(1, -(-total // TABELA_PAGINA)), pagina
+
+@app.callback(
+    Output("lista-vencendo", "children"),
+    Input("data-vigencia", "date"),
+    Input("janela-vencimento", "value"),
+    State("filtro-tipos", "value"),
+    State("filtro-continentes", "value"),
+    State("filtro-modalidades", "value"),
+    Input("filtros-estaveis", "data"),
+    Input("versao-dados", "value"),
+)
+def atualiza_vencendo(data_vig, janela, tipos, conts, modalidades, _estaveis=None, versao=None, max_itens: int = 10):
+    """Acordos cujo fim de vigência cai nos próximos `janela` dias a partir da data escolhida (índice de vigência)."""
+    idx = visao_de(versao).vigencia
+    data_ref = pd.Timestamp(data_vig or date.today())
+    janela = int(janela or 90)
+    ativos = idx.contagem_ativos(data_ref)
+    vencendo = idx.df.iloc[idx.vencendo(data_ref, janela)]
+    vencendo = filtra_df(vencendo, Filtros(None, tipos, conts, modalidades))
+
+    resumo = html.Div(
+        f"{ativos} acordos ativos em {data_ref:%d/%m/%Y} pelas datas de vigência · "
+        f"{len(vencendo)} vencem até {data_ref + pd.Timedelta(days=janela):%d/%m/%Y}",
+        className="lista-nota")
+    if not idx.df["vigencia_fim"].notna().any():
+        return [resumo, html.Div("A planilha não tem datas de término de vigência. Inclua uma coluna de término "
+                                 "(ex.: \"Vigência até\") ou defina INPA_VIGENCIA_ANOS para estimar o fim.",
+                                 className="lista-vazia")]
+
+    itens = []
+    for _, row in vencendo.head(max_itens).iterrows():
+        dias = (pd.Timestamp(row["vigencia_fim"]) - data_ref).days
+        local = row["uf_sigla"] if row["codigo_iso3"] == "BRA" and pd.notna(row["uf_sigla"]) else row["pais"]
+        itens.append(html.Div([
+            html.Div(f"{row.get('NÚMERO', '—')} · {local} · {row['modalidade']}", className="lista-texto"),
+            html.Div(f"{pd.Timestamp(row['vigencia_fim']):%d/%m/%Y} ({'hoje' if dias == 0 else f'em {dias} dias'})",
+                     className="vence-data urgente" if dias <= 30 else "vence-data"),
+        ], className="lista-item compacto"))
+    if len(vencendo) > max_itens:
+        itens.append(html.Div(f"+ {len(vencendo) - max_itens} acordos", className="lista-mais"))
+    return [resumo] + itens
+
+@app.callback(
+    Output("grafo-rede", "figure"),
+    Output("intervalo-rede", "disabled"),
+    Input("filtros-cruzados", "data"),
+    Input("filtro-ano", "value"),
+    State("filtro-tipos", "value"),
+    State("filtro-continentes", "value"),
+    State("filtro-modalidades", "value"),
+    Input("filtro-status", "value"),
+    Input("data-vigencia", "date"),
+    Input("rede-ligacoes", "value"),
+    Input("filtros-estaveis", "data"),
+    Input("intervalo-rede", "n_intervals"),
+    Input("versao-dados", "value"),
 )
-def atualiza_tabela(clickData, modo, ano_sel, tipos, conts, modalidades, status_mode):
-    dff = filtra(df, ano_sel, tipos, conts, modalidades, status_mode=status_mode)
+@ultima_vence("rede")
+def atualiza_rede(cruz, ano_sel, tipos, conts, modalidades, status_mode, data_vig=None, ligacoes=None,
+                  _estaveis=None, _n=None, versao=None):
+    """
+    Rede pesquisador–país/modalidade do recorte: só as ligações são recontadas,
+    as posições já estão prontas. Se o layout da versão ainda está rodando (logo
+    após a carga), não espera por ele: mostra um aviso e o intervalo tenta de novo.
+    """
+    f = filtros_normalizados(ano_sel, tipos, conts, modalidades, status_mode, data_vig=data_vig)
+    f = cruzados.aplica(f, cruzados.normaliza(cruz))
+    base = visao_de(versao)
+    linhas = base.rede.linhas(filtra_df(base.df, f))
+    fig = build_rede_figure(base.rede, linhas, [t for t in ("pais", "modalidade") if t in (ligacoes or [])])
+    if fig is None:
+        fig = go.Figure()
+        fig.add_annotation(text="Organizando a rede…", showarrow=False, font=dict(color="#6B7280"))
+        fig.update_layout(template="inpa", xaxis=dict(visible=False), yaxis=dict(visible=False))
+        return fig, False
+    return fig, True
+
+# =========================================================
+# TAREFAS PESADAS (background callbacks, tarefas.py)
+# =========================================================
+ESTADO_FILTROS = [
+    State("filtros-cruzados", "data"),
+    State("filtro-ano", "value"),
+    State("filtro-tipos", "value"),
+    State("filtro-continentes", "value"),
+    State("filtro-modalidades", "value"),
+    State("filtro-status", "value"),
+    State("data-vigencia", "date"),
+    State("versao-dados", "value"),
+]
+
+def _tarefa(nome: str) -> dict:
+    return dict(
+        progress=[Output(f"progresso-{nome}", "value"), Output(f"progresso-{nome}", "label")],
+        running=[(Output(f"btn-{nome}", "disabled"), True, False),
+                 (Output(f"btn-cancelar-{nome}", "style"), VISIVEL, OCULTO)],
+        cancel=[Input(f"btn-cancelar-{nome}", "n_clicks")],
+        prevent_initial_call=True,
+    )
 
-    if clickData and "points" in clickData:
+def _linhas_do_recorte(cruz, ano_sel, tipos, conts, modalidades, status_mode, data_vig, versao=None) -> tuple:
+    # pandas direto: a tarefa roda noutro processo (conexão DuckDB não atravessa o fork)
+    f = filtros_normalizados(ano_sel, tipos, conts, modalidades, status_mode, data_vig=data_vig)
+    f = cruzados.aplica(f, cruzados.normaliza(cruz))
+    return f, filtra_df(visao_de(versao).df, f)
+
+def _versao_escolhida(versao) -> str:
+    return versao if versao and versao != "atual" else versao_dados()
+
+def _nome_arquivo(prefixo: str, ext: str, versao=None) -> str:
+    return f"{prefixo}_{date.today():%Y%m%d}_{_versao_escolhida(versao)}.{ext}"
+
+@tarefas.callback_tarefa(
+    app,
+    Output("download-exportacao", "data"),
+    Input("btn-exportacao", "n_clicks"),
+    State("formato-exportacao", "value"),
+    *ESTADO_FILTROS,
+    manager=gerenciador_resultados,
+    cache_args_to_ignore=[0],          # o clique não entra na chave: mesmo recorte = mesmo arquivo guardado
+    **_tarefa("exportacao"),
+)
+def exporta_acordos(set_progress, n_clicks, formato, *estado):
+    if not n_clicks:
+        raise PreventUpdate
+    set_progress((0, "filtrando"))
+    _, dff = _linhas_do_recorte(*estado)
+    formato = "xlsx" if formato == "xlsx" else "csv"
+    conteudo = tarefas.exporta(dff, formato, set_progress)
+    set_progress((100, f"{len(dff):,} linhas"))
+    return dcc.send_bytes(conteudo, _nome_arquivo("acordos_inpa", formato, estado[-1]))
+
+@tarefas.callback_tarefa(
+    app,
+    Output("download-relatorio", "data"),
+    Input("btn-relatorio", "n_clicks"),
+    *ESTADO_FILTROS,
+    manager=gerenciador_resultados,
+    cache_args_to_ignore=[0],
+    **_tarefa("relatorio"),
+)
+def gera_relatorio(set_progress, n_clicks, *estado):
+    if not n_clicks:
+        raise PreventUpdate
+    set_progress((0, "filtrando"))
+    f, dff = _linhas_do_recorte(*estado)
+    lider = dff["modalidade"].value_counts()
+    resumo = {
+        "Gerado em": pd.Timestamp.now().strftime("%d/%m/%Y %H:%M"),
+        "Versão dos dados": _versao_escolhida(estado[-1]),
+        "Origem": DATA_SOURCE,
+        "Filtros": repr(f),
+        "Acordos": len(dff),
+        "Vigentes": int(dff["eh_vigente"].sum()),
+        "Países": int(dff.loc[dff["nivel_localizacao"] == "pais", "codigo_iso3"].nunique()),
+        "Modalidade mais frequente": f"{lider.index[0]} ({lider.iloc[0]})" if len(lider) else "—",
+    }
+    conteudo = tarefas.relatorio(dff, resumo, set_progress)
+    set_progress((100, "pronto"))
+    return dcc.send_bytes(conteudo, _nome_arquivo("relatorio_inpa", "xlsx", estado[-1]))
+
+@tarefas.callback_tarefa(
+    app,
+    Output("recarga-baixada", "data"),
+    Input("btn-recarga", "n_clicks"),
+    manager=gerenciador_recarga,
+    **_tarefa("recarga"),
+)
+def recarrega(set_progress, n_clicks):
+    """
+    Recarga forçada, parte lenta (rede): baixa de novo as fontes remotas para
+    os arquivos de data/. Em background roda noutro processo; a troca dos
+    dados em memória é feita depois, no processo do servidor (`aplica_recarga`).
+    """
+    if not n_clicks:
+        raise PreventUpdate
+    remotas = [f for f in FONTES if f.remota]
+    erros = []
+    for i, fonte in enumerate(remotas):
+        set_progress((int(i * 100 / len(remotas)), f"baixando {fonte.nome}"))
         try:
-            p = clickData["points"][0]
-            # usamos customdata = (identificador, qtd)
-            if modo == "br":
-                ident = None
-                if "customdata" in p and isinstance(p["customdata"], (list, tuple)) and len(p["customdata"]) >= 1:
-                    ident = p["customdata"][0]
-                if ident:
-                    dff = dff[(dff["codigo_iso3"] == "BRA") & (dff["uf_sigla"] == ident)]
-                else:
-                    loc = p.get("location")
-                    if loc:
-                        dff = dff[(dff["codigo_iso3"] == "BRA") & (dff["uf_sigla"] == loc)]
-            else:
-                ident = None
-                if "customdata" in p and isinstance(p["customdata"], (list, tuple)) and len(p["customdata"]) >= 1:
-                    ident = p["customdata"][0]
-                if ident:
-                    dff = dff[dff["codigo_iso3"] == ident]
-                else:
-                    loc = p.get("location")
-                    if loc:
-                        dff = dff[dff["codigo_iso3"] == loc]
+            baixa_planilha(fonte.url(), fonte.destino(), max_retries=1, rotulo=fonte.nome)
         except Exception as e:
-            print(f"⚠️ clique mapa: {e}")
+            erros.append(f"{fonte.nome}: {e}")
+    set_progress((100, "aplicando"))
+    return {"ts": time.time(), "erros": erros}
 
-    cols = ["pais","uf_sigla","tipo","modalidade","ano_assinatura","status","pesquisador_responsavel"]
-    det = dff[cols].sort_values(["pais","uf_sigla","ano_assinatura"], ascending=[True, True, False]).head(400).copy()
-    det["Vigente"] = dff.loc[det.index, "eh_vigente"].map({True:"Sim", False:"Não"}).fillna("Não")
-    
-    # Adicionar número do processo
-    if "NÚMERO" in dff.columns:
-        det["numero_processo"] = dff.loc[det.index, "NÚMERO"].fillna("—")
-    else:
-        det["numero_processo"] = "—"
-    
-    return det.to_dict("records")
+_recarga = {"em": 0.0, "mensagem": None, "futuro": None}   # última troca de dados pedida neste processo
+_recarga_lock = threading.Lock()
+_executor_recarga = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aplica-recarga")
+
+def _aplica_recarga():
+    inicio = time.time()
+    try:
+        mudou = atualiza_dados()
+        msg = f"🔁 Dados atualizados: {len(atual.df)} linhas" if mudou else "✅ Sem alterações na planilha"
+    except Exception as e:
+        msg = f"⚠️ Recarga forçada: {e}"
+    with _recarga_lock:
+        _recarga.update(em=inicio, mensagem=msg)
+
+def recarga_aplicada(desde: float):
+    """
+    Mensagem da troca de dados deste processo iniciada depois de `desde` (fim
+    do download); enquanto não houver, dispara uma numa thread e devolve None.
+    Vale para qualquer worker que receber a consulta: cada um troca os seus dados.
+    """
+    with _recarga_lock:
+        if _recarga["em"] >= desde:
+            return _recarga["mensagem"]
+        if _recarga["futuro"] is None or _recarga["futuro"].done():
+            _recarga["futuro"] = _executor_recarga.submit(_aplica_recarga)
+    return None
+
+@app.callback(
+    Output("status-recarga", "children"),
+    Output("intervalo-recarga", "disabled"),
+    Input("recarga-baixada", "data"),
+    Input("intervalo-recarga", "n_intervals"),
+    prevent_initial_call=True
+)
+def aplica_recarga(baixada, _n=None):
+    """
+    Relê as fontes (logo após o download a revalidação é barata) e troca os
+    dados deste processo numa thread, fora da requisição; o intervalo
+    consulta até a troca terminar.
+    """
+    if not baixada:
+        raise PreventUpdate
+    msg = recarga_aplicada(baixada["ts"])
+    if msg is None:
+        return "⏳ Aplicando os dados baixados…", False
+    erros = baixada.get("erros") or []
+    aviso = f" · ⚠️ {'; '.join(erros)}" if erros else ""
+    return msg + aviso, True
+
+# recálculo dos estados populares a partir da chave registrada
+def _filtros_da_chave(chave) -> Filtros:
+    return Filtros(*chave)
+
+cache_quente.calculadoras.update({
+    "desenha": lambda c: _desenha(_filtros_da_chave(c[4]), c[1], c[2], c[3], dict(c[5]) if len(c) > 5 else None),
+    "tabela": lambda c: atual.motor.pagina(_filtros_da_chave(c[1]), c[2], TABELA_PAGINA),
+})
+# a página é montada por requisição (estado da URL); o Dash a chama uma vez aqui para validar,
+# depois das funções de desenho, e isso já deixa o estado padrão pronto no cache quente
+app.layout = layout
+cache_quente.aquece_em_segundo_plano()
 
 if __name__ == "__main__":
     app.run_server(debug=True, host="0.0.0.0", port=8050)
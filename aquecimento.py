@@ -0,0 +1,197 @@
+# aquecimento.py
+"""
+Cache "quente" dos estados de filtro mais usados.
+
+- Cada requisição cacheável registra o estado normalizado dos filtros num
+  contador agregado (só contagens, sem dados de quem acessou), salvo em
+  `data/popularidade.json` para sobreviver a reinícios. O contador guarda
+  no máximo `max_estados` estados (os mais pedidos): chaves como a data de
+  "ativos em" mudam todo dia e fariam ele crescer sem fim. Cada worker
+  soma ao arquivo só o que contou desde a última gravação, sob trava, para
+  não apagar as contagens dos outros;
+- depois de cada carga de dados, uma thread recalcula os K estados mais
+  populares (respeitando um orçamento de memória) e os deixa prontos;
+- requisições que encontram o estado pronto são servidas do cache, e o
+  relatório diz quantas foram.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:      # Windows: sem trava entre processos
+    fcntl = None
+
+BASE_DIR = Path(__file__).resolve().parent
+POPULARIDADE_PATH = BASE_DIR / "data" / "popularidade.json"
+POPULARIDADE_MAX = int(os.environ.get("INPA_POPULARIDADE_MAX", "500"))   # estados de filtro guardados
+
+
+def _tupla(x):
+    """JSON -> chave (listas viram tuplas, recursivamente)."""
+    return tuple(_tupla(v) for v in x) if isinstance(x, list) else x
+
+
+class CacheQuente:
+    """
+    `calculadoras` mapeia o tipo da chave (primeiro elemento, ex. "desenha")
+    para a função que recalcula o resultado a partir da chave inteira.
+    `tamanho(resultado)` estima os bytes ocupados (ex.: tamanho do JSON).
+    """
+
+    def __init__(self, top_k: int, orcamento_bytes: int, tamanho, path: Path = POPULARIDADE_PATH, sementes=(),
+                 max_estados: int = POPULARIDADE_MAX):
+        self.top_k = top_k
+        self.max_estados = max(max_estados, top_k)
+        self.orcamento_bytes = orcamento_bytes
+        self.tamanho = tamanho
+        self.path = Path(path)
+        self.sementes = sementes          # estados (ou função que os devolve) aquecidos mesmo sem histórico
+        self.calculadoras = {}
+        self._lock = threading.Lock()
+        self._popularidade = self._corta(Counter(self._le()))
+        self._novos = Counter()           # contado desde a última gravação (o que este processo soma ao arquivo)
+        self._entradas = {}               # chave -> resultado
+        self._bytes = 0
+        self._geracao = 0
+        self._servidas = 0
+        self._requisicoes = 0
+        self._ultimo_aquecimento = None
+        atexit.register(self.salva)
+
+    # ---------------- popularidade ----------------
+    def _le(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return {_tupla(chave): n for chave, n in json.load(f)}
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def _corta(self, contador: Counter) -> Counter:
+        """Só os `max_estados` estados mais pedidos."""
+        if len(contador) <= self.max_estados:
+            return contador
+        return Counter(dict(contador.most_common(self.max_estados)))
+
+    @contextmanager
+    def _travado(self):
+        """Trava entre workers do gunicorn (onde houver fcntl) durante ler-somar-gravar."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self.path.with_suffix(".trava"), "w") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def salva(self):
+        """Soma ao arquivo o que foi contado desde a última gravação e relê o total (de todos os workers)."""
+        with self._lock:
+            novos, self._novos = self._novos, Counter()
+        try:
+            with self._travado():
+                total = Counter(self._le())
+                total.update(novos)
+                total = self._corta(total)
+                dados = [[list(chave), n] for chave, n in total.most_common()]
+                tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+                tmp.write_text(json.dumps(dados, ensure_ascii=False), encoding="utf-8")
+                tmp.replace(self.path)
+        except OSError as e:
+            print(f"⚠️  Não foi possível salvar a popularidade dos filtros: {e}")
+            with self._lock:
+                self._novos.update(novos)       # tenta de novo na próxima gravação
+            return
+        with self._lock:
+            self._popularidade = self._corta(total + self._novos)
+
+    def mais_populares(self) -> list:
+        with self._lock:
+            top = [chave for chave, _ in self._popularidade.most_common(self.top_k)]
+        sementes = self.sementes() if callable(self.sementes) else self.sementes
+        return top + [s for s in sementes if s not in top][:max(0, self.top_k - len(top))]
+
+    # ---------------- consulta ----------------
+    def obtem(self, chave, calcula):
+        """Registra o estado e devolve do cache quente, se estiver pronto; senão calcula."""
+        if chave is None:
+            return calcula()
+        with self._lock:
+            self._popularidade[chave] += 1
+            self._novos[chave] += 1
+            if len(self._popularidade) > 2 * self.max_estados:     # corte amortizado
+                self._popularidade = self._corta(self._popularidade)
+                self._novos = Counter({c: n for c, n in self._novos.items() if c in self._popularidade})
+            self._requisicoes += 1
+            if chave in self._entradas:
+                self._servidas += 1
+                return self._entradas[chave]
+        return calcula()
+
+    # ---------------- aquecimento ----------------
+    def invalida(self) -> int:
+        """Descarta o cache (dados novos); devolve a geração que o próximo aquecimento deve preencher."""
+        with self._lock:
+            self._geracao += 1
+            self._entradas, self._bytes = {}, 0
+            self._servidas = self._requisicoes = 0
+            return self._geracao
+
+    def aquece(self, geracao: int = None):
+        """Recalcula os K estados mais populares (ou até estourar o orçamento de memória)."""
+        if geracao is None:
+            geracao = self.invalida()
+
+        t0 = time.perf_counter()
+        prontos = 0
+        for chave in self.mais_populares():
+            calcula = self.calculadoras.get(chave[0])
+            if calcula is None:
+                continue
+            try:
+                resultado = calcula(chave)
+                tam = self.tamanho(resultado)
+            except Exception as e:
+                print(f"⚠️  Cache quente: falha ao calcular {chave[:2]}: {e}")
+                continue
+            with self._lock:
+                if geracao != self._geracao:
+                    return          # outra carga começou; ela aquece de novo
+                if self._bytes + tam > self.orcamento_bytes:
+                    break
+                self._entradas[chave] = resultado
+                self._bytes += tam
+                prontos += 1
+        self._ultimo_aquecimento = time.time()
+        print(f"🔥 Cache quente: {prontos} estados prontos ({self._bytes / 1024:.0f} KB) "
+              f"em {time.perf_counter() - t0:.2f}s")
+        self.salva()
+
+    def aquece_em_segundo_plano(self) -> threading.Thread:
+        # a invalidação é imediata; só o recálculo vai para a thread
+        t = threading.Thread(target=self.aquece, args=(self.invalida(),), daemon=True, name="cache-quente")
+        t.start()
+        return t
+
+    def relatorio(self) -> dict:
+        with self._lock:
+            return {
+                "estados_prontos": len(self._entradas),
+                "bytes": self._bytes,
+                "orcamento_bytes": self.orcamento_bytes,
+                "top_k": self.top_k,
+                "requisicoes": self._requisicoes,       # desde a última carga
+                "servidas_pelo_cache": self._servidas,
+                "taxa_acerto": round(self._servidas / self._requisicoes, 3) if self._requisicoes else None,
+                "estados_distintos_vistos": len(self._popularidade),
+                "ultimo_aquecimento": self._ultimo_aquecimento,
+            }
@@ -0,0 +1,364 @@
+# camadas.py
+"""
+Motor de camadas vetoriais locais da "Camada Cidadã – AAE BR-319".
+
+Lê a configuração no estilo kepler.gl (`camada_cidada_AAE_BR319.json`) e
+carrega cada dataset de um arquivo GeoJSON local em `data/camadas/<dataId>.geojson`
+no lugar das URLs WFS/API remotas (que ficam só como referência da origem).
+
+Para cada camada de polígonos o motor mantém:
+- um índice espacial STRtree sobre as geometrias originais;
+- versões simplificadas por nível de zoom, calculadas sob demanda e em cache;
+e devolve apenas as feições recortadas à janela (viewport) do mapa.
+
+Camadas de pontos densas (ex.: focos de queimada) são agregadas em células
+hexagonais ou quadradas (NumPy), com a resolução escolhida pelo zoom; o
+resultado fica em cache por (camada, período, grade, nível de zoom).
+"""
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely import STRtree
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+CAMADAS_CONFIG_PATH = BASE_DIR / "camada_cidada_AAE_BR319.json"
+CAMADAS_DIR = DATA_DIR / "camadas"
+
+# Zoom no padrão de mapas web (o mesmo do `mapState.zoom` do kepler):
+# tolerância de simplificação ≈ meio pixel na escala do zoom
+ZOOM_MIN, ZOOM_MAX = 0, 14
+
+
+def tolerancia_por_zoom(zoom: int) -> float:
+    return 360.0 / (512 * 2 ** zoom)
+
+
+# Agregação de pontos: tamanho da célula na tela (px) e limite para desenhar pontos crus
+CELULA_PX = 18
+PONTOS_MAX_BRUTOS = 5000
+AGREGACAO_CACHE_MAX = 64
+
+
+def tamanho_celula_por_zoom(zoom: int) -> float:
+    """
+    Largura da célula em graus para ~CELULA_PX pixels no nível de zoom: lado
+    do quadrado ou altura do hexágono (raio = metade, ver `agregacao`).
+    """
+    return CELULA_PX * 360.0 / (256 * 2 ** zoom)
+
+
+def binning(lon: np.ndarray, lat: np.ndarray, tamanho: float, grade: str = "hex") -> tuple:
+    """
+    Atribui cada ponto a uma célula da grade. Retorna (celula_por_ponto,
+    lon_centro, lat_centro), com as células numeradas de 0..n-1.
+
+    grade="hex": hexágonos "pointy-top" de raio `tamanho`, por arredondamento
+    em coordenadas cúbicas; grade="quadrada": quadrados de lado `tamanho`.
+    """
+    if grade == "hex":
+        q = (np.sqrt(3) / 3 * lon - lat / 3) / tamanho
+        r = (2 / 3 * lat) / tamanho
+        x, z = q, r
+        y = -x - z
+        rx, ry, rz = np.round(x), np.round(y), np.round(z)
+        dx, dy, dz = np.abs(rx - x), np.abs(ry - y), np.abs(rz - z)
+        corrige_x = (dx > dy) & (dx > dz)
+        corrige_z = ~corrige_x & (dz >= dy)
+        rx = np.where(corrige_x, -ry - rz, rx)
+        rz = np.where(corrige_z, -rx - ry, rz)
+        i, j = rx.astype(np.int64), rz.astype(np.int64)
+    else:
+        i = np.floor(lon / tamanho).astype(np.int64)
+        j = np.floor(lat / tamanho).astype(np.int64)
+
+    # (i, j) -> chave int64 única; j deslocado para caber sem sinal nos 32 bits baixos
+    chaves, celula = np.unique(i * (1 << 32) + (j + (1 << 31)), return_inverse=True)
+    ci, cj = chaves >> 32, (chaves & 0xFFFFFFFF) - (1 << 31)
+    if grade == "hex":
+        lon_c = tamanho * np.sqrt(3) * (ci + cj / 2)
+        lat_c = tamanho * 1.5 * cj
+    else:
+        lon_c, lat_c = (ci + 0.5) * tamanho, (cj + 0.5) * tamanho
+    return celula, lon_c, lat_c
+
+
+def resume_campo(celula: np.ndarray, n_celulas: int, valores: pd.Series) -> np.ndarray:
+    """
+    Resumo por célula de um campo do tooltip: intervalo para datas, média para
+    números e o valor mais frequente (com "+k" outros) para textos.
+    """
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        v = valores.to_numpy("datetime64[ns]").astype(np.int64)
+        nulos = valores.isna().to_numpy()
+        mn = np.full(n_celulas, np.iinfo(np.int64).max)
+        mx = np.full(n_celulas, np.iinfo(np.int64).min)
+        np.minimum.at(mn, celula[~nulos], v[~nulos])
+        np.maximum.at(mx, celula[~nulos], v[~nulos])
+        fmt = lambda a: pd.to_datetime(a).strftime("%d/%m/%Y")
+        ok = mn <= mx
+        out = np.full(n_celulas, "—", dtype=object)
+        out[ok] = [a if a == b else f"{a} – {b}" for a, b in zip(fmt(mn[ok]), fmt(mx[ok]))]
+        return out
+    if pd.api.types.is_numeric_dtype(valores):
+        v = valores.to_numpy(float)
+        ok = ~np.isnan(v)
+        soma = np.bincount(celula[ok], weights=v[ok], minlength=n_celulas)
+        cont = np.bincount(celula[ok], minlength=n_celulas)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.round(soma / cont, 2)
+    # textos: moda por célula via contagem de pares (celula, código)
+    codigos, uniques = pd.factorize(valores)
+    ok = codigos >= 0
+    pares, cont = np.unique(celula[ok] * len(uniques) + codigos[ok], return_counts=True)
+    cel, cod = pares // len(uniques), pares % len(uniques)
+    ordem = np.lexsort((-cont, cel))
+    cel_ord = cel[ordem]
+    primeiro = np.unique(cel_ord, return_index=True)[1]
+    distintos = np.bincount(cel, minlength=n_celulas)
+    out = np.full(n_celulas, "—", dtype=object)
+    for c, k in zip(cel_ord[primeiro], cod[ordem][primeiro]):
+        extra = distintos[c] - 1
+        out[c] = f"{uniques[k]} (+{extra})" if extra else str(uniques[k])
+    return out
+
+
+class Camada:
+    """Uma camada da configuração (metadados + dados locais carregados sob demanda)."""
+
+    def __init__(self, layer: dict, dataset: dict, tooltip: list, dados_dir: Path):
+        cfg = layer.get("config", {})
+        self.id = layer["id"]
+        self.data_id = cfg["dataId"]
+        self.tipo = layer.get("type", "geojson")            # "geojson" | "point"
+        self.label = cfg.get("label") or dataset.get("label") or self.data_id
+        self.cor = tuple(cfg.get("color") or dataset.get("color") or (128, 128, 128))
+        self.colunas = cfg.get("columns", {})
+        self.visivel = bool(cfg.get("isVisible", True))
+        self.tooltip = list(tooltip)
+        self.origem_remota = dataset.get("geojson") or dataset.get("api")
+        self.caminho = dados_dir / f"{self.data_id}.geojson"
+        if self.tipo == "point" and not self.caminho.exists() and (dados_dir / f"{self.data_id}.csv").exists():
+            self.caminho = dados_dir / f"{self.data_id}.csv"
+
+        self._lock = threading.Lock()
+        self._carregada = False
+        self.geoms = None          # np.ndarray de geometrias (polígonos)
+        self.lon = self.lat = None  # np.ndarray (pontos)
+        self.props = None          # DataFrame com os campos do tooltip
+        self.tree = None
+        self.datas = None          # datetime64 por ponto (1º campo de data do tooltip)
+        self._simplificadas = {}
+        self._agregacoes = OrderedDict()
+
+    @property
+    def disponivel(self) -> bool:
+        return self.caminho.exists()
+
+    def cor_rgba(self, alpha: float = 1.0) -> str:
+        r, g, b = self.cor[:3]
+        return f"rgba({r},{g},{b},{alpha})"
+
+    # ------------------------------------------------------------------
+    def carregar(self) -> "Camada":
+        with self._lock:
+            if self._carregada:
+                return self
+            if self.caminho.suffix == ".csv":
+                self._carregar_csv()
+            else:
+                self._carregar_geojson()
+            if self.tipo == "point":
+                self.datas = self._coluna_datas()
+            self._carregada = True
+            print(f"🗂️  Camada '{self.label}': {len(self.props)} feições carregadas de {self.caminho.name}")
+            return self
+
+    def _carregar_geojson(self):
+        with open(self.caminho, encoding="utf-8") as f:
+            feats = [ft for ft in json.load(f).get("features", []) if ft.get("geometry")]
+        self.props = pd.DataFrame(
+            [{k: (ft.get("properties") or {}).get(k) for k in self.tooltip} for ft in feats],
+            columns=self.tooltip,
+        )
+        geoms = shapely.from_geojson(
+            np.asarray([json.dumps(ft["geometry"]) for ft in feats], dtype=object)
+        ) if feats else np.empty(0, dtype=object)
+        if self.tipo == "point":
+            self.lon, self.lat = shapely.get_x(geoms), shapely.get_y(geoms)
+        else:
+            self.geoms = shapely.make_valid(geoms)
+            self.tree = STRtree(self.geoms)
+
+    def _carregar_csv(self):
+        col_lat = self.colunas.get("lat", "latitude")
+        col_lon = self.colunas.get("lng", "longitude")
+        cabecalho = pd.read_csv(self.caminho, nrows=0).columns
+        campos = [c for c in self.tooltip if c in cabecalho]
+        tab = pd.read_csv(
+            self.caminho, usecols=[col_lat, col_lon, *campos],
+            dtype={col_lat: "float64", col_lon: "float64", **{c: "string" for c in campos}},
+        ).dropna(subset=[col_lat, col_lon])
+        self.lat = tab[col_lat].to_numpy()
+        self.lon = tab[col_lon].to_numpy()
+        self.props = tab.reindex(columns=self.tooltip).reset_index(drop=True)
+
+    def _coluna_datas(self):
+        """Primeiro campo do tooltip que parece data (ex.: `data`), convertido uma vez."""
+        for campo in self.tooltip:
+            if "data" in campo.lower() or "date" in campo.lower():
+                datas = pd.to_datetime(self.props[campo], errors="coerce", format="ISO8601")
+                if datas.isna().all() and self.props[campo].notna().any():
+                    datas = pd.to_datetime(self.props[campo], errors="coerce", dayfirst=True)
+                self.props[campo] = datas
+                return datas.to_numpy("datetime64[ns]")
+        return None
+
+    def simplificadas(self, zoom: int) -> np.ndarray:
+        """Geometrias simplificadas para o nível de zoom (cache por nível)."""
+        zoom = int(min(max(zoom, ZOOM_MIN), ZOOM_MAX))
+        if zoom not in self._simplificadas:
+            self._simplificadas[zoom] = shapely.simplify(
+                self.geoms, tolerancia_por_zoom(zoom), preserve_topology=True
+            )
+        return self._simplificadas[zoom]
+
+    def na_janela(self, bbox: tuple, zoom: float) -> tuple:
+        """
+        Feições dentro da janela `bbox` = (lon_min, lat_min, lon_max, lat_max).
+
+        Polígonos: retorna (índices, geometrias simplificadas e recortadas).
+        Pontos: retorna (índices, None).
+        """
+        self.carregar()
+        if self.tipo == "point":
+            lon_min, lat_min, lon_max, lat_max = bbox
+            dentro = (self.lon >= lon_min) & (self.lon <= lon_max) & \
+                     (self.lat >= lat_min) & (self.lat <= lat_max)
+            return np.flatnonzero(dentro), None
+        idx = np.sort(self.tree.query(shapely.box(*bbox), predicate="intersects"))
+        recortes = shapely.clip_by_rect(self.simplificadas(round(zoom))[idx], *bbox)
+        validos = ~shapely.is_empty(recortes)
+        return idx[validos], recortes[validos]
+
+    def _mascara_periodo(self, periodo) -> np.ndarray:
+        ini, fim = periodo if periodo else (None, None)
+        mascara = np.ones(len(self.lon), dtype=bool)
+        if self.datas is not None:
+            if ini:
+                mascara &= self.datas >= np.datetime64(pd.Timestamp(ini))
+            if fim:
+                mascara &= self.datas < np.datetime64(pd.Timestamp(fim) + pd.Timedelta(days=1))
+        return mascara
+
+    def agregacao(self, zoom: float, periodo=None, grade: str = "hex") -> pd.DataFrame:
+        """
+        Pontos da camada inteira agregados por célula para o nível de zoom.
+        Colunas: lon, lat (centro da célula), qtd e um resumo por campo do tooltip.
+        Cache LRU por (período, grade, nível).
+        """
+        self.carregar()
+        nivel = int(min(max(round(zoom), ZOOM_MIN), ZOOM_MAX))
+        chave = (tuple(periodo) if periodo else None, grade, nivel)
+        with self._lock:
+            if chave in self._agregacoes:
+                self._agregacoes.move_to_end(chave)
+                return self._agregacoes[chave]
+
+        sel = np.flatnonzero(self._mascara_periodo(periodo))
+        tamanho = tamanho_celula_por_zoom(nivel)
+        if grade == "hex":
+            tamanho /= 2       # raio: hexágono de 2·raio = CELULA_PX, o tamanho do marcador no mapa
+        celula, lon_c, lat_c = binning(self.lon[sel], self.lat[sel], tamanho, grade)
+        agg = pd.DataFrame({"lon": lon_c, "lat": lat_c, "qtd": np.bincount(celula, minlength=len(lon_c))})
+        props = self.props.iloc[sel]
+        for campo in self.tooltip:
+            agg[campo] = resume_campo(celula, len(lon_c), props[campo])
+
+        with self._lock:
+            self._agregacoes[chave] = agg
+            while len(self._agregacoes) > AGREGACAO_CACHE_MAX:
+                self._agregacoes.popitem(last=False)
+        return agg
+
+
+class MotorCamadas:
+    """Registro das camadas definidas na configuração kepler."""
+
+    def __init__(self, config_path: Path = CAMADAS_CONFIG_PATH, dados_dir: Path = CAMADAS_DIR):
+        with open(config_path, encoding="utf-8") as f:
+            cfg = json.load(f)
+        vis = cfg.get("config", {}).get("visState", {})
+        datasets = {d["id"]: d for d in cfg.get("datasets", [])}
+        tooltips = vis.get("interactionConfig", {}).get("tooltip", {}).get("fieldsToShow", {})
+        self.titulo = cfg.get("metadata", {}).get("title", "Camadas")
+        self.map_state = cfg.get("config", {}).get("mapState", {})
+        self.camadas = {}
+        for layer in vis.get("layers", []):
+            data_id = layer.get("config", {}).get("dataId")
+            if data_id:
+                self.camadas[layer["id"]] = Camada(
+                    layer, datasets.get(data_id, {}), tooltips.get(data_id, []), dados_dir
+                )
+
+    def __iter__(self):
+        return iter(self.camadas.values())
+
+    def __getitem__(self, layer_id: str) -> Camada:
+        return self.camadas[layer_id]
+
+    def disponiveis(self) -> list:
+        return [c for c in self if c.disponivel]
+
+    def geojson_na_janela(self, layer_id: str, bbox: tuple, zoom: float) -> dict:
+        """FeatureCollection (dict) com as feições recortadas à janela e os campos do tooltip."""
+        camada = self[layer_id]
+        idx, geoms = camada.na_janela(bbox, zoom)
+        props = camada.props.iloc[idx].to_dict("records")
+        if camada.tipo == "point":
+            geoms = shapely.points(camada.lon[idx], camada.lat[idx])
+        feats = [
+            {"type": "Feature", "id": str(i), "properties": p, "geometry": json.loads(g)}
+            for i, p, g in zip(idx, props, shapely.to_geojson(geoms))
+        ]
+        return {"type": "FeatureCollection", "features": feats}
+
+    def pontos_na_janela(self, layer_id: str, bbox: tuple, zoom: float, periodo=None,
+                         grade: str = "hex") -> tuple:
+        """
+        Pontos da camada na janela: crus se forem poucos (<= PONTOS_MAX_BRUTOS),
+        senão células agregadas. Retorna (agregado: bool, DataFrame com lon/lat,
+        campos do tooltip e, se agregado, qtd).
+        """
+        camada = self[layer_id].carregar()
+        idx, _ = camada.na_janela(bbox, zoom)
+        idx = idx[camada._mascara_periodo(periodo)[idx]]
+        if len(idx) <= PONTOS_MAX_BRUTOS:
+            pts = camada.props.iloc[idx].copy()
+            pts.insert(0, "lat", camada.lat[idx])
+            pts.insert(0, "lon", camada.lon[idx])
+            return False, pts.reset_index(drop=True)
+        agg = camada.agregacao(zoom, periodo, grade)
+        lon_min, lat_min, lon_max, lat_max = bbox
+        dentro = agg["lon"].between(lon_min, lon_max) & agg["lat"].between(lat_min, lat_max)
+        return True, agg[dentro].reset_index(drop=True)
+
+
+def carrega_motor(config_path: Path = CAMADAS_CONFIG_PATH, dados_dir: Path = CAMADAS_DIR):
+    """Motor de camadas, ou None se a configuração não existir/for inválida."""
+    if not config_path.exists():
+        return None
+    try:
+        motor = MotorCamadas(config_path, dados_dir)
+    except Exception as e:
+        print(f"⚠️  Erro ao ler configuração de camadas {config_path.name}: {e}")
+        return None
+    faltando = [c.caminho.name for c in motor if not c.disponivel]
+    if faltando:
+        print(f"ℹ️  Camadas sem arquivo local em {dados_dir}: {', '.join(faltando)}")
+    return motor
@@ -0,0 +1,252 @@
+# coalescencia.py
+"""
+"Última requisição vence", por página aberta e por callback.
+
+Editar um multi-select (ex.: `filtro-tipos`) dispara `desenha` e
+`atualiza_tabela` a cada chip adicionado ou removido; o navegador só usa a
+resposta da última edição. Aqui:
+
+- cada navegador ganha um cookie (`inpa_sessao`, id aleatório) e cada
+  página aberta (aba) um id próprio, gerado no navegador e enviado no
+  cabeçalho `X-Inpa-Pagina` das chamadas de callback (`SCRIPT_PAGINA`,
+  no index do app): o cookie é o mesmo em todas as abas, o id não;
+- cada chamada de um callback registrado recebe uma geração crescente por
+  (cookie + página, callback); chegou uma mais nova, a antiga está
+  superada. Outra aba do mesmo navegador não supera nada desta;
+- pontos de verificação (`checa()`) entre as etapas caras interrompem o
+  cálculo superado com `Superada` (um PreventUpdate: o Dash responde 204 e
+  nada muda na tela); uma chamada que termina já superada também não é
+  enviada (economiza serialização e rede);
+- fora de uma requisição (ex.: aquecimento do cache em segundo plano) nada
+  disso vale: `checa()` não faz nada.
+
+O registro é por processo: com vários workers (gunicorn), cada um coalesce
+as requisições que recebe. O debounce dos filtros no navegador (app.py)
+reduz as chamadas antes de elas saírem.
+
+Simulação de carga: `python coalescencia.py --bench`.
+"""
+import functools
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from dash.exceptions import PreventUpdate
+from flask import has_request_context, request
+
+COOKIE_SESSAO = "inpa_sessao"
+CABECALHO_PAGINA = "X-Inpa-Pagina"
+MAX_SESSOES = 10_000      # gerações guardadas (as sessões mais antigas saem primeiro)
+
+# id por página aberta, enviado nas chamadas de callback do Dash (vai no index, antes do renderer)
+SCRIPT_PAGINA = """
+<script>
+    (function () {
+        var id = (window.crypto && crypto.randomUUID) ? crypto.randomUUID()
+                 : Date.now().toString(36) + Math.random().toString(36).slice(2);
+        var original = window.fetch;
+        window.fetch = function (url, opcoes) {
+            if (typeof url === 'string' && url.indexOf('_dash-update-component') >= 0) {
+                opcoes = Object.assign({}, opcoes);
+                opcoes.headers = new Headers(opcoes.headers || {});
+                opcoes.headers.set('%s', id);
+            }
+            return original.call(this, url, opcoes);
+        };
+    })();
+</script>
+""" % CABECALHO_PAGINA
+
+
+class Superada(PreventUpdate):
+    """Chegou uma chamada mais nova do mesmo callback na mesma página."""
+
+
+def sessao_da_requisicao():
+    """Cookie do navegador + id da página (aba); sem o cabeçalho, só o cookie."""
+    if not has_request_context():
+        return None
+    cookie = request.cookies.get(COOKIE_SESSAO)
+    if cookie is None:
+        return None
+    pagina = request.headers.get(CABECALHO_PAGINA)
+    return f"{cookie}:{pagina}" if pagina else cookie
+
+
+def instala_cookie(server) -> None:
+    """Dá um id de sessão a cada navegador (cookie de sessão, sem dados pessoais)."""
+    @server.after_request
+    def _cookie_sessao(resp):
+        if COOKIE_SESSAO not in request.cookies:
+            resp.set_cookie(COOKIE_SESSAO, uuid.uuid4().hex, httponly=True, samesite="Lax")
+        return resp
+
+
+class UltimaVence:
+    def __init__(self, sessao=sessao_da_requisicao, max_sessoes: int = MAX_SESSOES):
+        self.sessao = sessao
+        self.max_sessoes = max_sessoes
+        self._geracoes = OrderedDict()    # (sessão, callback) -> última geração
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.contadores = Counter()
+        self._sessoes = set()
+
+    # ---------------- gerações ----------------
+    def registra(self, sessao, nome: str) -> int:
+        with self._lock:
+            chave = (sessao, nome)
+            g = self._geracoes.get(chave, 0) + 1
+            self._geracoes[chave] = g
+            self._geracoes.move_to_end(chave)
+            while len(self._geracoes) > self.max_sessoes:
+                self._geracoes.popitem(last=False)
+            self._sessoes.add(sessao)
+            if len(self._sessoes) > self.max_sessoes:
+                self._sessoes.clear()
+            return g
+
+    def vigente(self, sessao, nome: str, geracao: int) -> bool:
+        return self._geracoes.get((sessao, nome), geracao) == geracao
+
+    def checa(self) -> None:
+        """Ponto de verificação: interrompe a chamada atual se já foi superada."""
+        atual = getattr(self._local, "atual", None)
+        if atual is not None and not self.vigente(*atual):
+            raise Superada()
+
+    # ---------------- decorador ----------------
+    def __call__(self, nome: str):
+        def deco(fn):
+            @functools.wraps(fn)
+            def envolvida(*args, **kwargs):
+                sessao = self.sessao()
+                if sessao is None:
+                    return fn(*args, **kwargs)
+                g = self.registra(sessao, nome)
+                anterior = getattr(self._local, "atual", None)
+                self._local.atual = (sessao, nome, g)
+                self._conta(nome, "chamadas")
+                try:
+                    resultado = fn(*args, **kwargs)
+                    if not self.vigente(sessao, nome, g):
+                        self._conta(nome, "superadas_ao_fim")     # calculada à toa
+                        raise PreventUpdate
+                    self._conta(nome, "entregues")
+                    return resultado
+                except Superada:
+                    self._conta(nome, "interrompidas")
+                    raise
+                finally:
+                    self._local.atual = anterior
+            return envolvida
+        return deco
+
+    def _conta(self, nome: str, evento: str) -> None:
+        with self._lock:
+            self.contadores[(nome, evento)] += 1
+
+    def relatorio(self) -> dict:
+        with self._lock:
+            por_callback = {}
+            for (nome, evento), n in self.contadores.items():
+                por_callback.setdefault(nome, {})[evento] = n
+            return {"sessoes": len(self._sessoes), "callbacks": por_callback}
+
+
+# =========================================================
+# SIMULAÇÃO DE CARGA
+# =========================================================
+def _edicoes(n: int, intervalo_s: float, debounce_s: float) -> list:
+    """Instantes em que o navegador envia a requisição (o debounce só solta a última de cada rajada)."""
+    t = [i * intervalo_s for i in range(n)]
+    if not debounce_s:
+        return t
+    return [ti + debounce_s for i, ti in enumerate(t) if i == n - 1 or t[i + 1] - ti >= debounce_s]
+
+
+def simula(sessoes: int = 20, edicoes: int = 6, intervalo_ms: float = 150, custo_ms: float = 120,
+           etapas: int = 6, nucleos: int = 4, coalesce: bool = True, debounce_ms: float = 0) -> dict:
+    """
+    `sessoes` usuários editam um filtro `edicoes` vezes (uma a cada `intervalo_ms`).
+    Cada requisição ganha uma thread ao chegar (como o servidor threaded do
+    Flask) e custa `custo_ms` de CPU em `etapas`, disputando `nucleos`;
+    entre as etapas há um ponto de verificação. Conta cálculos completos,
+    os descartados por sessão (resultados que o navegador jogaria fora), a CPU
+    gasta à toa e o tempo até a última resposta de cada sessão.
+    """
+    sessao_atual = threading.local()
+    ultima = UltimaVence(sessao=lambda: getattr(sessao_atual, "id", None))
+    cpu = threading.Semaphore(nucleos)
+    passo = custo_ms / 1000 / etapas
+    etapas_gastas = Counter()
+    ultimo_ok = {}
+
+    @ultima("desenha")
+    def desenha():
+        for _ in range(etapas):
+            if coalesce:
+                ultima.checa()
+            with cpu:
+                time.sleep(passo)
+                etapas_gastas["total"] += 1
+        return True
+
+    def requisicao(s, ultima_edicao):
+        sessao_atual.id = s
+        try:
+            desenha()
+        except PreventUpdate:
+            return
+        if ultima_edicao:
+            ultimo_ok[s] = time.perf_counter()
+
+    envios = _edicoes(edicoes, intervalo_ms / 1000, debounce_ms / 1000)
+    t0 = time.perf_counter()
+    threads = []
+    for t, s, i in sorted((t + s * 0.003, s, i) for s in range(sessoes) for i, t in enumerate(envios)):
+        espera = t0 + t - time.perf_counter()     # usuários levemente defasados
+        if espera > 0:
+            time.sleep(espera)
+        # sem coalescência cada chamada é tratada como independente (sessões distintas)
+        th = threading.Thread(target=requisicao, args=(s if coalesce else f"{s}-{i}", i == len(envios) - 1))
+        th.start()
+        threads.append(th)
+    for th in threads:
+        th.join()
+
+    r = ultima.relatorio()["callbacks"].get("desenha", {})
+    completos = r.get("entregues", 0) + r.get("superadas_ao_fim", 0)
+    uteis = sessoes                      # só a resposta da última edição de cada sessão é usada
+    return {
+        "requisicoes": len(envios) * sessoes,
+        "calculos_completos": completos,
+        "descartadas_por_sessao": (completos - uteis) / sessoes,       # calculadas até o fim à toa
+        "cpu_desperdicada_por_sessao_s": (etapas_gastas["total"] * passo - uteis * custo_ms / 1000) / sessoes,
+        "tempo_ate_ultima_s": max(ultimo_ok.values(), default=t0) - t0,
+    }
+
+
+def imprime_simulacao(**kw) -> None:
+    cenarios = [
+        ("sem coalescência", dict(coalesce=False)),
+        ("última vence", dict(coalesce=True)),
+        ("última vence + debounce 300 ms", dict(coalesce=True, debounce_ms=300)),
+    ]
+    print(f"{'cenário':<34}{'requisições':>12}{'cálculos':>10}{'descartados/sessão':>20}"
+          f"{'CPU à toa/sessão (s)':>22}{'última resp. (s)':>18}")
+    for nome, extra in cenarios:
+        r = simula(**{**kw, **extra})
+        print(f"{nome:<34}{r['requisicoes']:>12}{r['calculos_completos']:>10}{r['descartadas_por_sessao']:>20.1f}"
+              f"{r['cpu_desperdicada_por_sessao_s']:>22.2f}{r['tempo_ate_ultima_s']:>18.2f}")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        print("⏱️  Simulação: 20 sessões editando um multi-select 6 vezes (150 ms entre edições), "
+              "120 ms de CPU por cálculo, 4 núcleos")
+        imprime_simulacao()
+    else:
+        print(__doc__)
@@ -0,0 +1,577 @@
+# consultas.py
+"""
+Motores de consulta do dashboard (filtros, KPIs, agregações e paginação).
+
+- "pandas" (padrão): opera sobre o DataFrame em memória;
+- "duckdb": o DataFrame processado vira uma tabela num banco DuckDB embutido
+  (arquivo em `data/`, sem servidor) e cada consulta é SQL — para históricos
+  grandes.
+
+Os dois motores devolvem exatamente os mesmos resultados (mesma ordem,
+inclusive em empates). Benchmark por número de linhas:
+    python consultas.py --bench
+"""
+import atexit
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cubo import CuboAnual
+from vigencia import IndiceVigencia
+
+try:
+    import duckdb
+except ImportError:  # opcional: só é necessário com INPA_MOTOR=duckdb
+    duckdb = None
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+DUCKDB_PATH = DATA_DIR / "consultas.duckdb"
+
+ANO_ATUAL = 2025   # "Novos acordos" quando o filtro de ano é "Todos" (com período: o último ano dele)
+COLUNAS_TABELA = ["pais", "uf_sigla", "tipo", "modalidade", "ano_assinatura", "status", "pesquisador_responsavel"]
+# grão do agregado usado pelos filtros cruzados (cruzados.py)
+COLUNAS_AGREGADO = ["modalidade", "ano", "nivel_localizacao", "codigo_iso3", "pais", "uf_sigla", "uf_nome", "eh_vigente"]
+
+
+def periodo(ano):
+    """"Todos"/None -> None; um ano -> (ano, ano); (ini, fim) -> (ini, fim) em ordem."""
+    if ano in (None, "", "Todos"):
+        return None
+    if isinstance(ano, (list, tuple)):
+        ini, fim = sorted(int(a) for a in ano)
+        return ini, fim
+    return int(ano), int(ano)
+
+
+class Filtros:
+    """
+    Estado dos filtros do dashboard (+ país/UF clicado no mapa).
+    status_mode: "todos" | "vigentes" (pelo texto do STATUS) | "na_data"
+    (intervalo de vigência contém `ativos_em`, data ISO; padrão hoje).
+    distintos: só a linha `principal` de cada acordo (processos.py: duplicatas
+    do mesmo NÚMERO e aditivos ligados à origem contam uma vez).
+    """
+
+    def __init__(self, ano="Todos", tipos=None, conts=None, modalidades=None, status_mode="todos", local=None,
+                 ativos_em=None, distintos=False):
+        self.anos = periodo(ano)     # None (todos, inclusive sem ano) | (ini, fim) inclusivo
+        self.tipos = list(tipos or [])
+        self.conts = list(conts or [])
+        self.modalidades = list(modalidades or [])
+        self.status_mode = status_mode or "todos"
+        self.local = tuple(local) if local else None   # ("pais", ISO3) | ("uf", UF)
+        self.ativos_em = None
+        if self.status_mode == "na_data":
+            self.ativos_em = pd.Timestamp(ativos_em or pd.Timestamp.today()).date().isoformat()
+        self.distintos = bool(distintos)
+
+    def _com(self, **mudancas) -> "Filtros":
+        campos = dict(ano=self.anos, tipos=self.tipos, conts=self.conts, modalidades=self.modalidades,
+                      status_mode=self.status_mode, local=self.local, ativos_em=self.ativos_em,
+                      distintos=self.distintos)
+        return Filtros(**{**campos, **mudancas})
+
+    def sem_local(self) -> "Filtros":
+        return self._com(local=None)
+
+    def sem_ano(self) -> "Filtros":
+        return self._com(ano=None)
+
+    def sem_data(self) -> "Filtros":
+        return self._com(status_mode="todos") if self.status_mode == "na_data" else self
+
+    def chave(self) -> tuple:
+        """Mesma ordem dos argumentos do construtor (`Filtros(*chave)` reconstrói)."""
+        return (self.anos, tuple(self.tipos), tuple(self.conts), tuple(self.modalidades),
+                self.status_mode, self.local, self.ativos_em, self.distintos)
+
+    def __repr__(self):
+        return f"Filtros{self.chave()}"
+
+
+def _registros(det: pd.DataFrame) -> list:
+    """Linhas da tabela de detalhe no formato do DataTable."""
+    det = det.astype(object).where(det.notna(), None)
+    return det.to_dict("records")
+
+
+# =========================================================
+# PANDAS
+# =========================================================
+def filtra_df(df_in: pd.DataFrame, f: Filtros) -> pd.DataFrame:
+    d = df_in
+
+    # Período global
+    if f.anos is not None:
+        ano_num = pd.to_numeric(d["ano_assinatura"], errors="coerce")
+        d = d[ano_num.between(*f.anos)]
+
+    if f.tipos:
+        d = d[d["tipo"].isin(f.tipos)]
+    if f.modalidades:
+        d = d[d["modalidade"].isin(f.modalidades)]
+    if f.conts:
+        d = d[d["continente"].isin(f.conts)]
+    if f.status_mode == "vigentes":
+        d = d[d["eh_vigente"]]
+    elif f.status_mode == "na_data":
+        data = pd.Timestamp(f.ativos_em)
+        ini, fim = pd.to_datetime(d["vigencia_inicio"]), pd.to_datetime(d["vigencia_fim"])
+        d = d[(ini <= data) & (fim.isna() | (fim >= data))]
+
+    if f.local:
+        nivel, codigo = f.local
+        if nivel == "uf":
+            d = d[(d["codigo_iso3"] == "BRA") & (d["uf_sigla"] == codigo)]
+        else:
+            d = d[d["codigo_iso3"] == codigo]
+    if f.distintos and "principal" in d.columns:   # sem a marcação, cada linha é um acordo
+        d = d[d["principal"]]
+    return d
+
+
+class MotorPandas:
+    """
+    Filtros sobre o DataFrame em memória. Na carga monta um índice das linhas
+    ordenadas por ano (um período vira uma fatia por `searchsorted`, sem
+    converter a coluna a cada consulta), o índice de vigência por datas
+    (vigencia.py) e o cubo de somas de prefixo por ano (cubo.py), que
+    responde KPIs e evolução sem tocar nas linhas.
+    """
+    nome = "pandas"
+
+    def __init__(self, df: pd.DataFrame = None, vigencia: IndiceVigencia = None, cubo: CuboAnual = None):
+        self.df = None
+        if df is not None:
+            self.carrega(df, vigencia, cubo)
+
+    def carrega(self, df: pd.DataFrame, vigencia: IndiceVigencia = None, cubo: CuboAnual = None):
+        """
+        `vigencia`: índice já montado para este mesmo `df` (o do painel), em vez de um segundo;
+        `cubo`: cubo já atualizado pela diferença da recarga (`CuboAnual.aplica`).
+        """
+        anos = pd.to_numeric(df["ano_assinatura"], errors="coerce").to_numpy(dtype=float)
+        ordem = np.argsort(anos, kind="stable")       # sem ano (NaN) fica no fim
+        cubo = cubo if cubo is not None else CuboAnual(df)
+        vigencia = vigencia if vigencia is not None else IndiceVigencia(df)
+        # troca num passo só: uma consulta concorrente vê a carga antiga ou a nova, nunca as duas
+        self._indice = (df, ordem, anos[ordem], cubo, vigencia)
+        self.df, self.cubo, self.vigencia = df, cubo, vigencia
+
+    def filtra(self, f: Filtros) -> pd.DataFrame:
+        df, ordem, anos_ordenados, _, vigencia = self._indice
+        linhas = None
+        if f.anos is not None:
+            ini, fim = f.anos
+            i0, i1 = np.searchsorted(anos_ordenados, ini, "left"), np.searchsorted(anos_ordenados, fim, "right")
+            linhas = np.sort(ordem[i0:i1])            # de volta à ordem original (empates estáveis)
+        if f.ativos_em is not None:
+            ativos = vigencia.ativos_em(f.ativos_em)
+            linhas = ativos if linhas is None else np.intersect1d(linhas, ativos, assume_unique=True)
+        if linhas is None:
+            return filtra_df(df, f)
+        return filtra_df(df.iloc[linhas], f.sem_ano().sem_data())
+
+    def _usa_cubo(self, f: Filtros) -> bool:
+        return f.local is None and f.status_mode != "na_data" and not f.distintos
+
+    def kpis(self, f: Filtros) -> dict:
+        cubo = self._indice[3]
+        if self._usa_cubo(f):
+            k = cubo.kpis(f, ANO_ATUAL)
+            if k is not None:
+                return k
+        dff = self.filtra(f)
+        total = len(dff)
+        ano = f.anos[1] if f.anos else ANO_ATUAL
+        novos = int((pd.to_numeric(dff["ano_assinatura"], errors="coerce") == ano).sum())
+        lider, lider_qtd = None, 0
+        if total:
+            cont = dff["modalidade"].value_counts(sort=False)   # ordem da 1ª ocorrência: desempate estável
+            lider, lider_qtd = cont.idxmax(), int(cont.max())
+        return {
+            "total": total,
+            "vigentes": int(dff["eh_vigente"].sum()),
+            "paises": int(dff.loc[dff["nivel_localizacao"] == "pais", "codigo_iso3"].nunique()),
+            "ano_novos": ano,
+            "novos": novos,
+            "modalidade_lider": lider,
+            "modalidade_lider_qtd": lider_qtd,
+        }
+
+    def pins_paises(self, f: Filtros) -> pd.DataFrame:
+        paises = self.filtra(f)
+        paises = paises[paises["nivel_localizacao"] == "pais"]
+        grp = paises.groupby(["codigo_iso3", "eh_vigente"], dropna=True).size().reset_index(name="qtd")
+        meta = paises.groupby("codigo_iso3", dropna=True)["pais"].first().rename("pais").reset_index()
+        return grp.merge(meta, on="codigo_iso3", how="left")
+
+    def pins_ufs(self, f: Filtros) -> pd.DataFrame:
+        dff = self.filtra(f)
+        br = dff[(dff["codigo_iso3"] == "BRA") & dff["uf_sigla"].notna()]
+        grp = br.groupby(["uf_sigla", "eh_vigente"]).size().reset_index(name="qtd")
+        meta = br.groupby("uf_sigla")[["uf_nome"]].first().reset_index()
+        return grp.merge(meta, on="uf_sigla", how="left")
+
+    def resumo_ufs(self, f: Filtros) -> pd.DataFrame:
+        dff = self.filtra(f)
+        br = dff[(dff["codigo_iso3"] == "BRA") & dff["uf_sigla"].notna()]
+        return (br.groupby("uf_sigla")
+                  .agg(qtd=("uf_sigla", "size"), vigentes=("eh_vigente", "sum"), uf_nome=("uf_nome", "first"))
+                  .reset_index())
+
+    def contagem(self, f: Filtros, coluna: str, excluir=None) -> pd.DataFrame:
+        """Linhas por valor de `coluna` (decrescente; empate pela ordem do valor)."""
+        dff = self.filtra(f)
+        if excluir is not None:
+            dff = dff[dff[coluna] != excluir]
+        return (dff.groupby(coluna, dropna=False).size().reset_index(name="qtd")
+                   .sort_values("qtd", ascending=False, kind="stable").reset_index(drop=True))
+
+    def evolucao(self, f: Filtros) -> pd.DataFrame:
+        if self._usa_cubo(f):
+            return self._indice[3].evolucao(f)
+        dff = self.filtra(f)
+        ano = pd.to_numeric(dff["ano_assinatura"], errors="coerce")
+        ev = (dff.assign(ano_assinatura=ano).dropna(subset=["ano_assinatura"])
+                 .groupby(["ano_assinatura", "eh_vigente"], as_index=False).size()
+                 .rename(columns={"size": "qtd"}))
+        return ev.sort_values("ano_assinatura", kind="stable").reset_index(drop=True)
+
+    def agregado(self, f: Filtros) -> pd.DataFrame:
+        """
+        Contagens por COLUNAS_AGREGADO (+ qtd), uma linha por combinação, na
+        ordem da primeira ocorrência (é o que desempata líder e rótulos).
+        """
+        dff = self.filtra(f)
+        ag = dff.assign(ano=pd.to_numeric(dff["ano_assinatura"], errors="coerce").astype("Int64"))
+        return (ag.groupby(COLUNAS_AGREGADO, dropna=False, sort=False).size()
+                  .reset_index(name="qtd"))
+
+    def pagina(self, f: Filtros, pagina: int = 0, tamanho: int = 15) -> tuple:
+        """(registros da página, total de linhas) da tabela de detalhe."""
+        dff = self.filtra(f)
+        det = dff.sort_values(["pais", "uf_sigla", "ano_assinatura"], ascending=[True, True, False], kind="stable")
+        det = det.iloc[pagina * tamanho:(pagina + 1) * tamanho]
+        out = det[COLUNAS_TABELA].copy()
+        out["ano_assinatura"] = pd.to_numeric(out["ano_assinatura"], errors="coerce").astype("Int64")
+        out["Vigente"] = det["eh_vigente"].map({True: "Sim", False: "Não"}).fillna("Não")
+        out["numero_processo"] = det["NÚMERO"].fillna("—") if "NÚMERO" in det.columns else "—"
+        return _registros(out), len(dff)
+
+
+# =========================================================
+# DUCKDB
+# =========================================================
+_TEXTO = ["nivel_localizacao", "pais", "codigo_iso3", "uf_sigla", "uf_nome", "tipo",
+          "modalidade", "continente", "status", "pesquisador_responsavel"]
+
+
+class MotorDuckDB:
+    """
+    Mesmas consultas do MotorPandas em SQL sobre um banco DuckDB em arquivo.
+    Cada thread do servidor usa seu próprio cursor (conexão duplicada).
+    """
+    nome = "duckdb"
+
+    def __init__(self, df: pd.DataFrame = None, path: Path = DUCKDB_PATH):
+        if duckdb is None:
+            raise ImportError("duckdb não está instalado (pip install duckdb)")
+        self.path = Path(path)
+        self._con = self._conecta(self.path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.tabela, self._geracao, self._anterior = "processos", 0, None
+        if df is not None:
+            self.carrega(df)
+
+    def ao_lado(self, df: pd.DataFrame, vigencia: IndiceVigencia = None, cubo=None) -> "MotorDuckDB":
+        """
+        Motor da próxima carga: mesmo banco, tabela nova, carregada enquanto
+        este segue respondendo. A troca é a atribuição da visão que o usa; a
+        tabela deste fica até a carga seguinte (consultas em andamento na
+        visão antiga terminam nela) e a de duas cargas atrás é apagada.
+        """
+        novo = object.__new__(MotorDuckDB)
+        novo.path, novo._con, novo._lock, novo._local = self.path, self._con, self._lock, threading.local()
+        novo._geracao = self._geracao + 1
+        novo.tabela, novo._anterior = f"processos_{novo._geracao}", self.tabela
+        novo.carrega(df, vigencia, cubo)
+        if self._anterior is not None and self._anterior != novo.tabela:
+            with self._lock:
+                cur = self._con.cursor()
+                cur.execute(f"DROP TABLE IF EXISTS {self._anterior}")
+                cur.close()
+        return novo
+
+    @staticmethod
+    def _conecta(path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            return duckdb.connect(str(path))
+        except duckdb.IOException:
+            # arquivo já aberto por outro processo (ex.: vários workers do gunicorn)
+            proprio = path.with_name(f"{path.stem}.{os.getpid()}{path.suffix}")
+            atexit.register(lambda: [p.unlink(missing_ok=True) for p in (proprio, proprio.with_suffix(".duckdb.wal"))])
+            return duckdb.connect(str(proprio))
+
+    def _cur(self):
+        cur = getattr(self._local, "cur", None)
+        if cur is None:
+            cur = self._local.cur = self._con.cursor()
+        return cur
+
+    def _q(self, sql: str, params=()) -> pd.DataFrame:
+        return self._cur().execute(sql, list(params)).df()
+
+    def carrega(self, df: pd.DataFrame, vigencia: IndiceVigencia = None, cubo=None):
+        """`vigencia` e `cubo` não são usados: as datas viram colunas e as contagens são SQL."""
+        tabela = pd.DataFrame({c: df[c].astype("string") for c in _TEXTO})
+        tabela["ano"] = pd.to_numeric(df["ano_assinatura"], errors="coerce").astype("Int64")
+        tabela["eh_vigente"] = df["eh_vigente"].astype(bool)
+        tabela["numero"] = df["NÚMERO"].astype("string") if "NÚMERO" in df.columns else pd.NA
+        tabela["numero"] = tabela["numero"].astype("string")
+        tabela["principal"] = df["principal"].astype(bool) if "principal" in df.columns else True
+        for col, nome in (("vigencia_inicio", "vig_inicio"), ("vigencia_fim", "vig_fim")):
+            tabela[nome] = pd.to_datetime(df[col]).dt.normalize() if col in df.columns else pd.NaT
+            tabela[nome] = tabela[nome].astype("datetime64[ns]")
+        tabela["_ordem"] = np.arange(len(df), dtype=np.int64)
+        with self._lock:
+            cur = self._con.cursor()
+            cur.register("_novo", tabela)
+            cur.execute(f"CREATE OR REPLACE TABLE {self.tabela} AS SELECT * FROM _novo")
+            cur.unregister("_novo")
+            cur.close()
+
+    @staticmethod
+    def _where(f: Filtros, extra=()) -> tuple:
+        conds, params = list(extra), []
+        if f.anos is not None:
+            conds.append("ano BETWEEN ? AND ?")
+            params += list(f.anos)
+        for col, valores in (("tipo", f.tipos), ("modalidade", f.modalidades), ("continente", f.conts)):
+            if valores:
+                conds.append(f"{col} IN ({', '.join('?' * len(valores))})")
+                params += [str(v) for v in valores]
+        if f.status_mode == "vigentes":
+            conds.append("eh_vigente")
+        elif f.status_mode == "na_data":
+            conds.append("vig_inicio <= ?::DATE AND (vig_fim IS NULL OR vig_fim >= ?::DATE)")
+            params += [f.ativos_em, f.ativos_em]
+        if f.local:
+            nivel, codigo = f.local
+            if nivel == "uf":
+                conds.append("codigo_iso3 = 'BRA' AND uf_sigla = ?")
+            else:
+                conds.append("codigo_iso3 = ?")
+            params.append(codigo)
+        if f.distintos:
+            conds.append("principal")
+        return ("WHERE " + " AND ".join(conds)) if conds else "", params
+
+    def filtra(self, f: Filtros) -> pd.DataFrame:
+        where, params = self._where(f)
+        return self._q(f"SELECT * EXCLUDE (_ordem) FROM {self.tabela} {where} ORDER BY _ordem", params)
+
+    def kpis(self, f: Filtros) -> dict:
+        where, params = self._where(f)
+        ano = f.anos[1] if f.anos else ANO_ATUAL
+        r = self._cur().execute(f"""
+            SELECT count(*), coalesce(count_if(eh_vigente), 0),
+                   count(DISTINCT codigo_iso3) FILTER (WHERE nivel_localizacao = 'pais'),
+                   coalesce(count_if(ano = ?), 0)
+            FROM {self.tabela} {where}""", [ano] + params).fetchone()
+        lider = self._cur().execute(f"""
+            SELECT modalidade, count(*) AS n FROM {self.tabela} {where}
+            {'AND' if where else 'WHERE'} modalidade IS NOT NULL
+            GROUP BY modalidade ORDER BY n DESC, min(_ordem) LIMIT 1""", params).fetchone()
+        total = int(r[0])
+        return {
+            "total": total,
+            "vigentes": int(r[1]),
+            "paises": int(r[2]),
+            "ano_novos": ano,
+            "novos": int(r[3]),
+            "modalidade_lider": lider[0] if lider else None,
+            "modalidade_lider_qtd": int(lider[1]) if lider else 0,
+        }
+
+    def _pins(self, f: Filtros, chave: str, rotulo: str, cond: str) -> pd.DataFrame:
+        where, params = self._where(f, [cond, f"{chave} IS NOT NULL"])
+        return self._q(f"""
+            WITH sel AS (SELECT * FROM {self.tabela} {where}),
+                 meta AS (SELECT {chave}, arg_min({rotulo}, _ordem) FILTER (WHERE {rotulo} IS NOT NULL) AS {rotulo}
+                          FROM sel GROUP BY {chave})
+            SELECT sel.{chave}, sel.eh_vigente, count(*) AS qtd, any_value(meta.{rotulo}) AS {rotulo}
+            FROM sel JOIN meta USING ({chave})
+            GROUP BY sel.{chave}, sel.eh_vigente
+            ORDER BY sel.{chave}, sel.eh_vigente""", params)
+
+    def pins_paises(self, f: Filtros) -> pd.DataFrame:
+        return self._pins(f, "codigo_iso3", "pais", "nivel_localizacao = 'pais'")
+
+    def pins_ufs(self, f: Filtros) -> pd.DataFrame:
+        return self._pins(f, "uf_sigla", "uf_nome", "codigo_iso3 = 'BRA'")
+
+    def resumo_ufs(self, f: Filtros) -> pd.DataFrame:
+        where, params = self._where(f, ["codigo_iso3 = 'BRA'", "uf_sigla IS NOT NULL"])
+        return self._q(f"""
+            SELECT uf_sigla, count(*) AS qtd, count_if(eh_vigente)::BIGINT AS vigentes,
+                   arg_min(uf_nome, _ordem) FILTER (WHERE uf_nome IS NOT NULL) AS uf_nome
+            FROM {self.tabela} {where} GROUP BY uf_sigla ORDER BY uf_sigla""", params)
+
+    def contagem(self, f: Filtros, coluna: str, excluir=None) -> pd.DataFrame:
+        coluna_sql = {"ano_assinatura": "ano"}.get(coluna, coluna)
+        extra = [f"{coluna_sql} IS DISTINCT FROM ?"] if excluir is not None else []
+        where, params = self._where(f, extra)
+        if excluir is not None:
+            params = [excluir] + params
+        return self._q(f"""
+            SELECT {coluna_sql} AS "{coluna}", count(*) AS qtd FROM {self.tabela} {where}
+            GROUP BY {coluna_sql} ORDER BY qtd DESC, {coluna_sql} ASC NULLS LAST""", params)
+
+    def evolucao(self, f: Filtros) -> pd.DataFrame:
+        where, params = self._where(f, ["ano IS NOT NULL"])
+        return self._q(f"""
+            SELECT ano AS ano_assinatura, eh_vigente, count(*) AS qtd FROM {self.tabela} {where}
+            GROUP BY ano, eh_vigente ORDER BY ano, eh_vigente""", params)
+
+    def agregado(self, f: Filtros) -> pd.DataFrame:
+        where, params = self._where(f)
+        colunas = ", ".join(COLUNAS_AGREGADO)
+        ag = self._q(f"""
+            SELECT {colunas}, count(*) AS qtd FROM {self.tabela} {where}
+            GROUP BY {colunas} ORDER BY min(_ordem)""", params)
+        ag["ano"] = ag["ano"].astype("Int64")
+        return ag
+
+    def pagina(self, f: Filtros, pagina: int = 0, tamanho: int = 15) -> tuple:
+        where, params = self._where(f)
+        total = self._cur().execute(f"SELECT count(*) FROM {self.tabela} {where}", params).fetchone()[0]
+        det = self._q(f"""
+            SELECT pais, uf_sigla, tipo, modalidade, ano AS ano_assinatura, status, pesquisador_responsavel,
+                   CASE WHEN eh_vigente THEN 'Sim' ELSE 'Não' END AS "Vigente",
+                   coalesce(numero, '—') AS numero_processo
+            FROM {self.tabela} {where}
+            ORDER BY pais ASC NULLS LAST, uf_sigla ASC NULLS LAST, ano DESC NULLS LAST, _ordem
+            LIMIT ? OFFSET ?""", params + [tamanho, pagina * tamanho])
+        det["ano_assinatura"] = det["ano_assinatura"].astype("Int64")
+        return _registros(det), int(total)
+
+
+def cria_motor(nome: str, df: pd.DataFrame, vigencia: IndiceVigencia = None):
+    """
+    Motor configurado (`INPA_MOTOR`); sem duckdb instalado, volta ao pandas.
+    `vigencia`: índice de vigência de `df` já montado, reaproveitado pelo pandas.
+    """
+    if nome == "duckdb":
+        if duckdb is None:
+            print("⚠️  INPA_MOTOR=duckdb, mas o pacote duckdb não está instalado. Usando pandas.")
+        else:
+            motor = MotorDuckDB(df)
+            print(f"🦆 Motor de consultas: DuckDB ({motor._con.execute('PRAGMA database_list').fetchone()[2]})")
+            return motor
+    return MotorPandas(df, vigencia)
+
+
+# =========================================================
+# BENCHMARK
+# =========================================================
+def dados_sinteticos(n: int, seed: int = 0) -> pd.DataFrame:
+    """DataFrame processado sintético com cardinalidades parecidas com as reais."""
+    rng = np.random.default_rng(seed)
+    paises = [f"País {i:02d}" for i in range(60)]
+    isos = [f"P{i:02d}" for i in range(60)]
+    ufs = ["AM", "PA", "SP", "RJ", "MG", "RR", "AC", "RO", "AP", "TO", "MA", "BA", "DF"]
+    eh_uf = rng.random(n) < 0.25
+    i_pais = rng.integers(0, 60, n)
+    i_uf = rng.integers(0, len(ufs), n)
+    ano = rng.integers(2010, 2026, n).astype(object)
+    ano[rng.random(n) < 0.02] = pd.NA
+    df = pd.DataFrame({
+        "nivel_localizacao": np.where(eh_uf, "uf_br", "pais"),
+        "pais": np.where(eh_uf, "Brasil", np.array(paises, dtype=object)[i_pais]),
+        "codigo_iso3": np.where(eh_uf, "BRA", np.array(isos, dtype=object)[i_pais]),
+        "uf_sigla": np.where(eh_uf, np.array(ufs, dtype=object)[i_uf], None),
+        "uf_nome": np.where(eh_uf, np.array(ufs, dtype=object)[i_uf], None),
+        "ano_assinatura": ano,
+        "tipo": rng.choice([f"Tipo {i}" for i in range(20)], n),
+        "modalidade": rng.choice(["Acordo de Cooperação", "Memorando de Entendimento", "Carta Convite",
+                                  "Termo Aditivo", "Convênio", "Protocolo de Intenções"], n),
+        "continente": rng.choice(["América do Sul", "Europa", "Ásia", "África", "América do Norte"], n),
+        "status": rng.choice(["VIGENTE", "ENCERRADO", "EM ANDAMENTO"], n),
+        "pesquisador_responsavel": rng.choice([f"Pesq. {i}" for i in range(300)], n),
+        "NÚMERO": [f"01280.{i:06d}/2024-00" for i in range(n)],
+    })
+    df["eh_vigente"] = df["status"].eq("VIGENTE")
+    # vigência: início num dia do ano de assinatura, duração de 1 a 6 anos (10% sem fim conhecido)
+    ano_num = pd.to_numeric(df["ano_assinatura"], errors="coerce")
+    inicio = pd.to_datetime(ano_num.astype("Int64").astype("string") + "-01-01", errors="coerce") \
+        + pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+    fim = inicio + pd.to_timedelta(rng.integers(365, 6 * 365, n), unit="D")
+    df["vigencia_inicio"] = inicio
+    df["vigencia_fim"] = fim.where(rng.random(n) >= 0.1)
+    return df
+
+
+def _interacao(motor, f: Filtros):
+    """O que um `desenha` + `atualiza_tabela` consultam."""
+    motor.kpis(f)
+    motor.pins_paises(f)
+    motor.pins_ufs(f)
+    motor.resumo_ufs(f)
+    motor.contagem(f, "modalidade", excluir="Termo Aditivo")
+    motor.contagem(f, "pais")
+    motor.evolucao(f)
+    motor.pagina(f, 3)
+
+
+def benchmark(tamanhos=(1_000, 10_000, 100_000, 1_000_000), repeticoes: int = 5) -> list:
+    import tempfile
+    filtros = [
+        Filtros(),
+        Filtros(ano=2023, status_mode="vigentes"),
+        Filtros(tipos=["Tipo 1", "Tipo 2", "Tipo 3"], conts=["Europa", "Ásia"]),
+    ]
+    linhas = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in tamanhos:
+            df = dados_sinteticos(n)
+            motores = [MotorPandas(df)]
+            if duckdb is not None:
+                motores.append(MotorDuckDB(df, Path(tmp) / f"bench_{n}.duckdb"))
+            r = {"linhas": n}
+            for motor in motores:
+                _interacao(motor, filtros[0])   # aquecimento
+                tempos = []
+                for _ in range(repeticoes):
+                    t0 = time.perf_counter()
+                    for f in filtros:
+                        _interacao(motor, f)
+                    tempos.append((time.perf_counter() - t0) / len(filtros))
+                r[motor.nome] = sorted(tempos)[len(tempos) // 2]
+            linhas.append(r)
+    return linhas
+
+
+def imprime_benchmark(linhas: list) -> None:
+    print(f"{'linhas':>10}{'pandas (ms)':>14}{'duckdb (ms)':>14}  mais rápido")
+    for r in linhas:
+        dk = r.get("duckdb")
+        melhor = "—" if dk is None else ("duckdb" if dk < r["pandas"] else "pandas")
+        dk_txt = f"{dk * 1000:.1f}" if dk is not None else "n/d"
+        print(f"{r['linhas']:>10,}{r['pandas'] * 1000:>14.1f}{dk_txt:>14}  {melhor}")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        print("⏱️  Benchmark de consultas (mediana por interação: KPIs, mapas, gráficos e uma página da tabela)")
+        imprime_benchmark(benchmark())
+    else:
+        print(__doc__)
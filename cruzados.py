@@ -0,0 +1,212 @@
+# cruzados.py
+"""
+Filtros cruzados: um clique num gráfico filtra todos os outros.
+
+Dimensões clicáveis:
+- "modalidade": fatia da pizza de modalidades;
+- "ano": barra da evolução temporal;
+- "local": país/UF no mapa ou país no ranking (("pais", ISO3) | ("uf", UF)).
+
+Com filtros cruzados ativos, o dashboard não refiltra as linhas: o estado
+dos filtros globais vira um agregado (`motor.agregado`, uma consulta, em
+cache) com uma linha por modalidade x ano x local x vigência, e cada
+gráfico é uma fatia desse agregado sem a sua própria dimensão (a pizza não
+se filtra pela modalidade clicada, o mapa não se filtra pelo local etc.).
+As funções abaixo devolvem exatamente o que os motores devolvem
+(consultas.py), então os mesmos construtores de figura servem aos dois.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from consultas import Filtros
+
+DIMENSOES = ("modalidade", "ano", "local")
+NENHUM = "\x00"     # valor inexistente: seleção impossível (filtro cruzado fora dos filtros globais)
+ROTULOS = {"modalidade": "Modalidade", "ano": "Ano", "local": "Local"}
+
+
+def normaliza(cruz) -> dict:
+    """Conteúdo do dcc.Store (JSON) -> {dimensão: valor}, só com dimensões conhecidas."""
+    cruz = dict(cruz or {})
+    out = {}
+    if cruz.get("modalidade") is not None:
+        out["modalidade"] = str(cruz["modalidade"])
+    if cruz.get("ano") is not None:
+        out["ano"] = int(cruz["ano"])
+    if cruz.get("local"):
+        out["local"] = tuple(cruz["local"])
+    return out
+
+
+def chave(cruz: dict) -> tuple:
+    return tuple((d, cruz[d]) for d in DIMENSOES if d in cruz)
+
+
+def aplica(f: Filtros, cruz: dict) -> Filtros:
+    """Filtros globais + cruzados (para a tabela de detalhe, que precisa das linhas)."""
+    mud = {}
+    if "local" in cruz:
+        mud["local"] = cruz["local"]
+    if "modalidade" in cruz:
+        m = cruz["modalidade"]
+        mud["modalidades"] = [m] if not f.modalidades or m in f.modalidades else [NENHUM]
+    if "ano" in cruz:
+        a = cruz["ano"]
+        if f.anos is None or f.anos[0] <= a <= f.anos[1]:
+            mud["ano"] = a
+        else:
+            mud["modalidades"] = [NENHUM]
+    return f._com(**mud) if mud else f
+
+
+def fatia(ag: pd.DataFrame, cruz: dict, exceto: str = None) -> pd.DataFrame:
+    m = np.ones(len(ag), dtype=bool)
+    for dim, valor in cruz.items():
+        if dim == exceto:
+            continue
+        if dim == "modalidade":
+            m &= (ag["modalidade"] == valor).fillna(False).to_numpy(dtype=bool)
+        elif dim == "ano":
+            m &= (ag["ano"] == valor).fillna(False).to_numpy(dtype=bool)
+        elif dim == "local":
+            nivel, codigo = valor
+            sel = ag["codigo_iso3"] == ("BRA" if nivel == "uf" else codigo)
+            if nivel == "uf":
+                sel &= ag["uf_sigla"] == codigo
+            m &= sel.fillna(False).to_numpy(dtype=bool)
+    return ag[m]
+
+
+# ---------------- mesmas saídas dos motores ----------------
+def _primeiro(ag: pd.DataFrame, chave_col: str, rotulo: str) -> pd.DataFrame:
+    """Primeiro rótulo não nulo por chave (o agregado está na ordem da 1ª ocorrência)."""
+    return ag.dropna(subset=[rotulo]).groupby(chave_col, sort=True)[rotulo].first().reset_index()
+
+
+def kpis(ag: pd.DataFrame, ano_novos: int) -> dict:
+    total = int(ag["qtd"].sum())
+    paises = ag[(ag["nivel_localizacao"] == "pais") & ag["codigo_iso3"].notna()]
+    lider, lider_qtd = None, 0
+    mods = ag.dropna(subset=["modalidade"]).groupby("modalidade", sort=False)["qtd"].sum()  # ordem da 1ª ocorrência
+    if len(mods):
+        lider, lider_qtd = mods.idxmax(), int(mods.max())
+    return {
+        "total": total,
+        "vigentes": int(ag.loc[ag["eh_vigente"].astype(bool), "qtd"].sum()),
+        "paises": int(paises["codigo_iso3"].nunique()),
+        "ano_novos": ano_novos,
+        "novos": int(ag.loc[(ag["ano"] == ano_novos).fillna(False), "qtd"].sum()),
+        "modalidade_lider": lider,
+        "modalidade_lider_qtd": lider_qtd,
+    }
+
+
+def _pins(ag: pd.DataFrame, chave_col: str, rotulo: str) -> pd.DataFrame:
+    grp = ag.groupby([chave_col, "eh_vigente"], sort=True)["qtd"].sum().reset_index()
+    return grp.merge(_primeiro(ag, chave_col, rotulo), on=chave_col, how="left")
+
+
+def pins_paises(ag: pd.DataFrame) -> pd.DataFrame:
+    return _pins(ag[(ag["nivel_localizacao"] == "pais") & ag["codigo_iso3"].notna()], "codigo_iso3", "pais")
+
+
+def _br(ag: pd.DataFrame) -> pd.DataFrame:
+    return ag[(ag["codigo_iso3"] == "BRA").fillna(False) & ag["uf_sigla"].notna()]
+
+
+def pins_ufs(ag: pd.DataFrame) -> pd.DataFrame:
+    return _pins(_br(ag), "uf_sigla", "uf_nome")
+
+
+def resumo_ufs(ag: pd.DataFrame) -> pd.DataFrame:
+    br = _br(ag)
+    res = (br.assign(vigentes=br["qtd"].where(br["eh_vigente"].astype(bool), 0))
+             .groupby("uf_sigla", sort=True)[["qtd", "vigentes"]].sum().reset_index())
+    return res.merge(_primeiro(br, "uf_sigla", "uf_nome"), on="uf_sigla", how="left")
+
+
+def contagem(ag: pd.DataFrame, coluna: str, excluir=None) -> pd.DataFrame:
+    if excluir is not None:
+        ag = ag[ag[coluna] != excluir]
+    return (ag.groupby(coluna, dropna=False)["qtd"].sum().reset_index()
+              .sort_values("qtd", ascending=False, kind="stable").reset_index(drop=True))
+
+
+def evolucao(ag: pd.DataFrame) -> pd.DataFrame:
+    ev = (ag.dropna(subset=["ano"]).groupby(["ano", "eh_vigente"], sort=True)["qtd"].sum()
+            .reset_index().rename(columns={"ano": "ano_assinatura"}))
+    ev["ano_assinatura"] = ev["ano_assinatura"].astype("int64")
+    return ev[ev["qtd"] > 0].reset_index(drop=True)
+
+
+def rotulo(dim: str, valor, nomes: dict = None) -> str:
+    """Texto do chip; `nomes` traduz ISO3 -> nome do país."""
+    if dim == "local":
+        nivel, codigo = valor
+        if nivel == "uf":
+            return f"UF: {codigo}"
+        return f"País: {(nomes or {}).get(codigo, codigo)}"
+    return f"{ROTULOS[dim]}: {valor}"
+
+
+class Fatias:
+    """
+    Mesma interface do motor (kpis, pins_*, resumo_ufs, contagem, evolucao)
+    sobre o agregado de um estado de filtros globais + filtros cruzados.
+    O argumento `f` é ignorado (o agregado já é desse estado); cada consulta
+    aplica os filtros cruzados menos a dimensão que o próprio gráfico mostra.
+    """
+
+    def __init__(self, ag: pd.DataFrame, cruz: dict, ano_novos: int):
+        self.ag, self.cruz, self.ano_novos = ag, cruz, ano_novos
+
+    def _fatia(self, exceto=None) -> pd.DataFrame:
+        return fatia(self.ag, self.cruz, exceto)
+
+    def kpis(self, f=None) -> dict:
+        return kpis(self._fatia(), self.ano_novos)
+
+    def pins_paises(self, f=None) -> pd.DataFrame:
+        return pins_paises(self._fatia("local"))
+
+    def pins_ufs(self, f=None) -> pd.DataFrame:
+        return pins_ufs(self._fatia("local"))
+
+    def resumo_ufs(self, f=None) -> pd.DataFrame:
+        return resumo_ufs(self._fatia("local"))
+
+    def contagem(self, f, coluna: str, excluir=None) -> pd.DataFrame:
+        exceto = {"modalidade": "modalidade", "pais": "local", "uf_sigla": "local"}.get(coluna)
+        return contagem(self._fatia(exceto), coluna, excluir)
+
+    def evolucao(self, f=None) -> pd.DataFrame:
+        return evolucao(self._fatia("ano"))
+
+
+class AgregadosLRU:
+    """Últimos `maximo` agregados por estado de filtros globais (chave de Filtros)."""
+
+    def __init__(self, calcula, maximo: int = 32):
+        self.calcula, self.maximo = calcula, maximo
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtem(self, f) -> pd.DataFrame:
+        k = f.chave()
+        with self._lock:
+            if k in self._itens:
+                self._itens.move_to_end(k)
+                return self._itens[k]
+        ag = self.calcula(f)
+        with self._lock:
+            self._itens[k] = ag
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+        return ag
+
+    def limpa(self):
+        with self._lock:
+            self._itens.clear()
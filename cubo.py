@@ -0,0 +1,173 @@
+# cubo.py
+"""
+Contagens por ano acumuladas (somas de prefixo) para KPIs e evolução.
+
+Na carga, as linhas são agrupadas em células — cada combinação distinta de
+tipo, modalidade, continente, vigência e país — e cada célula guarda:
+
+- `por_ano[c, j]`: quantos acordos do ano `anos[j]` (última coluna: sem ano);
+- `acumulado[c, j]`: soma de `por_ano[c, :j]`.
+
+Um intervalo de anos vira duas colunas (`searchsorted`) e a contagem de cada
+célula no período é `acumulado[c, fim] - acumulado[c, ini]`, O(1) por série,
+qualquer que seja o tamanho do período. Os demais filtros são máscaras sobre
+as células (bem menos numerosas que as linhas). Mesma semântica de
+`consultas.filtra_df` (lista vazia = sem filtro; "Todos" inclui linhas sem ano).
+
+Numa recarga incremental (incremental.py), `aplica` monta o cubo novo a
+partir das células do atual (uma linha com peso por célula x ano) menos as
+linhas que saíram e mais as que entraram, sem reler as linhas mantidas.
+"""
+import numpy as np
+import pandas as pd
+
+DIMENSOES = {"tipos": "tipo", "modalidades": "modalidade", "conts": "continente"}
+COLUNAS = ["ano_assinatura", *DIMENSOES.values(), "eh_vigente", "codigo_iso3", "nivel_localizacao"]
+
+
+class CuboAnual:
+    def __init__(self, df: pd.DataFrame, pesos: str = None):
+        """`pesos`: coluna com quantos acordos cada linha vale (padrão: 1 por linha)."""
+        anos = pd.to_numeric(df["ano_assinatura"], errors="coerce").to_numpy(dtype=float)
+        sem_ano = np.isnan(anos)
+        self.anos = np.unique(anos[~sem_ano]).astype(np.int64)
+        n_anos = len(self.anos)
+        coluna = np.where(sem_ano, n_anos, np.searchsorted(self.anos, np.nan_to_num(anos)))
+
+        chaves, self.valores = [], {}
+        for coluna_df in DIMENSOES.values():
+            codigos, valores = pd.factorize(df[coluna_df])      # ausente -> -1
+            chaves.append(codigos)
+            self.valores[coluna_df] = list(valores)
+        chaves.append(df["eh_vigente"].fillna(False).to_numpy(dtype=bool).astype(np.int64))
+        codigos, self.valores["pais"] = pd.factorize(df["codigo_iso3"].where(df["nivel_localizacao"].eq("pais")))
+        chaves.append(codigos)
+
+        # combinação -> um inteiro só (base mista), bem mais rápido que np.unique por linha de matriz
+        bases = [int(c.max(initial=-1)) + 2 for c in chaves]          # +1 do código -1, +1 do tamanho
+        chave = np.zeros(len(df), dtype=np.int64)
+        for c, b in zip(chaves, bases):
+            chave = chave * b + (c + 1)
+        distintas, celula = np.unique(chave, return_inverse=True)
+        celulas = np.empty((len(distintas), len(chaves)), dtype=np.int64)
+        resto = distintas
+        for i in range(len(chaves) - 1, -1, -1):
+            resto, celulas[:, i] = np.divmod(resto, bases[i])
+        celulas -= 1
+        largura = n_anos + 1
+        peso = None if pesos is None else df[pesos].to_numpy(dtype=np.int64)
+        self.por_ano = np.bincount(celula * largura + coluna, weights=peso, minlength=len(celulas) * largura) \
+                         .astype(np.int64).reshape(len(celulas), largura)
+        if peso is not None:                  # células que zeraram na diferença saem
+            vivas = self.por_ano.any(axis=1)
+            self.por_ano, celulas = self.por_ano[vivas], celulas[vivas]
+        self.acumulado = np.zeros_like(self.por_ano)
+        np.cumsum(self.por_ano[:, :n_anos], axis=1, out=self.acumulado[:, 1:])
+
+        self.codigos = {col: celulas[:, i] for i, col in enumerate(DIMENSOES.values())}
+        self.vigente = celulas[:, len(DIMENSOES)].astype(bool)
+        self.pais = celulas[:, len(DIMENSOES) + 1]
+
+    @property
+    def celulas(self) -> int:
+        return len(self.por_ano)
+
+    # ---------------- recarga incremental ----------------
+    def _tabela(self) -> pd.DataFrame:
+        """Uma linha por célula x ano com acordos, no formato das linhas do DataFrame (coluna `_peso`)."""
+        c, j = np.nonzero(self.por_ano)
+        valor = lambda col, cod: np.array([*self.valores[col], None], dtype=object)[cod]   # -1 -> None
+        pais = self.pais[c]
+        return pd.DataFrame({
+            "ano_assinatura": np.append(self.anos.astype(float), np.nan)[j],
+            **{col: valor(col, self.codigos[col][c]) for col in DIMENSOES.values()},
+            "eh_vigente": self.vigente[c],
+            "codigo_iso3": valor("pais", pais),
+            "nivel_localizacao": np.where(pais >= 0, "pais", None),
+            "_peso": self.por_ano[c, j],
+        })
+
+    def aplica(self, saidas: pd.DataFrame, entradas: pd.DataFrame) -> "CuboAnual":
+        """Cubo novo = este - `saidas` + `entradas` (linhas do DeltaETL); este não muda."""
+        partes = [self._tabela()]
+        for linhas, sinal in ((saidas, -1), (entradas, 1)):
+            if linhas is not None and len(linhas):
+                partes.append(linhas[COLUNAS].assign(_peso=sinal))
+        return CuboAnual(pd.concat(partes, ignore_index=True), pesos="_peso")
+
+    # ---------------- seleção ----------------
+    def _mascara(self, f) -> np.ndarray:
+        m = self.vigente.copy() if f.status_mode == "vigentes" else np.ones(self.celulas, dtype=bool)
+        for atributo, coluna in DIMENSOES.items():
+            selecionados = getattr(f, atributo)
+            if selecionados:
+                tabela = np.zeros(len(self.valores[coluna]) + 1, dtype=bool)   # slot extra: código -1
+                pos = {v: i for i, v in enumerate(self.valores[coluna])}
+                tabela[[pos[v] for v in selecionados if v in pos]] = True
+                m &= tabela[self.codigos[coluna]]
+        return m
+
+    def _colunas(self, f) -> tuple:
+        """Fatia [j0, j1) de anos do período (todos os anos com "Todos")."""
+        if f.anos is None:
+            return 0, len(self.anos)
+        ini, fim = f.anos
+        return int(np.searchsorted(self.anos, ini, "left")), int(np.searchsorted(self.anos, fim, "right"))
+
+    def no_periodo(self, f, m: np.ndarray) -> np.ndarray:
+        """Acordos de cada célula selecionada no período: duas leituras por célula."""
+        if f.anos is None:      # "Todos" inclui as linhas sem ano
+            n = len(self.anos)
+            return self.acumulado[m, n] + self.por_ano[m, n]
+        j0, j1 = self._colunas(f)
+        return self.acumulado[m, j1] - self.acumulado[m, j0]
+
+    # ---------------- consultas ----------------
+    def kpis(self, f, ano_atual: int):
+        """
+        Mesmo dicionário de `MotorPandas.kpis`. Devolve None quando há empate
+        na modalidade líder: o desempate é pela ordem das linhas, que o cubo
+        não guarda (o motor resolve pelas linhas nesse caso).
+        """
+        m = self._mascara(f)
+        qtd = self.no_periodo(f, m)
+        total = int(qtd.sum())
+
+        pais = self.pais[m][qtd > 0]
+        ano_novos = f.anos[1] if f.anos else ano_atual
+        j = int(np.searchsorted(self.anos, ano_novos))
+        novos = int(self.por_ano[m, j].sum()) if j < len(self.anos) and self.anos[j] == ano_novos else 0
+
+        lider, lider_qtd = None, 0
+        mod = self.codigos["modalidade"][m]
+        com_mod = mod >= 0
+        por_mod = np.bincount(mod[com_mod], weights=qtd[com_mod], minlength=len(self.valores["modalidade"]))
+        if por_mod.size and por_mod.max() > 0:
+            topo = np.flatnonzero(por_mod == por_mod.max())
+            if len(topo) > 1:
+                return None
+            lider, lider_qtd = self.valores["modalidade"][topo[0]], int(por_mod[topo[0]])
+
+        return {
+            "total": total,
+            "vigentes": int(qtd[self.vigente[m]].sum()),
+            "paises": int(np.unique(pais[pais >= 0]).size),
+            "ano_novos": ano_novos,
+            "novos": novos,
+            "modalidade_lider": lider,
+            "modalidade_lider_qtd": lider_qtd,
+        }
+
+    def evolucao(self, f) -> pd.DataFrame:
+        """Acordos por ano e vigência no período (ano_assinatura, eh_vigente, qtd)."""
+        m = self._mascara(f)
+        j0, j1 = self._colunas(f)
+        fatia, vig = self.por_ano[m, j0:j1], self.vigente[m]
+        anos = self.anos[j0:j1]
+        blocos = []
+        for flag in (False, True):
+            qtd = fatia[vig == flag].sum(axis=0)
+            blocos.append(pd.DataFrame({"ano_assinatura": anos, "eh_vigente": flag, "qtd": qtd}))
+        ev = pd.concat(blocos, ignore_index=True)
+        ev = ev[ev["qtd"] > 0]
+        return ev.sort_values(["ano_assinatura", "eh_vigente"], kind="stable").reset_index(drop=True)
@@ -0,0 +1,169 @@
+# estado_url.py
+"""
+Estado do painel na URL (links compartilháveis) e cache da página inicial.
+
+A query string usa os mesmos parâmetros da API (api.py), então um link do
+painel e a consulta equivalente à API têm a mesma forma:
+
+    /?anos=2015-2020&tipo=Convênio&status=vigentes&modo=br&local=uf:AM
+
+- `anos`, `tipo`, `modalidade`, `continente`, `status`, `data`, `distintos`
+  (como na API; `distintos=1`: KPIs por acordo distinto, ver processos.py);
+- `modo=br` (mapa do Brasil; sem o parâmetro, mundial);
+- `local=pais:ISO3|uf:UF` (país/UF selecionado, o filtro cruzado de local);
+- `perfil=pais:ISO3|uf:UF` (perfil aberto, ver perfis.py);
+- `versao=` (versão do histórico).
+
+Valores padrão (todos os anos, todas as opções, status "todos", hoje, modo
+mundial) ficam fora da URL, então o mesmo estado tem sempre a mesma URL.
+Parâmetro inválido é ignorado (o painel abre no estado padrão).
+
+A página inicial (`/_dash-layout`, que o Dash pede logo depois do HTML) é
+montada para o estado da URL da página (cabeçalho Referer), com mapa,
+gráficos e KPIs já desenhados, e guardada inteira por (estado normalizado,
+versão dos dados, dia) em `CacheLayout`: a mesma visão aberta por muitas
+pessoas é montada uma vez, e o navegador revalida com ETag (304).
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from flask import Response, has_request_context, request
+from werkzeug.datastructures import MultiDict
+
+import api
+
+LAYOUT_CACHE = int(os.environ.get("INPA_LAYOUT_CACHE", "64"))   # páginas iniciais guardadas (LRU)
+ROTA_LAYOUT = "/_dash-layout"
+MODOS = ("world", "br")
+
+
+def padrao() -> dict:
+    return {"anos": None, "tipos": [], "modalidades": [], "conts": [], "status": "todos", "data": None,
+            "distintos": False, "modo": "world", "local": None, "perfil": None, "versao": None}
+
+
+def decodifica(busca: str) -> dict:
+    """Query string ("?anos=...") -> estado; filtros inválidos voltam ao padrão."""
+    args = MultiDict(parse_qsl((busca or "").lstrip("?")))
+    e = padrao()
+    try:
+        f = api.filtros_da_requisicao(args)
+    except api.ErroParametro:
+        f = None
+    if f is not None:
+        e.update(anos=f.anos, tipos=f.tipos, modalidades=f.modalidades, conts=f.conts, status=f.status_mode,
+                 local=f.local, distintos=f.distintos)
+    try:
+        e["data"] = date.fromisoformat(args["data"]).isoformat() if args.get("data") else None
+    except ValueError:
+        pass
+    if args.get("modo") in MODOS:
+        e["modo"] = args["modo"]
+    nivel, _, codigo = (args.get("perfil") or "").partition(":")
+    if nivel in ("pais", "uf") and codigo:
+        e["perfil"] = (nivel, codigo.upper())
+    e["versao"] = args.get("versao") or None
+    return e
+
+
+def codifica(e: dict) -> str:
+    """Estado -> query string ("" no estado padrão); mesma ordem de parâmetros sempre."""
+    pares = []
+    if e.get("anos"):
+        ini, fim = e["anos"]
+        pares.append(("anos", str(ini) if ini == fim else f"{ini}-{fim}"))
+    for nome, chave in (("tipo", "tipos"), ("modalidade", "modalidades"), ("continente", "conts")):
+        pares += [(nome, v) for v in sorted(e.get(chave) or [], key=str)]
+    if e.get("status", "todos") != "todos":
+        pares.append(("status", e["status"]))
+    if e.get("data") and e["data"] != date.today().isoformat():
+        pares.append(("data", e["data"]))
+    if e.get("distintos"):
+        pares.append(("distintos", "1"))
+    if e.get("modo", "world") != "world":
+        pares.append(("modo", e["modo"]))
+    if e.get("local"):
+        pares.append(("local", ":".join(e["local"])))
+    if e.get("perfil"):
+        pares.append(("perfil", ":".join(e["perfil"])))
+    if e.get("versao"):
+        pares.append(("versao", e["versao"]))
+    return f"?{urlencode(pares)}" if pares else ""
+
+
+def busca_da_pagina() -> str:
+    """
+    Query string da página que está sendo aberta. O `/_dash-layout` é pedido
+    pelo próprio painel: a URL da página vem no Referer (sem ele, estado padrão).
+    """
+    if not has_request_context():
+        return ""
+    if not request.path.endswith(ROTA_LAYOUT):
+        return request.query_string.decode("utf-8", "replace")
+    return urlparse(request.referrer or "").query
+
+
+# =========================================================
+# CACHE DA PÁGINA INICIAL
+# =========================================================
+class CacheLayout:
+    """
+    Corpo do `/_dash-layout` por (estado normalizado da URL, versão dos
+    dados, dia), em LRU. ETag = hash dessa chave; `no-cache` + `Vary: Referer`
+    para o navegador sempre revalidar (a rota é a mesma para qualquer URL).
+    """
+
+    def __init__(self, versao, maximo: int = LAYOUT_CACHE):
+        self.versao, self.maximo = versao, maximo
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.servidas = self.montadas = 0
+
+    def chave(self) -> str:
+        normal = codifica(decodifica(busca_da_pagina()))
+        base = f"{self.versao()}|{date.today().isoformat()}|{normal}"
+        return hashlib.sha1(base.encode("utf-8")).hexdigest()[:20]
+
+    def _cabecalhos(self, resp: Response, tag: str) -> Response:
+        resp.set_etag(tag)
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.headers["Vary"] = "Referer"
+        return resp
+
+    def instala(self, server) -> None:
+        @server.before_request
+        def _layout_guardado():
+            if not request.path.endswith(ROTA_LAYOUT):
+                return None
+            tag = self.chave()
+            if request.if_none_match.contains_weak(tag):
+                return self._cabecalhos(Response(status=304), tag)
+            with self._lock:
+                corpo = self._itens.get(tag)
+                if corpo is not None:
+                    self._itens.move_to_end(tag)
+                    self.servidas += 1
+            if corpo is None:
+                return None              # o Dash monta a página (`app.layout`) e o after_request guarda
+            return self._cabecalhos(Response(corpo, mimetype="application/json"), tag)
+
+        @server.after_request
+        def _guarda_layout(resp):
+            if (not request.path.endswith(ROTA_LAYOUT) or resp.status_code != 200
+                    or resp.direct_passthrough or "ETag" in resp.headers):
+                return resp
+            tag = self.chave()
+            with self._lock:
+                self._itens[tag] = resp.get_data()
+                self.montadas += 1
+                while len(self._itens) > self.maximo:
+                    self._itens.popitem(last=False)
+            return self._cabecalhos(resp, tag)
+
+    def relatorio(self) -> dict:
+        with self._lock:
+            return {"guardadas": len(self._itens), "montadas": self.montadas, "servidas_do_cache": self.servidas}
@@ -0,0 +1,289 @@
+# estaticos.py
+"""
+Assets estáticos servidos pelo próprio app (sem CDNs de terceiros).
+
+A página usava Bootstrap e Bootstrap Icons do jsDelivr, a fonte Inter do
+Google Fonts, o twemoji do maxcdn e a bandeira do flagcdn.com: uma consulta
+DNS + TLS por domínio, e nada disso funciona na rede isolada. Aqui:
+
+- `python estaticos.py` (uma vez, com rede) baixa tudo para `assets/vendor/`:
+  - Inter (400/500/600/700) e Bootstrap Icons com só os glifos usados
+    (fontTools: `pip install fonttools brotli`; sem ele, as fontes inteiras);
+  - emojis como fonte colorida Twemoji (COLR) só com os emojis do app, por
+    `unicode-range` — sem o `twemoji.parse` no body inteiro;
+  - Bootstrap CSS e a bandeira do Brasil;
+  - cada arquivo com o hash do conteúdo no nome, mais `.gz` e `.br`
+    pré-comprimidos, e `manifesto.json` com os nomes;
+- o app lê o manifesto e serve os arquivos em `/estaticos/<nome>` com
+  `Cache-Control: immutable` (o nome muda quando o conteúdo muda) e a
+  compressão que o navegador aceitar;
+- sem manifesto (build não rodado), cada asset cai na URL da CDN, como antes.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import re
+from io import BytesIO
+from pathlib import Path
+
+import requests
+from flask import Response, abort, request
+
+try:
+    import brotli
+except ImportError:      # opcional: sem .br, só .gz
+    brotli = None
+
+try:
+    from fontTools import subset as ft_subset
+    from fontTools.ttLib import TTFont
+except ImportError:      # opcional: sem subconjunto de glifos
+    ft_subset = None
+
+BASE_DIR = Path(__file__).resolve().parent
+VENDOR_DIR = BASE_DIR / "assets" / "vendor"
+MANIFESTO = "manifesto.json"
+ROTA = "/estaticos"
+CODIGO_UI = [BASE_DIR / "app.py"]        # onde procurar ícones e emojis usados
+
+# Dash carrega todo .css/.js de assets/: os arquivos com hash são incluídos pelo app
+IGNORAR_NO_DASH = r"\.[0-9a-f]{10}\.(css|js)$"
+
+CDN = {
+    "bootstrap.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css",
+    "fontes.css": "https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap",
+    "icones.css": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.0/font/bootstrap-icons.css",
+    "bandeira-br.png": "https://flagcdn.com/w20/br.png",
+}
+CDN_SCRIPTS = ["https://twemoji.maxcdn.com/v/latest/twemoji.min.js"]
+
+ORIGENS = {
+    "inter": "https://cdn.jsdelivr.net/npm/@fontsource/inter@5.0.18/files/inter-latin-{peso}-normal.woff2",
+    "icones_fonte": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.0/font/fonts/bootstrap-icons.woff2",
+    "twemoji": "https://github.com/mozilla/twemoji-colr/releases/download/v0.7.0/Twemoji.Mozilla.ttf",
+}
+PESOS_INTER = (400, 500, 600, 700)
+FAMILIA_EMOJI = "Twemoji INPA"
+
+# Latin-1 + Latin Extended-A (nomes de países/pesquisadores) + pontuação tipográfica
+UNICODES_TEXTO = [*range(0x20, 0x7F), *range(0xA0, 0x180), *range(0x2010, 0x2028), *range(0x2030, 0x203B),
+                  0x20AC, 0x2122, 0x2212]
+RE_EMOJI = re.compile("[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF][\uFE0F\u200D\U0001F000-\U0001FAFF]*")
+RE_ICONE = re.compile(r"\bbi-([a-z0-9-]+)")
+
+COMPRIMIR = {".css", ".js", ".svg", ".ttf", ".json"}     # woff/woff2/png já são comprimidos
+mimetypes.add_type("font/woff2", ".woff2")
+mimetypes.add_type("font/woff", ".woff")
+
+
+# =========================================================
+# BUILD (python estaticos.py)
+# =========================================================
+def _baixa(url: str) -> bytes:
+    r = requests.get(url, timeout=60)
+    r.raise_for_status()
+    return r.content
+
+
+def _nome_com_hash(base: str, conteudo: bytes) -> str:
+    raiz, ext = base.rsplit(".", 1)
+    return f"{raiz}.{hashlib.md5(conteudo).hexdigest()[:10]}.{ext}"
+
+
+def usados(arquivos=CODIGO_UI) -> tuple:
+    """(ícones `bi-*`, emojis) que aparecem no código da interface."""
+    texto = "\n".join(Path(a).read_text(encoding="utf-8") for a in arquivos if Path(a).exists())
+    icones = sorted(set(RE_ICONE.findall(texto)) - {"bi"})
+    emojis = sorted(set(RE_EMOJI.findall(texto)))
+    return icones, emojis
+
+
+def subconjunto(fonte: bytes, unicodes, formato: str = "woff2") -> tuple:
+    """(bytes, extensão) só com os glifos de `unicodes`; sem fontTools devolve a fonte inteira."""
+    if ft_subset is None or (fonte[:4] == b"wOF2" and brotli is None):   # ler woff2 exige brotli
+        return fonte, None
+    if formato == "woff2" and brotli is None:
+        formato = "woff"
+    opcoes = ft_subset.Options()
+    opcoes.flavor = formato
+    opcoes.layout_features = ["*"]
+    opcoes.notdef_outline = True
+    fnt = TTFont(BytesIO(fonte))
+    sub = ft_subset.Subsetter(opcoes)
+    sub.populate(unicodes=unicodes)
+    sub.subset(fnt)
+    buf = BytesIO()
+    fnt.flavor = formato
+    fnt.save(buf)
+    return buf.getvalue(), formato
+
+
+def _intervalos(unicodes) -> str:
+    """unicode-range compacto: U+20-7E,U+A0-17F,..."""
+    cps = sorted(set(unicodes))
+    partes, ini = [], None
+    for i, cp in enumerate(cps):
+        if ini is None:
+            ini = cp
+        if i + 1 == len(cps) or cps[i + 1] != cp + 1:
+            partes.append(f"U+{ini:X}" if ini == cp else f"U+{ini:X}-{cp:X}")
+            ini = None
+    return ",".join(partes)
+
+
+def _codepoints_emoji(emojis) -> list:
+    """Codepoints dos emojis, incluindo seletor de variação e ZWJ (a sequência inteira usa a fonte)."""
+    return sorted({ord(c) for e in emojis for c in e})
+
+
+def _icones_css(css: str, icones) -> tuple:
+    """Regras `.bi-<nome>::before` dos ícones usados e seus codepoints (do CSS do Bootstrap Icons)."""
+    regras, cps = [], []
+    for nome in icones:
+        m = re.search(r"\.bi-" + re.escape(nome) + r'::before\s*\{\s*content:\s*"\\([0-9a-f]+)"', css)
+        if m:
+            regras.append(f'.bi-{nome}::before{{content:"\\{m.group(1)}"}}')
+            cps.append(int(m.group(1), 16))
+    return regras, cps
+
+
+def _grava(destino: Path, nome: str, conteudo: bytes, arquivos: list) -> str:
+    final = _nome_com_hash(nome, conteudo)
+    (destino / final).write_bytes(conteudo)
+    if Path(final).suffix in COMPRIMIR:
+        (destino / f"{final}.gz").write_bytes(gzip.compress(conteudo, compresslevel=9, mtime=0))
+        if brotli is not None:
+            (destino / f"{final}.br").write_bytes(brotli.compress(conteudo, quality=11))
+    arquivos.append(final)
+    return final
+
+
+def constroi(destino: Path = VENDOR_DIR, baixa=_baixa, codigo=CODIGO_UI) -> dict:
+    """Baixa, reduz e grava os assets; cada um que falhar continua na CDN. Retorna o manifesto."""
+    destino.mkdir(parents=True, exist_ok=True)
+    icones, emojis = usados(codigo)
+    entradas, arquivos, falhas = {}, [], []
+
+    def etapa(nome, fn):
+        try:
+            entradas[nome] = fn()
+            print(f"✅ {nome} -> {entradas[nome]}")
+        except Exception as e:
+            falhas.append(nome)
+            print(f"⚠️  {nome}: {e} (continua na CDN)")
+
+    etapa("bootstrap.css", lambda: _grava(destino, "bootstrap.css", baixa(CDN["bootstrap.css"]), arquivos))
+    etapa("bandeira-br.png", lambda: _grava(destino, "bandeira-br.png", baixa(CDN["bandeira-br.png"]), arquivos))
+
+    def fontes():
+        faces = []
+        for peso in PESOS_INTER:
+            woff2, fmt = subconjunto(baixa(ORIGENS["inter"].format(peso=peso)), UNICODES_TEXTO)
+            ext = fmt or "woff2"
+            nome = _grava(destino, f"inter-{peso}.{ext}", woff2, arquivos)
+            faces.append(f'@font-face{{font-family:"Inter";font-style:normal;font-weight:{peso};'
+                         f'font-display:swap;src:url("{nome}") format("{ext}");'
+                         f'unicode-range:{_intervalos(UNICODES_TEXTO)}}}')
+        if emojis:
+            cps = _codepoints_emoji(emojis)
+            fonte, fmt = subconjunto(baixa(ORIGENS["twemoji"]), cps)
+            ext = fmt or "ttf"
+            nome = _grava(destino, f"twemoji.{ext}", fonte, arquivos)
+            formato = {"ttf": "truetype"}.get(ext, ext)
+            faces.append(f'@font-face{{font-family:"{FAMILIA_EMOJI}";font-display:swap;'
+                         f'src:url("{nome}") format("{formato}");unicode-range:{_intervalos(cps)}}}')
+        return _grava(destino, "fontes.css", "\n".join(faces).encode("utf-8"), arquivos)
+    etapa("fontes.css", fontes)
+
+    def icones_css():
+        css = baixa(CDN["icones.css"]).decode("utf-8")
+        regras, cps = _icones_css(css, icones)
+        fonte, fmt = subconjunto(baixa(ORIGENS["icones_fonte"]), cps)
+        ext = fmt or "woff2"
+        nome = _grava(destino, f"bootstrap-icons.{ext}", fonte, arquivos)
+        base = (f'@font-face{{font-display:block;font-family:"bootstrap-icons";src:url("{nome}") format("{ext}")}}'
+                '.bi::before,[class^="bi-"]::before,[class*=" bi-"]::before{display:inline-block;'
+                'font-family:bootstrap-icons!important;font-style:normal;font-weight:normal!important;'
+                'font-variant:normal;text-transform:none;line-height:1;vertical-align:-.125em;'
+                '-webkit-font-smoothing:antialiased;-moz-osx-font-smoothing:grayscale}')
+        return _grava(destino, "icones.css", "\n".join([base, *regras]).encode("utf-8"), arquivos)
+    etapa("icones.css", icones_css)
+
+    manifesto = {"entradas": entradas, "arquivos": sorted(arquivos), "icones": icones, "emojis": emojis}
+    (destino / MANIFESTO).write_text(json.dumps(manifesto, ensure_ascii=False, indent=1), encoding="utf-8")
+    _limpa_antigos(destino, manifesto)
+    if ft_subset is None:
+        print("ℹ️  fontTools não instalado: fontes gravadas inteiras (pip install fonttools brotli)")
+    return manifesto
+
+
+def _limpa_antigos(destino: Path, manifesto: dict) -> None:
+    """Remove arquivos de builds anteriores que não estão no manifesto novo."""
+    validos = set(manifesto["arquivos"])
+    for p in destino.iterdir():
+        if p.name == MANIFESTO:
+            continue
+        raiz = p.name[:-3] if p.name.endswith((".gz", ".br")) else p.name
+        if raiz not in validos:
+            p.unlink()
+
+
+# =========================================================
+# EXECUÇÃO
+# =========================================================
+def carrega_manifesto(destino: Path = VENDOR_DIR) -> dict:
+    try:
+        return json.loads((destino / MANIFESTO).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def url(manifesto: dict, chave: str) -> str:
+    """URL local (com hash) do asset, ou a da CDN se o build não o gerou."""
+    nome = (manifesto.get("entradas") or {}).get(chave)
+    return f"{ROTA}/{nome}" if nome else CDN[chave]
+
+
+def folhas_de_estilo(manifesto: dict) -> list:
+    return [url(manifesto, k) for k in ("bootstrap.css", "fontes.css", "icones.css")]
+
+
+def scripts(manifesto: dict) -> list:
+    """O twemoji da CDN só é necessário sem a fonte de emojis local."""
+    return [] if (manifesto.get("entradas") or {}).get("fontes.css") else CDN_SCRIPTS
+
+
+def instala_rota(server, manifesto: dict, destino: Path = VENDOR_DIR) -> None:
+    validos = set(manifesto.get("arquivos") or [])
+
+    @server.route(f"{ROTA}/<nome>")
+    def estatico(nome):
+        """Asset com hash no nome: cache de 1 ano, .br/.gz pré-comprimidos conforme o Accept-Encoding."""
+        if nome not in validos:
+            abort(404)
+        aceitos = request.headers.get("Accept-Encoding", "")
+        caminho, codificacao = destino / nome, None
+        for enc, ext in (("br", ".br"), ("gzip", ".gz")):
+            if enc in aceitos and (destino / f"{nome}{ext}").exists():
+                caminho, codificacao = destino / f"{nome}{ext}", enc
+                break
+        resp = Response(caminho.read_bytes(), mimetype=mimetypes.guess_type(nome)[0] or "application/octet-stream")
+        if codificacao:
+            resp.headers["Content-Encoding"] = codificacao
+        resp.headers["Vary"] = "Accept-Encoding"
+        resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return resp
+
+
+def imprime_tamanhos(destino: Path = VENDOR_DIR) -> None:
+    m = carrega_manifesto(destino)
+    print(f"{'arquivo':<34}{'bytes':>10}{'gzip':>10}{'brotli':>10}")
+    for nome in m.get("arquivos", []):
+        tam = lambda p: f"{p.stat().st_size:,}" if p.exists() else "—"
+        print(f"{nome:<34}{tam(destino / nome):>10}{tam(destino / (nome + '.gz')):>10}{tam(destino / (nome + '.br')):>10}")
+
+
+if __name__ == "__main__":
+    constroi()
+    imprime_tamanhos()
@@ -0,0 +1,127 @@
+# fetch.py
+"""
+Downloads HTTP com sessão compartilhada e revalidação condicional.
+
+- Uma única `requests.Session` (pool de conexões) para todo o app;
+- ETag / Last-Modified persistidos ao lado do arquivo baixado
+  (`<arquivo>.http.json`), enviados como If-None-Match / If-Modified-Since;
+- 304 Not Modified retorna sem tocar no arquivo (uma ida e volta pequena);
+- 200 é gravado em streaming num arquivo temporário no mesmo diretório e
+  movido para o destino com rename atômico (nunca fica um arquivo pela metade).
+"""
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CHUNK_SIZE = 64 * 1024
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Sessão HTTP compartilhada (criada sob demanda, segura entre threads)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers["User-Agent"] = "inpa-dash/1.0"
+            _session = s
+        return _session
+
+
+class FetchResult:
+    """Resultado de `fetch_to_file`."""
+
+    def __init__(self, path: Path, modificado: bool, status: int, etag=None, last_modified=None,
+                 bytes_baixados: int = 0):
+        self.path = path
+        self.modificado = modificado        # False quando o servidor respondeu 304
+        self.status = status
+        self.etag = etag
+        self.last_modified = last_modified
+        self.bytes_baixados = bytes_baixados
+
+    def __repr__(self):
+        return (f"FetchResult(path={self.path.name!r}, modificado={self.modificado}, "
+                f"status={self.status}, bytes={self.bytes_baixados})")
+
+
+def meta_path_for(dest: Path) -> Path:
+    return dest.with_name(dest.name + ".http.json")
+
+
+def _le_meta(path: Path) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _grava_atomico(dest: Path, escrever) -> None:
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            escrever(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, dest)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def fetch_to_file(url: str, dest: Path, timeout: float = 30, session: requests.Session = None) -> FetchResult:
+    """
+    Baixa `url` para `dest` revalidando com o servidor quando já há cópia local.
+
+    Levanta as exceções do `requests` (Timeout, ConnectionError, HTTPError) para
+    que o chamador decida sobre novas tentativas/fallback.
+    """
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    meta_path = meta_path_for(dest)
+    meta = _le_meta(meta_path) if dest.exists() else {}
+
+    headers = {}
+    if meta.get("url") == url:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    session = session or get_session()
+    with session.get(url, headers=headers, timeout=timeout, stream=True) as r:
+        if r.status_code == 304:
+            return FetchResult(dest, False, 304, meta.get("etag"), meta.get("last_modified"))
+        r.raise_for_status()
+
+        total = [0]
+
+        def _escreve(f):
+            for chunk in r.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                total[0] += len(chunk)
+
+        _grava_atomico(dest, _escreve)
+        novo_meta = {
+            "url": url,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+        }
+        _grava_atomico(meta_path, lambda f: f.write(json.dumps(novo_meta).encode("utf-8")))
+        return FetchResult(dest, True, r.status_code, novo_meta["etag"], novo_meta["last_modified"], total[0])
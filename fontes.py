@@ -0,0 +1,285 @@
+# fontes.py
+"""
+Ingestão paralela de várias fontes de processos (planilhas, abas e arquivos locais).
+
+Configuração em `data/fontes.json` (ou no caminho de `INPA_FONTES`), uma lista:
+
+    [
+      {"nome": "principal", "sheet_id": "1hPo...", "formato": "csv",
+       "fallback": "PROCESSOS_ASSINADOS.xlsx"},
+      {"nome": "convenios-2025", "sheet_id": "1AbC...", "gid": "123456"},
+      {"nome": "historico", "arquivo": "ACORDOS_2019.xlsx", "aba": "Plan2"}
+    ]
+
+- Downloads e leitura/parse num pool de threads (cada fonte lê a sua
+  planilha na própria thread: algumas centenas de linhas não pagam um pool
+  de processos, e um pool `fork` criado com o servidor já rodando herda
+  travas de outras threads — e, com `gunicorn --preload`, um gerenciador
+  que não existe no worker);
+- cada fonte corre sozinha: uma fonte lenta ou com erro não atrasa as demais
+  (há um prazo total; o que não terminar fica de fora desta carga);
+- fonte que falha reaproveita a última versão lida com sucesso ou, sem ela,
+  o arquivo `fallback`;
+- o resultado é um único DataFrame com a coluna `fonte`.
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+from fetch import fetch_to_file
+from ingest import CabecalhoInvalido, export_url, le_planilha
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+FONTES_CONFIG_PATH = Path(os.environ.get("INPA_FONTES", DATA_DIR / "fontes.json"))
+FONTES_CACHE_DIR = DATA_DIR / "fontes_cache"
+
+MAX_THREADS = 4
+PRAZO_S = float(os.environ.get("INPA_FONTES_PRAZO_S", "90"))
+
+COL_FONTE = "fonte"
+
+
+class Fonte:
+    """Uma planilha do Google Sheets (com aba opcional) ou um arquivo em `data/`."""
+
+    def __init__(self, nome: str, sheet_id: str = None, formato: str = "csv", gid=None, aba=None,
+                 arquivo=None, fallback=None, cache: Path = None):
+        if not sheet_id and not arquivo:
+            raise ValueError(f"Fonte {nome!r}: informe 'sheet_id' ou 'arquivo'")
+        self.nome = nome
+        self.sheet_id = sheet_id
+        self.formato = formato if sheet_id else Path(arquivo).suffix.lstrip(".").lower()
+        self.gid = gid
+        self.aba = aba
+        self.arquivo = _caminho_dados(arquivo)
+        self.fallback = _caminho_dados(fallback)
+        self.cache = Path(cache) if cache else FONTES_CACHE_DIR / nome   # sem extensão
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Fonte":
+        campos = ("nome", "sheet_id", "formato", "gid", "aba", "arquivo", "fallback")
+        return cls(**{k: d[k] for k in campos if d.get(k) is not None})
+
+    @property
+    def remota(self) -> bool:
+        return bool(self.sheet_id)
+
+    def url(self, formato: str = None) -> str:
+        return export_url(self.sheet_id, formato or self.formato, self.gid)
+
+    def destino(self, formato: str = None) -> Path:
+        return self.cache.with_name(f"{self.cache.name}.{formato or self.formato}")
+
+    def __repr__(self):
+        origem = f"sheet={self.sheet_id}" if self.remota else f"arquivo={self.arquivo.name}"
+        return f"Fonte({self.nome!r}, {origem})"
+
+
+def _caminho_dados(p):
+    if p is None:
+        return None
+    p = Path(p)
+    return p if p.is_absolute() else DATA_DIR / p
+
+
+def carrega_config(path: Path = FONTES_CONFIG_PATH, padrao=None) -> list:
+    """Lista de fontes do JSON; sem arquivo, usa `padrao` (a planilha principal)."""
+    path = Path(path)
+    if not path.exists():
+        return list(padrao or [])
+    with open(path, encoding="utf-8") as f:
+        fontes = [Fonte.from_dict(d) for d in json.load(f)]
+    nomes = [f.nome for f in fontes]
+    if len(set(nomes)) != len(nomes):
+        raise ValueError(f"Nomes de fonte repetidos em {path.name}: {nomes}")
+    return fontes
+
+
+# =========================================================
+# DOWNLOAD (threads)
+# =========================================================
+def baixa_planilha(url: str, destino: Path, timeout: int = 30, max_retries: int = 3, rotulo: str = ""):
+    """
+    Baixa a exportação do Google Sheets de forma robusta (download condicional,
+    ver fetch.py). Devolve o `FetchResult`; erros viram mensagens amigáveis.
+    """
+    prefixo = f"[{rotulo}] " if rotulo else ""
+    print(f"🔄 {prefixo}Tentando carregar planilha do Google Sheets...")
+
+    for tentativa in range(1, max_retries + 1):
+        try:
+            print(f"   {prefixo}Tentativa {tentativa}/{max_retries}...")
+            resultado = fetch_to_file(url, destino, timeout=timeout)
+            if not resultado.modificado:
+                print(f"✅ {prefixo}Planilha sem alterações desde o último download (304).")
+            return resultado
+
+        except requests.exceptions.Timeout:
+            print(f"⚠️  {prefixo}Timeout na tentativa {tentativa}. A conexão está demorando muito...")
+            if tentativa == max_retries:
+                raise Exception(
+                    "Não foi possível carregar a planilha: timeout após múltiplas tentativas. "
+                    "Verifique sua conexão com a internet."
+                )
+            time.sleep(2 * tentativa)  # Espera progressiva
+
+        except requests.exceptions.ConnectionError:
+            print(f"⚠️  {prefixo}Erro de conexão na tentativa {tentativa}...")
+            if tentativa == max_retries:
+                raise Exception(
+                    "Não foi possível conectar ao Google Sheets. "
+                    "Verifique sua conexão com a internet."
+                )
+            time.sleep(2 * tentativa)
+
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 403:
+                raise Exception(
+                    "Acesso negado ao Google Sheets. "
+                    "Verifique se a planilha está compartilhada publicamente ou com 'qualquer pessoa com o link'."
+                )
+            elif e.response.status_code == 404:
+                raise Exception(
+                    "Planilha não encontrada. Verifique se o ID da planilha está correto."
+                )
+            else:
+                print(f"⚠️  {prefixo}Erro HTTP {e.response.status_code} na tentativa {tentativa}...")
+                if tentativa == max_retries:
+                    raise Exception(f"Erro ao acessar Google Sheets: {str(e)}")
+            time.sleep(2 * tentativa)
+
+    raise Exception("Falha ao carregar dados após todas as tentativas.")
+
+
+# =========================================================
+# ORQUESTRAÇÃO
+# =========================================================
+class RelatorioFonte:
+    """Linha do relatório de carga de uma fonte."""
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.estado = "pendente"     # ok | sem alteração | fallback | anterior | falhou | atrasada
+        self.origem = ""
+        self.linhas = 0
+        self.download_s = None
+        self.parse_s = None
+        self.erro = None
+
+    @property
+    def ok(self) -> bool:
+        return self.estado in ("ok", "sem alteração", "fallback", "anterior")
+
+
+_memo = {}       # arquivo -> (chave, DataFrame): arquivo inalterado (ou 304) não é relido
+_ultimos = {}    # nome -> último DataFrame lido com sucesso
+
+
+def _le_com_memo(path: Path, aba=None, validadores=()) -> tuple:
+    """Lê `path` (na thread da fonte) a menos que nada tenha mudado desde a última leitura."""
+    st = path.stat()
+    chave = (st.st_mtime_ns, st.st_size, aba) + tuple(validadores)
+    anterior = _memo.get(path)
+    if anterior and anterior[0] == chave:
+        return anterior[1], False
+    df = le_planilha(path, aba)
+    _memo[path] = (chave, df)
+    return df, True
+
+
+def _carrega_fonte(fonte: Fonte, rel: RelatorioFonte, timeout: float, max_retries: int) -> pd.DataFrame:
+    t0 = time.perf_counter()
+    try:
+        if not fonte.remota:
+            rel.origem, rel.download_s = "arquivo local", 0.0
+            t1 = time.perf_counter()
+            df, relido = _le_com_memo(fonte.arquivo, fonte.aba)
+            rel.estado = "ok" if relido else "sem alteração"
+        else:
+            rel.origem = "Google Sheets"
+            resultado = baixa_planilha(fonte.url(), fonte.destino(), timeout, max_retries, fonte.nome)
+            rel.download_s = time.perf_counter() - t0
+            t1 = time.perf_counter()
+            try:
+                df, relido = _le_com_memo(resultado.path, fonte.aba, (resultado.etag, resultado.last_modified))
+            except CabecalhoInvalido as e:
+                # CSV exporta uma aba só e sem a coluna de país: tenta a exportação XLSX
+                print(f"⚠️  [{fonte.nome}] {e}. Usando a exportação XLSX.")
+                resultado = baixa_planilha(fonte.url("xlsx"), fonte.destino("xlsx"), timeout, max_retries, fonte.nome)
+                t1 = time.perf_counter()
+                df, relido = _le_com_memo(resultado.path, fonte.aba, (resultado.etag, resultado.last_modified))
+            rel.estado = "ok" if relido else "sem alteração"
+    except Exception as e:
+        rel.erro = str(e)
+        if fonte.nome in _ultimos:
+            rel.estado, rel.origem = "anterior", "última leitura"
+            return _ultimos[fonte.nome]
+        if fonte.fallback is None or not fonte.fallback.exists():
+            rel.estado = "falhou"
+            raise
+        print(f"🔄 [{fonte.nome}] Tentando carregar arquivo local como fallback...")
+        t1 = time.perf_counter()
+        df, _ = _le_com_memo(fonte.fallback, fonte.aba)
+        rel.estado, rel.origem = "fallback", f"arquivo local ({fonte.fallback.name})"
+    rel.parse_s = time.perf_counter() - t1
+    _ultimos[fonte.nome] = df
+    return df
+
+
+def ingere_fontes(fontes: list, timeout: float = 30, max_retries: int = 3, prazo_s: float = PRAZO_S):
+    """
+    Carrega todas as fontes em paralelo e junta num único DataFrame com a
+    coluna `fonte`. Retorna (df_raw, relatorios, partes) — `partes` é
+    {nome: DataFrame lido}, útil para saber se algo mudou desde a última carga.
+
+    Levanta exceção só se nenhuma fonte puder ser carregada.
+    """
+    relatorios = {f.nome: RelatorioFonte(f.nome) for f in fontes}
+    pool = ThreadPoolExecutor(max_workers=max(1, min(len(fontes), MAX_THREADS)), thread_name_prefix="fonte")
+    futuros = {pool.submit(_carrega_fonte, f, relatorios[f.nome], timeout, max_retries): f for f in fontes}
+    feitos, _ = wait(futuros, timeout=prazo_s)
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    partes, erros = {}, []
+    for futuro, fonte in futuros.items():
+        rel = relatorios[fonte.nome]
+        if futuro not in feitos:
+            rel.estado, rel.erro = "atrasada", f"não terminou em {prazo_s:.0f}s"
+            if fonte.nome in _ultimos:
+                partes[fonte.nome] = _ultimos[fonte.nome]
+            continue
+        try:
+            partes[fonte.nome] = futuro.result()
+        except Exception as e:
+            erros.append(f"{fonte.nome}: {e}")
+
+    for nome, parte in partes.items():
+        relatorios[nome].linhas = len(parte)
+    if not partes:
+        raise Exception("; ".join(erros) or "Nenhuma fonte de dados configurada.")
+
+    df_raw = junta_partes(partes)
+    return df_raw, list(relatorios.values()), partes
+
+
+def junta_partes(partes: dict) -> pd.DataFrame:
+    """Concatena as fontes (ordem da configuração) com a coluna `fonte`."""
+    blocos = [parte.assign(**{COL_FONTE: nome}) for nome, parte in partes.items()]
+    return pd.concat(blocos, ignore_index=True, sort=False)
+
+
+def imprime_relatorio(relatorios: list) -> None:
+    print("📋 Fontes de dados:")
+    print(f"   {'fonte':<20}{'estado':<15}{'linhas':>7}{'download (s)':>14}{'parse (s)':>11}  origem")
+    for r in relatorios:
+        dl = f"{r.download_s:.2f}" if r.download_s is not None else "—"
+        ps = f"{r.parse_s:.3f}" if r.parse_s is not None else "—"
+        print(f"   {r.nome:<20}{r.estado:<15}{r.linhas:>7}{dl:>14}{ps:>11}  {r.origem}")
+        if r.erro:
+            print(f"      ⚠️  {r.erro}")
@@ -0,0 +1,267 @@
+# geodata.py
+"""
+Geodados pré-processados do dashboard.
+
+Os pontos de rótulo (onde cada país/UF recebe o marcador) são calculados
+offline a partir das geometrias locais em `data/` e gravados numa tabela
+binária compacta (`data/label_points.npy`). Em tempo de execução a tabela é
+aberta por memmap, sem cópia e sem nenhum acesso à rede.
+
+A geometria das UFs para o mapa coroplético também é gerada aqui, em vários
+níveis de simplificação, e guardada em `data/geo_cache/` como GeoJSON gzip
+(servido pelo app em `/geo/<id>.geojson`).
+
+Uso:
+    python geodata.py        # recalcula label_points.npy e o cache de UFs
+"""
+import gzip
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely import STRtree
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+
+WORLD_GEOJSON_PATH = DATA_DIR / "world_countries.geojson"   # Natural Earth 1:110m
+BR_STATES_PATH = DATA_DIR / "br_states.geojson"
+ISO3_CENTROIDS_CSV = DATA_DIR / "iso3_centroids.csv"        # sementes p/ países sem geometria
+UF_CENTROIDS_CSV = DATA_DIR / "uf_centroids.csv"
+LABEL_POINTS_PATH = DATA_DIR / "label_points.npy"
+GEO_CACHE_DIR = DATA_DIR / "geo_cache"
+
+# Coroplético de UFs: tolerâncias de simplificação (graus) e grade de quantização
+UF_GEO_NIVEIS = {"baixa": 0.08, "media": 0.02, "alta": 0.005}
+UF_GEO_GRID = 1e-3   # ~110 m; também define as casas decimais do GeoJSON
+
+# nivel: b"P" = país (ISO3), b"U" = UF brasileira
+LABEL_DTYPE = np.dtype([("nivel", "S1"), ("codigo", "S3"), ("lat", "<f4"), ("lon", "<f4")])
+
+# Pequenos fallbacks úteis (usados apenas se o código não tiver geometria nem semente)
+FALLBACK_CENTROIDS = {
+    "CHN": (35.0, 103.0),"USA": (37.0, -95.0),"GBR": (54.0, -2.0),"FRA": (46.0, 2.0),
+    "DEU": (51.0, 10.0),"JPN": (36.0, 138.0),"IND": (20.0, 77.0),"CAN": (56.0, -106.0),
+    "AUS": (-25.0, 133.0),"RUS": (60.0, 100.0),
+}
+
+
+# ============================================================================
+# TABELA EM TEMPO DE EXECUÇÃO
+# ============================================================================
+class LabelPoints:
+    """
+    Tabela ordenada codigo -> (lat, lon) apoiada em arrays NumPy.
+
+    Os arrays são views da tabela em memmap; a busca é vetorizada via
+    `np.searchsorted`, sem dicionários Python no caminho de execução.
+    """
+
+    def __init__(self, codigos: np.ndarray, lat: np.ndarray, lon: np.ndarray):
+        self.codigos = codigos
+        self.lat = lat
+        self.lon = lon
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    def __contains__(self, codigo) -> bool:
+        return bool(self._posicoes([codigo])[0] >= 0)
+
+    def _posicoes(self, codigos) -> np.ndarray:
+        # chave mais longa que o código da tabela não casa com nada ("BRAZIL" não é "BRA")
+        largura = self.codigos.dtype.itemsize
+        chaves = [c if isinstance(c, str) and len(c) <= largura else "" for c in codigos]
+        chaves = np.char.encode(np.array(chaves, dtype=f"U{largura}"), "ascii", "replace")
+        if not len(self.codigos):
+            return np.full(len(chaves), -1)
+        pos = np.minimum(np.searchsorted(self.codigos, chaves), len(self.codigos) - 1)
+        return np.where(self.codigos[pos] == chaves, pos, -1)
+
+    def lookup(self, codigos) -> tuple:
+        """Retorna arrays (lat, lon) alinhados a `codigos`; NaN quando ausente."""
+        pos = self._posicoes(list(codigos))
+        ok = pos >= 0
+        lat = np.full(len(pos), np.nan)
+        lon = np.full(len(pos), np.nan)
+        lat[ok] = self.lat[pos[ok]]
+        lon[ok] = self.lon[pos[ok]]
+        return lat, lon
+
+    def get(self, codigo, default=(None, None)) -> tuple:
+        pos = self._posicoes([codigo])[0]
+        if pos < 0:
+            return default
+        return float(self.lat[pos]), float(self.lon[pos])
+
+
+def load_label_points(path: Path = LABEL_POINTS_PATH) -> tuple:
+    """
+    Abre a tabela binária (memmap, zero-copy) e devolve (paises, ufs).
+    Se o arquivo não existir, ele é gerado a partir das geometrias locais.
+    """
+    if not path.exists():
+        print(f"📐 {path.name} ausente, gerando a partir das geometrias locais...")
+        build_label_points(path)
+    tabela = np.load(path, mmap_mode="r")
+    if tabela.dtype != LABEL_DTYPE:
+        raise ValueError(f"Formato inesperado em {path}: {tabela.dtype}")
+
+    def _fatia(nivel: bytes) -> LabelPoints:
+        # a tabela é ordenada por (nivel, codigo): cada nível é uma fatia contígua
+        ini = np.searchsorted(tabela["nivel"], nivel, side="left")
+        fim = np.searchsorted(tabela["nivel"], nivel, side="right")
+        sub = tabela[ini:fim]
+        return LabelPoints(sub["codigo"], sub["lat"], sub["lon"])
+
+    return _fatia(b"P"), _fatia(b"U")
+
+
+# ============================================================================
+# BUILD (offline)
+# ============================================================================
+def _read_features(path: Path, key) -> tuple:
+    with open(path, encoding="utf-8") as f:
+        feats = json.load(f).get("features", [])
+    codigos, geoms_json = [], []
+    for feat in feats:
+        cod = key(feat)
+        if cod and feat.get("geometry"):
+            codigos.append(str(cod).upper())
+            geoms_json.append(json.dumps(feat["geometry"]))
+    return codigos, geoms_json
+
+
+def label_points_from_geometry(geoms_json: list) -> tuple:
+    """
+    Ponto de rótulo por geometria, numa única passada vetorizada do shapely 2.0.
+
+    Em multipolígonos usa-se a maior parte (ex.: EUA continental, França
+    metropolitana); nela, o centroide ponderado por área quando ele cai dentro
+    do polígono, senão `point_on_surface` (ex.: países em arco).
+    """
+    geoms = shapely.from_geojson(np.asarray(geoms_json, dtype=object))
+    partes, dono = shapely.get_parts(geoms, return_index=True)
+    # maior parte de cada geometria: ordena por (dono, -área) e pega a primeira
+    ordem = np.lexsort((-shapely.area(partes), dono))
+    primeira = np.unique(dono[ordem], return_index=True)[1]
+    principal = partes[ordem[primeira]]
+
+    centroide = shapely.centroid(principal)
+    interno = shapely.point_on_surface(principal)
+    pts = np.where(shapely.contains(principal, centroide), centroide, interno)
+    return shapely.get_y(pts), shapely.get_x(pts)
+
+
+def _seeds(path: Path, col: str) -> dict:
+    if not path.exists():
+        return {}
+    sementes = pd.read_csv(path)
+    return dict(zip(sementes[col].str.upper(), zip(sementes["lat"], sementes["lon"])))
+
+
+def build_label_points(path: Path = LABEL_POINTS_PATH) -> np.ndarray:
+    linhas = []
+    for nivel, geo_path, key, sementes in (
+        (b"P", WORLD_GEOJSON_PATH, lambda f: f.get("id"),
+         {**FALLBACK_CENTROIDS, **_seeds(ISO3_CENTROIDS_CSV, "iso3")}),
+        (b"U", BR_STATES_PATH, lambda f: f.get("properties", {}).get("sigla"),
+         _seeds(UF_CENTROIDS_CSV, "uf")),
+    ):
+        pontos = dict(sementes)
+        if geo_path.exists():
+            codigos, geoms_json = _read_features(geo_path, key)
+            lat, lon = label_points_from_geometry(geoms_json)
+            pontos.update(zip(codigos, zip(lat, lon)))
+        else:
+            print(f"⚠️  {geo_path.name} ausente; usando apenas os CSVs de sementes")
+        linhas += [(nivel, cod, la, lo) for cod, (la, lo) in pontos.items() if len(cod) <= 3]
+
+    tabela = np.array(linhas, dtype=LABEL_DTYPE)
+    tabela.sort(order=["nivel", "codigo"])
+    np.save(path, tabela)
+    print(f"✅ {len(tabela)} pontos de rótulo salvos em {path}")
+    return tabela
+
+
+# ============================================================================
+# GEOMETRIA DAS UFs (coroplético)
+# ============================================================================
+def simplify_coverage(geoms: np.ndarray, tolerancias: dict, grid: float) -> dict:
+    """
+    Simplifica uma cobertura de polígonos preservando a topologia entre vizinhos.
+
+    Como no TopoJSON, as fronteiras são quebradas em arcos compartilhados e
+    cada arco é simplificado uma única vez; os polígonos são refeitos por
+    `polygonize` e devolvidos ao dono original pelo vizinho mais próximo.
+    Assim não surgem frestas nem sobreposições entre UFs vizinhas.
+    Retorna {nivel: array de (Multi)Polygon alinhado a `geoms`}.
+    """
+    quant = shapely.set_precision(geoms, grid)
+    arcos = shapely.get_parts(shapely.line_merge(shapely.union_all(shapely.boundary(quant))))
+    tree = STRtree(quant)
+    saida = {}
+    for nivel, tol in tolerancias.items():
+        simpl = shapely.set_precision(shapely.simplify(arcos, tol, preserve_topology=True), grid)
+        # re-noda os arcos (a simplificação pode criar cruzamentos) antes de poligonizar
+        faces = shapely.get_parts(shapely.polygonize(shapely.get_parts(shapely.union_all(simpl))))
+        # faces que caem em buracos (lagos, áreas fora da cobertura) ficam sem dono
+        face_idx, dono = tree.query_nearest(shapely.point_on_surface(faces), max_distance=tol)
+        ordem = np.lexsort((face_idx, dono))
+        face_idx, dono = face_idx[ordem], dono[ordem]
+        grupos, inicios = np.unique(dono, return_index=True)
+        fins = np.append(inicios[1:], len(dono))
+        resultado = np.full(len(geoms), None, dtype=object)
+        for i, ini, fim in zip(grupos, inicios, fins):
+            resultado[i] = shapely.union_all(faces[face_idx[ini:fim]], grid_size=grid)
+        saida[nivel] = resultado
+    return saida
+
+
+def _round_coords(c, casas: int):
+    if isinstance(c, float):
+        return round(c, casas)
+    return [_round_coords(x, casas) for x in c]
+
+
+def build_uf_geometry(src: Path = BR_STATES_PATH, cache_dir: Path = GEO_CACHE_DIR) -> dict:
+    """
+    Gera (ou reaproveita do cache em disco) o GeoJSON gzip de UFs por nível.
+    O id de cada asset inclui o hash da fonte e dos parâmetros, então pode ser
+    servido com cache de longa duração. Retorna {nivel: asset_id}.
+    """
+    if not src.exists():
+        return {}
+    chave = hashlib.md5(
+        src.read_bytes() + json.dumps([UF_GEO_NIVEIS, UF_GEO_GRID]).encode()
+    ).hexdigest()[:10]
+    ids = {nivel: f"br_ufs_{nivel}_{chave}" for nivel in UF_GEO_NIVEIS}
+    if all((cache_dir / f"{i}.geojson.gz").exists() for i in ids.values()):
+        return ids
+
+    print("🗺️  Gerando geometria simplificada das UFs...")
+    siglas, geoms_json = _read_features(src, lambda f: f.get("properties", {}).get("sigla"))
+    geoms = shapely.from_geojson(np.asarray(geoms_json, dtype=object))
+    casas = max(0, int(round(-np.log10(UF_GEO_GRID))))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for nivel, simplificadas in simplify_coverage(geoms, UF_GEO_NIVEIS, UF_GEO_GRID).items():
+        feats = []
+        for sigla, g in zip(siglas, simplificadas):
+            if g is None:
+                continue
+            gj = json.loads(shapely.to_geojson(g))
+            gj["coordinates"] = _round_coords(gj["coordinates"], casas)
+            feats.append({"type": "Feature", "id": sigla, "properties": {"sigla": sigla}, "geometry": gj})
+        corpo = json.dumps({"type": "FeatureCollection", "features": feats}, separators=(",", ":"))
+        with open(cache_dir / f"{ids[nivel]}.geojson.gz", "wb") as f:
+            f.write(gzip.compress(corpo.encode("utf-8"), mtime=0))
+    print(f"✅ Geometria das UFs salva em {cache_dir}")
+    return ids
+
+
+if __name__ == "__main__":
+    build_label_points()
+    build_uf_geometry()
@@ -0,0 +1,295 @@
+# historico.py
+"""
+Histórico das versões da planilha e leitura "dados de" uma data passada.
+
+Cada versão distinta do derivado (mesma impressão digital de `_versao` no
+app) vira um snapshot colunar compacto em `data/historico/`:
+
+- um `.npz` comprimido por versão; texto vira códigos inteiros + dicionário
+  de valores (poucos países, tipos, modalidades repetidos em milhares de
+  linhas), datas viram int64, booleanos e números ficam como estão;
+- entre versões consecutivas grava-se só o delta: a ordem das chaves de
+  linha (`incremental.chaves_linhas`) e as linhas novas ou alteradas, em
+  relação à versão anterior (`base`); a cada `KEYFRAME` deltas (ou quando
+  o delta passa de metade das linhas) grava-se a versão completa, o que
+  limita a cadeia a remontar;
+- `versoes.json` lista as versões (data de registro, linhas, tipo, base e
+  contagens do delta); a retenção (`INPA_HISTORICO_MAX` versões e/ou
+  `INPA_HISTORICO_DIAS` dias) apaga as mais antigas e regrava como completa
+  a primeira versão que dependia de uma apagada;
+- `Historico.visao(versao)` remonta a versão e devolve a visão pronta para
+  consulta (motor, índices...), guardada num LRU das últimas
+  `INPA_HISTORICO_LRU` versões abertas.
+
+Sem pyarrow no ambiente de produção, o formato colunar é o do próprio numpy.
+"""
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:      # Windows: sem trava entre processos
+    fcntl = None
+
+BASE_DIR = Path(__file__).resolve().parent
+HISTORICO_DIR = Path(os.environ.get("INPA_HISTORICO_DIR", BASE_DIR / "data" / "historico"))
+HISTORICO_MAX = int(os.environ.get("INPA_HISTORICO_MAX", "100"))   # versões guardadas (0 = sem limite)
+HISTORICO_DIAS = int(os.environ.get("INPA_HISTORICO_DIAS", "0"))   # idade máxima em dias (0 = sem limite)
+HISTORICO_LRU = int(os.environ.get("INPA_HISTORICO_LRU", "4"))     # versões antigas abertas em memória
+KEYFRAME = 10            # no máximo 10 deltas seguidos antes de uma versão completa
+
+COLUNAS_SNAPSHOT = [
+    "nivel_localizacao", "pais", "codigo_iso3", "uf_sigla", "uf_nome", "ano_assinatura", "tipo", "modalidade",
+    "continente", "status", "pesquisador_responsavel", "NÚMERO", "eh_vigente", "vigencia_inicio", "vigencia_fim",
+]
+
+
+# =========================================================
+# CODIFICAÇÃO COLUNAR
+# =========================================================
+def _py(v):
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def _bytes_json(obj) -> np.ndarray:
+    return np.frombuffer(json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8"), dtype=np.uint8)
+
+
+def _le_json(arr: np.ndarray):
+    return json.loads(arr.tobytes().decode("utf-8"))
+
+
+def codifica(frame: pd.DataFrame) -> dict:
+    """Arrays do `np.savez` para as colunas de `frame` (+ "meta" com o tipo de cada uma)."""
+    arrays, meta = {}, {}
+    for col in frame.columns:
+        s = frame[col]
+        if isinstance(s.dtype, np.dtype) and s.dtype.kind == "M":
+            arrays[f"c:{col}"] = s.to_numpy().view("int64")
+            meta[col] = {"tipo": "data", "dtype": str(s.dtype)}
+        elif isinstance(s.dtype, np.dtype) and s.dtype.kind in "biuf":
+            arrays[f"c:{col}"] = s.to_numpy()
+            meta[col] = {"tipo": "bruto", "dtype": str(s.dtype)}
+        else:
+            codigos, valores = pd.factorize(s, use_na_sentinel=True)
+            arrays[f"c:{col}"] = codigos.astype(np.int32)
+            arrays[f"u:{col}"] = _bytes_json([_py(v) for v in valores])
+            meta[col] = {"tipo": "codigos", "dtype": str(s.dtype)}
+    arrays["meta"] = _bytes_json({"colunas": list(frame.columns), "tipos": meta})
+    return arrays
+
+
+def decodifica(arrays, chaves: pd.Index) -> pd.DataFrame:
+    """Inverso de `codifica`, com as linhas indexadas por `chaves`."""
+    meta = _le_json(arrays["meta"])
+    out = {}
+    for col in meta["colunas"]:
+        m, bruto = meta["tipos"][col], arrays[f"c:{col}"]
+        if m["tipo"] == "data":
+            out[col] = bruto.view(m["dtype"])
+        elif m["tipo"] == "bruto":
+            out[col] = bruto
+        else:
+            valores = np.array(_le_json(arrays[f"u:{col}"]) + [None], dtype=object)
+            s = pd.Series(valores[bruto], index=chaves)      # código -1 cai no None do fim
+            out[col] = s if m["dtype"] == "object" else s.astype(m["dtype"])
+    return pd.DataFrame(out, index=chaves)
+
+
+def impressoes(frame: pd.DataFrame) -> np.ndarray:
+    """Hash (uint64) de cada linha do snapshot: decide quais linhas entram no delta."""
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+# =========================================================
+# HISTÓRICO EM DISCO
+# =========================================================
+class Historico:
+    """
+    Versões em `pasta` (um `.npz` por versão + `versoes.json`). `abre(df)`
+    monta a visão de consulta de uma versão antiga (ver `visao`).
+    """
+
+    def __init__(self, pasta=HISTORICO_DIR, maximo: int = HISTORICO_MAX, dias: int = HISTORICO_DIAS,
+                 lru: int = HISTORICO_LRU, abre=None, keyframe: int = KEYFRAME):
+        self.pasta = Path(pasta)
+        self.maximo, self.dias, self.lru, self.keyframe = maximo, dias, lru, keyframe
+        self.abre = abre or (lambda d: d)
+        self._abertas = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---------- índice ----------
+    @property
+    def _indice_path(self) -> Path:
+        return self.pasta / "versoes.json"
+
+    def _le_indice(self) -> list:
+        try:
+            return json.loads(self._indice_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return []
+
+    def _grava(self, nome: str, escreve) -> None:
+        """Grava `nome` via arquivo temporário + rename atômico."""
+        fd, tmp = tempfile.mkstemp(dir=self.pasta, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                escreve(fh)
+            os.replace(tmp, self.pasta / nome)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def _grava_indice(self, entradas: list) -> None:
+        texto = json.dumps(entradas, ensure_ascii=False, indent=1).encode("utf-8")
+        self._grava("versoes.json", lambda fh: fh.write(texto))
+
+    @contextmanager
+    def _travado(self):
+        """Trava entre threads e, onde houver fcntl, entre workers do gunicorn."""
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.pasta / ".trava", "w") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def versoes(self) -> list:
+        """Entradas do índice, da mais nova para a mais antiga."""
+        return list(reversed(self._le_indice()))
+
+    # ---------- leitura ----------
+    def _arquivo(self, versao: str) -> Path:
+        return self.pasta / f"{versao}.npz"
+
+    def _carrega_com_chaves(self, versao: str, indice: dict) -> pd.DataFrame:
+        """Frame indexado pelas chaves de linha, remontando a cadeia de deltas."""
+        entrada = indice[versao]
+        with np.load(self._arquivo(versao), allow_pickle=False) as z:
+            arrays = {k: z[k] for k in z.files}
+        ordem = pd.Index(arrays["ordem"], name="chave")
+        if entrada["tipo"] == "completo":
+            return decodifica(arrays, ordem)
+        linhas = decodifica(arrays, pd.Index(arrays["chaves"], name="chave"))
+        base = self._carrega_com_chaves(entrada["base"], indice)
+        mantidas = base.loc[ordem.difference(linhas.index, sort=False)]
+        return pd.concat([mantidas, linhas]).reindex(ordem)
+
+    def carrega(self, versao: str) -> pd.DataFrame:
+        """Derivado de uma versão guardada, com índice posicional como o `df` do app. KeyError se não existe."""
+        indice = {e["versao"]: e for e in self._le_indice()}
+        if versao not in indice:
+            raise KeyError(versao)
+        return self._carrega_com_chaves(versao, indice).reset_index(drop=True)
+
+    def visao(self, versao: str):
+        """`abre(df)` da versão (LRU das últimas abertas); None se a versão não está guardada."""
+        with self._lock:
+            if versao in self._abertas:
+                self._abertas.move_to_end(versao)
+                return self._abertas[versao]
+        try:
+            v = self.abre(self.carrega(versao))
+        except (KeyError, OSError):
+            return None
+        with self._lock:
+            self._abertas[versao] = v
+            while len(self._abertas) > self.lru:
+                self._abertas.popitem(last=False)
+        return v
+
+    # ---------- escrita ----------
+    def _salva(self, versao: str, frame: pd.DataFrame, hashes: np.ndarray, novas: np.ndarray = None) -> None:
+        """
+        Todo arquivo leva a ordem das chaves e a impressão de todas as linhas
+        (base do próximo delta); as colunas vão inteiras ou só nas `novas`.
+        """
+        arrays = codifica(frame if novas is None else frame[novas])
+        arrays["ordem"] = frame.index.to_numpy(dtype=str)
+        arrays["impressoes"] = hashes
+        if novas is not None:
+            arrays["chaves"] = arrays["ordem"][novas]
+        self._grava(f"{versao}.npz", lambda fh: np.savez_compressed(fh, **arrays))
+
+    def registra(self, versao: str, por_chave: pd.DataFrame, agora: pd.Timestamp = None):
+        """
+        Guarda a versão `versao` (derivado indexado pela chave de linha,
+        `EstadoETL.por_chave`) se ainda não estiver no histórico. Retorna a
+        entrada gravada, ou None se já existia.
+        """
+        agora = agora or pd.Timestamp.now()
+        frame = por_chave[[c for c in COLUNAS_SNAPSHOT if c in por_chave.columns]]
+        frame = frame[~frame.index.duplicated(keep="last")]
+        frame.index = frame.index.astype(str)
+        hashes = impressoes(frame)
+        with self._travado():
+            entradas = self._le_indice()
+            if any(e["versao"] == versao for e in entradas):
+                return None
+            entrada = {"versao": versao, "registrada_em": agora.isoformat(timespec="seconds"),
+                       "linhas": len(frame), "tipo": "completo", "base": None}
+            anterior = entradas[-1] if entradas else None
+            deltas = 0
+            for e in reversed(entradas):
+                if e["tipo"] == "completo":
+                    break
+                deltas += 1
+
+            novas = None
+            if anterior is not None and deltas < self.keyframe and self._arquivo(anterior["versao"]).exists():
+                with np.load(self._arquivo(anterior["versao"]), allow_pickle=False) as z:
+                    antigas = pd.Series(z["impressoes"], index=pd.Index(z["ordem"]))
+                antigas = antigas[~antigas.index.duplicated(keep="last")]
+                existe = frame.index.isin(antigas.index)
+                mudou = np.zeros(len(frame), dtype=bool)
+                mudou[existe] = hashes[existe] != antigas.reindex(frame.index[existe]).to_numpy()
+                novas = ~existe | mudou
+                if novas.sum() * 2 <= len(frame):
+                    entrada.update(tipo="delta", base=anterior["versao"], adicionadas=int((~existe).sum()),
+                                   alteradas=int(mudou.sum()),
+                                   removidas=int((~antigas.index.isin(frame.index)).sum()))
+                else:
+                    novas = None
+
+            self._salva(versao, frame, hashes, novas)
+            entradas.append(entrada)
+            entradas = self._aplica_retencao(entradas, agora)
+            self._grava_indice(entradas)
+        return entrada
+
+    def _aplica_retencao(self, entradas: list, agora: pd.Timestamp) -> list:
+        """Remove as versões além de `maximo` / mais velhas que `dias` (a mais nova fica sempre)."""
+        sai = set()
+        if self.maximo and len(entradas) > self.maximo:
+            sai.update(e["versao"] for e in entradas[:-self.maximo])
+        if self.dias:
+            limite = agora - pd.Timedelta(days=self.dias)
+            sai.update(e["versao"] for e in entradas[:-1] if pd.Timestamp(e["registrada_em"]) < limite)
+        if not sai:
+            return entradas
+
+        indice = {e["versao"]: e for e in entradas}
+        ficam = [e for e in entradas if e["versao"] not in sai]
+        for e in ficam:
+            if e["tipo"] == "delta" and e["base"] in sai:
+                # a base vai embora: a versão passa a ser gravada completa
+                frame = self._carrega_com_chaves(e["versao"], indice)
+                self._salva(e["versao"], frame, impressoes(frame))
+                e.update(tipo="completo", base=None)
+        for v in sai:
+            self._arquivo(v).unlink(missing_ok=True)
+            self._abertas.pop(v, None)
+        return ficam
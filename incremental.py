@@ -0,0 +1,148 @@
+# incremental.py
+"""
+ETL incremental da planilha.
+
+Cada linha da planilha crua recebe uma chave estável (`NÚMERO` + ocorrência,
+ou um hash do conteúdo quando o número está vazio) e uma impressão digital do
+conteúdo. Numa recarga só as linhas novas ou alteradas passam de novo pelo
+ETL; as demais reaproveitam o resultado anterior e as removidas saem. As
+contagens por dimensão (opções dos filtros) são atualizadas pela diferença.
+"""
+from collections import Counter
+
+import pandas as pd
+
+COL_CHAVE = "NÚMERO"
+
+
+def hash_linhas(df_raw: pd.DataFrame) -> pd.Series:
+    """Impressão digital (uint64) do conteúdo de cada linha."""
+    return pd.util.hash_pandas_object(df_raw, index=False)
+
+
+def chaves_linhas(df_raw: pd.DataFrame, hashes: pd.Series = None, col_chave: str = COL_CHAVE) -> pd.Index:
+    """
+    Chave estável por linha: o número do processo (repetido quando o mesmo
+    processo aparece em várias linhas, daí o sufixo de ocorrência) ou, sem
+    número, o hash do conteúdo.
+    """
+    if hashes is None:
+        hashes = hash_linhas(df_raw)
+    por_conteudo = "h:" + pd.Series(hashes.to_numpy(), index=df_raw.index).map("{:016x}".format)
+    if col_chave in df_raw.columns:
+        base = df_raw[col_chave].astype("string").str.strip()
+        base = base.where(base.notna() & (base != ""), por_conteudo).astype(str)
+    else:
+        base = por_conteudo
+    ocorrencia = base.groupby(base, sort=False).cumcount().astype(str)
+    return pd.Index(base + "#" + ocorrencia, name="chave")
+
+
+class DeltaETL:
+    """Resultado de uma carga: contagens e as linhas que saíram/entraram."""
+
+    def __init__(self, adicionadas=0, alteradas=0, removidas=0, completo=False, saidas=None, entradas=None):
+        self.adicionadas = adicionadas
+        self.alteradas = alteradas
+        self.removidas = removidas
+        self.completo = completo      # True quando tudo foi reprocessado (1ª carga ou colunas mudaram)
+        self.saidas = saidas          # linhas derivadas antigas (removidas + versão antiga das alteradas)
+        self.entradas = entradas      # linhas derivadas novas (adicionadas + versão nova das alteradas)
+
+    @property
+    def vazio(self) -> bool:
+        return not (self.adicionadas or self.alteradas or self.removidas or self.completo)
+
+    def __str__(self):
+        if self.completo:
+            return f"{self.adicionadas} linhas processadas (carga completa)"
+        return f"+{self.adicionadas} novas, ~{self.alteradas} alteradas, -{self.removidas} removidas"
+
+
+class EstadoETL:
+    """
+    Mantém o DataFrame derivado da última carga e as impressões digitais de
+    cada linha. `processa` é o ETL linha a linha (planilha crua -> derivado).
+    """
+
+    def __init__(self, processa):
+        self.processa = processa
+        self.df = None
+        self._por_chave = None   # derivado indexado pela chave
+        self._hashes = None      # Series chave -> hash
+        self._colunas = None
+
+    @property
+    def por_chave(self) -> pd.DataFrame:
+        """Derivado da última carga indexado pela chave estável de cada linha."""
+        return self._por_chave
+
+    def _processa(self, df_raw: pd.DataFrame, chaves: pd.Index) -> pd.DataFrame:
+        out = self.processa(df_raw)
+        out.index = chaves
+        return out
+
+    def carrega(self, df_raw: pd.DataFrame) -> DeltaETL:
+        hashes = hash_linhas(df_raw)
+        chaves = chaves_linhas(df_raw, hashes)
+        hashes = pd.Series(hashes.to_numpy(), index=chaves)
+        colunas = list(df_raw.columns)
+
+        if self._por_chave is None or colunas != self._colunas:
+            # Primeira carga ou esquema diferente: o ETL depende das colunas (ex.: colunas de data)
+            novo = self._processa(df_raw, chaves)
+            delta = DeltaETL(adicionadas=len(novo), completo=True, entradas=novo)
+        else:
+            antigos = self._hashes
+            existe = chaves.isin(antigos.index)
+            mudou = existe.copy()
+            mudou[existe] = hashes.to_numpy()[existe] != antigos.reindex(chaves[existe]).to_numpy()
+            reprocessar = ~existe | mudou
+            removidas = antigos.index.difference(chaves)
+
+            if reprocessar.any():
+                entradas = self._processa(df_raw.loc[reprocessar], chaves[reprocessar])
+            else:
+                entradas = self._por_chave.iloc[:0]
+            mantidas = self._por_chave.loc[chaves[~reprocessar]]
+            novo = pd.concat([mantidas, entradas]).reindex(chaves) if len(entradas) else mantidas
+            saidas = self._por_chave.loc[removidas.append(chaves[mudou])]
+            delta = DeltaETL(adicionadas=int((~existe).sum()), alteradas=int(mudou.sum()),
+                             removidas=len(removidas), saidas=saidas, entradas=entradas)
+
+        self._por_chave, self._hashes, self._colunas = novo, hashes, colunas
+        self.df = novo.set_axis(df_raw.index)
+        return delta
+
+
+class Contagens:
+    """Contagem de linhas por valor em cada dimensão, mantida por diferença."""
+
+    def __init__(self, dimensoes, df: pd.DataFrame = None):
+        self.dimensoes = tuple(dimensoes)
+        self.total = 0
+        self.por_dimensao = {d: Counter() for d in self.dimensoes}
+        if df is not None:
+            self._soma(df, 1)
+
+    def _soma(self, df: pd.DataFrame, sinal: int):
+        if df is None or not len(df):
+            return
+        self.total += sinal * len(df)
+        for d in self.dimensoes:
+            cont = self.por_dimensao[d]
+            for valor, n in df[d].value_counts(dropna=True).items():
+                cont[valor] += sinal * int(n)
+                if cont[valor] <= 0:
+                    del cont[valor]
+
+    def aplica(self, delta: DeltaETL, df_completo: pd.DataFrame = None):
+        """Aplica um delta; numa carga completa recomeça a partir de `df_completo`."""
+        if delta.completo:
+            self.__init__(self.dimensoes, df_completo)
+            return
+        self._soma(delta.saidas, -1)
+        self._soma(delta.entradas, 1)
+
+    def valores(self, dimensao: str) -> list:
+        return sorted(self.por_dimensao[dimensao])
@@ -0,0 +1,179 @@
+# ingest.py
+"""
+Leitura da planilha de processos (exportação do Google Sheets ou arquivo local).
+
+Dois formatos de ingestão:
+- "csv"  (caminho rápido): exporta só a primeira aba como CSV e lê com o
+  parser C do pandas, em streaming a partir do arquivo, com dtype declarado
+  por coluna (nenhuma inferência de tipo, nenhum openpyxl);
+- "xlsx" (fallback): necessário quando a planilha depende de várias abas ou
+  quando o cabeçalho do CSV não traz a coluna de PAÍS/ESTADO.
+
+A detecção da coluna de país/estado é a mesma usada pelo ETL (`coluna_pais`).
+
+Benchmark (download + parse dos dois caminhos, lado a lado):
+    python ingest.py --bench
+"""
+import csv
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+
+FORMATOS = ("csv", "xlsx")
+CSV_ENCODING = "utf-8-sig"   # o export do Sheets é UTF-8; tolera BOM de cópias locais
+
+
+class CabecalhoInvalido(ValueError):
+    """O arquivo não traz a coluna de PAÍS/ESTADO na primeira linha."""
+
+
+def export_url(sheet_id: str, formato: str = "xlsx", gid=None) -> str:
+    """URL de exportação; `gid` escolhe a aba (o CSV exporta uma aba por vez)."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de ingestão desconhecido: {formato!r} (use {FORMATOS})")
+    url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format={formato}"
+    return f"{url}&gid={gid}" if gid is not None else url
+
+
+def eh_coluna_pais(nome) -> bool:
+    s = str(nome).upper()
+    return "PAÍS" in s or "PAIS" in s
+
+
+def coluna_pais(colunas):
+    """Primeira coluna cujo nome contém PAÍS/PAIS (ou None)."""
+    for col in colunas:
+        if eh_coluna_pais(col):
+            return col
+    return None
+
+
+def _cabecalho_csv(path: Path) -> list:
+    with open(path, newline="", encoding=CSV_ENCODING) as f:
+        return next(csv.reader(f), [])
+
+
+def _nomes_como_pandas(cabecalho: list) -> list:
+    """Reproduz os nomes que o pandas dá a colunas vazias/duplicadas ('Unnamed: i', 'X.1')."""
+    nomes, vistos = [], {}
+    for i, nome in enumerate(cabecalho):
+        nome = nome if nome != "" else f"Unnamed: {i}"
+        if nome in vistos:
+            vistos[nome] += 1
+            nome = f"{nome}.{vistos[nome]}"
+        else:
+            vistos[nome] = 0
+        nomes.append(nome)
+    return nomes
+
+
+def le_planilha_csv(path: Path) -> pd.DataFrame:
+    """
+    Lê o CSV exportado com dtype declarado: todas as colunas são texto
+    (o ETL extrai ano, UF/ISO3 e vigência por regex sobre strings), e
+    células vazias viram NaN como no leitor de Excel.
+    """
+    path = Path(path)
+    nomes = _nomes_como_pandas(_cabecalho_csv(path))
+    if coluna_pais(nomes) is None:
+        raise CabecalhoInvalido("Coluna de PAÍS/ESTADO não encontrada no CSV. Colunas: " + str(nomes))
+    return pd.read_csv(
+        path,
+        header=0,
+        names=nomes,
+        dtype={nome: object for nome in nomes},
+        encoding=CSV_ENCODING,
+        engine="c",
+        skip_blank_lines=True,
+    )
+
+
+def le_planilha_xlsx(path: Path, aba=0) -> pd.DataFrame:
+    return pd.read_excel(path, sheet_name=aba if aba is not None else 0, engine="openpyxl")
+
+
+def le_planilha(path: Path, aba=None) -> pd.DataFrame:
+    """Escolhe o leitor pela extensão do arquivo (`aba` só vale para XLSX)."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        return le_planilha_csv(path)
+    return le_planilha_xlsx(path, aba)
+
+
+# =========================================================
+# BENCHMARK
+# =========================================================
+def _mediana_parse(path: Path, repeticoes: int):
+    tempos, df = [], None
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        df = le_planilha(path)
+        tempos.append(time.perf_counter() - t0)
+    tempos.sort()
+    return tempos[len(tempos) // 2], df
+
+
+def benchmark(sheet_id: str, excel_local: Path = None, repeticoes: int = 5, timeout: float = 30) -> list:
+    """
+    Mede download e parse dos dois formatos. Sem acesso ao Sheets, mede só o
+    parse a partir de `excel_local` (convertido para CSV num diretório temporário).
+    """
+    from fetch import fetch_to_file
+
+    linhas = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        locais = {}
+        if excel_local is not None and Path(excel_local).exists():
+            locais["xlsx"] = Path(excel_local)
+            locais["csv"] = tmp / "local.csv"
+            le_planilha_xlsx(excel_local).to_csv(locais["csv"], index=False)
+
+        for formato in FORMATOS:
+            destino = tmp / f"bench.{formato}"
+            download_s, origem = None, "Google Sheets"
+            try:
+                t0 = time.perf_counter()
+                fetch_to_file(export_url(sheet_id, formato), destino, timeout=timeout)
+                download_s = time.perf_counter() - t0
+            except Exception as e:
+                print(f"⚠️  Download {formato} indisponível: {e.__class__.__name__}")
+                if formato not in locais:
+                    continue
+                destino, origem = locais[formato], "arquivo local"
+            parse_s, df = _mediana_parse(destino, repeticoes)
+            linhas.append({
+                "formato": formato, "origem": origem, "bytes": destino.stat().st_size,
+                "download_s": download_s, "parse_s": parse_s, "linhas": len(df),
+                "col_pais": coluna_pais(df.columns),
+            })
+    return linhas
+
+
+def imprime_benchmark(linhas: list) -> None:
+    print(f"{'formato':<8}{'origem':<16}{'KB':>9}{'download (s)':>14}{'parse (s)':>12}{'linhas':>8}  col_pais")
+    for r in linhas:
+        dl = f"{r['download_s']:.3f}" if r["download_s"] is not None else "—"
+        print(f"{r['formato']:<8}{r['origem']:<16}{r['bytes'] / 1024:>9.1f}{dl:>14}"
+              f"{r['parse_s']:>12.4f}{r['linhas']:>8}  {r['col_pais']}")
+    por_formato = {r["formato"]: r for r in linhas}
+    if set(FORMATOS) <= set(por_formato):
+        ganho = por_formato["xlsx"]["parse_s"] / max(por_formato["csv"]["parse_s"], 1e-9)
+        print(f"⚡ Parse CSV {ganho:.1f}x mais rápido que XLSX")
+
+
+if __name__ == "__main__":
+    # Mesmo ID configurado em app.py (GOOGLE_SHEET_ID); pode ser passado como argumento.
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    sheet_id = args[0] if args else "1hPoZOGtQV0fAMCFoviE9PVuhmYArA6BQ"
+    if "--bench" in sys.argv:
+        print("⏱️  Benchmark de ingestão (download + parse, mediana de 5 leituras)")
+        imprime_benchmark(benchmark(sheet_id, DATA_DIR / "PROCESSOS_ASSINADOS.xlsx", timeout=15))
+    else:
+        print(__doc__)
@@ -0,0 +1,133 @@
+# nomes_paises.py
+"""
+Nome de país em texto livre -> ISO3, para a coluna PAÍS/ESTADO sem o
+código entre parênteses ("Alemanha", "Reino Unido", "Alemana", "USA").
+
+Tabela local `data/paises_nomes.csv` (ISO3; nome em português, inglês e
+espanhol; variantes separadas por "|"). Na primeira consulta:
+- cada nome é dobrado (sem acento, minúsculo, só letras/dígitos) e vai
+  para um dicionário de nomes exatos;
+- os trigramas de cada nome dobrado (" al", "ale", ...) formam um índice
+  invertido trigrama -> ids dos nomes (vetores NumPy).
+
+Resolver um nome: igual a um nome da tabela -> confiança 1,0; senão os
+nomes que dividem trigramas com ele recebem um `np.bincount` dos ids das
+listas e a similaridade de Dice (2·comuns / (trigramas₁ + trigramas₂));
+o melhor acima de `INPA_PAIS_CONFIANCA` (padrão 0,6) vence. Texto com
+várias partes ("Berlim, Alemanha") tenta também cada parte.
+
+O ETL chama `resolve` uma vez por nome distinto sem código; o resultado
+(inclusive "sem correspondência") fica guardado e é registrado no log com
+a confiança só na primeira vez.
+"""
+import os
+import re
+import threading
+import unicodedata
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+TABELA_PATH = Path(__file__).resolve().parent / "data" / "paises_nomes.csv"
+CONFIANCA_MIN = float(os.environ.get("INPA_PAIS_CONFIANCA", "0.6"))
+
+Resolucao = namedtuple("Resolucao", "iso3 nome confianca")   # nome: nome em português do ISO3
+
+
+def dobra(texto) -> str:
+    """Sem acento, minúsculo, só letras/dígitos separados por um espaço."""
+    s = unicodedata.normalize("NFD", str(texto).lower())
+    s = "".join(c for c in s if unicodedata.category(c) != "Mn")
+    return " ".join(re.findall(r"[a-z0-9]+", s))
+
+
+def trigramas(dobrado: str) -> set:
+    s = f" {dobrado} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def _partes(texto: str) -> list:
+    partes = [p for p in re.split(r"\s*[,;/|]\s*|\s+-\s+|\s*\(\s*|\s*\)\s*", texto) if p.strip()]
+    return partes if len(partes) > 1 else []
+
+
+class ResolvedorPaises:
+    def __init__(self, tabela: pd.DataFrame = None, confianca_min: float = CONFIANCA_MIN, log=print):
+        if tabela is None:
+            tabela = pd.read_csv(TABELA_PATH, sep=";", dtype=str, keep_default_na=False)
+        self.confianca_min = confianca_min
+        self.log = log
+        self.nome_pt = dict(zip(tabela["iso3"], tabela["pt"]))
+
+        self.exatos = {}                  # nome dobrado -> ISO3 (o primeiro da tabela, se repetir)
+        for r in tabela.itertuples(index=False):
+            for nome in (r.pt, r.en, r.es, *r.variantes.split("|"), r.iso3):
+                d = dobra(nome)
+                if d:
+                    self.exatos.setdefault(d, r.iso3)
+        nomes = list(self.exatos)
+        self.nomes, self.isos = nomes, np.array([self.exatos[d] for d in nomes], dtype=object)
+
+        listas = {}
+        for i, d in enumerate(nomes):
+            for g in trigramas(d):
+                listas.setdefault(g, []).append(i)
+        self.indice = {g: np.array(ids, dtype=np.int32) for g, ids in listas.items()}
+        self.tamanhos = np.array([len(trigramas(d)) for d in nomes], dtype=np.float64)
+
+        self._resolvidos = {}
+        self._lock = threading.Lock()
+
+    def _melhor(self, texto: str) -> tuple:
+        """(ISO3, confiança) do nome mais parecido com `texto` (None, 0.0 sem trigrama em comum)."""
+        d = dobra(texto)
+        if not d:
+            return None, 0.0
+        if d in self.exatos:
+            return self.exatos[d], 1.0
+        grams = trigramas(d)
+        listas = [self.indice[g] for g in grams if g in self.indice]
+        if not listas:
+            return None, 0.0
+        comuns = np.bincount(np.concatenate(listas), minlength=len(self.nomes))
+        dice = 2.0 * comuns / (len(grams) + self.tamanhos)
+        i = int(np.argmax(dice))
+        return self.isos[i], float(dice[i])
+
+    def resolve(self, texto):
+        """`Resolucao` do nome ou None (abaixo da confiança mínima); uma vez por nome distinto."""
+        if texto is None or pd.isna(texto):
+            return None
+        chave, memo = str(texto).strip(), dobra(texto)     # "alemanha" e "Alemanha" são o mesmo nome
+        with self._lock:
+            if memo in self._resolvidos:
+                return self._resolvidos[memo]
+        iso, conf = self._melhor(chave)
+        if conf < 1.0:
+            for parte in _partes(chave):
+                i, c = self._melhor(parte)
+                if c > conf:
+                    iso, conf = i, c
+        r = Resolucao(iso, self.nome_pt[iso], round(conf, 2)) if iso and conf >= self.confianca_min else None
+        with self._lock:
+            self._resolvidos[memo] = r
+        if self.log:
+            if r:
+                self.log(f"🌐 País sem código: {chave!r} -> {r.iso3} ({r.nome}), confiança {r.confianca:.2f}")
+            else:
+                melhor = f"melhor: {iso}, {conf:.2f}" if iso else "nenhum trigrama em comum"
+                self.log(f"⚠️  País sem código não reconhecido: {chave!r} ({melhor})")
+        return r
+
+
+_resolvedor = None
+
+
+def resolvedor() -> ResolvedorPaises:
+    """Resolvedor do processo (a tabela e o índice são montados na primeira chamada)."""
+    global _resolvedor
+    if _resolvedor is None:
+        _resolvedor = ResolvedorPaises()
+    return _resolvedor
@@ -0,0 +1,109 @@
+# perfis.py
+"""
+Perfil de cada país (ISO3) e de cada UF: o que abre ao pedir o perfil de
+um local no painel.
+
+Cada perfil tem totais (acordos, vigentes x demais), o mix de modalidades,
+a linha do tempo por ano (vigentes x demais) e os pesquisadores envolvidos.
+Todos são calculados de uma vez na carga (`IndicePerfis`), sem filtros:
+cada acordo conta no seu país e, se for do Brasil com UF, também na UF.
+Uma passada agrupada por dimensão: o perfil e o valor viram um código
+combinado (`perfil * valores + valor`) e um `np.bincount` conta acordos e
+vigentes de todos os perfis ao mesmo tempo. Abrir um perfil é só consultar
+um dicionário já pronto (JSON, o mesmo servido pelo painel).
+
+Com o índice de processos (processos.py), cada perfil traz também os
+acordos distintos e as cadeias de termos aditivos dos acordos do local.
+"""
+import numpy as np
+import pandas as pd
+
+NAO_INFORMADO = "Não informado"     # preenchimento do ETL: não é um pesquisador
+
+# lista do perfil -> (coluna do DataFrame processado, campo do valor)
+DIMENSOES = {
+    "modalidades": ("modalidade", "modalidade"),
+    "anos": ("ano_assinatura", "ano"),
+    "pesquisadores": ("pesquisador_responsavel", "pesquisador"),
+}
+
+
+def _locais(df: pd.DataFrame) -> tuple:
+    """(posição da linha, nível, código) de cada par acordo x perfil."""
+    iso = df["codigo_iso3"].astype(object).where(df["codigo_iso3"].notna(), None).to_numpy()
+    uf = df["uf_sigla"].astype(object).where(df["uf_sigla"].notna(), None).to_numpy()
+    com_pais = np.flatnonzero(pd.notna(iso))
+    com_uf = np.flatnonzero((iso == "BRA") & pd.notna(uf))
+    linhas = np.concatenate([com_pais, com_uf])
+    niveis = np.array(["pais"] * len(com_pais) + ["uf"] * len(com_uf), dtype=object)
+    codigos = np.concatenate([iso[com_pais], np.array([str(u).upper() for u in uf[com_uf]], dtype=object)])
+    return linhas, niveis, codigos
+
+
+class IndicePerfis:
+    def __init__(self, df: pd.DataFrame, processos=None):
+        linhas, niveis, codigos = _locais(df)
+        chaves = pd.MultiIndex.from_arrays([niveis, codigos])
+        perfil, unicos = pd.factorize(chaves)
+        n = len(unicos)
+        vig = df["eh_vigente"].fillna(False).to_numpy(dtype=bool)[linhas]
+
+        # nome: o primeiro não nulo de cada local
+        nomes = {}
+        for nivel, col in (("pais", "pais"), ("uf", "uf_nome")):
+            m = niveis == nivel
+            rotulos = pd.Series(df[col].to_numpy(dtype=object)[linhas[m]], index=codigos[m]).dropna()
+            nomes[nivel] = rotulos[~rotulos.index.duplicated()].to_dict()
+
+        listas, totais = {}, None
+        for lista, (coluna, campo) in DIMENSOES.items():
+            serie = df[coluna]
+            if lista == "anos":
+                serie = pd.to_numeric(serie, errors="coerce")
+            cod, valores = pd.factorize(serie.to_numpy()[linhas])       # ausente -> -1
+            m = len(valores) + 1                           # slot 0: valor ausente (código -1)
+            combinado = perfil.astype(np.int64) * m + (cod + 1)
+            qtd = np.bincount(combinado, minlength=n * m).reshape(n, m)
+            qtd_vig = np.bincount(combinado[vig], minlength=n * m).reshape(n, m)
+            listas[lista] = (qtd, qtd_vig, valores, campo)
+            if totais is None:
+                totais = (qtd.sum(axis=1), qtd_vig.sum(axis=1))
+
+        distintos, cadeias = totais[0], {}
+        if processos is not None:
+            distintos = np.bincount(perfil[processos.principal[linhas]], minlength=n)
+            com_aditivos = np.isin(linhas, np.fromiter(processos.cadeias, dtype=np.int64))
+            for p, linha in zip(perfil[com_aditivos], linhas[com_aditivos]):
+                cadeias.setdefault(p, []).append(processos.cadeia(df, int(linha)))
+
+        self._perfis = {}
+        for p, (nivel, codigo) in enumerate(unicos):
+            acordos, vigentes = int(totais[0][p]), int(totais[1][p])
+            perf = {"nivel": nivel, "codigo": codigo, "nome": nomes[nivel].get(codigo, codigo),
+                    "acordos": acordos, "vigentes": vigentes, "demais": acordos - vigentes,
+                    "distintos": int(distintos[p]), "cadeias": cadeias.get(p, [])}
+            for lista, (qtd, qtd_vig, valores, campo) in listas.items():
+                idx = np.flatnonzero(qtd[p, 1:])
+                itens = [{campo: valores[i], "acordos": int(qtd[p, i + 1]), "vigentes": int(qtd_vig[p, i + 1])}
+                         for i in idx]
+                if lista == "anos":
+                    for it in itens:
+                        it["ano"] = int(it["ano"])
+                    itens.sort(key=lambda it: it["ano"])
+                    perf["sem_ano"] = int(qtd[p, 0])
+                else:
+                    itens.sort(key=lambda it: (-it["acordos"], str(it[campo])))
+                if lista == "pesquisadores":
+                    itens = [it for it in itens if it[campo] != NAO_INFORMADO]
+                perf[lista] = itens
+            self._perfis[(nivel, codigo)] = perf
+
+    def __len__(self) -> int:
+        return len(self._perfis)
+
+    def chaves(self) -> list:
+        return list(self._perfis)
+
+    def obtem(self, nivel: str, codigo: str):
+        """Perfil de ("pais", ISO3) ou ("uf", UF); None se o local não tiver acordos."""
+        return self._perfis.get((nivel, str(codigo).upper()))
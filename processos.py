@@ -0,0 +1,138 @@
+# processos.py
+"""
+Índice do número de processo (NÚMERO, ex.: "01280.000381/2023-95"):
+duplicatas e termos aditivos ligados ao acordo de origem.
+
+O número é normalizado para a forma canônica `NNNNN.NNNNNN/AAAA-DD`
+(espaços e "-" soltos da planilha, como "01280.001484/2022 - 91", somem).
+Uma célula pode ter mais de um número ("01280.001038/2020-15
+01280.000820/2023-60"): o mais recente (ano, sequência) é o da própria
+linha e os outros são referências a processos anteriores.
+
+Na carga (`IndiceProcessos`), sem comparar linhas duas a duas:
+- grupos de duplicatas: `pd.factorize` do número próprio (linhas com o
+  mesmo número são o mesmo acordo);
+- aditivo -> acordo de origem: junção por hash (`pd.merge`) entre os
+  números de cada Termo Aditivo (próprio + referências) e os números das
+  demais linhas; vale primeiro a linha cujo número *próprio* é o
+  procurado e só na falta dela a que o cita como referência; havendo
+  mais de uma, a primeira linha;
+- cadeia de cada acordo: os aditivos ligados a ele, pela ordem do
+  "1°/2° TERMO ADITIVO" no tipo e, sem ordinal, pelo ano.
+
+Numa recarga, `IndiceProcessos(df, anterior)` só lê de novo as células de
+NÚMERO que o índice anterior não viu (as demais reaproveitam os números já
+extraídos); as junções, baratas, são refeitas sobre a planilha inteira.
+
+`principal` marca uma linha por acordo distinto (a primeira de cada grupo,
+fora os aditivos ligados): é a coluna que o filtro "acordos distintos"
+(`Filtros.distintos`) usa para os KPIs.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+ADITIVO = "Termo Aditivo"       # modalidade normalizada (normaliza_modalidade)
+
+_NUMERO = re.compile(r"(\d{5})\.?\s*(\d{6})\s*/\s*(\d{4})\s*-?\s*(\d{2})")
+_ORDINAL = re.compile(r"^\s*(\d+)\s*[°ºª]")
+
+
+def numeros(texto) -> list:
+    """Números canônicos de uma célula, do mais recente (o da linha) para o mais antigo."""
+    if texto is None or (not isinstance(texto, str) and pd.isna(texto)):
+        return []
+    achados = {f"{a}.{b}/{c}-{d}": (c, b) for a, b, c, d in _NUMERO.findall(str(texto))}
+    return sorted(achados, key=achados.get, reverse=True)
+
+
+def normaliza_numero(texto):
+    """Número próprio canônico da célula (None sem número reconhecível)."""
+    ns = numeros(texto)
+    return ns[0] if ns else None
+
+
+def ordinal(tipo):
+    """1 para "1° TERMO ADITIVO ...", None sem ordinal."""
+    m = _ORDINAL.match(str(tipo)) if isinstance(tipo, str) else None
+    return int(m.group(1)) if m else None
+
+
+class IndiceProcessos:
+    def __init__(self, df: pd.DataFrame, anterior: "IndiceProcessos" = None):
+        n = len(df)
+        celulas = df["NÚMERO"] if "NÚMERO" in df.columns else pd.Series([None] * n, index=df.index)
+        # números extraídos uma vez por célula distinta (e, numa recarga, só das células novas)
+        celula, distintas = pd.factorize(celulas.to_numpy(dtype=object))
+        lidos = anterior._lidos if anterior is not None else {}
+        por_celula = [lidos[t] if t in lidos else numeros(t) for t in distintas]
+        self._lidos = dict(zip(distintas, por_celula))
+        listas = [por_celula[c] if c >= 0 else [] for c in celula]
+        self.numero = np.array([ns[0] if ns else None for ns in listas], dtype=object)
+        self.grupo, self._unicos = pd.factorize(self.numero)            # sem número -> -1
+        aditivo = df["modalidade"].eq(ADITIVO).to_numpy(dtype=bool)
+
+        # junção por hash: (linha do aditivo, número) x (linha de origem, número)
+        tam = np.array([len(ns) for ns in listas], dtype=np.int64)
+        pos = np.repeat(np.arange(n), tam)
+        proprio = np.arange(len(pos)) == np.repeat(np.cumsum(tam) - tam, tam)     # ns[0] de cada linha
+        todos = pd.DataFrame({"linha": pos, "numero": [x for ns in listas for x in ns], "proprio": proprio})
+        chaves = todos[aditivo[todos["linha"].to_numpy()]].drop(columns="proprio")
+        origens = (todos[~aditivo[todos["linha"].to_numpy()]]
+                   .sort_values(["numero", "proprio", "linha"], ascending=[True, False, True], kind="stable")
+                   .drop_duplicates("numero"))                                  # número próprio antes de referência
+        pares = chaves.merge(origens, on="numero", suffixes=("", "_pai"))
+        pares = (pares.sort_values(["linha", "proprio", "linha_pai"], ascending=[True, False, True], kind="stable")
+                 .drop_duplicates("linha"))
+        self.pai = np.full(n, -1, dtype=np.int64)
+        self.pai[pares["linha"].to_numpy()] = pares["linha_pai"].to_numpy()
+
+        # um acordo distinto por grupo, sem contar aditivos já ligados a uma origem
+        chave = np.where(self.grupo >= 0, self.grupo, -1 - np.arange(n))     # sem número: a linha sozinha
+        candidatas = np.flatnonzero(self.pai < 0)
+        _, primeiras = np.unique(chave[candidatas], return_index=True)
+        self.principal = np.zeros(n, dtype=bool)
+        self.principal[candidatas[primeiras]] = True
+
+        # cadeias: origem -> aditivos em ordem (ordinal, ano, linha)
+        tipos = df["tipo"].to_numpy(dtype=object) if "tipo" in df.columns else [None] * n
+        anos = pd.to_numeric(df["ano_assinatura"], errors="coerce").to_numpy(dtype=float)
+        self.cadeias = {}
+        for filho in np.flatnonzero(self.pai >= 0):
+            self.cadeias.setdefault(int(self.pai[filho]), []).append(int(filho))
+        for pai, filhos in self.cadeias.items():
+            filhos.sort(key=lambda i: (ordinal(tipos[i]) or np.inf, np.nan_to_num(anos[i], nan=np.inf), i))
+        self._aditivos = int(aditivo.sum())
+
+    def __len__(self) -> int:
+        return len(self._unicos)
+
+    def marca(self, df: pd.DataFrame) -> pd.DataFrame:
+        """`df` com as colunas `numero_canonico` e `principal` (cópia; o estado do ETL não muda)."""
+        return df.assign(numero_canonico=self.numero, principal=self.principal)
+
+    def cadeia(self, df: pd.DataFrame, linha: int) -> dict:
+        """Acordo da posição `linha` e os aditivos ligados a ele, em ordem (JSON, para o perfil)."""
+        def item(i):
+            r = df.iloc[i]
+            ano = pd.to_numeric(r.get("ano_assinatura"), errors="coerce")
+            return {"numero": self.numero[i], "tipo": r.get("tipo"), "modalidade": r.get("modalidade"),
+                    "ano": None if pd.isna(ano) else int(ano), "vigente": bool(r.get("eh_vigente"))}
+        return {**item(linha), "aditivos": [item(i) for i in self.cadeias.get(linha, [])]}
+
+    def duplicados(self) -> dict:
+        """Número -> posições das linhas que o repetem (só números com mais de uma linha)."""
+        s = pd.Series(self.numero)
+        rep = s[s.notna() & s.duplicated(keep=False)]
+        return {numero: linhas.index.tolist() for numero, linhas in rep.groupby(rep, sort=False)}
+
+    def relatorio(self) -> dict:
+        ligados = int((self.pai >= 0).sum())
+        return {
+            "numeros": len(self._unicos),
+            "repetidos": len(self.duplicados()),
+            "acordos_distintos": int(self.principal.sum()),
+            "aditivos_ligados": ligados,
+            "aditivos_sem_origem": self._aditivos - ligados,
+        }
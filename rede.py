@@ -0,0 +1,307 @@
+# rede.py
+"""
+Rede de colaboração: pesquisadores ligados aos países parceiros e às
+modalidades dos seus acordos.
+
+Montada uma vez por versão dos dados (`RedeColaboracao`), como os perfis:
+- `pesquisador_responsavel` é separado em nomes ("A / B", "A, B e C") e
+  cada nome vira um código (mesmo nome sem acento/título = mesmo código);
+- as matrizes de incidência pesquisador x país e pesquisador x modalidade
+  ficam esparsas, em coordenadas (linha, coluna, acordos): um
+  `np.unique` do código combinado `linha * colunas + coluna` (memória só
+  dos pares existentes, nunca linhas x colunas);
+- grau (países por pesquisador, pesquisadores por país) = não nulos por
+  linha/coluna; coocorrência = não nulos de B·Bᵀ (pesquisadores que
+  dividem um país) e Bᵀ·B (países que dividem um pesquisador), contados
+  pelas coordenadas: a coluna de maior grau de cada linha entra inteira
+  pelo grau, e só as demais geram pares (linha, vizinha), deduplicados
+  pelo código combinado ordenado, em blocos de no máximo `PARES_BLOCO` pares (nem o
+  produto denso nem todos os k² pares de um país com k pesquisadores);
+- posições dos nós: força dirigida (Fruchterman–Reingold) com os
+  `INPA_REDE_LAYOUT_MAX` pesquisadores com mais acordos, os países e as
+  modalidades; os demais pesquisadores vão para o baricentro dos seus
+  países/modalidades. Calculadas na primeira vez que o grafo é pedido
+  (em segundo plano, na carga) e guardadas.
+
+Numa recarga, `RedeColaboracao(df, anterior)` só separa os nomes das
+células de pesquisador que a rede anterior não viu.
+
+Com filtros, o painel só reconta as ligações das linhas filtradas
+(`ligacoes`, só os pares das linhas do recorte) e desenha nas posições já
+prontas: o grafo não se reorganiza a cada mudança de filtro.
+"""
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from nomes_paises import dobra
+from perfis import NAO_INFORMADO
+
+ITERACOES = int(os.environ.get("INPA_REDE_ITERACOES", "200"))   # passos do layout de força
+LAYOUT_MAX = int(os.environ.get("INPA_REDE_LAYOUT_MAX", "500"))  # pesquisadores no layout de força
+BLOCO = 512                                                      # linhas por bloco da repulsão (memória)
+PARES_BLOCO = 2_000_000                                          # pares por bloco da coocorrência (memória)
+AFASTAMENTO = 0.02                                               # espalha quem cai no mesmo baricentro
+
+TIPOS = ("pesquisador", "pais", "modalidade")
+_SEPARADORES = re.compile(r"\s*(?:/|,|;|\n|\s+e\s+)\s*")
+_TITULO = re.compile(r"^(?:dra?|prof[a]?|professora?)\b\.?\s*", re.IGNORECASE)
+_VAZIOS = {"", "-", "—", "nan", dobra(NAO_INFORMADO)}
+
+
+def nomes(texto) -> list:
+    """Pesquisadores de uma célula, sem repetição ("Dr. A / Dra. B" -> ["Dr. A", "Dra. B"])."""
+    if texto is None or (not isinstance(texto, str) and pd.isna(texto)):
+        return []
+    vistos, saida = set(), []
+    for parte in _SEPARADORES.split(str(texto)):
+        nome = " ".join(parte.split())
+        chave = chave_nome(nome)
+        if chave not in _VAZIOS and chave not in vistos:
+            vistos.add(chave)
+            saida.append(nome)
+    return saida
+
+
+def chave_nome(nome: str) -> str:
+    """Nome sem título, acento e maiúsculas: "Dra. Camila Ribas" e "camila ribas" são a mesma pessoa."""
+    return dobra(_TITULO.sub("", nome.strip()))
+
+
+class Esparsa:
+    """Matriz esparsa em coordenadas (linha, coluna, valor), linhas x colunas."""
+
+    def __init__(self, linhas, colunas, valores, forma: tuple):
+        self.linhas, self.colunas, self.valores, self.forma = linhas, colunas, valores, forma
+
+    @classmethod
+    def de_pares(cls, i, j, forma: tuple) -> "Esparsa":
+        """Soma 1 por par (i, j): contagens pelo `np.unique` do código combinado."""
+        cod, cont = np.unique(np.asarray(i, dtype=np.int64) * forma[1] + j, return_counts=True)
+        return cls(cod // forma[1], cod % forma[1], cont, forma)
+
+    def t(self) -> "Esparsa":
+        return Esparsa(self.colunas, self.linhas, self.valores, self.forma[::-1])
+
+    def grau(self) -> np.ndarray:
+        """Colunas não nulas por linha."""
+        return np.bincount(self.linhas, minlength=self.forma[0])
+
+    def soma(self) -> np.ndarray:
+        return np.bincount(self.linhas, weights=self.valores, minlength=self.forma[0]).astype(np.int64)
+
+    def vizinhos(self, max_pares: int = PARES_BLOCO) -> np.ndarray:
+        """
+        Quantas outras linhas dividem ao menos uma coluna com cada linha (não
+        nulos de A·Aᵀ fora a diagonal), pelas coordenadas: a coluna de maior
+        grau de cada linha conta inteira (grau - 1); das demais colunas só
+        entram os pares (linha, vizinha) com a vizinha fora dessa coluna,
+        sem repetição (código combinado ordenado), em blocos de linhas
+        inteiras com até `max_pares` pares cada.
+        """
+        n, m = self.forma
+        saida = np.zeros(n, dtype=np.int64)
+        if not len(self.linhas):
+            return saida
+        grau_c = np.bincount(self.colunas, minlength=m)
+        por_coluna = self.linhas[np.argsort(self.colunas, kind="stable")]     # linhas de cada coluna, seguidas
+        inicio_c = np.cumsum(grau_c) - grau_c
+        incidencia = np.sort(self.linhas.astype(np.int64) * m + self.colunas)
+        ordem = np.lexsort((-grau_c[self.colunas], self.linhas))             # por linha, maior coluna primeiro
+        li, co = self.linhas[ordem], self.colunas[ordem]
+        primeira = np.r_[True, li[1:] != li[:-1]]
+        maior = np.full(n, -1, dtype=np.int64)
+        maior[li[primeira]] = co[primeira]
+        saida[li[primeira]] = grau_c[co[primeira]] - 1                       # a maior coluna, sem a própria linha
+
+        li, co = li[~primeira], co[~primeira]
+        custo = grau_c[co]                                                   # pares gerados por entrada
+        acum = np.cumsum(np.bincount(li, weights=custo, minlength=n).astype(np.int64))
+        r0 = int(np.searchsorted(acum, 0, side="right"))                     # pula as linhas de uma coluna só
+        while r0 < n:
+            r1 = max(int(np.searchsorted(acum, acum[r0 - 1] + max_pares if r0 else max_pares, side="right")),
+                     r0 + 1)
+            e0, e1 = np.searchsorted(li, [r0, r1])
+            c = custo[e0:e1]
+            origem = np.repeat(li[e0:e1], c).astype(np.int64)
+            desloc = np.arange(len(origem)) - np.repeat(np.cumsum(c) - c, c)
+            vizinho = por_coluna[np.repeat(inicio_c[co[e0:e1]], c) + desloc]
+            chave = vizinho * m + maior[origem]                              # vizinha já está na maior coluna?
+            pos = np.minimum(np.searchsorted(incidencia, chave), len(incidencia) - 1)
+            fora = incidencia[pos] != chave
+            cod = np.sort((origem[fora] - r0) * n + vizinho[fora])
+            cod = cod[np.r_[True, cod[1:] != cod[:-1]]] if len(cod) else cod     # pares distintos do bloco
+            saida += np.bincount(cod // n + r0, minlength=n)
+            r0 = r1
+        return saida
+
+
+def posicoes(n: int, origem, destino, peso, iteracoes: int = ITERACOES, seed: int = 7) -> np.ndarray:
+    """Layout de força (Fruchterman–Reingold) em [-1, 1]²; mesmo grafo, mesmas posições."""
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(-1, 1, (n, 2))
+    if n < 2:
+        return pos * 0
+    k = 1.0 / np.sqrt(n)
+    peso = 1.0 + np.log(np.asarray(peso, dtype=float))
+    temperatura = 0.1
+    for passo in range(iteracoes):
+        desloc = np.empty((n, 2))
+        x, y = pos[:, 0], pos[:, 1]
+        for i in range(0, n, BLOCO):                  # repulsão entre todos os pares, em blocos
+            dx, dy = x[i:i + BLOCO, None] - x, y[i:i + BLOCO, None] - y
+            f = k * k / np.maximum(dx * dx + dy * dy, 1e-6)
+            desloc[i:i + BLOCO, 0], desloc[i:i + BLOCO, 1] = (dx * f).sum(axis=1), (dy * f).sum(axis=1)
+        d = pos[origem] - pos[destino]                # atração ao longo das ligações
+        dist = np.maximum(np.sqrt((d ** 2).sum(-1)), 1e-3)
+        forca = d * (dist * peso / k)[:, None]
+        for eixo in (0, 1):
+            desloc[:, eixo] += np.bincount(destino, forca[:, eixo], n) - np.bincount(origem, forca[:, eixo], n)
+        desloc -= pos * 0.05                          # gravidade: componentes soltos não se afastam
+        comp = np.maximum(np.sqrt((desloc ** 2).sum(-1)), 1e-9)
+        pos += desloc / comp[:, None] * np.minimum(comp, temperatura)[:, None]
+        temperatura = 0.1 * (1 - (passo + 1) / iteracoes) + 0.002
+    pos -= pos.mean(axis=0)
+    return pos / max(np.abs(pos).max(), 1e-9)
+
+
+class RedeColaboracao:
+    def __init__(self, df: pd.DataFrame, anterior: "RedeColaboracao" = None):
+        n = len(df)
+        self._indice = df.index
+        # nomes separados uma vez por célula distinta; cada linha aponta para a lista da sua célula
+        celula, distintas = pd.factorize(df["pesquisador_responsavel"].to_numpy(dtype=object))
+        lidos = anterior._lidos if anterior is not None else {}
+        listas = [lidos[t] if t in lidos else nomes(t) for t in distintas]
+        self._lidos = dict(zip(distintas, listas))
+        todos = [x for l in listas for x in l]
+        cod_nome, _ = pd.factorize(pd.Index([chave_nome(x) for x in todos]))
+        tam = np.array([len(l) for l in listas] + [0], dtype=np.int64)      # último: célula vazia (-1)
+        inicio = np.concatenate([[0], np.cumsum(tam)[:-1]])
+        tam_linha = tam[celula]
+        linha_p = np.repeat(np.arange(n), tam_linha)
+        desloc = np.arange(len(linha_p)) - np.repeat(np.cumsum(tam_linha) - tam_linha, tam_linha)
+        cod_p = cod_nome[inicio[celula][linha_p] + desloc] if len(linha_p) else np.array([], dtype=np.int64)
+        rotulo = pd.Series(todos).groupby(cod_nome, sort=True).first()    # primeira grafia de cada pessoa
+        self.pesquisadores = rotulo.to_numpy(dtype=object) if len(rotulo) else np.array([], dtype=object)
+        self._linha_p, self._cod_p = linha_p, cod_p
+
+        pais, self.paises = pd.factorize(df["codigo_iso3"].to_numpy(dtype=object))
+        nomes_pais = pd.Series(df["pais"].to_numpy(dtype=object), index=pais).dropna()
+        nomes_pais = nomes_pais[~nomes_pais.index.duplicated() & (nomes_pais.index >= 0)]
+        self.nomes_paises = np.array([nomes_pais.get(i, c) for i, c in enumerate(self.paises)], dtype=object)
+        modal, self.modalidades = pd.factorize(df["modalidade"].to_numpy(dtype=object))
+
+        # (linha, pesquisador) com país / modalidade conhecidos
+        self._pares = {}
+        for tipo, cod in (("pais", pais), ("modalidade", modal)):
+            ok = cod[linha_p] >= 0
+            self._pares[tipo] = (linha_p[ok], cod_p[ok], cod[linha_p[ok]])
+        forma = lambda tipo: (len(self.pesquisadores), len(self.paises if tipo == "pais" else self.modalidades))
+        self.incidencia = {t: Esparsa.de_pares(p[1], p[2], forma(t)) for t, p in self._pares.items()}
+
+        bp = self.incidencia["pais"]
+        self.metricas = {
+            "pesquisador": {
+                "acordos": self.acordos(),
+                "paises": bp.grau(),
+                "modalidades": self.incidencia["modalidade"].grau(),
+                "colaboradores": bp.vizinhos(),          # pesquisadores que dividem um país (B·Bᵀ)
+            },
+            "pais": {
+                "acordos": bp.t().soma(),
+                "pesquisadores": bp.t().grau(),
+                "paises_ligados": bp.t().vizinhos(),     # países que dividem um pesquisador (Bᵀ·B)
+            },
+            "modalidade": {
+                "acordos": self.incidencia["modalidade"].t().soma(),
+                "pesquisadores": self.incidencia["modalidade"].t().grau(),
+            },
+        }
+        self._posicoes = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.pesquisadores)
+
+    def nos(self) -> tuple:
+        """(tipo, código) de cada nó, na ordem das posições: pesquisadores, países, modalidades."""
+        return (np.repeat(np.array(TIPOS, dtype=object), [len(self.pesquisadores), len(self.paises),
+                                                          len(self.modalidades)]),
+                np.concatenate([np.arange(len(self.pesquisadores)), np.arange(len(self.paises)),
+                                np.arange(len(self.modalidades))]))
+
+    def deslocamento(self, tipo: str) -> int:
+        """Primeiro nó do tipo na ordem de `nos`."""
+        return {"pesquisador": 0, "pais": len(self.pesquisadores),
+                "modalidade": len(self.pesquisadores) + len(self.paises)}[tipo]
+
+    def posicoes(self, espera: bool = True):
+        """
+        Posições de todos os nós (calculadas uma vez, com as duas incidências).
+        Com `espera=False`, devolve None enquanto outra thread as calcula.
+        """
+        if self._posicoes is not None:
+            return self._posicoes
+        if not self._lock.acquire(blocking=espera):
+            return None
+        try:
+            if self._posicoes is None:
+                self._posicoes = self._calcula_posicoes()
+            return self._posicoes
+        finally:
+            self._lock.release()
+
+    def _calcula_posicoes(self) -> np.ndarray:
+        """Força dirigida só com os `LAYOUT_MAX` pesquisadores de mais acordos; os demais no baricentro."""
+        n_p = len(self.pesquisadores)
+        n = self.deslocamento("modalidade") + len(self.modalidades)
+        fixos = np.zeros(n_p, dtype=bool)
+        fixos[np.argsort(-self.metricas["pesquisador"]["acordos"], kind="stable")[:LAYOUT_MAX]] = True
+        no_layout = np.concatenate([fixos, np.ones(n - n_p, dtype=bool)])
+        novo = np.cumsum(no_layout) - 1                      # posição de cada nó no layout de força
+        origem, destino, peso = [], [], []
+        for tipo, b in self.incidencia.items():
+            m = fixos[b.linhas]
+            origem.append(novo[b.linhas[m]])
+            destino.append(novo[b.colunas[m] + self.deslocamento(tipo)])
+            peso.append(b.valores[m])
+        pos = np.zeros((n, 2))
+        pos[no_layout] = posicoes(int(no_layout.sum()), np.concatenate(origem), np.concatenate(destino),
+                                  np.concatenate(peso))
+
+        soma, total = np.zeros((n_p, 2)), np.zeros(n_p)       # baricentro ponderado pelos acordos
+        for tipo, b in self.incidencia.items():
+            xy = pos[b.colunas + self.deslocamento(tipo)]
+            for eixo in (0, 1):
+                soma[:, eixo] += np.bincount(b.linhas, xy[:, eixo] * b.valores, n_p)
+            total += np.bincount(b.linhas, b.valores, n_p)
+        resto = np.flatnonzero(~fixos)
+        espalha = np.random.default_rng(7).uniform(-AFASTAMENTO, AFASTAMENTO, (len(resto), 2))
+        pos[resto] = np.clip(soma[resto] / np.maximum(total[resto], 1)[:, None] + espalha, -1, 1)
+        return pos
+
+    def linhas(self, sub: pd.DataFrame) -> np.ndarray:
+        """Posições das linhas de `sub` (um recorte do DataFrame da rede) no DataFrame inteiro."""
+        return self._indice.get_indexer(sub.index)
+
+    def _nas_linhas(self, linha: np.ndarray, linhas) -> np.ndarray:
+        ok = np.zeros(len(self._indice), dtype=bool)
+        ok[linhas] = True
+        return ok[linha]
+
+    def acordos(self, linhas=None) -> np.ndarray:
+        """Acordos de cada pesquisador contando só as `linhas` (todas, sem filtro)."""
+        p = self._cod_p if linhas is None else self._cod_p[self._nas_linhas(self._linha_p, linhas)]
+        return np.bincount(p, minlength=len(self.pesquisadores))
+
+    def ligacoes(self, tipo: str, linhas=None) -> Esparsa:
+        """Incidência pesquisador x `tipo` contando só as `linhas` (todas, sem filtro)."""
+        linha, p, c = self._pares[tipo]
+        if linhas is not None:
+            m = self._nas_linhas(linha, linhas)
+            p, c = p[m], c[m]
+        return Esparsa.de_pares(p, c, self.incidencia[tipo].forma)
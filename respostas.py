@@ -0,0 +1,167 @@
+# respostas.py
+"""
+Respostas enxutas dos callbacks e medição do tamanho de cada uma.
+
+Cada `desenha` devolve mapa, pizza, evolução, ranking e 4 KPIs. Entre uma
+interação e outra quase sempre só mudam os números: o layout das figuras
+(template, estilo geográfico, eixos, legendas) e a forma dos componentes
+continuam iguais. Aqui:
+
+- cada figura é separada em estrutura (tudo que não é array) e dados (os
+  arrays: x, y, labels, values, lat, lon, customdata...);
+- o navegador guarda, num dcc.Store, a assinatura (hash) da estrutura e dos
+  dados de cada saída que recebeu;
+- mesma estrutura e mesmos dados: `no_update` (nada trafega);
+  mesma estrutura: um `Patch` só com os arrays; senão, a figura inteira;
+- componentes (ranking, KPIs) vão inteiros ou `no_update`.
+
+`Medidor` registra, por callback, os bytes das respostas de
+`/_dash-update-component` e, por saída enxugada, quanto iria sem enxugar x
+quanto foi enviado (`GET /status/payload`).
+"""
+import hashlib
+import json
+import threading
+from collections import defaultdict
+
+import numpy as np
+from dash import Patch, no_update
+from flask import request
+from plotly.utils import PlotlyJSONEncoder
+
+ROTA_CALLBACKS = "/_dash-update-component"
+
+
+def _json(obj) -> str:
+    return json.dumps(obj, cls=PlotlyJSONEncoder, sort_keys=True, separators=(",", ":"))
+
+
+def _hash(texto: str) -> str:
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def _eh_array(v) -> bool:
+    if isinstance(v, np.ndarray):
+        return True
+    return isinstance(v, (list, tuple)) and not any(isinstance(x, dict) for x in v)
+
+
+def separa(obj, caminho=()):
+    """(estrutura, dados): a estrutura troca cada array por "§"; dados = [(caminho, array)]."""
+    dados = []
+
+    def anda(o, cam):
+        if isinstance(o, dict):
+            return {k: anda(v, cam + (k,)) for k, v in o.items()}
+        if isinstance(o, (list, tuple)) and not _eh_array(o):
+            return [anda(v, cam + (i,)) for i, v in enumerate(o)]
+        if _eh_array(o):
+            dados.append((cam, o))
+            return "§"
+        return o
+
+    return anda(obj, tuple(caminho)), dados
+
+
+def _como_json(valor):
+    """Figura (go.Figure) ou componente -> estrutura serializável."""
+    if hasattr(valor, "to_plotly_json") and hasattr(valor, "layout"):
+        return valor.to_plotly_json(), True
+    return valor, False
+
+
+def enxuga(nomes, saidas, anteriores: dict = None, sempre_inteiras=(), medidor=None):
+    """
+    (respostas, assinaturas) para as `saidas` de um callback, dadas as
+    assinaturas que o navegador já tem (`anteriores`, do dcc.Store).
+    Saídas em `sempre_inteiras` vão inteiras e ficam sem assinatura (outro
+    callback as altera no navegador, ex.: o mapa com camadas).
+    """
+    anteriores = anteriores or {}
+    respostas, assinaturas = [], {}
+    for nome, valor in zip(nomes, saidas):
+        obj, eh_figura = _como_json(valor)
+        if eh_figura:
+            estrutura, dados = separa(obj)
+            txt_estrutura = _json(estrutura)
+            txt_dados = _json([v for _, v in dados])
+            assinatura = [_hash(txt_estrutura), _hash(txt_dados)]
+            completo = len(txt_estrutura) + len(txt_dados)
+        else:
+            txt = _json(obj)
+            assinatura = [_hash(txt)] * 2
+            completo = len(txt)
+            dados = None
+
+        anterior = anteriores.get(nome)
+        if nome in sempre_inteiras:
+            resposta, enviado = valor, completo
+            assinatura = None
+        elif anterior == assinatura:
+            resposta, enviado = no_update, 0
+        elif eh_figura and anterior and anterior[0] == assinatura[0]:
+            resposta = Patch()
+            for cam, v in dados:
+                alvo = resposta
+                for passo in cam[:-1]:
+                    alvo = alvo[passo]
+                alvo[cam[-1]] = v
+            enviado = len(txt_dados)
+        else:
+            resposta, enviado = valor, completo
+
+        assinaturas[nome] = assinatura
+        respostas.append(resposta)
+        if medidor is not None:
+            medidor.conta_saida(nome, completo, enviado)
+    return respostas, assinaturas
+
+
+class Medidor:
+    """Bytes por callback (respostas HTTP) e por saída enxugada (sem enxugar x enviado)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks = defaultdict(lambda: {"requisicoes": 0, "bytes": 0, "bytes_max": 0})
+        self._saidas = defaultdict(lambda: {"respostas": 0, "bytes_sem_enxugar": 0, "bytes_enviados": 0,
+                                            "sem_mudanca": 0, "so_dados": 0})
+
+    def instala(self, server) -> None:
+        @server.after_request
+        def _mede_resposta(resp):
+            if request.path.endswith(ROTA_CALLBACKS) and not resp.direct_passthrough:
+                corpo = request.get_json(silent=True) or {}
+                self.conta_callback(nome_callback(corpo.get("output", "")), len(resp.get_data()))
+            return resp
+
+    def conta_callback(self, nome: str, n_bytes: int) -> None:
+        with self._lock:
+            c = self._callbacks[nome]
+            c["requisicoes"] += 1
+            c["bytes"] += n_bytes
+            c["bytes_max"] = max(c["bytes_max"], n_bytes)
+
+    def conta_saida(self, nome: str, completo: int, enviado: int) -> None:
+        with self._lock:
+            s = self._saidas[nome]
+            s["respostas"] += 1
+            s["bytes_sem_enxugar"] += completo
+            s["bytes_enviados"] += enviado
+            if enviado == 0:
+                s["sem_mudanca"] += 1
+            elif enviado < completo:
+                s["so_dados"] += 1
+
+    def relatorio(self) -> dict:
+        with self._lock:
+            callbacks = {n: {**c, "bytes_medio": round(c["bytes"] / c["requisicoes"]) if c["requisicoes"] else 0}
+                         for n, c in sorted(self._callbacks.items())}
+            return {"callbacks": callbacks, "saidas": {n: dict(s) for n, s in sorted(self._saidas.items())}}
+
+
+def nome_callback(output: str) -> str:
+    """"..mapa.figure...graf-evolucao.figure.." -> "mapa.figure (+1)" (primeira saída + quantas mais)."""
+    partes = [p for p in output.strip(".").split("...") if p]
+    if not partes:
+        return output or "?"
+    return partes[0].split("@")[0] + (f" (+{len(partes) - 1})" if len(partes) > 1 else "")
@@ -0,0 +1,226 @@
+# tarefas.py
+"""
+Tarefas pesadas fora da requisição: recarga forçada, exportação e relatório.
+
+Rodam como background callbacks do Dash com um gerenciador local em disco
+(`DiskcacheManager`; o extra `dash[diskcache]` está no requirements.txt):
+
+- cada tarefa roda num processo próprio; o worker do gunicorn só dispara e
+  consulta o progresso, sem ficar preso nem estourar o timeout;
+- no máximo `INPA_TAREFAS_MAX` tarefas correm ao mesmo tempo (vagas no
+  próprio cache em disco, valem para todos os workers); as demais mostram
+  "na fila" até abrir vaga;
+- progresso na barra da tarefa, botão de cancelar (o Dash encerra o processo);
+- exportações e relatórios ficam guardados por `INPA_TAREFAS_TTL_S`
+  segundos, por filtros + versão dos dados: pedir de novo o mesmo arquivo
+  devolve o resultado guardado sem recalcular.
+
+Se diskcache/multiprocess faltarem no ambiente (instalação mínima), as
+mesmas funções rodam como callbacks comuns (síncronos, sem barra de
+progresso nem cancelamento). A troca dos dados em memória após a recarga
+não é tarefa: roda numa thread do próprio processo (app.aplica_recarga).
+"""
+import functools
+import io
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import diskcache
+    from dash import DiskcacheManager
+except ImportError:      # dash[diskcache] ausente: callbacks síncronos
+    diskcache = None
+    DiskcacheManager = None
+
+BASE_DIR = Path(__file__).resolve().parent
+TAREFAS_DIR = Path(os.environ.get("INPA_TAREFAS_DIR", BASE_DIR / "data" / "tarefas"))
+TAREFAS_MAX = int(os.environ.get("INPA_TAREFAS_MAX", "2"))            # tarefas simultâneas
+RESULTADO_TTL_S = int(os.environ.get("INPA_TAREFAS_TTL_S", "600"))    # resultados guardados
+VAGA_PRAZO_S = 3600      # vaga de processo que morreu sem liberar expira sozinha
+
+LOTE_EXPORTACAO = 5_000  # linhas por passo de progresso
+
+
+# =========================================================
+# GERENCIADORES E VAGAS
+# =========================================================
+def cria_gerenciadores(versao_dados):
+    """
+    (com_cache, sem_cache): o primeiro guarda resultados por `RESULTADO_TTL_S`
+    (chave = argumentos + `versao_dados()`); o segundo não guarda (recarga).
+    (None, None) sem o extra dash[diskcache].
+    """
+    if diskcache is None:
+        print("ℹ️  Tarefas pesadas rodando na própria requisição (instale dash[diskcache] para background callbacks)")
+        return None, None
+    TAREFAS_DIR.mkdir(parents=True, exist_ok=True)
+    cache = diskcache.Cache(str(TAREFAS_DIR))
+    return (DiskcacheManager(cache, cache_by=[versao_dados], expire=RESULTADO_TTL_S),
+            DiskcacheManager(cache))
+
+
+def _vivo(pid) -> bool:
+    try:
+        os.kill(int(pid), 0)
+        return True
+    except (OSError, TypeError, ValueError):
+        return False
+
+
+class Vagas:
+    """
+    Semáforo entre processos sobre o cache em disco: `TAREFAS_MAX` chaves
+    "vaga-i", ocupadas com `add` (atômico) pelo pid da tarefa. Vaga de
+    processo cancelado/morto é recuperada.
+    """
+
+    def __init__(self, cache, maximo: int = TAREFAS_MAX, espera_s: float = 0.5):
+        self.cache, self.maximo, self.espera_s = cache, maximo, espera_s
+
+    def _tenta(self):
+        for i in range(self.maximo):
+            chave = f"vaga-{i}"
+            if self.cache.add(chave, os.getpid(), expire=VAGA_PRAZO_S):
+                return chave
+            dono = self.cache.get(chave)
+            if dono is not None and not _vivo(dono):
+                self.cache.delete(chave)
+                if self.cache.add(chave, os.getpid(), expire=VAGA_PRAZO_S):
+                    return chave
+        return None
+
+    def ocupa(self, avisa=None) -> str:
+        """Espera uma vaga; `avisa()` é chamado enquanto a tarefa está na fila."""
+        while True:
+            chave = self._tenta()
+            if chave is not None:
+                return chave
+            if avisa:
+                avisa()
+            time.sleep(self.espera_s)
+
+    def libera(self, chave: str) -> None:
+        if self.cache.get(chave) == os.getpid():
+            self.cache.delete(chave)
+
+
+def _sem_progresso(*_):
+    pass
+
+
+def callback_tarefa(app, *deps, manager=None, progress=None, cancel=None, running=None,
+                    cache_args_to_ignore=None, **kwargs):
+    """
+    `app.callback` em background quando há gerenciador; senão callback comum.
+    A função recebe `set_progress` como primeiro argumento nos dois casos.
+    """
+    def deco(fn):
+        if manager is None:
+            @functools.wraps(fn)
+            def sincrona(*args):
+                return fn(_sem_progresso, *args)
+            return app.callback(*deps, running=running, **kwargs)(sincrona)
+
+        @functools.wraps(fn)
+        def com_vaga(set_progress, *args):
+            vagas = Vagas(manager.handle)
+            chave = vagas.ocupa(lambda: set_progress((0, "na fila: aguardando vaga")))
+            try:
+                return fn(set_progress, *args)
+            finally:
+                vagas.libera(chave)
+        return app.callback(*deps, background=True, manager=manager, progress=progress, cancel=cancel,
+                            running=running, cache_args_to_ignore=cache_args_to_ignore, **kwargs)(com_vaga)
+    return deco
+
+
+# =========================================================
+# EXPORTAÇÃO E RELATÓRIO
+# =========================================================
+COLUNAS_EXPORTACAO = {
+    "NÚMERO": "Número do processo",
+    "pais": "País",
+    "codigo_iso3": "ISO3",
+    "uf_sigla": "UF",
+    "continente": "Continente",
+    "tipo": "Tipo",
+    "modalidade": "Modalidade",
+    "ano_assinatura": "Ano",
+    "status": "Status",
+    "eh_vigente": "Vigente",
+    "vigencia_inicio": "Início da vigência",
+    "vigencia_fim": "Fim da vigência",
+    "pesquisador_responsavel": "Pesquisador responsável",
+}
+
+
+def tabela_exportacao(dff: pd.DataFrame) -> pd.DataFrame:
+    cols = [c for c in COLUNAS_EXPORTACAO if c in dff.columns]
+    out = dff[cols].rename(columns=COLUNAS_EXPORTACAO)
+    if "Vigente" in out.columns:
+        out["Vigente"] = out["Vigente"].map({True: "Sim", False: "Não"}).fillna("Não")
+    if "Ano" in out.columns:
+        out["Ano"] = pd.to_numeric(out["Ano"], errors="coerce").astype("Int64")
+    return out.reset_index(drop=True)
+
+
+def exporta(dff: pd.DataFrame, formato: str = "csv", set_progress=_sem_progresso) -> bytes:
+    """Linhas filtradas em CSV (UTF-8 com BOM, `;`, abre direto no Excel) ou XLSX, em lotes com progresso."""
+    tab = tabela_exportacao(dff)
+    n = len(tab)
+    if formato == "xlsx":
+        from openpyxl import Workbook
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Acordos")
+        ws.append(list(tab.columns))
+        for i, linha in enumerate(tab.astype(object).where(tab.notna(), None).itertuples(index=False), 1):
+            ws.append(list(linha))
+            if i % LOTE_EXPORTACAO == 0:
+                set_progress((int(i * 100 / n), f"{i:,}/{n:,} linhas"))
+        buf = io.BytesIO()
+        wb.save(buf)
+        return buf.getvalue()
+
+    buf = io.StringIO()
+    for ini in range(0, max(n, 1), LOTE_EXPORTACAO):
+        tab.iloc[ini:ini + LOTE_EXPORTACAO].to_csv(buf, sep=";", index=False, header=ini == 0)
+        fim = min(ini + LOTE_EXPORTACAO, n)
+        set_progress((int(fim * 100 / max(n, 1)), f"{fim:,}/{n:,} linhas"))
+    return ("\ufeff" + buf.getvalue()).encode("utf-8")
+
+
+def _por(dff: pd.DataFrame, coluna: str, rotulo: str, por_valor: bool = False) -> pd.DataFrame:
+    """Acordos e vigentes por valor de `coluna` (maiores primeiro, ou em ordem do valor)."""
+    g = (dff.assign(_vig=dff["eh_vigente"].fillna(False).astype(bool))
+            .groupby(coluna, dropna=False)
+            .agg(acordos=(coluna, "size"), vigentes=("_vig", "sum"))
+            .reset_index())
+    g = g.sort_values(coluna if por_valor else "acordos", ascending=por_valor, kind="stable")
+    g[coluna] = g[coluna].astype(object).where(g[coluna].notna(), "sem registro")
+    return g.rename(columns={coluna: rotulo, "acordos": "Acordos", "vigentes": "Vigentes"})
+
+
+def relatorio(dff: pd.DataFrame, resumo: dict, set_progress=_sem_progresso) -> bytes:
+    """
+    Relatório XLSX do recorte: aba "Resumo" (KPIs e filtros) + uma aba por
+    país, UF, modalidade, tipo e ano, e as linhas.
+    """
+    abas = [
+        ("Por país", lambda: _por(dff[dff["nivel_localizacao"] == "pais"], "pais", "País")),
+        ("Por UF", lambda: _por(dff[(dff["codigo_iso3"] == "BRA") & dff["uf_sigla"].notna()], "uf_sigla", "UF")),
+        ("Por modalidade", lambda: _por(dff, "modalidade", "Modalidade")),
+        ("Por tipo", lambda: _por(dff, "tipo", "Tipo")),
+        ("Por ano", lambda: _por(dff.assign(ano=pd.to_numeric(dff["ano_assinatura"], errors="coerce")
+                                              .astype("Int64")), "ano", "Ano", por_valor=True)),
+        ("Acordos", lambda: tabela_exportacao(dff)),
+    ]
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as xl:
+        pd.DataFrame(list(resumo.items()), columns=["Indicador", "Valor"]).to_excel(xl, sheet_name="Resumo", index=False)
+        for i, (nome, calcula) in enumerate(abas, 1):
+            set_progress((int(i * 100 / (len(abas) + 1)), nome))
+            calcula().to_excel(xl, sheet_name=nome, index=False)
+    return buf.getvalue()
@@ -0,0 +1,118 @@
+"""
+Testes da API JSON (api.py): números iguais aos do motor, ETag/304 pela
+versão dos dados e validação dos parâmetros.
+
+Execução:
+    python -m pytest -q test_api.py
+"""
+
+import gzip
+import json
+from collections import namedtuple
+
+import pytest
+from flask import Flask
+
+import api
+import cruzados
+from consultas import Filtros, MotorPandas, dados_sinteticos
+
+Visao = namedtuple("Visao", "motor agregados antiga")
+
+
+@pytest.fixture(scope="module")
+def motor():
+    return MotorPandas(dados_sinteticos(3000, seed=8))
+
+
+@pytest.fixture()
+def cliente(motor):
+    estado = {"versao": "v1", "consultas": 0}
+
+    def agregado(f):
+        estado["consultas"] += 1
+        return motor.agregado(f)
+
+    visao = Visao(motor, cruzados.AgregadosLRU(agregado), False)
+    server = Flask(__name__)
+    api.instala(server, lambda versao: (estado["versao"], visao), lambda: {"tipo": ["Tipo 1"]})
+    return server.test_client(), estado
+
+
+@pytest.mark.parametrize("query, f", [
+    ("", Filtros()),
+    ("anos=2012-2020&status=vigentes", Filtros(ano=(2012, 2020), status_mode="vigentes")),
+    ("tipo=Tipo 4,Tipo 1&continente=Europa", Filtros(tipos=["Tipo 1", "Tipo 4"], conts=["Europa"])),
+    ("status=na_data&data=2019-06-30&local=uf:am", Filtros(status_mode="na_data", ativos_em="2019-06-30",
+                                                           local=("uf", "AM"))),
+])
+def test_kpis_e_contagens_iguais_ao_motor(cliente, motor, query, f):
+    c, _ = cliente
+    k = c.get(f"/api/v1/kpis?{query}").get_json()
+    esperado = motor.kpis(f)
+    assert (k["acordos"], k["vigentes"], k["paises"], k["novos"]) == \
+           (esperado["total"], esperado["vigentes"], esperado["paises"], esperado["novos"])
+    assert k["modalidade_lider"] == esperado["modalidade_lider"]
+
+    modal = c.get(f"/api/v1/contagens/modalidade?{query}").get_json()
+    cont = motor.contagem(f, "modalidade").dropna()
+    assert {m["modalidade"]: m["acordos"] for m in modal} == dict(zip(cont["modalidade"], cont["qtd"]))
+
+    paises = c.get(f"/api/v1/contagens/pais?{query}").get_json()
+    pins = motor.pins_paises(f)
+    assert sum(p["acordos"] for p in paises) == pins["qtd"].sum()
+    assert sum(p["vigentes"] for p in paises) == pins.loc[pins["eh_vigente"].astype(bool), "qtd"].sum()
+
+    ufs = c.get(f"/api/v1/contagens/uf?{query}").get_json()
+    res = motor.resumo_ufs(f)
+    assert {u["uf"]: (u["acordos"], u["vigentes"]) for u in ufs} == \
+           {r.uf_sigla: (r.qtd, r.vigentes) for r in res.itertuples()}
+
+    anos = c.get(f"/api/v1/contagens/ano?{query}").get_json()
+    ev = motor.evolucao(f)
+    assert [a["ano"] for a in anos] == sorted(a["ano"] for a in anos)
+    assert sum(a["acordos"] for a in anos) == ev["qtd"].sum()
+
+
+def test_acordos_paginados(cliente, motor):
+    c, _ = cliente
+    r = c.get("/api/v1/acordos?pagina=2&por_pagina=50&status=vigentes", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["Content-Encoding"] == "gzip"
+    corpo = json.loads(gzip.decompress(r.data))
+    registros, total = motor.pagina(Filtros(status_mode="vigentes"), 2, 50)
+    assert corpo["total"] == total and corpo["acordos"] == registros
+
+
+def test_etag_pela_versao_e_304(cliente):
+    c, estado = cliente
+    r = c.get("/api/v1/kpis?tipo=Tipo 1&tipo=Tipo 2")
+    assert r.status_code == 200
+    assert r.headers["Cache-Control"] == f"public, max-age={api.API_MAX_AGE}"
+    tag = r.headers["ETag"]
+    assert tag.startswith('"v1-')
+
+    # mesma consulta em outra ordem/forma: mesmo ETag, 304 sem corpo e sem consultar
+    consultas = estado["consultas"]
+    r = c.get("/api/v1/kpis?tipo=Tipo 2,Tipo 1", headers={"If-None-Match": tag})
+    assert r.status_code == 304 and r.data == b"" and r.headers["ETag"] == tag
+    assert c.get("/api/v1/kpis?tipo=Tipo 2,Tipo 1", headers={"If-None-Match": f"W/{tag}"}).status_code == 304
+    assert estado["consultas"] == consultas
+
+    # filtros diferentes ou dados novos: outro ETag
+    assert c.get("/api/v1/kpis?tipo=Tipo 1", headers={"If-None-Match": tag}).status_code == 200
+    estado["versao"] = "v2"
+    r = c.get("/api/v1/kpis?tipo=Tipo 1&tipo=Tipo 2", headers={"If-None-Match": tag})
+    assert r.status_code == 200 and r.headers["ETag"].startswith('"v2-')
+
+
+def test_parametros_invalidos(cliente):
+    c, _ = cliente
+    for query in ("anos=20x", "anos=1-2-3", "status=ativos", "data=ontem", "local=cidade:Manaus",
+                  "por_pagina=0", "por_pagina=5000", "pagina=-1"):
+        rota = "acordos" if "pagina" in query else "kpis"
+        r = c.get(f"/api/v1/{rota}?{query}")
+        assert r.status_code == 400, query
+        assert "erro" in r.get_json()
+    assert c.get("/api/v1/contagens/cidade").status_code == 404
+    indice = c.get("/api/v1/").get_json()
+    assert indice["versao"] == "v1" and indice["opcoes"]["tipo"] == ["Tipo 1"]
@@ -0,0 +1,82 @@
+"""
+Testes do cache quente por popularidade dos filtros (aquecimento.py).
+
+Execução:
+    python -m pytest -q test_aquecimento.py
+"""
+
+import json
+
+from aquecimento import CacheQuente
+
+
+def _cache(tmp_path, top_k=2, orcamento=1000, sementes=()):
+    calculos = []
+    cache = CacheQuente(top_k, orcamento, tamanho=len, path=tmp_path / "pop.json", sementes=sementes)
+    cache.calculadoras["eco"] = lambda chave: calculos.append(chave) or "x" * chave[1]
+    return cache, calculos
+
+
+def test_aquece_os_mais_pedidos_e_conta_o_que_serviu(tmp_path):
+    cache, calculos = _cache(tmp_path)
+    for chave, vezes in ((("eco", 1), 3), (("eco", 2), 2), (("eco", 3), 1)):
+        for _ in range(vezes):
+            cache.obtem(chave, lambda: "frio")
+
+    cache.aquece()
+    assert calculos == [("eco", 1), ("eco", 2)]
+
+    assert cache.obtem(("eco", 1), lambda: "frio") == "x"
+    assert cache.obtem(("eco", 3), lambda: "frio") == "frio"
+    r = cache.relatorio()
+    assert (r["requisicoes"], r["servidas_pelo_cache"], r["estados_prontos"]) == (2, 1, 2)
+
+
+def test_orcamento_de_memoria_limita_o_aquecimento(tmp_path):
+    cache, _ = _cache(tmp_path, top_k=3, orcamento=5)
+    for n in (4, 3, 1):
+        cache.obtem(("eco", n), lambda: None)
+
+    cache.aquece()
+    r = cache.relatorio()
+    assert r["estados_prontos"] == 1 and r["bytes"] == 4
+
+
+def test_sementes_sem_historico_e_popularidade_persistida(tmp_path):
+    cache, calculos = _cache(tmp_path, sementes=lambda: [("eco", 7)])
+    cache.aquece()
+    assert calculos == [("eco", 7)]
+
+    cache.obtem(("eco", 5, ("uf", "AM")), lambda: None)
+    cache.salva()
+    outro, _ = _cache(tmp_path)
+    assert outro.mais_populares()[0] == ("eco", 5, ("uf", "AM"))
+
+
+def test_nova_carga_descarta_o_cache(tmp_path):
+    cache, _ = _cache(tmp_path)
+    cache.obtem(("eco", 1), lambda: None)
+    cache.aquece()
+    cache.invalida()
+    assert cache.obtem(("eco", 1), lambda: "recalculado") == "recalculado"
+
+
+def test_popularidade_limitada_e_somada_entre_workers(tmp_path):
+    a = CacheQuente(1, 1000, tamanho=len, path=tmp_path / "pop.json", max_estados=3)
+    b = CacheQuente(1, 1000, tamanho=len, path=tmp_path / "pop.json", max_estados=3)
+    for dia in range(20):                           # uma chave nova por dia ("ativos em")
+        a.obtem(("eco", dia), lambda: None)
+    for _ in range(5):
+        a.obtem(("eco", "padrao"), lambda: None)
+        b.obtem(("eco", "padrao"), lambda: None)
+    b.obtem(("eco", "so_b"), lambda: None)
+    b.obtem(("eco", "so_b"), lambda: None)
+    assert a.relatorio()["estados_distintos_vistos"] <= 2 * 3          # corte amortizado em memória
+
+    a.salva()
+    b.salva()
+    a.salva()                                       # sem nada novo: não soma de novo
+    salvos = {tuple(c): n for c, n in json.loads((tmp_path / "pop.json").read_text(encoding="utf-8"))}
+    assert len(salvos) == 3
+    assert salvos[("eco", "padrao")] == 10 and salvos[("eco", "so_b")] == 2
+    assert a.mais_populares() == [("eco", "padrao")]
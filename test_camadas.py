@@ -0,0 +1,151 @@
+"""
+Testes do motor de camadas vetoriais (camadas.py): consulta espacial pelo
+STRtree, simplificação em cache por zoom, recorte à janela e agregação de
+pontos em células hexagonais/quadradas.
+
+Execução:
+    python -m pytest -q test_camadas.py
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+import camadas
+from camadas import (CELULA_PX, ZOOM_MAX, MotorCamadas, binning, resume_campo, tamanho_celula_por_zoom,
+                     tolerancia_por_zoom)
+
+
+def _config(caminho):
+    layers = [{"id": "ucs-layer", "type": "geojson", "config": {"dataId": "ucs", "label": "UCs"}},
+              {"id": "queimadas-layer", "type": "point",
+               "config": {"dataId": "queimadas", "columns": {"lat": "latitude", "lng": "longitude"}}}]
+    tooltip = {"ucs": ["nome", "categoria"], "queimadas": ["data", "municipio"]}
+    caminho.write_text(json.dumps({
+        "datasets": [{"id": "ucs"}, {"id": "queimadas"}],
+        "config": {"visState": {"layers": layers, "interactionConfig": {"tooltip": {"fieldsToShow": tooltip}}}},
+    }), encoding="utf-8")
+
+
+def _poligono(lon, lat):
+    """Polígono estrelado (sempre simples) de ~0,9° com a borda serrilhada: muitos vértices para simplificar."""
+    a = np.linspace(0, 2 * np.pi, 800, endpoint=False)
+    raio = 0.45 * (1 + 0.01 * np.sin(97 * a))
+    return shapely.Polygon(np.column_stack([lon + 0.5 + raio * np.cos(a), lat + 0.5 + raio * np.sin(a)]))
+
+
+@pytest.fixture(scope="module")
+def motor(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp("camadas")
+    rng = np.random.default_rng(5)
+    geoms = [_poligono(lon, lat) for lon in range(-65, -55) for lat in range(-10, 0)]
+    feats = [{"type": "Feature", "properties": {"nome": f"UC {i}", "categoria": "PI" if i % 3 else "US"},
+              "geometry": json.loads(shapely.to_geojson(g))} for i, g in enumerate(geoms)]
+    (pasta / "ucs.geojson").write_text(json.dumps({"type": "FeatureCollection", "features": feats}))
+
+    n = 20_000
+    pd.DataFrame({
+        "latitude": rng.uniform(-10, 0, n), "longitude": rng.uniform(-65, -55, n),
+        "data": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 366, n), unit="D"),
+        "municipio": rng.choice(["Humaitá", "Lábrea", "Canutama"], n, p=[0.6, 0.3, 0.1]),
+    }).to_csv(pasta / "queimadas.csv", index=False)
+    _config(pasta / "config.json")
+    return MotorCamadas(pasta / "config.json", pasta)
+
+
+BBOX = (-62.3, -7.6, -59.1, -4.2)
+
+
+def test_poligonos_na_janela(motor):
+    camada = motor["ucs-layer"]
+    idx, recortes = camada.na_janela(BBOX, 6)
+    # STRtree: as mesmas feições da comparação com todas as geometrias
+    assert idx.tolist() == np.flatnonzero(shapely.intersects(camada.geoms, shapely.box(*BBOX))).tolist()
+    # recortadas à janela e não vazias
+    lon_min, lat_min, lon_max, lat_max = shapely.total_bounds(recortes)
+    assert lon_min >= BBOX[0] and lat_min >= BBOX[1] and lon_max <= BBOX[2] and lat_max <= BBOX[3]
+    assert not shapely.is_empty(recortes).any()
+
+    fc = motor.geojson_na_janela("ucs-layer", BBOX, 6)
+    assert [f["id"] for f in fc["features"]] == [str(i) for i in idx]
+    assert fc["features"][0]["properties"] == camada.props.iloc[idx[0]].to_dict()
+
+
+def test_simplificacao_em_cache_por_zoom(motor):
+    camada = motor["ucs-layer"].carregar()
+    baixo, alto = camada.simplificadas(3), camada.simplificadas(ZOOM_MAX)
+    assert camada.simplificadas(3) is baixo                      # calculada uma vez por nível
+    assert camada.simplificadas(99) is alto and camada.simplificadas(-2) is camada.simplificadas(0)
+    vertices = lambda g: shapely.get_num_coordinates(g).sum()
+    assert vertices(baixo) < vertices(alto) <= vertices(camada.geoms)
+    assert shapely.is_valid(baixo).all()
+    # a simplificação não desloca a forma além da tolerância do nível
+    assert (shapely.hausdorff_distance(baixo, camada.geoms) <= tolerancia_por_zoom(3) * 1.01).all()
+
+
+@pytest.mark.parametrize("grade", ["hex", "quadrada"])
+def test_binning_celula_mais_proxima(grade):
+    rng = np.random.default_rng(1)
+    lon, lat, tamanho = rng.uniform(-70, -50, 5000), rng.uniform(-15, 5, 5000), 0.37
+    celula, lon_c, lat_c = binning(lon, lat, tamanho, grade)
+    assert len(np.unique(celula)) == len(lon_c)
+    dlon, dlat = lon - lon_c[celula], lat - lat_c[celula]
+    if grade == "quadrada":
+        assert (np.abs(dlon) <= tamanho / 2 + 1e-9).all() and (np.abs(dlat) <= tamanho / 2 + 1e-9).all()
+        return
+    # hexágono de raio `tamanho`: dentro do círculo circunscrito e no centro mais próximo da grade
+    assert (np.hypot(dlon, dlat) <= tamanho + 1e-9).all()
+    vizinhos = tamanho * np.sqrt(3) * np.array([[np.cos(a), np.sin(a)] for a in np.radians(np.arange(0, 360, 60))])
+    proprio = np.hypot(dlon, dlat)
+    for vx, vy in vizinhos:
+        assert (proprio <= np.hypot(dlon - vx, dlat - vy) + 1e-9).all()
+
+
+def test_resume_campo():
+    celula = np.array([0, 0, 1, 1, 1, 2])
+    datas = pd.Series(pd.to_datetime(["2024-01-02", "2024-03-04", "2024-05-06", None, "2024-05-06", None]))
+    assert resume_campo(celula, 3, datas).tolist() == ["02/01/2024 – 04/03/2024", "06/05/2024", "—"]
+    assert resume_campo(celula, 3, pd.Series([1.0, 2.0, 3.0, np.nan, 5.0, np.nan]))[:2].tolist() == [1.5, 4.0]
+    textos = pd.Series(["A", "A", "B", "C", "C", None])
+    assert resume_campo(celula, 3, textos).tolist() == ["A", "C (+1)", "—"]
+
+
+@pytest.mark.parametrize("grade", ["hex", "quadrada"])
+def test_agregacao_por_zoom_e_periodo(motor, grade):
+    camada = motor["queimadas-layer"]
+    agg = camada.agregacao(6, grade=grade)
+    assert agg["qtd"].sum() == len(camada.lon) and (agg["qtd"] > 0).all()
+    assert camada.agregacao(6.2, grade=grade) is agg                 # mesmo nível: do cache
+    assert list(agg.columns) == ["lon", "lat", "qtd", "data", "municipio"]
+
+    # raio do hexágono = metade da célula: 2·raio = CELULA_PX, o tamanho do marcador
+    lado = tamanho_celula_por_zoom(6)
+    assert np.isclose(lado, CELULA_PX * 360 / (256 * 2 ** 6))
+    celula, _, _ = binning(camada.lon, camada.lat, lado / 2 if grade == "hex" else lado, grade)
+    assert len(agg) == celula.max() + 1
+    assert len(camada.agregacao(4, grade=grade)) < len(agg)          # zoom menor, células maiores
+
+    periodo = ("2024-03-01", "2024-03-31")
+    no_mes = camada.agregacao(6, periodo, grade)
+    datas = pd.Series(camada.datas)
+    assert no_mes["qtd"].sum() == datas.between("2024-03-01", "2024-03-31 23:59").sum()
+    assert no_mes["data"].str.contains("/03/2024").all()
+
+
+def test_pontos_na_janela_crus_ou_agregados(motor, monkeypatch):
+    camada = motor["queimadas-layer"].carregar()
+    dentro = (camada.lon >= BBOX[0]) & (camada.lon <= BBOX[2]) & (camada.lat >= BBOX[1]) & (camada.lat <= BBOX[3])
+
+    agregado, pts = motor.pontos_na_janela("queimadas-layer", BBOX, 8)
+    assert not agregado and len(pts) == dentro.sum()
+    assert pts["lon"].tolist() == camada.lon[dentro].tolist()
+    assert pts["municipio"].tolist() == camada.props["municipio"][dentro].tolist()
+
+    monkeypatch.setattr(camadas, "PONTOS_MAX_BRUTOS", 100)
+    agregado, cel = motor.pontos_na_janela("queimadas-layer", BBOX, 8, grade="quadrada")
+    assert agregado and len(cel) < dentro.sum()
+    assert cel["lon"].between(BBOX[0], BBOX[2]).all() and cel["lat"].between(BBOX[1], BBOX[3]).all()
+    assert cel["municipio"].str.startswith("Humaitá").mean() > 0.5    # o mais frequente vence na célula
@@ -0,0 +1,137 @@
+"""
+Testes de "última requisição vence" por página (coalescencia.py).
+
+Execução:
+    python -m pytest -q test_coalescencia.py
+"""
+
+import threading
+
+import pytest
+from dash.exceptions import PreventUpdate
+from flask import Flask
+
+from coalescencia import CABECALHO_PAGINA, COOKIE_SESSAO, Superada, UltimaVence, _edicoes, instala_cookie
+
+
+def _registro():
+    atual = threading.local()
+    return atual, UltimaVence(sessao=lambda: getattr(atual, "id", None))
+
+
+def test_chamada_superada_para_no_ponto_de_verificacao():
+    atual, ultima = _registro()
+    comecou, liberar = threading.Event(), threading.Event()
+    resultados = {}
+
+    @ultima("desenha")
+    def desenha(n):
+        if n == 1:
+            comecou.set()
+            liberar.wait(5)
+        ultima.checa()
+        return n
+
+    def chama(sessao, n):
+        atual.id = sessao
+        try:
+            resultados[(sessao, n)] = desenha(n)
+        except PreventUpdate as e:
+            resultados[(sessao, n)] = type(e)
+
+    antiga = threading.Thread(target=chama, args=("a", 1))
+    antiga.start()
+    comecou.wait(5)
+    chama("a", 2)           # edição mais nova na mesma sessão
+    chama("b", 3)           # outra sessão não interfere
+    liberar.set()
+    antiga.join()
+
+    assert resultados == {("a", 1): Superada, ("a", 2): 2, ("b", 3): 3}
+    r = ultima.relatorio()
+    assert r["sessoes"] == 2
+    assert r["callbacks"]["desenha"] == {"chamadas": 3, "entregues": 2, "interrompidas": 1}
+
+
+def test_resultado_que_termina_superado_nao_e_entregue():
+    atual, ultima = _registro()
+    atual.id = "s"
+
+    @ultima("tabela")
+    def tabela():
+        ultima.registra("s", "tabela")     # chegou outra chamada enquanto esta calculava
+        return "velha"
+
+    with pytest.raises(PreventUpdate):
+        tabela()
+    assert ultima.relatorio()["callbacks"]["tabela"]["superadas_ao_fim"] == 1
+
+
+def test_fora_de_requisicao_nao_coalesce():
+    ultima = UltimaVence()      # sessão pelo cookie: sem requisição Flask não há sessão
+    chamadas = []
+
+    @ultima("desenha")
+    def desenha():
+        ultima.checa()
+        chamadas.append(1)
+        return "ok"
+
+    assert desenha() == "ok" and desenha() == "ok" and len(chamadas) == 2
+    assert ultima.relatorio()["callbacks"] == {}
+
+
+def test_cookie_de_sessao():
+    server = Flask(__name__)
+    instala_cookie(server)
+    server.add_url_rule("/", "raiz", lambda: "ok")
+    cliente = server.test_client()
+
+    primeira = cliente.get("/")
+    assert COOKIE_SESSAO in primeira.headers.get("Set-Cookie", "")
+    assert "Set-Cookie" not in cliente.get("/").headers       # já tem o cookie
+
+
+def test_abas_do_mesmo_navegador_nao_se_superam():
+    server = Flask(__name__)
+    ultima = UltimaVence()          # sessão da requisição: cookie + cabeçalho da página
+    comecou, liberar = threading.Event(), threading.Event()
+
+    @ultima("desenha")
+    def desenha(n):
+        if n == 1:
+            comecou.set()
+            liberar.wait(5)
+        ultima.checa()
+        return str(n)
+
+    server.add_url_rule("/<int:n>", "desenha", desenha)
+    server.register_error_handler(PreventUpdate, lambda e: ("", 204))     # como o Dash responde
+    respostas = {}
+
+    def chama(pagina, n):
+        cliente = server.test_client()
+        cliente.set_cookie(COOKIE_SESSAO, "navegador-1")          # o mesmo cookie em todas as abas
+        r = cliente.get(f"/{n}", headers={CABECALHO_PAGINA: pagina} if pagina else {})
+        respostas[(pagina, n)] = r.status_code if r.status_code != 200 else r.text
+
+    def rodada(lenta, rapida):
+        comecou.clear(), liberar.clear()
+        th = threading.Thread(target=chama, args=(lenta, 1))
+        th.start()
+        comecou.wait(5)
+        chama(rapida, 2)
+        liberar.set()
+        th.join()
+
+    rodada("aba-a", "aba-b")        # outra aba: as duas respostas chegam
+    assert respostas[("aba-a", 1)] == "1" and respostas[("aba-b", 2)] == "2"
+    rodada("aba-a", "aba-a")        # mesma aba: a edição mais nova vence
+    assert respostas[("aba-a", 1)] == 204 and respostas[("aba-a", 2)] == "2"
+    assert ultima.relatorio()["sessoes"] == 2
+
+
+def test_debounce_solta_so_a_ultima_da_rajada():
+    assert _edicoes(4, 0.1, 0) == [0, 0.1, 0.2, pytest.approx(0.3)]
+    assert _edicoes(4, 0.1, 0.3) == [pytest.approx(0.6)]
+    assert len(_edicoes(3, 0.5, 0.3)) == 3                     # edições espaçadas passam todas
@@ -0,0 +1,82 @@
+"""
+Testes dos filtros cruzados (cruzados.py): fatias do agregado x motor.
+
+Execução:
+    python -m pytest -q test_cruzados.py
+"""
+
+import pandas as pd
+import pytest
+
+import cruzados
+from consultas import Filtros, MotorPandas, dados_sinteticos
+
+GLOBAIS = [
+    Filtros(),
+    Filtros(ano=(2012, 2020), status_mode="vigentes"),
+    Filtros(tipos=["Tipo 1", "Tipo 4"], conts=["Europa", "América do Sul"]),
+    Filtros(status_mode="na_data", ativos_em="2019-06-30"),
+]
+
+CRUZADOS = [
+    {},
+    {"modalidade": "Convênio"},
+    {"ano": 2016},
+    {"local": ("pais", "P07")},
+    {"local": ("uf", "AM"), "modalidade": "Termo Aditivo"},
+    {"modalidade": "Carta Convite", "ano": 2019, "local": ("pais", "BRA")},
+    {"ano": 1990},      # fora do período: seleção vazia
+]
+
+CONSULTAS = [
+    ("pins_paises", ()),
+    ("pins_ufs", ()),
+    ("resumo_ufs", ()),
+    ("contagem", ("modalidade", "Termo Aditivo")),
+    ("contagem", ("pais",)),
+    ("evolucao", ()),
+]
+
+
+@pytest.fixture(scope="module")
+def motor():
+    return MotorPandas(dados_sinteticos(5000, seed=11))
+
+
+def _normaliza(r):
+    if isinstance(r, pd.DataFrame):
+        return r.reset_index(drop=True).astype(object).where(r.notna(), None).values.tolist()
+    return r
+
+
+@pytest.mark.parametrize("cruz", CRUZADOS, ids=repr)
+@pytest.mark.parametrize("f", GLOBAIS, ids=repr)
+def test_fatia_do_agregado_igual_ao_motor(motor, f, cruz):
+    ag = cruzados.fatia(motor.agregado(f), cruz)
+    fc = cruzados.aplica(f, cruz)
+
+    for nome, args in CONSULTAS:
+        assert _normaliza(getattr(cruzados, nome)(ag, *args)) == \
+               _normaliza(getattr(motor, nome)(fc, *args)), nome
+    k_motor = motor.kpis(fc)
+    assert cruzados.kpis(ag, k_motor["ano_novos"]) == k_motor
+
+
+def test_cada_grafico_ignora_a_propria_dimensao(motor):
+    f, cruz = Filtros(), {"modalidade": "Convênio", "ano": 2016}
+    ag = motor.agregado(f)
+
+    pizza = cruzados.contagem(cruzados.fatia(ag, cruz, exceto="modalidade"), "modalidade")
+    assert len(pizza) > 1           # a pizza continua mostrando as outras modalidades
+    assert _normaliza(pizza) == _normaliza(motor.contagem(Filtros(ano=2016), "modalidade"))
+
+    evol = cruzados.evolucao(cruzados.fatia(ag, cruz, exceto="ano"))
+    assert _normaliza(evol) == _normaliza(motor.evolucao(Filtros(modalidades=["Convênio"])))
+
+
+def test_normaliza_e_rotulos():
+    cruz = cruzados.normaliza({"ano": "2020", "local": ["uf", "AM"], "modalidade": None, "outra": 1})
+    assert cruz == {"ano": 2020, "local": ("uf", "AM")}
+    assert cruzados.chave(cruz) == (("ano", 2020), ("local", ("uf", "AM")))
+    assert cruzados.rotulo("local", ("uf", "AM")) == "UF: AM"
+    assert cruzados.aplica(Filtros(modalidades=["Convênio"]), {"modalidade": "Outra"}).modalidades == [cruzados.NENHUM]
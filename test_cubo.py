@@ -0,0 +1,80 @@
+"""
+Testes do cubo de somas de prefixo por ano (cubo.py).
+
+Execução:
+    python -m pytest -q test_cubo.py
+"""
+
+import pandas as pd
+import pytest
+
+from consultas import ANO_ATUAL, Filtros, dados_sinteticos, filtra_df
+from cubo import CuboAnual
+
+FILTROS = [
+    Filtros(),
+    Filtros(ano=2015),
+    Filtros(ano=(2011, 2020), status_mode="vigentes"),
+    Filtros(ano=(2018, 2030), tipos=["Tipo 4", "Tipo 9"], conts=["África"]),
+    Filtros(ano=(1990, 1995)),              # período sem acordos
+    Filtros(modalidades=["Convênio", "Termo Aditivo"], conts=["Europa", "sem registro"]),
+]
+
+
+@pytest.fixture(scope="module")
+def dados():
+    return dados_sinteticos(4000, seed=3)
+
+
+@pytest.mark.parametrize("f", FILTROS, ids=repr)
+def test_kpis_iguais_as_linhas(dados, f):
+    k = CuboAnual(dados).kpis(f, ANO_ATUAL)
+    dff = filtra_df(dados, f)
+    ano = pd.to_numeric(dff["ano_assinatura"], errors="coerce")
+    if k is None:   # só com empate na modalidade líder
+        cont = dff["modalidade"].value_counts()
+        assert (cont == cont.max()).sum() > 1
+        return
+
+    assert k["total"] == len(dff)
+    assert k["vigentes"] == dff["eh_vigente"].sum()
+    assert k["paises"] == dff.loc[dff["nivel_localizacao"] == "pais", "codigo_iso3"].nunique()
+    assert k["novos"] == (ano == k["ano_novos"]).sum()
+    assert k["ano_novos"] == (f.anos[1] if f.anos else ANO_ATUAL)
+    if len(dff):
+        assert (k["modalidade_lider"], k["modalidade_lider_qtd"]) == \
+               (dff["modalidade"].value_counts().idxmax(), dff["modalidade"].value_counts().max())
+
+
+@pytest.mark.parametrize("f", FILTROS, ids=repr)
+def test_evolucao_igual_as_linhas(dados, f):
+    ev = CuboAnual(dados).evolucao(f)
+    dff = filtra_df(dados, f)
+    ref = (dff.assign(ano_assinatura=pd.to_numeric(dff["ano_assinatura"], errors="coerce"))
+              .dropna(subset=["ano_assinatura"])
+              .groupby(["ano_assinatura", "eh_vigente"]).size())
+
+    assert list(zip(ev["ano_assinatura"], ev["eh_vigente"], ev["qtd"])) == \
+           [(int(a), v, n) for (a, v), n in ref.items()]
+
+
+def test_empate_na_modalidade_fica_para_as_linhas():
+    dados = dados_sinteticos(2, seed=0).assign(modalidade=["Convênio", "Carta Convite"])
+    assert CuboAnual(dados).kpis(Filtros(), ANO_ATUAL) is None
+
+
+def test_cubo_por_diferenca_igual_ao_recalculado(dados):
+    novo = dados.drop(index=dados.index[:300])                              # removidas
+    alteradas = novo.index[:200]
+    novo.loc[alteradas, "tipo"] = "Tipo novo"                               # valor que o cubo não tinha
+    novo.loc[alteradas[:50], "ano_assinatura"] = 1980                        # ano novo
+    novo = pd.concat([novo, dados_sinteticos(250, seed=9)], ignore_index=True)   # adicionadas
+    saidas = pd.concat([dados.iloc[:300], dados.loc[alteradas]])
+    entradas = pd.concat([novo.iloc[:200], novo.iloc[-250:]])
+
+    cubo = CuboAnual(dados).aplica(saidas, entradas)
+    ref = CuboAnual(novo)
+    for f in FILTROS + [Filtros(tipos=["Tipo novo"]), Filtros(ano=(1970, 1985))]:
+        assert cubo.kpis(f, ANO_ATUAL) == ref.kpis(f, ANO_ATUAL), f
+        pd.testing.assert_frame_equal(cubo.evolucao(f), ref.evolucao(f))
+    assert cubo.celulas == ref.celulas
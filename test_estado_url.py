@@ -0,0 +1,79 @@
+"""
+Testes do estado na URL (estado_url.py): ida e volta da query string,
+padrões fora da URL e cache da página inicial com ETag/304.
+
+Execução:
+    python -m pytest -q test_estado_url.py
+"""
+
+import json
+from datetime import date
+
+from flask import Flask
+
+import estado_url
+
+
+def test_ida_e_volta():
+    e = {**estado_url.padrao(), "anos": (2015, 2020), "tipos": ["Tipo 2", "Tipo 1"], "conts": ["Europa"],
+         "status": "na_data", "data": "2019-06-30", "modo": "br", "local": ("uf", "AM"), "perfil": ("pais", "ARG"),
+         "versao": "abc123"}
+    busca = estado_url.codifica(e)
+    assert busca == ("?anos=2015-2020&tipo=Tipo+1&tipo=Tipo+2&continente=Europa&status=na_data"
+                     "&data=2019-06-30&modo=br&local=uf%3AAM&perfil=pais%3AARG&versao=abc123")
+    volta = estado_url.decodifica(busca)
+    assert volta == {**e, "tipos": ["Tipo 1", "Tipo 2"]}
+    assert estado_url.codifica(volta) == busca
+
+
+def test_padroes_ficam_fora_da_url():
+    assert estado_url.codifica(estado_url.padrao()) == ""
+    assert estado_url.codifica({**estado_url.padrao(), "data": date.today().isoformat()}) == ""
+    assert estado_url.decodifica("") == estado_url.padrao()
+    # a mesma visão escrita de outro jeito normaliza para a mesma URL
+    assert estado_url.codifica(estado_url.decodifica("?modo=br&tipo=B,A&local=uf:am")) == \
+           estado_url.codifica(estado_url.decodifica("?local=uf:AM&tipo=A&tipo=B&modo=br"))
+
+
+def test_parametros_invalidos_sao_ignorados():
+    e = estado_url.decodifica("?anos=20x&modo=lua&data=ontem&perfil=cidade:Manaus")
+    assert e == estado_url.padrao()
+    # modo válido sobrevive a um filtro inválido
+    assert estado_url.decodifica("?status=ativos&modo=br")["modo"] == "br"
+    # KPIs por acordo distinto (processos.py): só "1" liga
+    assert estado_url.codifica(estado_url.decodifica("?distintos=1")) == "?distintos=1"
+    assert estado_url.decodifica("?distintos=sim") == estado_url.padrao()
+
+
+def test_cache_do_layout_por_estado_da_url():
+    versao = {"v": "v1"}
+    montagens = []
+    server = Flask(__name__)
+
+    @server.route(estado_url.ROTA_LAYOUT)
+    def layout():
+        montagens.append(estado_url.busca_da_pagina())
+        return server.response_class(json.dumps({"busca": montagens[-1]}), mimetype="application/json")
+
+    cache = estado_url.CacheLayout(lambda: versao["v"])
+    cache.instala(server)
+    c = server.test_client()
+    ref = {"Referer": "http://painel/?modo=br&status=vigentes"}
+
+    r = c.get(estado_url.ROTA_LAYOUT, headers=ref)
+    assert r.status_code == 200 and r.get_json() == {"busca": "modo=br&status=vigentes"}
+    assert r.headers["Cache-Control"] == "no-cache" and r.headers["Vary"] == "Referer"
+    tag = r.headers["ETag"]
+
+    # mesma visão (outra ordem): corpo guardado, 304 com o ETag
+    outra = {"Referer": "http://painel/?status=vigentes&modo=br"}
+    assert c.get(estado_url.ROTA_LAYOUT, headers=outra).data == r.data
+    assert c.get(estado_url.ROTA_LAYOUT, headers={**outra, "If-None-Match": tag}).status_code == 304
+    assert len(montagens) == 1
+
+    # outra visão ou dados novos: monta de novo
+    assert c.get(estado_url.ROTA_LAYOUT).headers["ETag"] != tag
+    versao["v"] = "v2"
+    assert c.get(estado_url.ROTA_LAYOUT, headers={**ref, "If-None-Match": tag}).status_code == 200
+    assert len(montagens) == 3
+    assert cache.relatorio() == {"guardadas": 3, "montadas": 3, "servidas_do_cache": 1}
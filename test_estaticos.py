@@ -0,0 +1,96 @@
+"""
+Testes dos assets locais (estaticos.py): build com downloads simulados e rota com cache longo.
+
+Execução:
+    python -m pytest -q test_estaticos.py
+"""
+
+import gzip
+import re
+
+import pytest
+from flask import Flask
+
+import estaticos
+
+CSS_ICONES = ('.bi-funnel-fill::before { content: "\\f3e1"; }\n'
+              '.bi-alarm::before { content: "\\f102"; }\n')
+
+
+@pytest.fixture
+def origens():
+    return {
+        estaticos.CDN["bootstrap.css"]: b".btn{color:red}" * 200,
+        estaticos.CDN["bandeira-br.png"]: b"\x89PNG fake",
+        estaticos.CDN["icones.css"]: CSS_ICONES.encode(),
+        estaticos.ORIGENS["icones_fonte"]: b"wOF2 icones",
+        estaticos.ORIGENS["twemoji"]: b"\x00\x01\x00\x00 twemoji",
+        **{estaticos.ORIGENS["inter"].format(peso=p): f"wOF2 inter {p}".encode() for p in estaticos.PESOS_INTER},
+    }
+
+
+@pytest.fixture
+def construido(tmp_path, origens, monkeypatch):
+    monkeypatch.setattr(estaticos, "ft_subset", None)       # fontes falsas: sem subconjunto
+    codigo = tmp_path / "ui.py"
+    codigo.write_text('html.I(className="bi bi-funnel-fill"); kpi_card("Total", icon="📅"); "⚠️ aviso"',
+                      encoding="utf-8")
+    destino = tmp_path / "vendor"
+    return destino, estaticos.constroi(destino, baixa=origens.__getitem__, codigo=[codigo])
+
+
+def test_build_grava_com_hash_e_pre_comprimido(construido):
+    destino, m = construido
+    assert set(m["entradas"]) == {"bootstrap.css", "bandeira-br.png", "fontes.css", "icones.css"}
+    assert m["icones"] == ["funnel-fill"] and m["emojis"] == ["⚠️", "📅"]
+    for nome in m["arquivos"]:
+        assert re.search(r"\.[0-9a-f]{10}\.\w+$", nome)
+        assert (destino / nome).exists()
+    css = m["entradas"]["bootstrap.css"]
+    assert gzip.decompress((destino / f"{css}.gz").read_bytes()) == (destino / css).read_bytes()
+    assert not (destino / f"{m['entradas']['bandeira-br.png']}.gz").exists()     # png não é recomprimido
+
+    fontes = (destino / m["entradas"]["fontes.css"]).read_text()
+    assert fontes.count('font-family:"Inter"') == 4 and 'font-family:"Twemoji INPA"' in fontes
+    assert "unicode-range:U+26A0,U+FE0F,U+1F4C5}" in fontes          # ⚠️ (com seletor de variação) e 📅
+    icones = (destino / m["entradas"]["icones.css"]).read_text()
+    assert ".bi-funnel-fill::before" in icones and "alarm" not in icones     # só os ícones usados
+
+
+def test_rebuild_remove_arquivos_antigos(construido, origens):
+    destino, m = construido
+    origens[estaticos.CDN["bootstrap.css"]] = b".btn{color:blue}"
+    novo = estaticos.constroi(destino, baixa=origens.__getitem__, codigo=[destino.parent / "ui.py"])
+    assert novo["entradas"]["bootstrap.css"] != m["entradas"]["bootstrap.css"]
+    assert not (destino / m["entradas"]["bootstrap.css"]).exists()
+    assert estaticos.carrega_manifesto(destino) == novo
+
+
+def test_falha_no_download_cai_na_cdn(tmp_path):
+    m = estaticos.constroi(tmp_path, baixa=lambda url: (_ for _ in ()).throw(OSError("sem rede")), codigo=[])
+    assert m["entradas"] == {}
+    assert estaticos.folhas_de_estilo(m)[0] == estaticos.CDN["bootstrap.css"]
+    assert estaticos.scripts(m) == estaticos.CDN_SCRIPTS
+    assert estaticos.carrega_manifesto(tmp_path / "nao_existe") == {}
+
+
+def test_rota_serve_com_cache_longo_e_compressao(construido):
+    destino, m = construido
+    server = Flask(__name__)
+    estaticos.instala_rota(server, m, destino)
+    cliente = server.test_client()
+    url = estaticos.url(m, "bootstrap.css")
+    assert url.startswith(estaticos.ROTA + "/") and estaticos.scripts(m) == []
+
+    r = cliente.get(url, headers={"Accept-Encoding": "gzip"})
+    assert r.headers["Content-Encoding"] == "gzip" and r.mimetype == "text/css"
+    assert r.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert "Content-Encoding" not in cliente.get(url).headers
+    assert cliente.get(f"{estaticos.ROTA}/manifesto.json").status_code == 404
+    assert cliente.get(f"{estaticos.ROTA}/..%2Fapp.py").status_code == 404
+
+
+def test_dash_ignora_so_os_arquivos_com_hash():
+    ignora = re.compile(estaticos.IGNORAR_NO_DASH)
+    assert ignora.search("bootstrap.0123456789.css") and ignora.search("emoji.abcdef0123.js")
+    assert not ignora.search("styles.css")
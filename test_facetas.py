@@ -0,0 +1,55 @@
+"""
+Testes das contagens por faceta dos dropdowns (facetas.py).
+
+Execução:
+    python -m pytest -q test_facetas.py
+"""
+
+import pandas as pd
+import pytest
+
+from consultas import Filtros, dados_sinteticos, filtra_df
+from facetas import DIMENSOES, IndiceFacetas, opcoes_com_contagem
+
+
+@pytest.fixture(scope="module")
+def dados():
+    d = dados_sinteticos(3000, seed=11)
+    d.loc[d.index[::97], "tipo"] = None          # valores ausentes não contam em filtro ativo
+    return d
+
+
+@pytest.mark.parametrize("f", [
+    Filtros(),
+    Filtros(ano=2021, status_mode="vigentes"),
+    Filtros(ano=(2014, 2018), tipos=["Tipo 2"]),
+    Filtros(conts=["Europa"], status_mode="na_data", ativos_em="2020-02-29"),
+    Filtros(tipos=["Tipo 1", "Tipo 3"], conts=["Europa"]),
+    Filtros(ano="2019", modalidades=["Carta Convite"], conts=["Ásia", "América do Sul"]),
+], ids=repr)
+def test_igual_a_filtrar_por_opcao(dados, f):
+    qtd = IndiceFacetas(dados).contagens(f)
+
+    for nome, coluna in DIMENSOES.items():
+        # referência ingênua: filtra de novo para cada opção, só trocando a faceta em questão
+        for valor, n in qtd[nome].items():
+            outro = Filtros(**{**_campos(f), nome: valor if nome == "ano" else [valor]})
+            assert n == len(filtra_df(dados, outro)), (nome, valor)
+    assert qtd["_total"] == len(filtra_df(dados, Filtros(**{**_campos(f), "ano": "Todos"})))
+
+
+def _campos(f):
+    return dict(ano=f.anos, tipos=f.tipos, conts=f.conts, modalidades=f.modalidades, status_mode=f.status_mode,
+                ativos_em=f.ativos_em)
+
+
+def test_opcoes_com_contagem():
+    opcoes = opcoes_com_contagem(["Todos", 2020, 2021], {2020: 4}, todos=4)
+    assert [o["label"] for o in opcoes] == ["Todos (4)", "2020 (4)", "2021 (0)"]
+    assert [o["value"] for o in opcoes] == ["Todos", 2020, 2021]
+
+
+def test_indice_ignora_opcao_inexistente(dados):
+    qtd = IndiceFacetas(dados).contagens(Filtros(tipos=["não existe"]))
+    assert sum(qtd["conts"].values()) == 0
+    assert sum(qtd["tipos"].values()) == pd.notna(dados["tipo"]).sum()
@@ -0,0 +1,130 @@
+"""
+Testes do download condicional (fetch.py) contra um servidor HTTP local.
+
+O servidor stub responde com ETag/Last-Modified e devolve 304 quando os
+validadores enviados pelo cliente batem com o conteúdo atual.
+
+Execução:
+    python -m pytest -q test_fetch.py
+"""
+
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetch import fetch_to_file, meta_path_for
+
+
+class StubState:
+    def __init__(self):
+        self.corpo = b"versao-1" * 1000
+        self.etag = '"v1"'
+        self.last_modified = formatdate(1_700_000_000, usegmt=True)
+        self.status_forcado = None
+        self.requisicoes = []   # (path, If-None-Match, If-Modified-Since, status)
+
+
+@pytest.fixture
+def stub():
+    estado = StubState()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            inm = self.headers.get("If-None-Match")
+            ims = self.headers.get("If-Modified-Since")
+            if estado.status_forcado:
+                status = estado.status_forcado
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif inm == estado.etag or (inm is None and ims == estado.last_modified):
+                status = 304
+                self.send_response(304)
+                self.end_headers()
+            else:
+                status = 200
+                self.send_response(200)
+                self.send_header("ETag", estado.etag)
+                self.send_header("Last-Modified", estado.last_modified)
+                self.send_header("Content-Length", str(len(estado.corpo)))
+                self.end_headers()
+                self.wfile.write(estado.corpo)
+            estado.requisicoes.append((self.path, inm, ims, status))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    estado.url = f"http://127.0.0.1:{server.server_address[1]}/planilha.xlsx"
+    yield estado
+    server.shutdown()
+    server.server_close()
+
+
+def test_primeiro_download_grava_arquivo_e_validadores(stub, tmp_path):
+    dest = tmp_path / "sheet_cache.xlsx"
+    r = fetch_to_file(stub.url, dest)
+
+    assert r.modificado and r.status == 200
+    assert dest.read_bytes() == stub.corpo
+    assert r.bytes_baixados == len(stub.corpo)
+    assert meta_path_for(dest).exists()
+    assert stub.requisicoes[-1][1:3] == (None, None)
+
+
+def test_revalidacao_sem_mudanca_retorna_304(stub, tmp_path):
+    dest = tmp_path / "sheet_cache.xlsx"
+    fetch_to_file(stub.url, dest)
+    mtime = dest.stat().st_mtime_ns
+
+    r = fetch_to_file(stub.url, dest)
+
+    assert not r.modificado and r.status == 304
+    assert r.bytes_baixados == 0
+    assert dest.stat().st_mtime_ns == mtime
+    assert stub.requisicoes[-1][1] == '"v1"'
+    assert stub.requisicoes[-1][2] == stub.last_modified
+
+
+def test_conteudo_novo_substitui_arquivo(stub, tmp_path):
+    dest = tmp_path / "sheet_cache.xlsx"
+    fetch_to_file(stub.url, dest)
+
+    stub.corpo, stub.etag = b"versao-2", '"v2"'
+    r = fetch_to_file(stub.url, dest)
+
+    assert r.modificado and r.etag == '"v2"'
+    assert dest.read_bytes() == b"versao-2"
+
+
+def test_erro_http_preserva_copia_local(stub, tmp_path):
+    dest = tmp_path / "sheet_cache.xlsx"
+    fetch_to_file(stub.url, dest)
+    dest.unlink()  # sem cópia local: validadores não devem ser enviados
+    stub.status_forcado = 500
+
+    with pytest.raises(Exception):
+        fetch_to_file(stub.url, dest)
+    assert stub.requisicoes[-1][1:3] == (None, None)
+
+    stub.status_forcado = None
+    fetch_to_file(stub.url, dest)
+    stub.status_forcado = 503
+    with pytest.raises(Exception):
+        fetch_to_file(stub.url, dest)
+    assert dest.read_bytes() == stub.corpo
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_url_diferente_nao_reaproveita_validadores(stub, tmp_path):
+    dest = tmp_path / "sheet_cache.xlsx"
+    fetch_to_file(stub.url, dest)
+
+    r = fetch_to_file(stub.url + "?format=csv", dest)
+
+    assert r.modificado
+    assert stub.requisicoes[-1][1:3] == (None, None)
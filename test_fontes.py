@@ -0,0 +1,105 @@
+"""
+Testes da ingestão de várias fontes (fontes.py).
+
+Execução:
+    python -m pytest -q test_fontes.py
+"""
+
+import time
+
+import pandas as pd
+import pytest
+
+import fontes
+from fontes import Fonte, ingere_fontes
+
+
+@pytest.fixture(autouse=True)
+def estado_limpo(monkeypatch, tmp_path):
+    monkeypatch.setattr(fontes, "_memo", {})
+    monkeypatch.setattr(fontes, "_ultimos", {})
+    monkeypatch.setattr(fontes, "FONTES_CACHE_DIR", tmp_path / "cache")
+
+
+def _planilha(n, inicio=0):
+    return pd.DataFrame({
+        "NÚMERO": [f"01280.{i:06d}/2024-00" for i in range(inicio, inicio + n)],
+        "STATUS": ["VIGENTE"] * n,
+        "PAÍS/ESTADO (ISO3/UF)": ["França (FRA)"] * n,
+    })
+
+
+@pytest.fixture
+def arquivos(tmp_path):
+    csv_path = tmp_path / "a.csv"
+    _planilha(3).to_csv(csv_path, index=False)
+    xlsx_path = tmp_path / "b.xlsx"
+    with pd.ExcelWriter(xlsx_path) as w:
+        _planilha(1, 100).to_excel(w, sheet_name="Capa", index=False)
+        _planilha(2, 200).to_excel(w, sheet_name="Acordos", index=False)
+    return csv_path, xlsx_path
+
+
+def test_junta_arquivos_e_abas_com_coluna_fonte(arquivos):
+    csv_path, xlsx_path = arquivos
+    df, relatorios, _ = ingere_fontes([
+        Fonte("csv", arquivo=csv_path),
+        Fonte("acordos", arquivo=xlsx_path, aba="Acordos"),
+    ])
+
+    assert df["fonte"].tolist() == ["csv"] * 3 + ["acordos"] * 2
+    assert df["NÚMERO"].iloc[-1] == "01280.000201/2024-00"
+    assert [r.estado for r in relatorios] == ["ok", "ok"]
+    assert all(r.parse_s is not None for r in relatorios)
+
+
+def test_fonte_com_erro_nao_impede_as_demais(arquivos, tmp_path):
+    csv_path, _ = arquivos
+    df, relatorios, partes = ingere_fontes([
+        Fonte("quebrada", arquivo=tmp_path / "nao_existe.xlsx"),
+        Fonte("csv", arquivo=csv_path),
+    ])
+
+    assert list(partes) == ["csv"] and len(df) == 3
+    assert relatorios[0].estado == "falhou" and relatorios[0].erro
+
+
+def test_fonte_lenta_fica_de_fora_sem_atrasar(arquivos, monkeypatch):
+    csv_path, _ = arquivos
+    monkeypatch.setattr(fontes, "baixa_planilha", lambda *a, **k: time.sleep(3))
+
+    t0 = time.perf_counter()
+    df, relatorios, _ = ingere_fontes([
+        Fonte("lenta", sheet_id="X"),
+        Fonte("csv", arquivo=csv_path),
+    ], prazo_s=0.5)
+
+    assert time.perf_counter() - t0 < 2
+    assert len(df) == 3
+    assert relatorios[0].estado == "atrasada"
+
+
+def test_remota_com_falha_usa_fallback_e_depois_a_ultima_leitura(arquivos, monkeypatch):
+    csv_path, _ = arquivos
+
+    def sem_rede(*a, **k):
+        raise Exception("Não foi possível conectar ao Google Sheets.")
+
+    monkeypatch.setattr(fontes, "baixa_planilha", sem_rede)
+    fonte = Fonte("principal", sheet_id="X", fallback=csv_path)
+
+    df, relatorios, partes = ingere_fontes([fonte])
+    assert relatorios[0].estado == "fallback" and len(df) == 3
+
+    _, relatorios, partes2 = ingere_fontes([fonte])
+    assert relatorios[0].estado == "anterior"
+    assert partes2["principal"] is partes["principal"]
+
+
+def test_arquivo_inalterado_nao_e_relido(arquivos):
+    csv_path, _ = arquivos
+    _, _, partes = ingere_fontes([Fonte("csv", arquivo=csv_path)])
+    _, relatorios, partes2 = ingere_fontes([Fonte("csv", arquivo=csv_path)])
+
+    assert relatorios[0].estado == "sem alteração"
+    assert partes2["csv"] is partes["csv"]
@@ -0,0 +1,157 @@
+"""
+Testes dos geodados pré-processados (geodata.py): tabela binária de pontos
+de rótulo (gravada, reaberta por memmap e consultada por searchsorted),
+ponto de rótulo pela maior parte da geometria e simplificação da cobertura
+de UFs sem frestas nem sobreposições.
+
+Execução:
+    python -m pytest -q test_geodata.py
+"""
+
+import json
+
+import numpy as np
+import pytest
+import shapely
+
+import geodata
+from geodata import (LABEL_DTYPE, build_label_points, label_points_from_geometry, load_label_points,
+                     simplify_coverage)
+
+
+def _geojson(caminho, feats):
+    caminho.write_text(json.dumps({"type": "FeatureCollection", "features": [
+        {"type": "Feature", "id": i, "properties": p, "geometry": json.loads(shapely.to_geojson(g))}
+        for i, p, g in feats]}), encoding="utf-8")
+
+
+@pytest.fixture
+def tabela(tmp_path, monkeypatch):
+    """Países e UFs sintéticos: geometria para alguns, semente em CSV para outros."""
+    _geojson(tmp_path / "mundo.geojson", [
+        ("BRA", {}, shapely.box(-70, -30, -40, 0)),
+        ("arg", {}, shapely.box(-70, -50, -60, -30)),      # código em minúsculas vira maiúsculo
+        ("USA", {}, shapely.MultiPolygon([shapely.box(-120, 30, -80, 45), shapely.box(-160, 60, -150, 65)])),
+        ("LONGO", {}, shapely.box(0, 0, 1, 1)),            # mais de 3 letras: fora da tabela
+    ])
+    _geojson(tmp_path / "ufs.geojson", [(None, {"sigla": "AM"}, shapely.box(-70, -10, -58, 0))])
+    (tmp_path / "iso3.csv").write_text("iso3,lat,lon\nper,-9.5,-75.0\nBRA,1.0,1.0\n", encoding="utf-8")
+    (tmp_path / "uf.csv").write_text("uf,lat,lon\nRR,2.0,-61.0\n", encoding="utf-8")
+    for nome, arquivo in (("WORLD_GEOJSON_PATH", "mundo.geojson"), ("BR_STATES_PATH", "ufs.geojson"),
+                          ("ISO3_CENTROIDS_CSV", "iso3.csv"), ("UF_CENTROIDS_CSV", "uf.csv")):
+        monkeypatch.setattr(geodata, nome, tmp_path / arquivo)
+    caminho = tmp_path / "label_points.npy"
+    build_label_points(caminho)
+    return caminho
+
+
+def test_tabela_ordenada_e_aberta_por_memmap(tabela):
+    bruta = np.load(tabela)
+    assert bruta.dtype == LABEL_DTYPE
+    assert bruta[["nivel", "codigo"]].tolist() == sorted(bruta[["nivel", "codigo"]].tolist())
+    paises, ufs = load_label_points(tabela)
+    assert isinstance(paises.lat, np.memmap) and isinstance(ufs.codigos, np.memmap)   # sem cópia
+    assert len(paises) + len(ufs) == len(bruta)
+    assert ufs.codigos.tolist() == [b"AM", b"RR"]
+
+
+def test_lookup_ida_e_volta(tabela):
+    paises, ufs = load_label_points(tabela)
+    lat, lon = paises.lookup(["BRA", "ARG", "PER", "CHN", "XXX", None, "LONGO"])
+    # geometria vence a semente (BRA); semente para quem não tem geometria (PER) e fallback fixo (CHN)
+    assert np.allclose(lat[:4], [-15.0, -40.0, -9.5, 35.0]) and np.allclose(lon[:4], [-55.0, -65.0, -75.0, 103.0])
+    assert np.isnan(lat[4:]).all() and np.isnan(lon[4:]).all()
+    assert paises.get("USA") == pytest.approx((37.5, -100.0))         # maior parte do multipolígono
+    assert paises.get("ZZZ") == (None, None) and paises.get("ZZZ", 0) == 0
+    assert "ARG" in paises and "AM" not in paises and "AM" in ufs
+    # cada nível é uma fatia: a mesma sigla não vaza de um para o outro
+    assert ufs.get("RR") == pytest.approx((2.0, -61.0)) and ufs.get("BRA") == (None, None)
+    # chave maior que o código não é truncada até casar com um prefixo
+    assert np.isnan(paises.lookup(["BRAZIL", "ARGX", "BRASIL"])[0]).all()
+    assert paises.get("BRAZIL") == (None, None) and "BRASIL" not in paises and "AMX" not in ufs
+    # fim da tabela: código depois do último não casa com ele
+    assert np.isnan(ufs.lookup(["ZZ"])[0]).all()
+
+
+def test_tabela_ausente_e_gerada(tabela, tmp_path):
+    nova = tmp_path / "outra" / "label_points.npy"
+    nova.parent.mkdir()
+    paises, _ = load_label_points(nova)
+    assert nova.exists() and paises.get("BRA") == load_label_points(tabela)[0].get("BRA")
+
+
+def test_ponto_de_rotulo_dentro_da_maior_parte():
+    arco = shapely.Polygon([(0, 0), (10, 0), (10, 10), (0, 10), (0, 8), (8, 8), (8, 2), (0, 2)])   # "C" invertido
+    ilhas = shapely.MultiPolygon([shapely.box(0, 0, 1, 1), shapely.box(20, 20, 24, 24)])
+    lat, lon = label_points_from_geometry([shapely.to_geojson(g) for g in (arco, ilhas)])
+    assert not arco.contains(arco.centroid)
+    assert arco.contains(shapely.Point(lon[0], lat[0]))              # centroide fora: ponto na superfície
+    assert (lon[1], lat[1]) == (22.0, 22.0)                          # centroide da maior ilha
+
+
+def _borda(p, q, n=40, amplitude=0.06):
+    """Fronteira ondulada de p a q, a mesma nos dois sentidos (vizinhos dividem o mesmo arco)."""
+    inverte = tuple(p) > tuple(q)
+    p, q = (q, p) if inverte else (p, q)
+    t = np.linspace(0, 1, n)
+    normal = np.array([p[1] - q[1], q[0] - p[0]])
+    pts = np.outer(1 - t, p) + np.outer(t, q) + np.outer(amplitude * np.sin(2 * np.pi * t), normal)
+    return pts[::-1] if inverte else pts
+
+
+def _juntas(j):
+    """Fileira j de tijolos de largura 2 em [0, 4], deslocada de 1 nas fileiras ímpares."""
+    return [0, 2, 4] if j % 2 == 0 else [0, 1, 3, 4]
+
+
+@pytest.fixture(scope="module")
+def cobertura():
+    """
+    "UFs" em 3 fileiras de tijolos (7 polígonos, fronteiras onduladas e
+    compartilhadas) e um lago no tijolo do meio. As juntas em T são vértices
+    de um lado e meio de aresta do outro: simplificando cada polígono sozinho
+    abrem-se frestas e sobreposições.
+    """
+    fileiras = 3
+    quebras = lambda y: sorted({x for j in (y - 1, y) if 0 <= j < fileiras for x in _juntas(j)})
+    geoms = []
+    for j in range(fileiras):
+        for x0, x1 in zip(_juntas(j), _juntas(j)[1:]):
+            nos = [(x, j) for x in quebras(j) if x0 <= x <= x1] + \
+                  [(x, j + 1) for x in quebras(j + 1) if x0 <= x <= x1][::-1]
+            anel = np.concatenate([_borda(a, b)[:-1] for a, b in zip(nos, nos[1:] + nos[:1])])
+            lago = [shapely.Point(2, 1.5).buffer(0.2).exterior.coords] if (j, x0) == (1, 1) else []
+            geoms.append(shapely.Polygon(anel, lago))
+    return np.array(geoms, dtype=object)
+
+
+def test_cobertura_simplificada_sem_frestas_nem_sobreposicoes(cobertura):
+    tolerancias, grade = {"baixa": 0.1, "alta": 0.02}, 1e-4
+    assert shapely.is_valid(cobertura).all()
+    niveis = simplify_coverage(cobertura, tolerancias, grade)
+    assert list(niveis) == ["baixa", "alta"]
+    vertices = {n: shapely.get_num_coordinates(g).sum() for n, g in niveis.items()}
+    assert vertices["baixa"] < vertices["alta"] < shapely.get_num_coordinates(cobertura).sum()
+    lago = np.pi * 0.2 ** 2
+
+    for nivel, tol in tolerancias.items():
+        simpl = niveis[nivel]
+        assert len(simpl) == len(cobertura) and shapely.is_valid(simpl).all()
+        # cada face volta ao dono: a UF simplificada fica perto da original e contém o seu interior
+        assert (shapely.hausdorff_distance(simpl, cobertura) <= tol + 2 * grade).all()
+        assert shapely.contains(simpl, shapely.point_on_surface(cobertura)).all()
+        # sem sobreposição: áreas somadas = área da união; sem fresta: a união só tem o buraco do lago
+        uniao = shapely.union_all(simpl)
+        assert shapely.area(simpl).sum() == pytest.approx(uniao.area, abs=1e-9)
+        assert shapely.get_num_interior_rings(uniao) == 1 and uniao.area == pytest.approx(12 - lago, rel=0.01)
+        assert not shapely.intersects(simpl, shapely.Point(2, 1.5)).any()    # o lago segue sem dono
+        # arcos compartilhados: vizinhos se tocam numa linha, dos dois lados o mesmo traçado
+        for a, b in ((0, 1), (0, 3), (2, 3), (3, 6)):
+            comum = shapely.intersection(simpl[a], simpl[b])
+            assert comum.area == 0 and comum.length > 0.9
+            assert shapely.equals(comum, shapely.intersection(simpl[a].boundary, simpl[b].boundary))
+
+    # referência: cada polígono simplificado sozinho abre frestas/sobreposições nas juntas em T
+    sozinhas = shapely.simplify(cobertura, tolerancias["alta"], preserve_topology=True)
+    uniao = shapely.union_all(sozinhas)
+    assert shapely.area(sozinhas).sum() - uniao.area > 1e-3 or shapely.get_num_interior_rings(uniao) > 1
@@ -0,0 +1,108 @@
+"""
+Testes do histórico de versões (historico.py): snapshot colunar, deltas,
+retenção e LRU de versões abertas.
+
+Execução:
+    python -m pytest -q test_historico.py
+"""
+
+import pandas as pd
+import pytest
+
+import historico
+from consultas import dados_sinteticos
+
+
+@pytest.fixture()
+def base():
+    d = dados_sinteticos(800, seed=11)
+    return d.set_axis(pd.Index([f"{n}#0" for n in range(len(d))], name="chave"))
+
+
+def _edita(d: pd.DataFrame, i: int) -> pd.DataFrame:
+    """Versão seguinte: uma linha alterada, uma removida, uma nova."""
+    d = d.copy()
+    d.iloc[i, d.columns.get_loc("status")] = f"Revisado {i}"
+    d = d.drop(d.index[i + 1])
+    nova = d.iloc[[0]].set_axis([f"novo-{i}#0"])
+    return pd.concat([d, nova])
+
+
+def _esperado(d: pd.DataFrame) -> pd.DataFrame:
+    return d[historico.COLUNAS_SNAPSHOT].reset_index(drop=True)
+
+
+def _confere(obtido: pd.DataFrame, esperado: pd.DataFrame):
+    # nulos voltam como None nas colunas de texto: compara nulidade e valores
+    assert list(obtido.columns) == list(esperado.columns)
+    assert obtido.dtypes.equals(esperado.dtypes)
+    assert obtido.isna().equals(esperado.isna())
+    pd.testing.assert_frame_equal(obtido.astype(object).where(obtido.notna(), "∅"),
+                                  esperado.astype(object).where(esperado.notna(), "∅"))
+
+
+def test_snapshot_completo_volta_igual(base, tmp_path):
+    h = historico.Historico(tmp_path)
+    e = h.registra("v1", base)
+
+    assert e["tipo"] == "completo" and e["linhas"] == len(base)
+    _confere(h.carrega("v1"), _esperado(base))
+    assert h.registra("v1", base) is None          # mesma versão não é gravada de novo
+
+
+def test_deltas_remontam_cada_versao(base, tmp_path):
+    h = historico.Historico(tmp_path, keyframe=2)
+    versoes, d = [], base
+    for i in range(5):
+        h.registra(f"v{i}", d)
+        versoes.append(d)
+        d = _edita(d, 10 * i + 1)
+
+    tipos = [e["tipo"] for e in reversed(h.versoes())]
+    assert tipos == ["completo", "delta", "delta", "completo", "delta"]
+    e1 = h.versoes()[-2]
+    assert (e1["base"], e1["adicionadas"], e1["alteradas"], e1["removidas"]) == ("v0", 1, 1, 1)
+    assert (tmp_path / "v1.npz").stat().st_size < (tmp_path / "v0.npz").stat().st_size / 2
+    for i, d in enumerate(versoes):
+        _confere(h.carrega(f"v{i}"), _esperado(d))
+
+
+def test_retencao_regrava_delta_sem_base(base, tmp_path):
+    h = historico.Historico(tmp_path, maximo=2)
+    d1, d2 = _edita(base, 1), _edita(_edita(base, 1), 5)
+    for v, d in (("v0", base), ("v1", d1), ("v2", d2)):
+        h.registra(v, d)
+
+    assert [e["versao"] for e in h.versoes()] == ["v2", "v1"]
+    assert not (tmp_path / "v0.npz").exists()
+    assert h.versoes()[-1]["tipo"] == "completo"
+    _confere(h.carrega("v1"), _esperado(d1))
+    _confere(h.carrega("v2"), _esperado(d2))
+    with pytest.raises(KeyError):
+        h.carrega("v0")
+
+
+def test_retencao_por_idade(base, tmp_path):
+    h = historico.Historico(tmp_path, dias=30)
+    h.registra("velha", base, agora=pd.Timestamp("2024-01-01"))
+    h.registra("nova", _edita(base, 3), agora=pd.Timestamp("2024-03-01"))
+    assert [e["versao"] for e in h.versoes()] == ["nova"]
+
+
+def test_lru_de_versoes_abertas(base, tmp_path):
+    abertas = []
+    h = historico.Historico(tmp_path, lru=2, abre=lambda d: abertas.append(len(d)) or len(d))
+    d = base
+    for i in range(3):
+        h.registra(f"v{i}", d)
+        d = _edita(d, i + 1)
+
+    assert h.visao("v0") == len(base)
+    h.visao("v0")
+    h.visao("v1")
+    h.visao("v2")                 # tira v0 (a menos usada)
+    h.visao("v1")
+    assert len(abertas) == 3
+    h.visao("v0")
+    assert len(abertas) == 4
+    assert h.visao("nao-existe") is None
@@ -0,0 +1,86 @@
+"""
+Testes do ETL incremental (incremental.py).
+
+Execução:
+    python -m pytest -q test_incremental.py
+"""
+
+import pandas as pd
+
+from incremental import Contagens, EstadoETL, chaves_linhas
+
+
+def _planilha():
+    return pd.DataFrame({
+        "NÚMERO": ["01/2023-1", "02/2023-1", "02/2023-1", None, "03/2024-1"],
+        "STATUS": ["VIGENTE", "ENCERRADO", "VIGENTE", "VIGENTE", "ENCERRADO"],
+        "PAÍS": ["França (FRA)", "China (CHN)", "China (CHN)", "Peru (PER)", "Japão (JPN)"],
+    })
+
+
+class EtlContado:
+    """ETL de brinquedo que registra quais linhas processou."""
+
+    def __init__(self):
+        self.processadas = []
+
+    def __call__(self, raw):
+        self.processadas.append(len(raw))
+        out = raw.copy()
+        out["eh_vigente"] = out["STATUS"].eq("VIGENTE")
+        out["pais"] = out["PAÍS"].str.replace(r"\s*\(.*\)", "", regex=True)
+        return out
+
+
+def test_chaves_estaveis_para_numero_repetido_e_vazio():
+    raw = _planilha()
+    chaves = chaves_linhas(raw)
+
+    assert list(chaves[:3]) == ["01/2023-1#0", "02/2023-1#0", "02/2023-1#1"]
+    assert chaves[3].startswith("h:")
+    assert chaves.is_unique
+    assert chaves.equals(chaves_linhas(raw.copy()))
+
+
+def test_recarga_reprocessa_so_linhas_novas_ou_alteradas():
+    etl = EtlContado()
+    estado = EstadoETL(etl)
+    estado.carrega(_planilha())
+
+    novo = _planilha().drop(index=[0])
+    novo.loc[4, "STATUS"] = "VIGENTE"
+    novo.loc[len(novo) + 1] = ["04/2025-1", "VIGENTE", "Chile (CHL)"]
+    novo = novo.reset_index(drop=True)
+    delta = estado.carrega(novo)
+
+    assert (delta.adicionadas, delta.alteradas, delta.removidas) == (1, 1, 1)
+    assert etl.processadas == [5, 2]
+    assert estado.df.index.equals(novo.index)
+    esperado = etl(novo)
+    pd.testing.assert_frame_equal(estado.df, esperado, check_dtype=False)
+
+
+def test_recarga_sem_mudanca_nao_chama_etl():
+    etl = EtlContado()
+    estado = EstadoETL(etl)
+    estado.carrega(_planilha())
+
+    delta = estado.carrega(_planilha())
+
+    assert delta.vazio
+    assert etl.processadas == [5]
+
+
+def test_contagens_por_diferenca_batem_com_recontagem():
+    etl = EtlContado()
+    estado = EstadoETL(etl)
+    estado.carrega(_planilha())
+    contagens = Contagens(["pais", "eh_vigente"], estado.df)
+
+    novo = _planilha().drop(index=[1, 2]).reset_index(drop=True)
+    novo.loc[0, "PAÍS"] = "Peru (PER)"
+    contagens.aplica(estado.carrega(novo), estado.df)
+
+    recontagem = Contagens(["pais", "eh_vigente"], etl(novo))
+    assert contagens.por_dimensao == recontagem.por_dimensao
+    assert contagens.valores("pais") == ["Japão", "Peru"]
@@ -0,0 +1,51 @@
+"""
+Testes dos leitores de planilha (ingest.py): CSV com dtype declarado x XLSX.
+
+Execução:
+    python -m pytest -q test_ingest.py
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from ingest import CabecalhoInvalido, coluna_pais, le_planilha, le_planilha_csv
+
+EXCEL_PATH = Path(__file__).resolve().parent / "data" / "PROCESSOS_ASSINADOS.xlsx"
+
+
+@pytest.mark.skipif(not EXCEL_PATH.exists(), reason="Excel local ausente")
+def test_csv_e_xlsx_tem_mesmas_colunas_e_valores(tmp_path):
+    xlsx = le_planilha(EXCEL_PATH)
+    csv_path = tmp_path / "export.csv"
+    xlsx.to_csv(csv_path, index=False)
+
+    df = le_planilha(csv_path)
+
+    assert list(df.columns) == list(xlsx.columns)
+    assert coluna_pais(df.columns) == coluna_pais(xlsx.columns)
+    for col in ["NÚMERO", "STATUS", "TIPO DE PROCESSO", coluna_pais(df.columns)]:
+        assert df[col].equals(xlsx[col]), col
+
+
+def test_csv_sem_coluna_pais_pede_fallback(tmp_path):
+    path = tmp_path / "outra_aba.csv"
+    path.write_text("NÚMERO,STATUS\n01280.000381/2023-95,VIGENTE\n", encoding="utf-8")
+
+    with pytest.raises(CabecalhoInvalido):
+        le_planilha_csv(path)
+
+
+def test_csv_nao_infere_tipos(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text(
+        "PAÍS/ESTADO (ISO3/UF),NÚMERO,,ANO\nCanadá (CAN),0012,,2023\nAmazonas (AM),,,\n",
+        encoding="utf-8",
+    )
+
+    df = le_planilha_csv(path)
+
+    assert list(df.columns) == ["PAÍS/ESTADO (ISO3/UF)", "NÚMERO", "Unnamed: 2", "ANO"]
+    assert df.loc[0, "NÚMERO"] == "0012" and df.loc[0, "ANO"] == "2023"
+    assert pd.isna(df.loc[1, "NÚMERO"])
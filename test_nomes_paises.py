@@ -0,0 +1,67 @@
+"""
+Testes do resolvedor de nomes de país (nomes_paises.py): nomes exatos em
+várias línguas, sem acento, com erro de digitação, em partes, e uma
+resolução (e um log) por nome distinto.
+
+Execução:
+    python -m pytest -q test_nomes_paises.py
+"""
+
+import pandas as pd
+import pytest
+
+import nomes_paises
+from nomes_paises import ResolvedorPaises
+
+
+@pytest.fixture()
+def resolvedor():
+    log = []
+    return ResolvedorPaises(log=log.append), log
+
+
+@pytest.mark.parametrize("nome, iso3", [
+    ("Alemanha", "DEU"), ("Germany", "DEU"), ("Reino Unido", "GBR"), ("Inglaterra", "GBR"),
+    ("Estados Unidos da América", "USA"), ("EUA", "USA"), ("Holanda", "NLD"), ("  FRANCA ", "FRA"),
+    ("Japao", "JPN"), ("Guiné-Bissau", "GNB"), ("España", "ESP"), ("Coreia do Sul", "KOR"),
+])
+def test_nomes_exatos(resolvedor, nome, iso3):
+    r, _ = resolvedor
+    res = r.resolve(nome)
+    assert res.iso3 == iso3 and res.confianca == 1.0
+
+
+@pytest.mark.parametrize("nome, iso3", [("Alemana", "DEU"), ("Colombis", "COL"), ("Itali", "ITA"),
+                                        ("Suéciaa", "SWE"), ("Berlim, Alemanha", "DEU"), ("Paris - França", "FRA")])
+def test_erros_de_digitacao_e_partes(resolvedor, nome, iso3):
+    r, _ = resolvedor
+    res = r.resolve(nome)
+    assert res.iso3 == iso3 and r.confianca_min <= res.confianca
+    assert res.nome == r.nome_pt[iso3]
+
+
+def test_sem_correspondencia(resolvedor):
+    r, log = resolvedor
+    assert r.resolve("Xpto") is None
+    assert r.resolve("Amazonas") is None       # UF sem sigla não vira país
+    assert r.resolve(None) is None and r.resolve(pd.NA) is None
+    assert len(log) == 2 and all("não reconhecido" in linha for linha in log)
+
+
+def test_uma_resolucao_por_nome(resolvedor, monkeypatch):
+    r, log = resolvedor
+    chamadas = []
+    melhor = r._melhor
+    monkeypatch.setattr(r, "_melhor", lambda t: chamadas.append(t) or melhor(t))
+    for nome in ("Alemana", "alemana", " ALEMANA", "Alemana"):
+        assert r.resolve(nome).iso3 == "DEU"
+    assert len(chamadas) == 1 and len(log) == 1
+    assert "confiança 0.67" in log[0]
+
+
+def test_tabela_cobre_os_centroides():
+    tabela = pd.read_csv(nomes_paises.TABELA_PATH, sep=";", dtype=str, keep_default_na=False)
+    centroides = pd.read_csv(nomes_paises.TABELA_PATH.parent / "iso3_centroids.csv")
+    assert not tabela["iso3"].duplicated().any()
+    assert set(tabela["iso3"]) == set(centroides["iso3"])
+    assert (tabela[["pt", "en", "es"]] != "").all().all()
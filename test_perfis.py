@@ -0,0 +1,55 @@
+"""
+Testes dos perfis de país/UF (perfis.py): números iguais aos do filtro
+por local + agrupamentos nas linhas.
+
+Execução:
+    python -m pytest -q test_perfis.py
+"""
+
+import pandas as pd
+import pytest
+
+from consultas import Filtros, dados_sinteticos, filtra_df
+from perfis import NAO_INFORMADO, IndicePerfis
+
+
+@pytest.fixture(scope="module")
+def dados():
+    d = dados_sinteticos(4000, seed=5)
+    d.loc[d.index[:40], "pesquisador_responsavel"] = NAO_INFORMADO
+    d.loc[d.index[40:45], "modalidade"] = None
+    return d, IndicePerfis(d)
+
+
+def _por(sub: pd.DataFrame, coluna: str) -> dict:
+    g = sub.dropna(subset=[coluna]).groupby(coluna)
+    return {k: (int(n), int(v)) for k, n, v in zip(g.size().index, g.size(), g["eh_vigente"].sum())}
+
+
+@pytest.mark.parametrize("local", [("pais", "P07"), ("pais", "BRA"), ("uf", "AM"), ("uf", "DF")])
+def test_perfil_igual_ao_filtro(dados, local):
+    d, perfis = dados
+    p = perfis.obtem(*local)
+    sub = filtra_df(d, Filtros(local=local))
+
+    assert (p["acordos"], p["vigentes"], p["demais"]) == \
+           (len(sub), int(sub["eh_vigente"].sum()), len(sub) - int(sub["eh_vigente"].sum()))
+    assert {m["modalidade"]: (m["acordos"], m["vigentes"]) for m in p["modalidades"]} == _por(sub, "modalidade")
+    anos = sub.assign(ano=pd.to_numeric(sub["ano_assinatura"], errors="coerce"))
+    assert {a["ano"]: (a["acordos"], a["vigentes"]) for a in p["anos"]} == _por(anos, "ano")
+    assert [a["ano"] for a in p["anos"]] == sorted(a["ano"] for a in p["anos"])
+    assert p["sem_ano"] == int(anos["ano"].isna().sum())
+    pesq = _por(sub[sub["pesquisador_responsavel"] != NAO_INFORMADO], "pesquisador_responsavel")
+    assert {r["pesquisador"]: (r["acordos"], r["vigentes"]) for r in p["pesquisadores"]} == pesq
+    assert [r["acordos"] for r in p["pesquisadores"]] == sorted((r["acordos"] for r in p["pesquisadores"]),
+                                                                reverse=True)
+
+
+def test_chaves_e_nomes(dados):
+    d, perfis = dados
+    paises = d["codigo_iso3"].dropna().unique()
+    ufs = d.loc[d["codigo_iso3"] == "BRA", "uf_sigla"].dropna().unique()
+    assert len(perfis) == len(paises) + len(ufs)
+    assert perfis.obtem("pais", "p07")["nome"] == "País 07"          # código sem diferenciar maiúsculas
+    assert perfis.obtem("uf", "AM")["nome"] == "AM"
+    assert perfis.obtem("pais", "XYZ") is None
@@ -0,0 +1,130 @@
+"""
+Testes do índice de números de processo (processos.py): normalização,
+duplicatas, aditivo -> acordo de origem e KPIs por acordo distinto.
+
+Execução:
+    python -m pytest -q test_processos.py
+"""
+
+import pandas as pd
+import pytest
+
+from consultas import Filtros, MotorPandas, dados_sinteticos, filtra_df
+from perfis import IndicePerfis
+from processos import IndiceProcessos, normaliza_numero, numeros
+
+
+def _linhas(*linhas) -> pd.DataFrame:
+    cols = ["NÚMERO", "tipo", "modalidade", "ano_assinatura", "eh_vigente", "codigo_iso3", "uf_sigla"]
+    d = pd.DataFrame([dict(zip(cols, l)) for l in linhas])
+    return d.assign(pais=d["codigo_iso3"], uf_nome=d["uf_sigla"], pesquisador_responsavel="Pesq. 1")
+
+
+def test_normaliza_numero():
+    assert normaliza_numero("01280.000381/2023-95") == "01280.000381/2023-95"
+    assert normaliza_numero("01280.001484/2022 - 91") == "01280.001484/2022-91"
+    assert normaliza_numero(" 01280.000916/2024-17        \n        ") == "01280.000916/2024-17"
+    assert normaliza_numero("01280000381/202395") == "01280.000381/2023-95"
+    assert normaliza_numero("sem número") is None and normaliza_numero(None) is None
+    # dois números na célula: o mais recente é o da linha, o outro é referência
+    assert numeros("01280.001038/2020-15      01280.000820/2023-60") == \
+           ["01280.000820/2023-60", "01280.001038/2020-15"]
+
+
+@pytest.fixture
+def planilha():
+    return _linhas(
+        ("01280.000100/2020-10", "Acordo de Cooperação com X", "Acordo de Cooperação", 2020, True, "ARG", None),
+        ("01280.000200/2021-20", "Carta Convite nº 001/2021", "Carta Convite", 2021, False, "BRA", "AM"),
+        ("01280.000200/2021 - 20", "Carta Convite nº 002/2021", "Carta Convite", 2021, False, "BRA", "AM"),
+        ("01280.000100/2020-10  01280.000900/2024-90", "2° TERMO ADITIVO X", "Termo Aditivo", 2024, True,
+         "ARG", None),
+        ("01280.000800/2023-80 01280.000100/2020-10", "1° TERMO ADITIVO X", "Termo Aditivo", 2023, False,
+         "ARG", None),
+        ("01280.000700/2022-70", "1° TERMO ADITIVO Y", "Termo Aditivo", 2022, False, "PER", None),
+        (None, "Convênio sem número", "Convênio", None, False, "PER", None),
+    )
+
+
+def test_duplicatas_e_aditivos(planilha):
+    idx = IndiceProcessos(planilha)
+    assert idx.duplicados() == {"01280.000200/2021-20": [1, 2]}
+    assert idx.pai.tolist() == [-1, -1, -1, 0, 0, -1, -1]
+    # cadeia na ordem do ordinal, não da planilha
+    assert idx.cadeias == {0: [4, 3]}
+    assert idx.principal.tolist() == [True, True, False, False, False, True, True]
+    assert idx.relatorio() == {"numeros": 5, "repetidos": 1, "acordos_distintos": 4,
+                               "aditivos_ligados": 2, "aditivos_sem_origem": 1}
+
+    c = idx.cadeia(planilha, 0)
+    assert (c["numero"], c["ano"], c["vigente"]) == ("01280.000100/2020-10", 2020, True)
+    assert [(a["numero"], a["ano"]) for a in c["aditivos"]] == \
+           [("01280.000800/2023-80", 2023), ("01280.000900/2024-90", 2024)]
+
+
+def test_aditivo_antes_da_origem_na_planilha():
+    d = _linhas(
+        ("01280.000500/2021-50", "1° TERMO ADITIVO Z", "Termo Aditivo", 2021, False, "ARG", None),
+        ("01280.000500/2021-50", "Acordo Z", "Acordo de Cooperação", 2020, False, "ARG", None),
+    )
+    idx = IndiceProcessos(d)
+    assert idx.pai.tolist() == [1, -1] and idx.principal.tolist() == [False, True]
+
+
+def test_origem_pelo_numero_proprio_antes_da_referencia():
+    d = _linhas(
+        ("01280.000300/2023-10 01280.000100/2020-11", "Acordo W", "Acordo de Cooperação", 2023, True, "ARG", None),
+        ("01280.000100/2020-11", "Acordo V", "Acordo de Cooperação", 2020, False, "ARG", None),
+        ("01280.000400/2024-12 01280.000100/2020-11", "1° TERMO ADITIVO V", "Termo Aditivo", 2024, True,
+         "ARG", None),
+    )
+    assert IndiceProcessos(d).pai.tolist() == [-1, -1, 1]
+    # sem a linha de número próprio, a referência ainda liga
+    assert IndiceProcessos(d.iloc[[0, 2]].reset_index(drop=True)).pai.tolist() == [-1, 0]
+
+
+def test_kpis_por_acordo_distinto(planilha):
+    idx = IndiceProcessos(planilha)
+    d = idx.marca(planilha)
+    assert filtra_df(d, Filtros(distintos=True)).index.tolist() == [0, 1, 5, 6]
+    assert len(filtra_df(planilha, Filtros(distintos=True))) == len(planilha)   # sem a marcação: todas
+
+    f = Filtros(distintos=True)
+    assert f.chave()[-1] is True and Filtros(*f.chave()).distintos
+    assert f.sem_local().distintos and not Filtros().distintos
+
+
+@pytest.fixture(scope="module")
+def sinteticos():
+    d = dados_sinteticos(3000, seed=11)
+    d.loc[d.index[100:400], "NÚMERO"] = d["NÚMERO"].iloc[:300].to_numpy()     # 300 repetidos
+    idx = IndiceProcessos(d)
+    return idx.marca(d), idx
+
+
+@pytest.mark.parametrize("f", [Filtros(distintos=True), Filtros(ano=(2015, 2020), distintos=True),
+                               Filtros(status_mode="na_data", ativos_em="2019-06-30", distintos=True),
+                               Filtros(local=("uf", "AM"), distintos=True)], ids=repr)
+def test_motores_respeitam_distintos(sinteticos, f, tmp_path):
+    d, _ = sinteticos
+    p = MotorPandas(d)
+    esperado = filtra_df(d, f)
+    k = p.kpis(f)
+    assert k["total"] == len(esperado) < len(filtra_df(d, f._com(distintos=False)))
+    assert k["vigentes"] == int(esperado["eh_vigente"].sum())
+    assert p.agregado(f)["qtd"].sum() == len(esperado)
+
+    pytest.importorskip("duckdb")
+    from consultas import MotorDuckDB
+    assert MotorDuckDB(d, tmp_path / "t.duckdb").kpis(f) == k
+
+
+def test_perfil_com_distintos_e_cadeias(planilha):
+    idx = IndiceProcessos(planilha)
+    perfis = IndicePerfis(idx.marca(planilha), idx)
+    arg, am = perfis.obtem("pais", "ARG"), perfis.obtem("uf", "AM")
+    assert (arg["acordos"], arg["distintos"]) == (3, 1)
+    assert [len(c["aditivos"]) for c in arg["cadeias"]] == [2]
+    assert (am["acordos"], am["distintos"], am["cadeias"]) == (2, 1, [])
+    # sem o índice: cada linha é um acordo, sem cadeias
+    assert IndicePerfis(planilha).obtem("pais", "ARG")["distintos"] == 3
@@ -0,0 +1,126 @@
+"""
+Testes da rede de colaboração (rede.py): nomes por célula, incidências
+esparsas iguais à contagem pelas linhas, grau e coocorrência iguais aos
+produtos densos (também em blocos pequenos), posições fixas (também com o
+layout limitado) e ligações de um recorte.
+
+Execução:
+    python -m pytest -q test_rede.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from consultas import Filtros, dados_sinteticos, filtra_df
+from perfis import NAO_INFORMADO
+import rede as modulo_rede
+from rede import RedeColaboracao, chave_nome, nomes
+
+
+def test_nomes_da_celula():
+    assert nomes("Dra. Beatriz da Cocap / Dr. Henrique") == ["Dra. Beatriz da Cocap", "Dr. Henrique"]
+    assert nomes("José Laurindo, Jorge Porto e Luiz Antonio") == ["José Laurindo", "Jorge Porto", "Luiz Antonio"]
+    assert nomes("Dra. Flavia Costa\n") == ["Dra. Flavia Costa"]
+    assert nomes("Dr. Ana Lima / ana lima") == ["Dr. Ana Lima"]          # a mesma pessoa uma vez
+    assert nomes("-") == nomes(NAO_INFORMADO) == nomes(None) == []
+    assert chave_nome("Dra. Camila Ribas") == chave_nome("camila ribás") == "camila ribas"
+    assert chave_nome("Dr.Adalberto") == "adalberto" and chave_nome("Drauzio") == "drauzio"
+
+
+@pytest.fixture(scope="module")
+def dados():
+    d = dados_sinteticos(3000, seed=3)
+    d.loc[d.index[:30], "pesquisador_responsavel"] = NAO_INFORMADO
+    d.loc[d.index[30:60], "pesquisador_responsavel"] = "Pesq. 1 / Pesq. 2"
+    d.loc[d.index[60:70], "codigo_iso3"] = None
+    return d, RedeColaboracao(d)
+
+
+def _pares(d: pd.DataFrame, coluna: str) -> pd.DataFrame:
+    """(pesquisador, valor) por linha, explodindo as células com mais de um nome."""
+    p = d.assign(pesq=d["pesquisador_responsavel"].map(nomes)).explode("pesq").dropna(subset=["pesq", coluna])
+    return p.groupby(["pesq", coluna]).size()
+
+
+def _densa(rede, tipo, b=None):
+    b = b or rede.incidencia[tipo]
+    m = np.zeros(b.forma, dtype=np.int64)
+    m[b.linhas, b.colunas] = b.valores
+    return m
+
+
+@pytest.mark.parametrize("tipo,coluna", [("pais", "codigo_iso3"), ("modalidade", "modalidade")])
+def test_incidencia_igual_as_linhas(dados, tipo, coluna):
+    d, rede = dados
+    valores = rede.paises if tipo == "pais" else rede.modalidades
+    b = rede.incidencia[tipo]
+    obtido = {(rede.pesquisadores[i], valores[j]): int(v) for i, j, v in zip(b.linhas, b.colunas, b.valores)}
+    assert obtido == {k: int(v) for k, v in _pares(d, coluna).items()}
+    assert NAO_INFORMADO not in set(rede.pesquisadores)
+
+
+def test_grau_e_coocorrencia_iguais_aos_produtos_densos(dados):
+    _, rede = dados
+    b = _densa(rede, "pais") > 0
+    m = rede.metricas
+    assert m["pesquisador"]["paises"].tolist() == b.sum(axis=1).tolist()
+    assert m["pais"]["pesquisadores"].tolist() == b.sum(axis=0).tolist()
+    bbt, btb = b.astype(int) @ b.T.astype(int), b.T.astype(int) @ b.astype(int)
+    assert m["pesquisador"]["colaboradores"].tolist() == ((bbt > 0).sum(axis=1) - (np.diag(bbt) > 0)).tolist()
+    assert m["pais"]["paises_ligados"].tolist() == ((btb > 0).sum(axis=1) - (np.diag(btb) > 0)).tolist()
+    assert m["pais"]["acordos"].tolist() == _densa(rede, "pais").sum(axis=0).tolist()
+    # blocos de poucos pares (uma linha por bloco quando ela sozinha passa do limite): mesma contagem
+    bp = rede.incidencia["pais"]
+    assert bp.vizinhos(max_pares=50).tolist() == m["pesquisador"]["colaboradores"].tolist()
+    assert bp.t().vizinhos(max_pares=1).tolist() == m["pais"]["paises_ligados"].tolist()
+
+
+def test_posicoes_calculadas_uma_vez(dados):
+    d, rede = dados
+    pos = rede.posicoes()
+    n = len(rede.pesquisadores) + len(rede.paises) + len(rede.modalidades)
+    assert pos.shape == (n, 2) and np.isfinite(pos).all() and np.abs(pos).max() <= 1.0 + 1e-9
+    assert rede.posicoes() is pos
+    tipos, codigos = rede.nos()
+    assert tipos[rede.deslocamento("pais")] == "pais" and codigos[rede.deslocamento("modalidade")] == 0
+    # mesma versão dos dados, mesmas posições
+    assert np.allclose(RedeColaboracao(d).posicoes(), pos)
+
+
+def test_layout_limitado_aos_pesquisadores_com_mais_acordos(dados, monkeypatch):
+    d, _ = dados
+    monkeypatch.setattr(modulo_rede, "LAYOUT_MAX", 5)
+    rede = RedeColaboracao(d)
+    pos = rede.posicoes()
+    assert pos.shape == (len(rede.nos()[0]), 2) and np.isfinite(pos).all() and np.abs(pos).max() <= 1.0
+    # fora do layout: no baricentro dos seus países/modalidades, pesado pelos acordos
+    resto = np.argsort(-rede.metricas["pesquisador"]["acordos"], kind="stable")[5:]
+    soma, total = np.zeros((len(rede), 2)), np.zeros(len(rede))
+    for tipo, b in rede.incidencia.items():
+        np.add.at(soma, b.linhas, pos[b.colunas + rede.deslocamento(tipo)] * b.valores[:, None])
+        np.add.at(total, b.linhas, b.valores)
+    centro = soma[resto] / total[resto, None]
+    assert np.abs(pos[resto] - centro).max() <= modulo_rede.AFASTAMENTO + 1e-9
+
+
+def test_posicoes_sem_esperar_o_calculo(dados):
+    d, _ = dados
+    rede = RedeColaboracao(d)
+    with rede._lock:                                   # outra thread calculando
+        assert rede.posicoes(espera=False) is None
+    assert rede.posicoes(espera=False) is rede.posicoes()
+
+
+def test_ligacoes_do_recorte(dados):
+    d, rede = dados
+    sub = filtra_df(d, Filtros(ano=(2015, 2018), status_mode="vigentes"))
+    linhas = rede.linhas(sub)
+    b = rede.ligacoes("pais", linhas)
+    obtido = {(rede.pesquisadores[i], rede.paises[j]): int(v) for i, j, v in zip(b.linhas, b.colunas, b.valores)}
+    assert obtido == {k: int(v) for k, v in _pares(sub, "codigo_iso3").items()}
+
+    por_pesq = sub["pesquisador_responsavel"].map(nomes).explode().dropna().value_counts()
+    acordos = rede.acordos(linhas)
+    assert {rede.pesquisadores[i]: int(acordos[i]) for i in np.flatnonzero(acordos)} == por_pesq.to_dict()
+    assert rede.acordos().sum() == rede.metricas["pesquisador"]["acordos"].sum() > acordos.sum()
@@ -0,0 +1,90 @@
+"""
+Testes das respostas enxutas (respostas.py): Patch só com dados, no_update e medição.
+
+Execução:
+    python -m pytest -q test_respostas.py
+"""
+
+import copy
+import json
+
+import plotly.graph_objects as go
+from dash import html, no_update
+from flask import Flask, Response
+from plotly.utils import PlotlyJSONEncoder
+
+import respostas
+
+
+def _figura(x, y, titulo="Acordos"):
+    fig = go.Figure(go.Bar(x=x, y=y, name="Vigentes", marker=dict(color="#10B981")))
+    fig.update_layout(template="none", title=titulo, height=320)
+    return fig
+
+
+def _no_navegador(fig):
+    """Figura como o navegador a guarda (JSON)."""
+    return json.loads(json.dumps(fig.to_plotly_json(), cls=PlotlyJSONEncoder))
+
+
+def _aplica(atual, patch):
+    """Aplica as operações Assign de um Patch como o dash-renderer."""
+    atual = copy.deepcopy(atual)
+    for op in patch.to_plotly_json()["operations"]:
+        assert op["operation"] == "Assign"
+        *caminho, ultimo = op["location"]
+        alvo = atual
+        for passo in caminho:
+            alvo = alvo[passo]
+        alvo[ultimo] = json.loads(json.dumps(op["params"]["value"], cls=PlotlyJSONEncoder))
+    return atual
+
+
+def test_mesma_estrutura_manda_so_os_dados():
+    antes, depois = _figura([2019, 2020], [3, 4]), _figura([2019, 2020, 2021], [5, 1, 2])
+    (r1,), ass = respostas.enxuga(["evolucao"], [antes])
+    assert r1 is antes
+
+    (r2,), ass2 = respostas.enxuga(["evolucao"], [depois], ass)
+    assert ass2["evolucao"][0] == ass["evolucao"][0] and ass2["evolucao"][1] != ass["evolucao"][1]
+    assert _aplica(_no_navegador(antes), r2) == _no_navegador(depois)
+    assert all(op["location"][-1] in ("x", "y") for op in r2.to_plotly_json()["operations"])
+
+    (r3,), ass3 = respostas.enxuga(["evolucao"], [depois], ass2)
+    assert r3 is no_update and ass3 == ass2
+
+
+def test_estrutura_diferente_manda_a_figura():
+    _, ass = respostas.enxuga(["evolucao"], [_figura([1], [1])])
+    nova = _figura([1], [1], titulo="Outro título")
+    (r,), _ = respostas.enxuga(["evolucao"], [nova], ass)
+    assert r is nova
+
+
+def test_componentes_e_saidas_sempre_inteiras():
+    ranking = html.Div([html.Div("Brasil", className="lista-texto")], className="ranking")
+    fig = _figura([1], [1])
+    r, ass = respostas.enxuga(["ranking", "mapa"], [ranking, fig], sempre_inteiras=("mapa",))
+    assert ass["mapa"] is None
+    r, _ = respostas.enxuga(["ranking", "mapa"], [ranking, fig], ass, sempre_inteiras=("mapa",))
+    assert r[0] is no_update and r[1] is fig
+
+
+def test_medidor_por_callback_e_por_saida():
+    medidor = respostas.Medidor()
+    server = Flask(__name__)
+    medidor.instala(server)
+    server.add_url_rule(respostas.ROTA_CALLBACKS, "cb", lambda: Response("x" * 120), methods=["POST"])
+    cliente = server.test_client()
+    for _ in range(2):
+        cliente.post(respostas.ROTA_CALLBACKS, json={"output": "..mapa.figure...kpi-total.children.."})
+
+    fig_a, fig_b = _figura([1, 2], [3, 4]), _figura([1, 2], [5, 6])
+    _, ass = respostas.enxuga(["evolucao"], [fig_a], medidor=medidor)
+    respostas.enxuga(["evolucao"], [fig_b], ass, medidor=medidor)
+
+    r = medidor.relatorio()
+    assert r["callbacks"]["mapa.figure (+1)"] == {"requisicoes": 2, "bytes": 240, "bytes_max": 120, "bytes_medio": 120}
+    s = r["saidas"]["evolucao"]
+    assert s["respostas"] == 2 and s["so_dados"] == 1
+    assert s["bytes_enviados"] < s["bytes_sem_enxugar"]
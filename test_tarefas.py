@@ -0,0 +1,131 @@
+"""
+Testes das tarefas pesadas (tarefas.py): exportação, relatório e vagas.
+
+Execução:
+    python -m pytest -q test_tarefas.py
+"""
+
+import io
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import tarefas
+from consultas import dados_sinteticos
+
+
+@pytest.fixture(scope="module")
+def dff():
+    return dados_sinteticos(1200, seed=5)
+
+
+def test_exporta_csv_abre_no_excel(dff, monkeypatch):
+    monkeypatch.setattr(tarefas, "LOTE_EXPORTACAO", 500)
+    passos = []
+    conteudo = tarefas.exporta(dff, "csv", passos.append)
+
+    assert conteudo.startswith("\ufeff".encode("utf-8"))
+    lido = pd.read_csv(io.BytesIO(conteudo), sep=";", encoding="utf-8-sig")
+    assert len(lido) == len(dff)
+    assert list(lido.columns) == [tarefas.COLUNAS_EXPORTACAO[c] for c in tarefas.COLUNAS_EXPORTACAO]
+    assert set(lido["Vigente"]) <= {"Sim", "Não"}
+    assert (lido["Vigente"] == "Sim").sum() == int(dff["eh_vigente"].sum())
+    assert [p for p, _ in passos] == [41, 83, 100]        # progresso por lote
+
+
+def test_exporta_xlsx(dff):
+    lido = pd.read_excel(io.BytesIO(tarefas.exporta(dff, "xlsx")), sheet_name="Acordos")
+    assert len(lido) == len(dff)
+    assert lido["Número do processo"].tolist() == dff["NÚMERO"].tolist()
+
+
+def test_exporta_recorte_vazio(dff):
+    lido = pd.read_csv(io.BytesIO(tarefas.exporta(dff.iloc[:0])), sep=";", encoding="utf-8-sig")
+    assert len(lido) == 0 and "País" in lido.columns
+
+
+def test_relatorio_tem_uma_aba_por_dimensao(dff):
+    abas = pd.read_excel(io.BytesIO(tarefas.relatorio(dff, {"Acordos": len(dff)})), sheet_name=None)
+    assert list(abas) == ["Resumo", "Por país", "Por UF", "Por modalidade", "Por tipo", "Por ano", "Acordos"]
+    assert abas["Resumo"].values.tolist() == [["Acordos", len(dff)]]
+    assert abas["Por modalidade"]["Acordos"].sum() == len(dff)
+    assert abas["Por modalidade"]["Vigentes"].sum() == int(dff["eh_vigente"].sum())
+    assert pd.to_numeric(abas["Por ano"]["Ano"], errors="coerce").dropna().is_monotonic_increasing
+    assert len(abas["Acordos"]) == len(dff)
+
+
+def test_sem_gerenciador_vira_callback_comum():
+    registrados = []
+
+    class AppFalso:
+        def callback(self, *deps, **kw):
+            registrados.append(kw)
+            return lambda fn: fn
+
+    @tarefas.callback_tarefa(AppFalso(), "saida", "entrada", manager=None, progress="p", cancel="c")
+    def tarefa(set_progress, x):
+        set_progress((50, "meio"))      # sem efeito, mas não quebra
+        return x * 2
+
+    assert tarefa(21) == 42
+    assert "background" not in registrados[0] and "progress" not in registrados[0]
+
+
+def test_vagas_limitam_tarefas_simultaneas(tmp_path):
+    diskcache = pytest.importorskip("diskcache")
+    cache = diskcache.Cache(str(tmp_path))
+    vagas = tarefas.Vagas(cache, maximo=2, espera_s=0)
+
+    a, b = vagas._tenta(), vagas._tenta()
+    assert {a, b} == {"vaga-0", "vaga-1"} and vagas._tenta() is None
+    vagas.libera(a)
+    assert vagas._tenta() == a
+
+    cache.set("vaga-1", 2 ** 22 + 1)      # pid que não existe: vaga recuperada
+    vagas.libera(a)
+    assert vagas._tenta() == "vaga-0" and vagas._tenta() == "vaga-1"
+
+
+def _chama(cliente, corpo, prazo_s=30):
+    """Protocolo dos background callbacks: dispara e consulta até a resposta (progresso acumulado)."""
+    r = cliente.post("/_dash-update-component", json=corpo).get_json()
+    progresso, fim = {}, time.time() + prazo_s
+    while time.time() < fim:
+        resp = cliente.post(f"/_dash-update-component?cacheKey={r['cacheKey']}&job={r['job']}", json=corpo)
+        d = resp.get_json() if resp.status_code == 200 else {}   # 204: terminou entre as duas leituras do Dash
+        progresso.update(d.get("progress", {}))
+        if "response" in d:
+            return {**d, "progress": progresso}
+        time.sleep(0.1)
+    raise TimeoutError("tarefa em background não terminou")
+
+
+def test_tarefa_roda_em_background_noutro_processo(tmp_path, monkeypatch):
+    pytest.importorskip("diskcache")
+    from dash import Dash, Input, Output, html
+    monkeypatch.setattr(tarefas, "TAREFAS_DIR", tmp_path)
+    versao = {"v": "v1"}
+    com_cache, sem_cache = tarefas.cria_gerenciadores(lambda: versao["v"])
+    assert com_cache is not None and sem_cache is not None
+
+    app = Dash(__name__)
+    app.layout = html.Div([html.Button(id="b"), html.Div(id="o"), html.Progress(id="p")])
+
+    @tarefas.callback_tarefa(app, Output("o", "children"), Input("b", "n_clicks"), manager=com_cache,
+                             progress=[Output("p", "value")], prevent_initial_call=True)
+    def tarefa(set_progress, n):
+        set_progress((50,))
+        return f"{os.getpid()}:{n}"
+
+    cliente = app.server.test_client()
+    corpo = {"output": "o.children", "outputs": {"id": "o", "property": "children"},
+             "inputs": [{"id": "b", "property": "n_clicks", "value": 1}], "changedPropIds": ["b.n_clicks"],
+             "state": []}
+    r = _chama(cliente, corpo)
+    pid, n = r["response"]["o"]["children"].split(":")
+    assert int(pid) != os.getpid() and n == "1"           # fora do processo que atende a requisição
+    assert r["progress"] == {"p.value": 50}
+    versao["v"] = "v2"                                       # dados novos: outra chave, outro processo
+    assert _chama(cliente, corpo)["response"] != r["response"]
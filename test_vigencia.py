@@ -0,0 +1,67 @@
+"""
+Testes da vigência por intervalo de datas (vigencia.py).
+
+Execução:
+    python -m pytest -q test_vigencia.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vigencia import IndiceVigencia, colunas_vigencia, data_no_texto, datas_vigencia
+
+
+def test_datas_da_planilha():
+    raw = pd.DataFrame({
+        "NÚMERO": ["a", "b", "c", "d"],
+        "PORTARIA": ["PORTARIA INPA Nº 81, 22 DE MARÇO DE 2023", "Portaria 9, 1º de julho de 2021", None, "sem data"],
+        "Data de Término": ["21/03/2028", None, "10/10/2030", "01/01/2020"],
+    })
+    inicio, fim = datas_vigencia(raw, anos_padrao=5)
+
+    assert inicio.tolist()[:2] == [pd.Timestamp(2023, 3, 22), pd.Timestamp(2021, 7, 1)]
+    assert inicio.isna().tolist()[2:] == [True, True]
+    assert fim[0] == pd.Timestamp(2028, 3, 21)
+    assert fim[1] == pd.Timestamp(2026, 7, 1)          # sem término: início + 5 anos
+    assert colunas_vigencia(["DATA DE ASSINATURA", "VIGÊNCIA ATÉ"]) == ("DATA DE ASSINATURA", "VIGÊNCIA ATÉ")
+    assert data_no_texto("31/02/2024") is pd.NaT
+
+
+@pytest.fixture(scope="module")
+def intervalos():
+    rng = np.random.default_rng(5)
+    n = 2000
+    inicio = pd.Timestamp("2010-01-01") + pd.to_timedelta(rng.integers(0, 5000, n), unit="D")
+    fim = inicio + pd.to_timedelta(rng.integers(0, 2500, n), unit="D")
+    return pd.DataFrame({
+        "vigencia_inicio": pd.Series(inicio).where(rng.random(n) > 0.05),
+        "vigencia_fim": pd.Series(fim).where(rng.random(n) > 0.2),      # fim desconhecido = aberto
+    })
+
+
+@pytest.mark.parametrize("data", ["2009-12-31", "2012-06-30", "2016-02-29", "2023-06-30", "2035-01-01"])
+def test_ativos_na_data_igual_a_varrer(intervalos, data):
+    idx = IndiceVigencia(intervalos)
+    d = pd.Timestamp(data)
+    ini, fim = intervalos["vigencia_inicio"], intervalos["vigencia_fim"]
+    esperado = np.flatnonzero((ini <= d) & (fim.isna() | (fim >= d)))
+
+    assert idx.ativos_em(data).tolist() == esperado.tolist()
+    assert idx.contagem_ativos(data) == len(esperado)
+
+
+def test_vencendo_na_janela_em_ordem_de_fim(intervalos):
+    idx = IndiceVigencia(intervalos)
+    d = pd.Timestamp("2018-03-01")
+    pos = idx.vencendo(d, 90)
+
+    fim = intervalos["vigencia_fim"]
+    esperado = (intervalos["vigencia_inicio"] <= d) & (fim >= d) & (fim <= d + pd.Timedelta(days=90))
+    assert sorted(pos.tolist()) == np.flatnonzero(esperado).tolist()
+    assert fim.iloc[pos].is_monotonic_increasing
+
+
+def test_sem_colunas_de_vigencia():
+    idx = IndiceVigencia(pd.DataFrame({"x": [1, 2]}))
+    assert idx.contagem_ativos("2024-01-01") == 0 and len(idx.vencendo("2024-01-01", 30)) == 0
@@ -0,0 +1,165 @@
+# vigencia.py
+"""
+Vigência como intervalo de datas [início, fim] por acordo.
+
+Extração (`datas_vigencia`, chamada no ETL):
+- início: coluna de início/assinatura, se a planilha tiver; senão a data
+  escrita na PORTARIA ("PORTARIA INPA Nº 81, 22 DE MARÇO DE 2023") ou
+  qualquer dd/mm/aaaa das colunas de data;
+- fim: coluna de término/vencimento/validade, se houver; senão início +
+  `INPA_VIGENCIA_ANOS` anos (padrão 0 = fim desconhecido, intervalo aberto).
+Fim anterior ao início é descartado (tratado como desconhecido).
+
+Consulta (`IndiceVigencia`): extremos ordenados em dois vetores de dias.
+- ativos numa data d = início <= d e (fim >= d ou fim desconhecido):
+  a contagem é uma diferença de dois `searchsorted` (O(log n));
+  as linhas vêm do menor dos dois lados ordenados, conferido pelo outro;
+- vencendo em [d, d + N dias]: uma fatia do vetor de fins, já em ordem.
+Acordos sem data de início ficam fora das consultas por data.
+"""
+import os
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+VIGENCIA_ANOS = float(os.environ.get("INPA_VIGENCIA_ANOS", "0"))
+
+MESES = {
+    "JANEIRO": 1, "FEVEREIRO": 2, "MARCO": 3, "ABRIL": 4, "MAIO": 5, "JUNHO": 6,
+    "JULHO": 7, "AGOSTO": 8, "SETEMBRO": 9, "OUTUBRO": 10, "NOVEMBRO": 11, "DEZEMBRO": 12,
+}
+_RE_EXTENSO = re.compile(r"(\d{1,2})\s*(?:º|°|O)?\s+DE\s+([A-Z]+)\s+DE\s+(\d{4})")
+_RE_NUMERICA = re.compile(r"(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})")
+
+# palavras do cabeçalho (sem acento, maiúsculas)
+_INICIO = ("INICIO", "ASSINATURA", "DATA DE ASSINATURA", "CELEBRACAO")
+_FIM = ("TERMINO", "FIM", "VENCIMENTO", "VALIDADE", "ENCERRAMENTO", "VIGENCIA ATE", "VIGENTE ATE")
+
+SEM_FIM = np.iinfo(np.int64).max     # fim desconhecido: intervalo aberto
+SEM_DATA = np.iinfo(np.int64).min
+
+
+def _normaliza(txt: str) -> str:
+    s = unicodedata.normalize("NFD", str(txt).upper())
+    return "".join(c for c in s if unicodedata.category(c) != "Mn")
+
+
+def colunas_vigencia(colunas) -> tuple:
+    """(coluna de início, coluna de fim) pelo cabeçalho; None quando não houver."""
+    inicio = fim = None
+    for c in colunas:
+        n = _normaliza(c)
+        if fim is None and any(re.search(rf"\b{p}\b", n) for p in _FIM):
+            fim = c
+        elif inicio is None and any(re.search(rf"\b{p}\b", n) for p in _INICIO):
+            inicio = c
+    return inicio, fim
+
+
+def data_no_texto(txt) -> pd.Timestamp:
+    """Primeira data do texto (por extenso ou dd/mm/aaaa); NaT se não houver."""
+    if isinstance(txt, (pd.Timestamp, np.datetime64)) or hasattr(txt, "year"):
+        return pd.Timestamp(txt)
+    if not isinstance(txt, str) or not txt.strip():
+        return pd.NaT
+    s = _normaliza(txt)
+    for m in (_RE_EXTENSO.search(s), _RE_NUMERICA.search(s)):
+        if m is None:
+            continue
+        dia, mes, ano = m.groups()
+        mes = MESES.get(mes) if not mes.isdigit() else int(mes)
+        try:
+            return pd.Timestamp(int(ano), int(mes), int(dia))
+        except (TypeError, ValueError):
+            continue
+    return pd.NaT
+
+
+def _coluna_datas(serie: pd.Series) -> pd.Series:
+    return pd.to_datetime(serie.map(data_no_texto), errors="coerce")
+
+
+def datas_vigencia(df_raw: pd.DataFrame, anos_padrao: float = None) -> tuple:
+    """(início, fim) como duas Series datetime64 alinhadas a `df_raw`."""
+    anos_padrao = VIGENCIA_ANOS if anos_padrao is None else anos_padrao
+    col_inicio, col_fim = colunas_vigencia(df_raw.columns)
+    vazio = pd.Series(pd.NaT, index=df_raw.index, dtype="datetime64[ns]")
+
+    inicio = _coluna_datas(df_raw[col_inicio]) if col_inicio else vazio.copy()
+    for c in df_raw.columns:     # texto com data (PORTARIA, DATA...) completa o que faltar
+        if inicio.notna().all():
+            break
+        if c not in (col_inicio, col_fim) and any(k in _normaliza(c) for k in ("PORTARIA", "DATA")):
+            inicio = inicio.fillna(_coluna_datas(df_raw[c]))
+
+    fim = _coluna_datas(df_raw[col_fim]) if col_fim else vazio.copy()
+    if anos_padrao:
+        fim = fim.fillna(inicio + pd.DateOffset(months=int(round(anos_padrao * 12))))
+    fim = fim.where(~(fim < inicio))
+    return inicio, fim
+
+
+def _dias(serie: pd.Series) -> np.ndarray:
+    """datetime64 -> dias desde 1970 (int64); NaT -> SEM_DATA."""
+    s = pd.to_datetime(serie, errors="coerce")
+    dias = s.to_numpy(dtype="datetime64[D]").astype(np.int64)
+    dias[s.isna().to_numpy()] = SEM_DATA
+    return dias
+
+
+def dia(data) -> int:
+    return int(np.datetime64(pd.Timestamp(data).date(), "D").astype(np.int64))
+
+
+class IndiceVigencia:
+    def __init__(self, df: pd.DataFrame, col_inicio: str = "vigencia_inicio", col_fim: str = "vigencia_fim"):
+        n = len(df)
+        if col_inicio in df.columns:
+            inicio, fim = _dias(df[col_inicio]), _dias(df[col_fim])
+        else:
+            inicio, fim = np.full(n, SEM_DATA, np.int64), np.full(n, SEM_DATA, np.int64)
+        com_inicio = inicio != SEM_DATA
+        fim = np.where(fim != SEM_DATA, fim, SEM_FIM)
+
+        self.df = df           # as posições devolvidas valem para este DataFrame
+        self.linhas = n
+        self.com_datas = np.flatnonzero(com_inicio)
+        self.inicio, self.fim = inicio, fim
+        self._ord_ini = self.com_datas[np.argsort(inicio[com_inicio], kind="stable")]
+        self._inicios = inicio[self._ord_ini]
+        self._ord_fim = self.com_datas[np.argsort(fim[com_inicio], kind="stable")]
+        self._fins = fim[self._ord_fim]
+
+    def contagem_ativos(self, data) -> int:
+        d = dia(data)
+        comecaram = np.searchsorted(self._inicios, d, "right")
+        terminaram = np.searchsorted(self._fins, d, "left")      # fim < d (fim >= início sempre)
+        return int(comecaram - terminaram)
+
+    def ativos_em(self, data) -> np.ndarray:
+        """Posições (em ordem crescente) das linhas vigentes na data."""
+        d = dia(data)
+        k_ini = np.searchsorted(self._inicios, d, "right")       # prefixo: início <= d
+        k_fim = np.searchsorted(self._fins, d, "left")           # sufixo: fim >= d
+        if k_ini <= len(self._fins) - k_fim:
+            cand = self._ord_ini[:k_ini]
+            cand = cand[self.fim[cand] >= d]
+        else:
+            cand = self._ord_fim[k_fim:]
+            cand = cand[self.inicio[cand] <= d]
+        return np.sort(cand)
+
+    def mascara_ativos(self, data) -> np.ndarray:
+        m = np.zeros(self.linhas, dtype=bool)
+        m[self.ativos_em(data)] = True
+        return m
+
+    def vencendo(self, data, dias: int) -> np.ndarray:
+        """Posições das linhas já iniciadas cujo fim cai em [data, data + dias], pela data de fim."""
+        d = dia(data)
+        i0 = np.searchsorted(self._fins, d, "left")
+        i1 = np.searchsorted(self._fins, d + dias, "right")
+        cand = self._ord_fim[i0:i1]
+        return cand[self.inicio[cand] <= d]